@@ -0,0 +1,90 @@
+"""
+Benchmark of the parallel scaling of a fourth-order Laplacian evaluated
+block by block with `plasmapy.simulation.DomainDecomposition`.
+
+Every step exchanges two layers of ghost cells and applies the stencil
+to all blocks in worker processes. The single-process evaluation with
+`plasmapy.simulation.FiniteDifference` on the undivided grid is given
+for reference.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.simulation import DomainDecomposition, FiniteDifference
+
+_COEFFICIENTS = {-2: -1 / 12, -1: 16 / 12, 0: -30 / 12, 1: 16 / 12,
+                 2: -1 / 12}
+
+
+def laplacian(f, spacing):
+    r"""Fourth-order Laplacian of the interior of a block with two ghost
+    cells."""
+    interior = tuple(slice(2, -2) for _ in range(3))
+    result = np.zeros(tuple(n - 4 for n in f.shape))
+    for dim in range(3):
+        for offset, coefficient in _COEFFICIENTS.items():
+            shifted = list(interior)
+            shifted[dim] = slice(2 + offset, f.shape[dim] - 2 + offset)
+            result += coefficient / spacing ** 2 * f[tuple(shifted)]
+    return result
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=192)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    n = args.size
+    x = np.arange(n) / n * u.m
+    plasma = Plasma3D(x, x, x)
+    plasma.pressure[...] = np.random.RandomState(0).rand(n, n, n) * u.Pa
+    spacing = 1 / n
+
+    fd = FiniteDifference(plasma, order=4)
+    out = np.empty((n, n, n))
+    reference = best_time(lambda: fd.laplacian(plasma.pressure, out=out),
+                          args.repeat)
+    print(f"grid {n}^3, FiniteDifference on one process: "
+          f"{reference:.3f} s")
+
+    print(f"{'workers':>8} {'blocks':>10} {'halo s':>8} {'stencil s':>10} "
+          f"{'total s':>8} {'speedup':>8}")
+    for workers in args.workers:
+        with DomainDecomposition(plasma, ghost_width=2, n_workers=workers,
+                                 fields=['pressure']) as decomposition:
+            decomposition.add_field('laplacian')
+            # Start the workers outside of the timings
+            decomposition.exchange_halos('pressure')
+
+            halo = best_time(
+                lambda: decomposition.exchange_halos('pressure'), args.repeat)
+            stencil = best_time(
+                lambda: decomposition.map_blocks(
+                    laplacian, ['pressure'], 'laplacian', exchange=False,
+                    spacing=spacing), args.repeat)
+            total = halo + stencil
+            assert np.allclose(decomposition.gather('laplacian'), out)
+            blocks = 'x'.join(str(b) for b in decomposition.blocks)
+            print(f"{workers:>8} {blocks:>10} {halo:>8.3f} {stencil:>10.3f} "
+                  f"{total:>8.3f} {reference / total:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
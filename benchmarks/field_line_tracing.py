@@ -0,0 +1,71 @@
+"""
+Benchmark of `plasmapy.analysis.FieldLineTracer` on a sheared, periodic
+field with a helical perturbation, tracing many lines at once and
+streaming their Poincaré crossings to disk.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.analysis import FieldLineTracer
+from plasmapy.classes import Plasma3D
+
+
+def perturbed_field(n, amplitude):
+    r"""Field lines on nested circles about the z-axis, broken up into
+    islands and stochastic layers by a helical perturbation."""
+    x = np.linspace(-1, 1, n) * u.m
+    z = np.arange(n) / n * 2 * np.pi * u.m
+    plasma = Plasma3D(x, x, z)
+    X, Y, Z = plasma.grid.to_value(u.m)
+    angle = np.arctan2(Y, X)
+    plasma.magnetic_field[0] = (-Y + amplitude * np.cos(3 * angle - 2 * Z)) \
+        * u.T
+    plasma.magnetic_field[1] = X * u.T
+    plasma.magnetic_field[2] = 1 * u.T
+    return plasma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lines', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--grid', type=int, default=64)
+    parser.add_argument('--length', type=float, default=20,
+                        help="length of each line in each direction, in m")
+    parser.add_argument('--amplitude', type=float, default=0.05)
+    parser.add_argument('--rtol', type=float, default=1e-5)
+    args = parser.parse_args()
+
+    plasma = perturbed_field(args.grid, args.amplitude)
+    rng = np.random.RandomState(0)
+    print(f"{'lines':>8} {'s':>8} {'lines/s':>9} {'Msteps/s':>9} "
+          f"{'crossings':>10} {'left':>6}")
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'crossings.npy')
+        for n_lines in args.lines:
+            tracer = FieldLineTracer(plasma, periodic=(False, False, True),
+                                     rtol=args.rtol)
+            radius = 0.8 * np.sqrt(rng.uniform(size=n_lines))
+            angle = rng.uniform(0, 2 * np.pi, n_lines)
+            seeds = np.column_stack([radius * np.cos(angle),
+                                     radius * np.sin(angle),
+                                     np.zeros(n_lines)]) * u.m
+
+            start = time.perf_counter()
+            _, left_domain, crossings = tracer.trace(
+                seeds, args.length * u.m, section=(2, 0 * u.m),
+                output=output)
+            elapsed = time.perf_counter() - start
+            print(f"{n_lines:>8} {elapsed:>8.2f} {n_lines / elapsed:>9.0f} "
+                  f"{tracer.n_steps / elapsed / 1e6:>9.3f} "
+                  f"{crossings.size:>10} {left_domain.any(axis=1).sum():>6}")
+            del crossings
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark of field gathering throughput versus grid size, with particles
+in random order and sorted by cell with `plasmapy.simulation.sorting`.
+
+Once the field arrays no longer fit in the CPU caches, gathering for
+randomly ordered particles becomes limited by memory latency, while
+sorted particles access the grid almost sequentially.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from plasmapy.simulation import GridInterpolator, deposition, sorting
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--particles', type=int, default=2 ** 21)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[16, 32, 64, 128, 192])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(0)
+    print(f"{'grid':>6} {'field MB':>9} {'method':>12} {'random':>10} "
+          f"{'sorted':>10} {'speedup':>8} {'sort time':>10}")
+    for n in args.sizes:
+        axes = (np.arange(n, dtype=float),) * 3
+        field = rng.uniform(size=(3, n, n, n))
+        positions = rng.uniform(0, n - 1, (args.particles, 3))
+
+        sorted_positions = positions.copy()
+        sort_time = best_time(
+            lambda: sorting.sort_by_cell(sorted_positions, axes), 1)
+
+        interpolator = GridInterpolator(axes, field)
+        methods = {
+            'trilinear': interpolator,
+            'CIC gather': lambda p: deposition.gather(p, field, axes),
+        }
+        for name, method in methods.items():
+            random = best_time(lambda: method(positions), args.repeat)
+            ordered = best_time(lambda: method(sorted_positions),
+                                args.repeat)
+            print(f"{n:>5}³ {field.nbytes / 2 ** 20:>9.1f} {name:>12} "
+                  f"{args.particles / random:>10.3g} "
+                  f"{args.particles / ordered:>10.3g} "
+                  f"{random / ordered:>8.2f} {sort_time:>9.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark of `plasmapy.simulation.GradShafranovSolver` on a tokamak-like
+equilibrium, timing the one-off factorization of the sparse operator and
+the Picard iterations to convergence.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.simulation import GradShafranovSolver
+
+
+def pressure(psi_n):
+    return 5e4 * (1 - psi_n) ** 2 * u.Pa
+
+
+def toroidal_field_function(psi_n):
+    return np.sqrt(36 + 4 * (1 - psi_n) ** 2) * u.T * u.m
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--grid', type=int, nargs='+',
+                        default=[129, 257, 513])
+    parser.add_argument('--tolerance', type=float, default=1e-8)
+    parser.add_argument('--relaxation', type=float, default=1)
+    args = parser.parse_args()
+
+    print(f"{'grid':>9} {'setup s':>8} {'solve s':>8} {'iters':>6} "
+          f"{'ms/iter':>8} {'I_p MA':>8}")
+    for n in args.grid:
+        R = np.linspace(4, 8, n) * u.m
+        Z = np.linspace(-2.5, 2.5, n) * u.m
+
+        start = time.perf_counter()
+        solver = GradShafranovSolver(R, Z, pressure, toroidal_field_function)
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solver.solve(tolerance=args.tolerance, relaxation=args.relaxation)
+        elapsed = time.perf_counter() - start
+
+        iterations = len(solver.residuals)
+        print(f"{n:>4}x{n:<4} {setup:>8.2f} {elapsed:>8.2f} {iterations:>6} "
+              f"{1e3 * elapsed / iterations:>8.1f} "
+              f"{solver.plasma_current.to_value(u.MA):>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
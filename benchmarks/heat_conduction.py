@@ -0,0 +1,76 @@
+"""
+Benchmark of `plasmapy.simulation.AnisotropicHeatConduction` on a
+magnetic island chain, timing the assembly of the sparse operator, the
+factorization of the preconditioner and the implicit steps.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import k_B
+from plasmapy.simulation import AnisotropicHeatConduction
+
+DENSITY = 1e19
+
+
+def island_plasma(n, nz):
+    x = np.linspace(0, 1, n, endpoint=False) * u.m
+    z = np.linspace(0, 1, nz, endpoint=False) * u.m if nz > 1 else \
+        np.zeros(1) * u.m
+    plasma = Plasma3D(x, x, z)
+    X, Y, Z = plasma.grid.to_value(u.m)
+    plasma.magnetic_field[0] = -np.sin(2 * np.pi * Y) * u.T
+    plasma.magnetic_field[1] = np.sin(2 * np.pi * X) * u.T
+    plasma.magnetic_field[2] = (0.5 + 0.1 * np.cos(2 * np.pi * Z)) * u.T
+    return plasma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--grid', type=int, nargs=2, action='append',
+                        metavar=('N', 'NZ'),
+                        help="(x, y) and z sizes, default 256x256x1 and "
+                             "24x24x24")
+    parser.add_argument('--anisotropy', type=float, default=1e8)
+    parser.add_argument('--preconditioner', default='lu',
+                        choices=['lu', 'ilu', 'jacobi'])
+    parser.add_argument('--steps', type=int, default=10)
+    args = parser.parse_args()
+    grids = args.grid or [(256, 1), (24, 24)]
+
+    kappa = 1.5 * k_B.si.value * DENSITY * \
+        np.array([args.anisotropy, 1, 0]) * u.W / u.m / u.K
+    print(f"{'grid':>12} {'setup s':>8} {'first s':>8} {'ms/step':>8} "
+          f"{'iters':>6} {'factors':>7}")
+    for n, nz in grids:
+        plasma = island_plasma(n, nz)
+        X, Y, _ = plasma.grid.to_value(u.m)
+        T = (1 + 0.1 * np.cos(2 * np.pi * X) * np.cos(2 * np.pi * Y)) * u.keV
+
+        start = time.perf_counter()
+        solver = AnisotropicHeatConduction(
+            plasma, kappa, DENSITY * u.m ** -3,
+            preconditioner=args.preconditioner)
+        setup = time.perf_counter() - start
+
+        # The first step assembles the system and factorizes it
+        start = time.perf_counter()
+        T = solver.step(T, 1e-3 * u.s)
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            T = solver.step(T, 1e-3 * u.s)
+        elapsed = time.perf_counter() - start
+
+        print(f"{f'{n}x{n}x{nz}':>12} {setup:>8.2f} {first:>8.2f} "
+              f"{1e3 * elapsed / args.steps:>8.1f} "
+              f"{solver.iterations:>6} "
+              f"{solver.factorizations:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark of `plasmapy.diagnostics.langmuir.batch_swept_probe_analysis` on
+noisy simulated probe sweeps, comparing the serial analysis with pools of
+worker processes.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy import constants as const
+from plasmapy.diagnostics.langmuir import batch_swept_probe_analysis
+
+
+def simulated_sweeps(n_sweeps, n_points, seed=0):
+    rng = np.random.RandomState(seed)
+    bias = np.linspace(-20, 15, n_points)
+    T_e = rng.uniform(1, 3, (n_sweeps, 1))
+    I_es = (1e18 * u.m ** -3 * u.cm ** 2 * const.e *
+            np.sqrt(T_e * u.eV / (2 * np.pi * const.m_e))).to_value(u.A)
+    current = np.minimum(np.exp(bias / T_e), I_es)
+    current += np.where(current < I_es, 1e-4, 5e-4) * bias
+    current *= 1 + 0.01 * rng.normal(size=current.shape)
+    return bias * u.V, current * u.A
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sweeps', type=int, default=200)
+    parser.add_argument('--points', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--bimaxwellian', action='store_true')
+    args = parser.parse_args()
+
+    bias, current = simulated_sweeps(args.sweeps, args.points)
+    print(f"{'workers':>7} {'time s':>8} {'sweeps/s':>9} {'failed':>7}")
+    for n_workers in args.workers:
+        start = time.perf_counter()
+        results = batch_swept_probe_analysis(
+            (bias, current), 1 * u.cm ** 2, 40 * u.u,
+            bimaxwellian=args.bimaxwellian, n_workers=n_workers)
+        elapsed = time.perf_counter() - start
+        print(f"{n_workers:>7} {elapsed:>8.2f} "
+              f"{args.sweeps / elapsed:>9.1f} "
+              f"{np.count_nonzero(~results['success']):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark of `plasmapy.diagnostics.langmuir.SweptProbeStream` on a
+simulated probe data feed, replaying a recorded stream of sawtooth sweeps
+from a memory-mapped ``.npy`` file in chunks and comparing the processing
+rate with the sample rate.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy import constants as const
+from plasmapy.diagnostics.langmuir import SweptProbeStream
+
+
+def record_stream(filename, rate, sweep_frequency, duration, seed=0):
+    r"""Write (time, bias, current) samples of a slowly cooling plasma."""
+    rng = np.random.RandomState(seed)
+    t = np.arange(int(rate * duration)) / rate
+    bias = (t * sweep_frequency % 1) * 35 - 20
+    T_e = 2 - t / duration
+    I_es = (1e18 * u.m ** -3 * u.cm ** 2 * const.e *
+            np.sqrt(T_e * u.eV / (2 * np.pi * const.m_e))).to_value(u.A)
+    current = np.minimum(np.exp(bias / T_e), I_es)
+    current += np.where(current < I_es, 1e-4, 5e-4) * bias
+    current *= 1 + 0.01 * rng.normal(size=t.size)
+    np.save(filename, np.array([t, bias, current]))
+
+
+def replay(filename, chunk):
+    samples = np.load(filename, mmap_mode='r')
+    for start in range(0, samples.shape[1], chunk):
+        yield samples[:, start:start + chunk]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rate', type=float, default=1e7,
+                        help="samples per second")
+    parser.add_argument('--sweep-frequency', type=float, default=1e3)
+    parser.add_argument('--duration', type=float, default=1,
+                        help="recorded time in s")
+    parser.add_argument('--chunk', type=int, default=2 ** 16)
+    parser.add_argument('--bins', type=int, default=256,
+                        help="bias bins per analysis, 0 for the raw samples")
+    parser.add_argument('--average', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--bimaxwellian', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'stream.npy')
+        record_stream(filename, args.rate, args.sweep_frequency,
+                      args.duration)
+
+        print(f"{'average':>7} {'analyses':>8} {'failed':>6} {'time s':>7} "
+              f"{'MS/s':>7} {'real time':>9}")
+        for average in args.average:
+            stream = SweptProbeStream(1 * u.cm ** 2, 40 * u.u, 10 * u.V,
+                                      bimaxwellian=args.bimaxwellian,
+                                      average=average, bins=args.bins or None)
+            start = time.perf_counter()
+            results = list(stream.analyze(replay(filename, args.chunk)))
+            elapsed = time.perf_counter() - start
+
+            failed = sum(not result['success'] for result in results)
+            print(f"{average:>7} {len(results):>8} {failed:>6} "
+                  f"{elapsed:>7.2f} "
+                  f"{args.rate * args.duration / elapsed / 1e6:>7.1f} "
+                  f"{args.duration / elapsed:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark of the throughput of `plasmapy.simulation.IdealMHD` in cell
+updates per second on the Orszag-Tang vortex, with the time spent in
+each stage of the solver.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import mu0
+from plasmapy.simulation import IdealMHD
+
+
+def orszag_tang(n, nz):
+    gamma = 5 / 3
+    scale = np.sqrt(mu0.si.value)
+    x = np.arange(n) / n * u.m
+    z = np.arange(nz) / max(nz, 1) * u.m
+    plasma = Plasma3D(x, x, z)
+    X, Y = np.meshgrid(x.value + 0.5 / n, x.value + 0.5 / n, indexing='ij')
+    X, Y = X[..., np.newaxis], Y[..., np.newaxis]
+    plasma.density[...] = gamma ** 2 * u.kg / u.m ** 3
+    plasma.pressure[...] = gamma * u.Pa
+    momentum_unit = u.kg / (u.m ** 2 * u.s)
+    plasma.momentum[0] = -gamma ** 2 * np.sin(2 * np.pi * Y) * momentum_unit
+    plasma.momentum[1] = gamma ** 2 * np.sin(2 * np.pi * X) * momentum_unit
+    plasma.magnetic_field[0] = -np.sin(2 * np.pi * Y) * scale * u.T
+    plasma.magnetic_field[1] = np.sin(4 * np.pi * X) * scale * u.T
+    return plasma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 256])
+    parser.add_argument('--nz', type=int, default=1,
+                        help="cells along z; more than one gives a 3D run")
+    parser.add_argument('--steps', type=int, default=20)
+    args = parser.parse_args()
+
+    stages = ('primitives', 'reconstruction', 'riemann', 'update',
+              'time_step')
+    print(f"{'grid':>12} {'solver':>6} {'cells/s':>10}  " +
+          " ".join(f"{stage[:8]:>8}" for stage in stages) +
+          "  (fraction of time)")
+    for n in args.sizes:
+        for riemann_solver in ('HLL', 'HLLD'):
+            plasma = orszag_tang(n, args.nz)
+            solver = IdealMHD(plasma, riemann_solver=riemann_solver)
+            solver.step()
+            solver.reset_timings()
+
+            start = time.perf_counter()
+            solver.run(n_steps=args.steps)
+            elapsed = time.perf_counter() - start
+
+            rate = np.prod(plasma.domain_shape) * args.steps / elapsed
+            fractions = " ".join(f"{solver.timings[stage] / elapsed:>8.2f}"
+                                 for stage in stages)
+            grid = 'x'.join(str(k) for k in plasma.domain_shape)
+            print(f"{grid:>12} {riemann_solver:>6} {rate:>10.3g}  "
+                  f"{fractions}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark of `plasmapy.analysis.find_magnetic_nulls` on a memory-mapped
+field of many superposed Arnold-Beltrami-Childress modes, by default on a
+512^3 grid.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.analysis import find_magnetic_nulls
+from plasmapy.classes import Plasma3D
+
+
+def write_field(path, n, modes, dtype):
+    r"""Write a divergence-free field of ABC modes with wavenumbers from
+    one to ``modes`` one slab at a time."""
+    field = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                      shape=(3, n, n, n))
+    x = np.arange(n) / n * 2 * np.pi
+    rng = np.random.RandomState(0)
+    coefficients = rng.standard_normal((modes, 3))
+    phases = rng.uniform(0, 2 * np.pi, (modes, 3))
+    for start in range(0, n, 16):
+        X, Y, Z = np.meshgrid(x[start:start + 16], x, x, indexing='ij',
+                              sparse=True)
+        slab = np.zeros((3, X.shape[0], n, n))
+        for k, ((a, b, c), (p, q, r)) in enumerate(
+                zip(coefficients, phases), start=1):
+            slab[0] += a * np.sin(k * Z + r) + c * np.cos(k * Y + q)
+            slab[1] += b * np.sin(k * X + p) + a * np.cos(k * Z + r)
+            slab[2] += c * np.sin(k * Y + q) + b * np.cos(k * X + p)
+        field[:, start:start + 16] = slab
+    field.flush()
+    del field
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--modes', type=int, default=16)
+    parser.add_argument('--dtype', choices=['float64', 'float32'],
+                        default='float32')
+    parser.add_argument('--max-bytes', type=int, default=2 ** 28)
+    args = parser.parse_args()
+
+    n = args.size
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'magnetic_field.npy')
+        write_field(path, n, args.modes, args.dtype)
+        x = np.arange(n) / n * 2 * np.pi * u.m
+        plasma = Plasma3D.from_files(x, x, x, magnetic_field=path)
+
+        start = time.perf_counter()
+        nulls = find_magnetic_nulls(plasma, max_bytes=args.max_bytes)
+        elapsed = time.perf_counter() - start
+
+        types, counts = np.unique(nulls['type'], return_counts=True)
+        cells = (n - 1) ** 3
+        print(f"grid {n}^3 {args.dtype}: {elapsed:.2f} s, "
+              f"{cells / elapsed / 1e6:.1f} Mcells/s, {nulls.size} nulls")
+        print("  " + ", ".join(f"{kind}: {count}"
+                               for kind, count in zip(types, counts)))
+        del plasma
+
+
+if __name__ == '__main__':
+    main()
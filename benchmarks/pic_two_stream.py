@@ -0,0 +1,95 @@
+"""
+Benchmark of `plasmapy.simulation.ElectrostaticPIC` on the two-stream
+instability in one, two and three dimensions.
+
+Two cold, counter-streaming electron beams are loaded on a uniform
+neutralizing background, with the box length chosen such that the
+fundamental mode lies close to the fastest growing one. Besides the
+throughput, the growth of the field energy and the relative energy error
+are printed as a sanity check of the physics.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D, Species
+from plasmapy.constants import e, m_e, eps0
+from plasmapy.simulation import ElectrostaticPIC
+
+SIZES = {
+    '1D': (256, 1, 1),
+    '2D': (64, 64, 1),
+    '3D': (32, 32, 32),
+}
+
+
+def two_stream(shape, particles_per_cell, n_threads=1, seed=0):
+    n0 = 1e14 / u.m ** 3
+    w_pe = np.sqrt(n0 * e ** 2 / (eps0 * m_e)).to(1 / u.s)
+    v0 = 1e6 * u.m / u.s
+    L = (2 * np.pi * v0 / (0.8 * w_pe)).to_value(u.m)
+
+    axes = [np.arange(n) * L / n * u.m if n > 1 else np.zeros(1) * u.m
+            for n in shape]
+    plasma = Plasma3D(*axes)
+
+    n_particles = int(np.prod(shape)) * particles_per_cell
+    volume = np.prod([L if n > 1 else 1 for n in shape])
+    rng = np.random.RandomState(seed)
+
+    species = []
+    for sign in (1, -1):
+        s = Species(plasma, 'e', n_particles,
+                    scaling=n0.si.value * volume / (2 * n_particles),
+                    dt=0.05 / w_pe, nt=1)
+        x = np.zeros((n_particles, 3))
+        for dim, n in enumerate(shape):
+            if n > 1:
+                x[:, dim] = rng.uniform(0, L, n_particles)
+        x[:, 0] = (np.arange(n_particles) + 0.5) / n_particles * L
+        x[:, 0] += sign * 1e-3 * L * np.sin(2 * np.pi * x[:, 0] / L)
+        s.x = x * u.m
+        s.v[:, 0] = sign * v0
+        species.append(s)
+
+    return ElectrostaticPIC(plasma, species, output_interval=10,
+                            n_threads=n_threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--steps', type=int, default=200)
+    parser.add_argument('--particles-per-cell', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--sizes', nargs='+', default=list(SIZES),
+                        choices=list(SIZES))
+    args = parser.parse_args()
+
+    print(f"{'case':>4} {'grid':>14} {'particles':>10} {'steps/s':>9} "
+          f"{'pushes/s':>10} {'growth':>9} {'dE/E':>9}")
+    for name in args.sizes:
+        shape = SIZES[name]
+        sim = two_stream(shape, args.particles_per_cell, args.threads)
+        n_particles = sum(s.x.shape[0] for s in sim.species)
+
+        sim.initialize()
+        start = time.perf_counter()
+        sim.run(args.steps)
+        elapsed = time.perf_counter() - start
+
+        history = sim.history
+        field = history['field_energy'].value
+        total = history['kinetic_energy'].value.sum(axis=1) + field
+        growth = field.max() / field[0] if field[0] > 0 else np.inf
+        error = np.abs(total - total[0]).max() / total[0]
+
+        print(f"{name:>4} {str(shape):>14} {n_particles:>10d} "
+              f"{args.steps / elapsed:>9.1f} "
+              f"{args.steps * n_particles / elapsed:>10.3g} "
+              f"{growth:>9.3g} {error:>9.2g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of `plasmapy.io` snapshot writing and reading against saving
+and loading the raw field arrays with `numpy.save` and `numpy.load`.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.io import read_snapshot, write_snapshot
+
+FORMATS = [
+    ('npz', '.npz', None),
+    ('npz deflate', '.npz', 'deflate'),
+    ('hdf5', '.h5', None),
+    ('hdf5 gzip', '.h5', 'gzip'),
+    ('hdf5 lzf', '.h5', 'lzf'),
+]
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def make_plasma(n):
+    axis = np.linspace(0, 1, n) * u.m
+    plasma = Plasma3D(axis, axis, axis)
+    rng = np.random.RandomState(0)
+    # Smooth fields compress like simulation output, unlike white noise
+    k = 2 * np.pi * np.arange(n) / n
+    profile = np.sin(k)[:, None, None] * np.cos(2 * k)[None, :, None]
+    for name in Plasma3D._fields:
+        field = getattr(plasma, name)
+        field[...] = (1 + profile + 1e-3 * rng.normal(size=field.shape)) * \
+            field.unit
+    return plasma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--size', type=int, default=128)
+    args = parser.parse_args()
+
+    plasma = make_plasma(args.size)
+    n_bytes = sum(getattr(plasma, name).nbytes for name in Plasma3D._fields)
+    mb = n_bytes / 2 ** 20
+    quarter = slice(0, args.size // 4)
+
+    print(f"grid {args.size}³, {mb:.0f} MB of fields")
+    print(f"{'format':>12} {'write MB/s':>11} {'read MB/s':>10} "
+          f"{'1/64 read s':>12} {'size MB':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"{name}.npy")
+                 for name in Plasma3D._fields]
+
+        def save():
+            for name, path in zip(Plasma3D._fields, paths):
+                np.save(path, getattr(plasma, name).value)
+
+        def load():
+            for path in paths:
+                np.load(path)
+
+        def load_region():
+            for path in paths:
+                np.array(np.load(path, mmap_mode='r')[..., quarter, quarter,
+                                                      quarter])
+
+        write = timed(save)
+        size = sum(os.path.getsize(path) for path in paths) / 2 ** 20
+        print(f"{'np.save':>12} {mb / write:>11.0f} {mb / timed(load):>10.0f} "
+              f"{timed(load_region):>12.3f} {size:>8.0f}")
+
+        for label, suffix, compression in FORMATS:
+            path = os.path.join(directory, label.replace(' ', '_') + suffix)
+            try:
+                write = timed(lambda: write_snapshot(
+                    path, plasma, compression=compression))
+            except (ImportError, ValueError) as error:
+                print(f"{label:>12} skipped: {error}")
+                continue
+            read = timed(lambda: read_snapshot(path))
+            region = timed(lambda: read_snapshot(
+                path, region=(quarter, quarter, quarter)))
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{label:>12} {mb / write:>11.0f} {mb / read:>10.0f} "
+                  f"{region:>12.3f} {size:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
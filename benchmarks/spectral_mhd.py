@@ -0,0 +1,62 @@
+"""
+Benchmark of the steps per second of `plasmapy.simulation.SpectralMHD`
+on a three-dimensional Taylor-Green vortex threaded by a magnetic field,
+with the memory held by its buffers.
+"""
+import argparse
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import mu0
+from plasmapy.simulation import SpectralMHD
+
+
+def taylor_green(n):
+    x = np.arange(n) / n * 2 * np.pi * u.m
+    plasma = Plasma3D(x, x, x)
+    plasma.density[...] = 1 * u.kg / u.m ** 3
+    X, Y, Z = plasma.grid.value
+    momentum_unit = u.kg / (u.m ** 2 * u.s)
+    plasma.momentum[0] = np.sin(X) * np.cos(Y) * np.cos(Z) * momentum_unit
+    plasma.momentum[1] = -np.cos(X) * np.sin(Y) * np.cos(Z) * momentum_unit
+    plasma.magnetic_field[0] = np.cos(X) * np.sin(Y) * np.sin(Z) * \
+        np.sqrt(mu0.si.value) * u.T
+    plasma.magnetic_field[1] = -np.sin(X) * np.cos(Y) * np.sin(Z) * \
+        np.sqrt(mu0.si.value) * u.T
+    return plasma
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[64, 128, 256])
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('--dtype', choices=['float64', 'float32'],
+                        default='float64')
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'grid':>6} {'dtype':>8} {'steps/s':>8} {'s/step':>8} "
+          f"{'buffers GB':>11}")
+    for n in args.sizes:
+        plasma = taylor_green(n)
+        solver = SpectralMHD(plasma, viscosity=1e-3 * u.m ** 2 / u.s,
+                             dtype=args.dtype, n_threads=args.threads)
+        buffers = sum(array.nbytes for array in (
+            solver._state, solver._initial, solver._nonlinear,
+            solver._curls, solver._products))
+        # The first step computes the integrating factors
+        dt = solver.step()
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            solver.step(dt)
+        elapsed = (time.perf_counter() - start) / args.steps
+        print(f"{n:>6} {args.dtype:>8} {1 / elapsed:>8.3g} {elapsed:>8.3f} "
+              f"{buffers / 2 ** 30:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
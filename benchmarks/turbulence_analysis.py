@@ -0,0 +1,87 @@
+"""
+Benchmark of the throughput of `plasmapy.analysis.TurbulenceAnalysis` on
+a memory-mapped random field, by default of 512^3 cells, with the
+transforms held in memory-mapped scratch files.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.analysis import TurbulenceAnalysis
+from plasmapy.classes import Plasma3D
+
+
+def write_field(path, n, dtype):
+    r"""Write a random scalar field of n^3 cells one slab at a time."""
+    field = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                      shape=(n, n, n))
+    rng = np.random.RandomState(0)
+    for start in range(0, n, 16):
+        stop = min(start + 16, n)
+        field[start:stop] = rng.standard_normal((stop - start, n, n))
+    field.flush()
+    del field
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--dtype', choices=['float64', 'float32'],
+                        default='float32')
+    parser.add_argument('--max-bytes', type=int, default=2 ** 28)
+    parser.add_argument('--samples', type=int, default=10 ** 6)
+    parser.add_argument('--threads', type=int, default=None)
+    args = parser.parse_args()
+
+    n = args.size
+    cells = n ** 3
+    with tempfile.TemporaryDirectory() as directory:
+        path = f"{directory}/density.npy"
+        write_field(path, n, args.dtype)
+        x = np.arange(n) / n * u.m
+        plasma = Plasma3D.from_files(x, x, x, density=path)
+        analysis = TurbulenceAnalysis(plasma, max_bytes=args.max_bytes,
+                                      scratch_dir=directory,
+                                      n_threads=args.threads)
+        field_bytes = plasma.density.nbytes
+
+        cases = [
+            ('power spectrum (shells)',
+             lambda: analysis.power_spectrum('density')),
+            ('power spectrum (x)',
+             lambda: analysis.power_spectrum('density', axis=0)),
+            ('structure functions p=2',
+             lambda: analysis.structure_function('density', orders=2)),
+            ('structure functions p=2..4',
+             lambda: analysis.structure_function('density',
+                                                 orders=[2, 3, 4])),
+            ('increment PDF',
+             lambda: analysis.increment_pdf('density', n // 4, axis=1)),
+        ]
+        print(f"grid {n}^3 {args.dtype}, field "
+              f"{field_bytes / 2 ** 20:.0f} MB, chunks of "
+              f"{args.max_bytes / 2 ** 20:.0f} MB")
+        print(f"{'analysis':>28} {'s':>8} {'Mcells/s':>9} {'MB/s':>8}")
+        for label, function in cases:
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            print(f"{label:>28} {elapsed:>8.2f} {cells / elapsed / 1e6:>9.2f} "
+                  f"{field_bytes / elapsed / 2 ** 20:>8.1f}")
+
+        lags = np.unique(np.geomspace(1, n // 2, 8).astype(int))
+        start = time.perf_counter()
+        analysis.sampled_structure_function('density', lags, orders=[1, 2, 3],
+                                            n_samples=args.samples)
+        elapsed = time.perf_counter() - start
+        pairs = args.samples * lags.size
+        print(f"sampled structure functions: {lags.size} lags, "
+              f"{pairs / elapsed / 1e6:.2f} Mpairs/s")
+        del analysis, plasma
+
+
+if __name__ == '__main__':
+    main()
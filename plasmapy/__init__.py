@@ -25,11 +25,14 @@ if sys.version_info < tuple((int(val) for val in "3.6".split('.'))):
 
 if not _ASTROPY_SETUP_:
     # For egg_info test builds to pass, put package imports here.
+    from . import analysis
     from . import atomic
     from . import classes
     from . import constants
     from . import diagnostics
+    from . import io
     from . import mathematics
     from . import physics
+    from . import simulation
     from . import utils
 
@@ -0,0 +1,9 @@
+"""
+The `plasmapy.analysis` subpackage contains tools for analyzing fields
+defined on `~plasmapy.classes.Plasma3D` grids, such as simulation
+snapshots.
+"""
+
+from .turbulence import TurbulenceAnalysis
+from .field_lines import FieldLineTracer
+from .nulls import find_magnetic_nulls
@@ -0,0 +1,364 @@
+"""
+Tracing of magnetic field lines on Plasma3D grids, with Poincaré
+sections and connection lengths.
+"""
+import struct
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.simulation.guiding_center import _dormand_prince_step
+from plasmapy.simulation.interpolation import GridInterpolator
+
+__all__ = [
+    "FieldLineTracer",
+]
+
+
+class _NpyWriter:
+    r"""
+    Append records to a ``.npy`` file as they are produced. The header is
+    written with a fixed size and rewritten with the final number of
+    records when the writer is closed.
+    """
+    _HEADER_BYTES = 256
+
+    def __init__(self, path, dtype):
+        self.dtype = dtype
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype),
+                       'fortran_order': False, 'shape': (self.count,)})
+        header = header.ljust(self._HEADER_BYTES - 11) + '\n'
+        self._file.seek(0)
+        self._file.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header))
+                         + header.encode('latin1'))
+
+    def append(self, records):
+        self._file.seek(0, 2)
+        self._file.write(records.tobytes())
+        self.count += records.size
+
+    def close(self):
+        self._write_header()
+        self._file.close()
+
+
+def _hermite(y0, y1, f0, f1, h, theta):
+    r"""Cubic Hermite interpolant through the ends of a step of length
+    ``h`` and its derivative with respect to ``theta``."""
+    theta = theta[:, np.newaxis]
+    h = h[:, np.newaxis]
+    t2, t3 = theta ** 2, theta ** 3
+    value = (2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + theta) * h * f0 + \
+        (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * h * f1
+    slope = (6 * t2 - 6 * theta) * (y0 - y1) + \
+        (3 * t2 - 4 * theta + 1) * h * f0 + (3 * t2 - 2 * theta) * h * f1
+    return value, slope
+
+
+class FieldLineTracer:
+    r"""
+    Trace many magnetic field lines of a `~plasmapy.classes.Plasma3D` at
+    once.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma providing the grid and the magnetic field.
+    periodic : bool or sequence of bool
+        Whether the x, y and z axes are periodic, either for all axes or
+        for each of them. Periodic axes must be uniformly spaced and have
+        a period of the number of grid points times the spacing. Lines
+        leave the domain through the ends of the other axes.
+    rtol : float
+        Tolerance of the adaptive step controller on the position error
+        of each step, relative to the largest extent of the grid.
+    max_step : `~astropy.units.Quantity`, optional
+        Longest step along a line. By default sixteen times the smallest
+        grid spacing.
+
+    Attributes
+    ----------
+    n_steps : int
+        Total number of accepted steps of all lines traced so far.
+
+    Notes
+    -----
+    Field lines are integrated in their arc length :math:`s`,
+
+    .. math::
+        \frac{d\vec{x}}{ds} = \pm \frac{\vec{B}}{|\vec{B}|},
+
+    with the embedded Dormand-Prince Runge-Kutta scheme of
+    `~plasmapy.simulation.GuidingCenter`. All lines are advanced together
+    in array operations, each with its own adaptive step size, and the
+    field is interpolated with `~plasmapy.simulation.GridInterpolator`.
+    Lines that leave the domain, or run into a null of the field, are
+    pinned at the boundary and dropped from the integration. Only the
+    current positions of the lines are held in memory.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 5) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> plasma.magnetic_field[2] = 1 * u.T
+    >>> tracer = FieldLineTracer(plasma)
+    >>> seeds = [[0.5, 0.5, 0.25]] * u.m
+    >>> lengths, left_domain, _ = tracer.trace(seeds, 2 * u.m)
+    >>> np.round(lengths, 6)
+    <Quantity [[0.75, 0.25]] m>
+    """
+
+    #: Record of one crossing of a Poincaré section: the index of the
+    #: seed, the tracing direction (1 along the field and -1 against
+    #: it), the arc length from the seed and the position in metres.
+    crossing_dtype = np.dtype([('seed', np.int64), ('direction', np.int8),
+                               ('length', np.float64),
+                               ('position', np.float64, (3,))])
+
+    def __init__(self, plasma, periodic=False, rtol=1e-6, max_step=None):
+        if isinstance(periodic, (bool, np.bool_)):
+            periodic = (periodic,) * 3
+        periodic = tuple(bool(flag) for flag in periodic)
+        if len(periodic) != 3:
+            raise ValueError(f"Expected one periodic flag per axis, got "
+                             f"{periodic}.")
+        self.periodic = periodic
+
+        axes = [plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m)]
+        self.shape = tuple(axis.size for axis in axes)
+        self._origin = np.array([axis[0] for axis in axes])
+        spacing = np.array([np.diff(axis).min() if axis.size > 1 else np.inf
+                            for axis in axes])
+        self._period = np.full(3, np.inf)
+
+        field = plasma.magnetic_field.value
+        for dim, axis in enumerate(axes):
+            if not periodic[dim] or axis.size == 1:
+                continue
+            steps = np.diff(axis)
+            if not np.allclose(steps, steps[0]):
+                raise ValueError(f"Periodic axis {dim} must be uniformly "
+                                 f"spaced.")
+            self._period[dim] = axis.size * steps[0]
+            # Close the period with a copy of the first plane, so that
+            # positions between the last point and the first can be
+            # interpolated
+            axes[dim] = np.append(axis, axis[0] + self._period[dim])
+            first = [slice(None)] * 4
+            first[dim + 1] = slice(0, 1)
+            field = np.concatenate([field, field[tuple(first)]], axis=dim + 1)
+
+        self._interpolator = GridInterpolator(axes, field, fill_value=np.nan)
+        extent = max(axis[-1] - axis[0] for axis in axes)
+        self._atol = rtol * (extent if extent > 0 else 1)
+        self._h_initial = spacing.min() if np.isfinite(spacing.min()) else 1
+        self._h_max = 16 * self._h_initial if max_step is None \
+            else max_step.to_value(u.m)
+        self._h_min = 1e-9 * max(extent, self._h_initial)
+        self.n_steps = 0
+
+    def _wrap(self, points):
+        r"""Map positions on periodic axes into the first period."""
+        wrapped = points.copy()
+        for dim in range(3):
+            if np.isfinite(self._period[dim]):
+                wrapped[:, dim] = self._origin[dim] + np.mod(
+                    points[:, dim] - self._origin[dim], self._period[dim])
+        return wrapped
+
+    def _rhs(self, sign):
+        def rhs(points):
+            field = self._interpolator(self._wrap(points))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return field * (sign / np.linalg.norm(field, axis=1))[
+                    :, np.newaxis]
+        return rhs
+
+    def _crossings(self, section, y0, y1, h, sign):
+        r"""
+        Find the steps from ``y0`` to ``y1`` that cross the section plane
+        and the fraction of the step at which they do.
+        """
+        dim, value = section
+        before, after = y0[:, dim] - value, y1[:, dim] - value
+        if np.isfinite(self._period[dim]):
+            before = np.floor(before / self._period[dim])
+            after = np.floor(after / self._period[dim])
+            crossed = np.flatnonzero(before != after)
+            target = value + np.maximum(before, after)[crossed] * \
+                self._period[dim]
+        else:
+            crossed = np.flatnonzero((before >= 0) != (after >= 0))
+            target = np.full(crossed.size, value)
+        if crossed.size == 0:
+            return crossed, None, None
+
+        # Refine the linear estimate on the cubic Hermite interpolant
+        y0, y1, h = y0[crossed], y1[crossed], h[crossed]
+        rhs = self._rhs(sign[crossed])
+        f0, f1 = rhs(y0), rhs(y1)
+        theta = (target - y0[:, dim]) / (y1[:, dim] - y0[:, dim])
+        for _ in range(4):
+            value_, slope = _hermite(y0, y1, f0, f1, h, theta)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                update = (value_[:, dim] - target) / slope[:, dim]
+            theta = np.clip(theta - np.nan_to_num(update), 0, 1)
+        position, _ = _hermite(y0, y1, f0, f1, h, theta)
+        position[:, dim] = target
+        return crossed, theta, position
+
+    def trace(self, seeds, max_length, section=None, direction='both',
+              output=None):
+        r"""
+        Trace the field lines through the given seed points.
+
+        Parameters
+        ----------
+        seeds : `~astropy.units.Quantity`
+            Array of shape (n, 3) of starting points within the domain.
+        max_length : `~astropy.units.Quantity`
+            Arc length after which a line is no longer followed.
+        section : tuple, optional
+            Poincaré section as the index of an axis and a coordinate
+            `~astropy.units.Quantity` along it, e.g. ``(2, 0 * u.m)`` for
+            the plane :math:`z = 0`. On periodic axes all periodic images
+            of the plane are crossed.
+        direction : str
+            Trace ``'forward'`` along the field, ``'backward'`` against
+            it, or ``'both'``.
+        output : str or path, optional
+            ``.npy`` file to which the section crossings are written as
+            they are found, instead of collecting them in memory.
+
+        Returns
+        -------
+        lengths : `~astropy.units.Quantity`
+            Array of shape (n, 2) of the arc lengths followed forward and
+            backward from each seed. The connection length of lines that
+            left the domain in both directions is their sum.
+        left_domain : ndarray
+            Boolean array of shape (n, 2) marking the directions in which
+            each line left the domain before reaching ``max_length``.
+        crossings : ndarray
+            Structured array of ``crossing_dtype`` records of the section
+            crossings, with the positions mapped into the domain on
+            periodic axes. The crossings of each line appear in the order
+            of their distance from the seed. If ``output`` is given, this
+            is a read-only memory map of the file.
+        """
+        points = seeds.to_value(u.m).astype(float)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError(f"Seeds must have shape (n, 3), got "
+                             f"{points.shape}.")
+        n_seeds = points.shape[0]
+        max_length = max_length.to_value(u.m)
+        signs = {'forward': [1], 'backward': [-1], 'both': [1, -1]}
+        if direction not in signs:
+            raise ValueError(f"Unknown direction {direction!r}; expected "
+                             f"'forward', 'backward' or 'both'.")
+        signs = signs[direction]
+
+        h_max = self._h_max
+        if section is not None:
+            dim, value = section
+            if dim not in (0, 1, 2) or self.shape[dim] == 1:
+                raise ValueError(f"The section must be normal to an axis "
+                                 f"with more than one point, got {dim}.")
+            section = (dim, value.to_value(u.m))
+            # At most one periodic image of the plane per step
+            h_max = min(h_max, self._period[dim] / 2)
+        if output is not None and not str(output).endswith('.npy'):
+            raise ValueError(f"Crossings can only be written to .npy "
+                             f"files, got {output}.")
+
+        y = np.concatenate([points] * len(signs))
+        sign = np.repeat(signs, n_seeds).astype(float)
+        seed_index = np.tile(np.arange(n_seeds), len(signs))
+        s = np.zeros(y.shape[0])
+        h = np.full(y.shape[0], min(self._h_initial, h_max))
+        lost = ~self._interpolator.contains(self._wrap(y))
+        if lost.any():
+            raise ValueError("All seeds must lie within the domain.")
+
+        found = []
+        writer = None if output is None else \
+            _NpyWriter(output, self.crossing_dtype)
+        try:
+            while True:
+                active = np.flatnonzero(~lost & (s < max_length))
+                if active.size == 0:
+                    break
+
+                step = np.minimum(h[active], max_length - s[active])
+                y_new, error = _dormand_prince_step(
+                    self._rhs(sign[active]), y[active], step)
+                err = np.sqrt(np.mean((error / self._atol) ** 2, axis=1))
+                # Steps that leave the grid produce NaN and are retried
+                # with a smaller step until the line is pinned at the
+                # boundary
+                outside = np.isnan(err)
+                err[outside] = np.inf
+                accept = err <= 1
+                accepted = active[accept]
+
+                if section is not None:
+                    crossed, theta, position = self._crossings(
+                        section, y[accepted], y_new[accept], step[accept],
+                        sign[accepted])
+                    if crossed.size:
+                        lines = accepted[crossed]
+                        records = np.empty(crossed.size, self.crossing_dtype)
+                        records['seed'] = seed_index[lines]
+                        records['direction'] = sign[lines]
+                        records['length'] = s[lines] + \
+                            theta * step[accept][crossed]
+                        records['position'] = self._wrap(position)
+                        # Seeds on the section are not crossings
+                        records = records[records['length'] > 0]
+                        if writer is None:
+                            found.append(records)
+                        else:
+                            writer.append(records)
+
+                y[accepted] = y_new[accept]
+                s[accepted] += step[accept]
+                self.n_steps += accepted.size
+
+                with np.errstate(divide='ignore'):
+                    factor = np.clip(0.9 * err ** -0.2, 0.2, 5.0)
+                h_next = np.minimum(step * factor, h_max)
+                # A step shortened to end at max_length says nothing about
+                # the step size the line could otherwise sustain
+                truncated = accept & (step < h[active])
+                h_next[truncated] = np.maximum(h_next[truncated],
+                                               h[active][truncated])
+                h[active] = h_next
+
+                lost[active[outside & (h_next < self._h_min)]] = True
+        finally:
+            if writer is not None:
+                writer.close()
+
+        lengths = np.zeros((n_seeds, 2))
+        left_domain = np.zeros((n_seeds, 2), dtype=bool)
+        for position, direction_sign in enumerate(signs):
+            column = 0 if direction_sign > 0 else 1
+            lines = slice(position * n_seeds, (position + 1) * n_seeds)
+            lengths[:, column] = s[lines]
+            left_domain[:, column] = lost[lines]
+
+        if output is not None:
+            crossings = np.load(output, mmap_mode='r')
+        elif found:
+            crossings = np.concatenate(found)
+        else:
+            crossings = np.empty(0, self.crossing_dtype)
+        return lengths * u.m, left_domain, crossings
@@ -0,0 +1,276 @@
+"""
+Location and classification of magnetic null points on Plasma3D grids.
+"""
+import numpy as np
+from astropy import units as u
+
+__all__ = [
+    "find_magnetic_nulls",
+]
+
+#: Null point record: the position in metres, the lower corner of the
+#: grid cell holding it, the eigenvalues of the Jacobian of the field in
+#: T/m, the unit vectors along the spine and normal to the fan, and the
+#: type of the null.
+_NULL_DTYPE = np.dtype([('position', np.float64, (3,)),
+                       ('cell', np.int64, (3,)),
+                       ('eigenvalues', np.complex128, (3,)),
+                       ('spine', np.float64, (3,)),
+                       ('fan_normal', np.float64, (3,)),
+                       ('type', 'U10')])
+
+# Starting points of the Newton iterations, in cell coordinates: the
+# centre, then points near each corner
+_STARTS = np.array([[0.5, 0.5, 0.5]] +
+                   [[a, b, c] for a in (0.1, 0.9) for b in (0.1, 0.9)
+                    for c in (0.1, 0.9)])
+
+
+def _candidate_cells(slab):
+    r"""
+    Mark the cells of a (3, x, y, z) slab of the field in which every
+    component changes sign or vanishes at a corner.
+
+    Trilinear interpolation keeps each component between its extreme
+    corner values, so all other cells are free of nulls.
+    """
+    candidate = None
+    for component in slab:
+        for sign in (np.greater, np.less):
+            same = sign(component, 0)
+            same = same[1:] & same[:-1]
+            same = same[:, 1:] & same[:, :-1]
+            same = same[:, :, 1:] & same[:, :, :-1]
+            if candidate is None:
+                candidate = ~same
+            else:
+                candidate &= ~same
+    return candidate
+
+
+def _trilinear(corners, xi):
+    r"""Field and Jacobian in cell coordinates of the trilinear
+    interpolant with (n, 3, 2, 2, 2) ``corners`` at (n, 3) ``xi``."""
+    weights = np.stack([1 - xi, xi], axis=-1)
+    slopes = np.array([-1.0, 1.0])
+    wx, wy, wz = weights[:, 0], weights[:, 1], weights[:, 2]
+    value = np.einsum('nkabc,na,nb,nc->nk', corners, wx, wy, wz)
+    jacobian = np.stack([
+        np.einsum('nkabc,a,nb,nc->nk', corners, slopes, wy, wz),
+        np.einsum('nkabc,na,b,nc->nk', corners, wx, slopes, wz),
+        np.einsum('nkabc,na,nb,c->nk', corners, wx, wy, slopes),
+    ], axis=-1)
+    return value, jacobian
+
+
+def _newton(corners, start, max_iterations, tolerance=1e-10):
+    r"""
+    Newton iterations for the zero of the trilinear field in each cell,
+    from one starting point in cell coordinates.
+
+    Returns the cell coordinates and a mask of the iterations that
+    converged within the cell.
+    """
+    n = corners.shape[0]
+    xi = np.tile(start, (n, 1))
+    converged = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+    for _ in range(max_iterations):
+        value, jacobian = _trilinear(corners[active], xi[active])
+        # Exactly singular Jacobians, e.g. of uniform components, cannot
+        # be inverted and end their iterations
+        singular = np.linalg.det(jacobian) == 0
+        jacobian[singular] = np.eye(3)
+        value[singular] = np.nan
+        step = np.linalg.solve(jacobian, value[..., np.newaxis])[..., 0]
+        xi[active] -= step
+        size = np.abs(step).max(axis=1)
+        done = size < tolerance
+        converged[active[done]] = True
+        # Iterations that diverge or wander far from the cell are dropped
+        with np.errstate(invalid='ignore'):
+            keep = ~done & np.isfinite(size) & \
+                (np.abs(xi[active] - 0.5).max(axis=1) < 2)
+        active = active[keep]
+        if active.size == 0:
+            break
+
+    slack = 1e-8
+    inside = np.all((xi >= -slack) & (xi <= 1 + slack), axis=1)
+    return np.clip(xi, 0, 1), converged & inside
+
+
+def _classify(jacobian):
+    r"""Eigenvalues, spine and fan normal directions and types of the
+    nulls with the given (n, 3, 3) physical Jacobians."""
+    n = jacobian.shape[0]
+    eigenvalues, eigenvectors = np.linalg.eig(jacobian)
+    scale = np.abs(eigenvalues).max(axis=1)
+    determinant = np.linalg.det(jacobian)
+    degenerate = np.abs(determinant) <= 1e-8 * scale ** 3
+    spiral = np.abs(eigenvalues.imag).max(axis=1) > 1e-8 * scale
+    sign = np.sign(determinant)
+
+    # The spine eigenvalue has the sign of the determinant, opposite to
+    # the two eigenvalues of the fan
+    spine_index = np.argmax(sign[:, np.newaxis] * eigenvalues.real, axis=1)
+    rows = np.arange(n)
+    spine = eigenvectors[rows, :, spine_index].real
+    fan = [eigenvectors[rows, :, (spine_index + offset) % 3]
+           for offset in (1, 2)]
+    fan_normal = np.where(spiral[:, np.newaxis],
+                          np.cross(fan[0].real, fan[0].imag),
+                          np.cross(fan[0].real, fan[1].real))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spine /= np.linalg.norm(spine, axis=1, keepdims=True)
+        fan_normal /= np.linalg.norm(fan_normal, axis=1, keepdims=True)
+
+    types = np.where(sign > 0, 'A', 'B').astype('U10')
+    types[spiral] = np.char.add(types[spiral], 's')
+    types[degenerate] = 'degenerate'
+    spine[degenerate] = np.nan
+    fan_normal[degenerate] = np.nan
+    return eigenvalues, spine, fan_normal, types
+
+
+def find_magnetic_nulls(plasma, max_bytes=2 ** 28, max_iterations=30):
+    r"""
+    Find and classify the null points of the magnetic field of a
+    `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma whose ``magnetic_field`` is searched. All three axes must
+        have more than one point; the spacing may be non-uniform.
+    max_bytes : int
+        Approximate upper limit on the size of each slab of the field
+        read at once, so that memory-mapped fields are searched without
+        loading them as a whole.
+    max_iterations : int
+        Largest number of Newton iterations from each starting point.
+
+    Returns
+    -------
+    ndarray
+        Structured array with one record per null and the fields
+
+        - ``position``: position in metres, shape (3,)
+        - ``cell``: grid indices of the lower corner of the cell
+          holding the null, shape (3,)
+        - ``eigenvalues``: eigenvalues of the Jacobian
+          :math:`\partial B_i / \partial x_j` in T/m, shape (3,)
+        - ``spine``: unit vector along the spine, shape (3,)
+        - ``fan_normal``: unit normal of the fan plane, shape (3,)
+        - ``type``: ``'A'`` for negative nulls, with two eigenvalues of
+          negative real part in the fan and field lines converging
+          towards the null in it, ``'B'`` for positive nulls, a suffix
+          ``'s'`` for spiral nulls whose fan eigenvalues are complex, or
+          ``'degenerate'`` if the Jacobian is singular.
+
+        The records are sorted by position.
+
+    Notes
+    -----
+    The field is interpolated trilinearly within each cell, as in [1]_.
+    Each component of this interpolant lies between its extreme values
+    at the corners of the cell, so a cell can only hold a null if every
+    component changes sign across its corners. This test is evaluated
+    for all cells with a few boolean array operations on each slab of
+    the grid and discards the vast majority of them. The remaining cells
+    are refined together with vectorized Newton iterations on the
+    trilinear interpolant, started at the centre of the cell and, if
+    that fails, near each of its corners. Candidates without a zero in
+    their cell are dropped, and nulls on shared faces are reported once.
+
+    Lines of nulls, such as the X-lines of two-dimensional fields, have
+    singular Jacobians and are not found. A cell holding more than one
+    null reports at most one of them.
+
+    References
+    ----------
+    .. [1] M. Haynes and C. E. Parnell, "A trilinear method for finding
+           null points in a three-dimensional vector space", Physics of
+           Plasmas 14, 082107 (2007)
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(-1, 1, 5) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> X, Y, Z = plasma.grid.value
+    >>> plasma.magnetic_field[...] = np.stack([X - 0.1, Y, -2 * Z]) * u.T
+    >>> nulls = find_magnetic_nulls(plasma)
+    >>> nulls['position'].round(6), nulls['type']
+    (array([[0.1, 0. , 0. ]]), array(['B'], dtype='<U10'))
+    """
+    axes = [plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+            plasma.z.to_value(u.m)]
+    shape = tuple(axis.size for axis in axes)
+    if min(shape) < 2:
+        raise ValueError(f"Null points can only be found on grids with at "
+                         f"least two points along each axis, got {shape}.")
+    field = plasma.magnetic_field
+    unit_scale = field.unit.to(u.T)
+    field = field.value
+
+    # Sign-change filter over slabs of x-planes sharing their last plane
+    plane_bytes = field[:, 0].nbytes
+    planes = max(1, int(max_bytes // max(plane_bytes, 1)) - 1)
+    cells, corners = [], []
+    for start in range(0, shape[0] - 1, planes):
+        stop = min(start + planes, shape[0] - 1)
+        slab = np.asarray(field[:, start:stop + 1])
+        found = np.nonzero(_candidate_cells(slab))
+        if found[0].size == 0:
+            continue
+        i, j, k = found
+        corners.append(np.stack([
+            slab[:, i + a, j + b, k + c]
+            for a in (0, 1) for b in (0, 1) for c in (0, 1)
+        ], axis=-1).reshape(3, -1, 2, 2, 2).swapaxes(0, 1))
+        cells.append(np.stack([i + start, j, k], axis=1))
+
+    if not cells:
+        return np.empty(0, _NULL_DTYPE)
+    cells = np.concatenate(cells)
+    corners = np.concatenate(corners).astype(float)
+
+    xi = np.zeros((cells.shape[0], 3))
+    found = np.zeros(cells.shape[0], dtype=bool)
+    for start in _STARTS:
+        pending = np.flatnonzero(~found)
+        if pending.size == 0:
+            break
+        result, converged = _newton(corners[pending], start, max_iterations)
+        xi[pending[converged]] = result[converged]
+        found[pending[converged]] = True
+    if not found.any():
+        return np.empty(0, _NULL_DTYPE)
+    cells, corners, xi = cells[found], corners[found], xi[found]
+
+    lower = np.stack([axes[dim][cells[:, dim]] for dim in range(3)], axis=1)
+    spacing = np.stack([axes[dim][cells[:, dim] + 1] - axes[dim][cells[:, dim]]
+                        for dim in range(3)], axis=1)
+    position = lower + xi * spacing
+
+    # Nulls on faces, edges or corners are found in every adjacent cell
+    tolerance = 1e-6 * spacing.min(axis=0)
+    _, unique = np.unique(np.round(position / tolerance), axis=0,
+                          return_index=True)
+    cells, corners, xi, position, spacing = (
+        array[unique] for array in (cells, corners, xi, position, spacing))
+
+    _, jacobian = _trilinear(corners, xi)
+    jacobian = jacobian * unit_scale / spacing[:, np.newaxis, :]
+    eigenvalues, spine, fan_normal, types = _classify(jacobian)
+
+    nulls = np.empty(cells.shape[0], _NULL_DTYPE)
+    nulls['position'] = position
+    nulls['cell'] = cells
+    nulls['eigenvalues'] = eigenvalues
+    nulls['spine'] = spine
+    nulls['fan_normal'] = fan_normal
+    nulls['type'] = types
+    return nulls
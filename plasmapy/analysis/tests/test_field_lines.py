@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.analysis import FieldLineTracer
+from plasmapy.classes import Plasma3D
+
+
+def helical_plasma(twist=0.5):
+    r"""Uniform rotation of the field about the z-axis, periodic in z,
+    which trilinear interpolation represents exactly."""
+    x = np.linspace(-1, 1, 21) * u.m
+    z = np.arange(8) / 8 * u.m
+    test_plasma = Plasma3D(x, x, z)
+    X, Y, _ = test_plasma.grid.to_value(u.m)
+    test_plasma.magnetic_field[0] = -twist * Y * u.T
+    test_plasma.magnetic_field[1] = twist * X * u.T
+    test_plasma.magnetic_field[2] = 1 * u.T
+    return test_plasma
+
+
+def test_connection_lengths():
+    x = np.linspace(0, 2, 9) * u.m
+    test_plasma = Plasma3D(x, x[:5], x[:3])
+    test_plasma.magnetic_field[0] = 3 * u.G
+    seeds = [[0.5, 0.2, 0.1], [1.9, 0.7, 0.3], [1, 0.5, 0.5]] * u.m
+
+    tracer = FieldLineTracer(test_plasma)
+    lengths, left_domain, crossings = tracer.trace(seeds, 10 * u.m)
+    assert u.allclose(lengths, [[1.5, 0.5], [0.1, 1.9], [1, 1]] * u.m,
+                      atol=1e-6 * u.m)
+    assert left_domain.all()
+    assert crossings.size == 0
+    assert tracer.n_steps > 0
+
+    # Lines stop at the maximum length or in one direction only
+    lengths, left_domain, _ = tracer.trace(seeds, 0.3 * u.m,
+                                           direction='backward')
+    assert u.allclose(lengths[:, 1], 0.3 * u.m)
+    assert u.allclose(lengths[:, 0], 0 * u.m)
+    assert not left_domain.any()
+
+
+def test_poincare_section():
+    r"""Crossings of the periodic images of z = 0 lie on circles rotated
+    by the twist of the field over the distance travelled along z."""
+    twist = 0.5
+    tracer = FieldLineTracer(helical_plasma(twist),
+                             periodic=(False, False, True))
+    seeds = np.array([[0.5, 0, 0.3], [0, 0.3, 0.1], [-0.2, -0.2, 0]])
+    lengths, left_domain, crossings = tracer.trace(seeds * u.m, 10 * u.m,
+                                                   section=(2, 0 * u.m))
+    assert not left_domain.any()
+    assert u.allclose(lengths, 10 * u.m)
+
+    radius = np.hypot(seeds[:, 0], seeds[:, 1])
+    # Arc length per unit distance along z
+    stretch = np.sqrt(1 + (twist * radius) ** 2)
+    for index in range(3):
+        for direction in (1, -1):
+            selected = crossings[(crossings['seed'] == index) &
+                                 (crossings['direction'] == direction)]
+            assert np.all(np.diff(selected['length']) > 0)
+            distance = direction * selected['length'] / stretch[index]
+            # Crossings land on integer z, excluding the seed itself
+            z = seeds[index, 2] + distance
+            assert np.allclose(z, np.round(z), atol=1e-5)
+            end = seeds[index, 2] + direction * 10 / stretch[index]
+            if direction > 0:
+                n_crossings = np.floor(end) - np.floor(seeds[index, 2])
+            else:
+                n_crossings = np.ceil(seeds[index, 2]) - np.ceil(end)
+            assert selected.size == n_crossings
+
+            angle = np.arctan2(seeds[index, 1], seeds[index, 0]) + \
+                twist * distance
+            assert np.allclose(selected['position'][:, 0],
+                               radius[index] * np.cos(angle), atol=1e-5)
+            assert np.allclose(selected['position'][:, 1],
+                               radius[index] * np.sin(angle), atol=1e-5)
+            assert np.all(selected['position'][:, 2] == 0)
+
+
+def test_streamed_output(tmpdir):
+    r"""Crossings written to disk match those collected in memory."""
+    tracer = FieldLineTracer(helical_plasma(), periodic=(False, False, True))
+    seeds = np.random.RandomState(0).uniform(-0.5, 0.5, (50, 3)) * u.m
+    path = str(tmpdir.join('crossings.npy'))
+
+    _, _, in_memory = tracer.trace(seeds, 5 * u.m, section=(2, 0.5 * u.m))
+    _, _, streamed = tracer.trace(seeds, 5 * u.m, section=(2, 0.5 * u.m),
+                                  output=path)
+    assert isinstance(streamed, np.memmap)
+    assert streamed.dtype == FieldLineTracer.crossing_dtype
+    assert np.array_equal(np.load(path), in_memory)
+    assert in_memory.size > 50 * 4
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'direction': 'sideways'},
+    {'section': (2, 0 * u.m)},
+    {'section': (3, 0 * u.m)},
+    {'output': 'crossings.txt'},
+])
+def test_invalid_trace(kwargs):
+    x = np.linspace(0, 1, 4) * u.m
+    test_plasma = Plasma3D(x, x, np.zeros(1) * u.m)
+    test_plasma.magnetic_field[0] = 1 * u.T
+    tracer = FieldLineTracer(test_plasma)
+    with pytest.raises(ValueError):
+        tracer.trace([[0.5, 0.5, 0]] * u.m, 1 * u.m, **kwargs)
+
+
+def test_invalid():
+    x = np.linspace(0, 1, 4) * u.m
+    test_plasma = Plasma3D(x ** 2 / u.m, x, x)
+    with pytest.raises(ValueError):
+        FieldLineTracer(test_plasma, periodic=True)
+    with pytest.raises(ValueError):
+        FieldLineTracer(test_plasma, periodic=(True, False))
+
+    tracer = FieldLineTracer(test_plasma)
+    with pytest.raises(ValueError):
+        tracer.trace([0.5, 0.5, 0.5] * u.m, 1 * u.m)
+    with pytest.raises(ValueError):
+        tracer.trace([[0.5, 0.5, 2]] * u.m, 1 * u.m)
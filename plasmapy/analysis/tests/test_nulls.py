@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.analysis import find_magnetic_nulls
+from plasmapy.classes import Plasma3D
+
+CENTER = np.array([0.13, -0.27, 0.31])
+
+
+def linear_plasma(matrix, center=CENTER, unit=u.T):
+    r"""Field :math:`M (x - x_0)`, which trilinear interpolation
+    represents exactly."""
+    x = np.linspace(-1, 1, 9) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    offset = test_plasma.grid.to_value(u.m) - \
+        np.reshape(center, (3, 1, 1, 1))
+    test_plasma.magnetic_field[...] = np.einsum('ij,j...->i...', matrix,
+                                                offset) * unit
+    return test_plasma
+
+
+@pytest.mark.parametrize('matrix, kind, spine', [
+    ([[1, 0, 0], [0, 1, 0], [0, 0, -2]], 'B', [0, 0, 1]),
+    ([[-1, 0, 0], [0, -2, 0], [0, 0, 3]], 'A', [0, 0, 1]),
+    ([[1, -3, 0], [3, 1, 0], [0, 0, -2]], 'Bs', [0, 0, 1]),
+    ([[2, 0, 0], [0, -1, 3], [0, -3, -1]], 'As', [1, 0, 0]),
+])
+def test_linear_nulls(matrix, kind, spine):
+    nulls = find_magnetic_nulls(linear_plasma(matrix, unit=u.G))
+    assert nulls.size == 1
+    null = nulls[0]
+    assert np.allclose(null['position'], CENTER)
+    assert np.array_equal(null['cell'], [4, 2, 5])
+    assert null['type'] == kind
+    assert np.allclose(np.sort_complex(null['eigenvalues']),
+                       np.sort_complex(np.linalg.eigvals(matrix) * 1e-4))
+    assert np.isclose(abs(np.dot(null['spine'], spine)), 1)
+    # The fan holds the other eigenvectors
+    assert np.isclose(abs(np.dot(null['fan_normal'], spine)), 1)
+
+
+def test_null_on_grid_point():
+    r"""Nulls shared by several cells are reported once."""
+    nulls = find_magnetic_nulls(linear_plasma(np.diag([1, 1, -2]),
+                                              center=[0, 0.25, 0]))
+    assert nulls.size == 1
+    assert np.allclose(nulls['position'], [[0, 0.25, 0]])
+
+
+def test_several_nulls():
+    r"""The two nulls of :math:`(x^2 - a^2, y, -z)` have opposite types,
+    and the search in slabs finds them all."""
+    a = 0.37
+    x = np.linspace(-1, 1, 41) * u.m
+    test_plasma = Plasma3D(x, x[15:26], x[15:26])
+    X, Y, Z = test_plasma.grid.to_value(u.m)
+    test_plasma.magnetic_field[...] = np.stack([X ** 2 - a ** 2, Y, -Z]) * u.T
+
+    nulls = find_magnetic_nulls(test_plasma, max_bytes=3000)
+    assert nulls['type'].tolist() == ['A', 'B']
+    assert np.allclose(nulls['position'], [[-a, 0, 0], [a, 0, 0]],
+                       atol=1e-3)
+    assert np.allclose(nulls['eigenvalues'].real,
+                       [[-2 * a, 1, -1], [2 * a, 1, -1]], atol=0.05)
+
+
+def test_memory_mapped(tmpdir):
+    n = 24
+    x = np.arange(n) / n * 2 * np.pi * u.m
+    test_plasma = Plasma3D(x, x, x)
+    X, Y, Z = test_plasma.grid.to_value(u.m)
+    test_plasma.magnetic_field[...] = np.stack([
+        np.sin(Z) + 0.6 * np.cos(Y), 0.8 * np.sin(X) + np.cos(Z),
+        0.6 * np.sin(Y) + 0.8 * np.cos(X)]) * u.T
+    path = str(tmpdir.join('magnetic_field.npy'))
+    np.save(path, test_plasma.magnetic_field.value.astype(np.float32))
+    mapped = Plasma3D.from_files(x, x, x, magnetic_field=path)
+
+    expected = find_magnetic_nulls(test_plasma)
+    nulls = find_magnetic_nulls(mapped, max_bytes=10000)
+    assert expected.size == nulls.size > 0
+    assert np.allclose(nulls['position'], expected['position'], atol=1e-4)
+    assert np.array_equal(nulls['type'], expected['type'])
+
+
+def test_no_nulls():
+    nulls = find_magnetic_nulls(linear_plasma(np.eye(3), center=[3, 0, 0]))
+    assert nulls.size == 0
+    x = np.linspace(0, 1, 4) * u.m
+    assert find_magnetic_nulls(Plasma3D(x, x, x)).size == 0
+
+
+def test_invalid():
+    x = np.linspace(0, 1, 4) * u.m
+    with pytest.raises(ValueError):
+        find_magnetic_nulls(Plasma3D(x, x, np.zeros(1) * u.m))
@@ -0,0 +1,172 @@
+import itertools
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.analysis import TurbulenceAnalysis
+from plasmapy.classes import Plasma3D
+
+DENSITY = u.kg / u.m ** 3
+
+
+def random_plasma(shape=(16, 12, 8)):
+    axes = [np.arange(n) / 16 * u.m for n in shape]
+    test_plasma = Plasma3D(*axes)
+    rng = np.random.RandomState(0)
+    test_plasma.density[...] = rng.randn(*shape) * DENSITY
+    test_plasma.magnetic_field[...] = rng.randn(3, *shape) * u.T
+    return test_plasma
+
+
+def increments(values, lag, axis, order):
+    r"""Brute-force structure function along one axis."""
+    return ((np.roll(values, -lag, axis=axis) - values) ** order).mean()
+
+
+@pytest.mark.parametrize('axis', [None, 0, 1, 2])
+def test_power_spectrum_parseval(axis):
+    r"""The spectra integrate to the mean square of the field."""
+    test_plasma = random_plasma()
+    analysis = TurbulenceAnalysis(test_plasma, max_bytes=4096)
+    for name in ('density', 'magnetic_field'):
+        k, spectrum = analysis.power_spectrum(name, axis=axis)
+        field = getattr(test_plasma, name)
+        mean_square = (field ** 2).sum(axis=0).mean() if field.ndim == 4 \
+            else (field ** 2).mean()
+        assert u.isclose((spectrum * (k[1] - k[0])).sum(), mean_square)
+
+
+def test_power_spectrum_modes():
+    x = np.arange(16) / 16 * u.m
+    test_plasma = Plasma3D(x, x, x[:8])
+    X, Y, Z = test_plasma.grid.to_value(u.m)
+    test_plasma.pressure[...] = (np.cos(2 * np.pi * X) +
+                                 np.sin(2 * np.pi * (3 * Y + 4 * Z))) * u.Pa
+    analysis = TurbulenceAnalysis(test_plasma)
+
+    k, spectrum = analysis.power_spectrum('pressure')
+    assert u.isclose(k[1], 2 * np.pi / u.m)
+    assert spectrum.unit == u.Pa ** 2 * u.m
+    assert np.flatnonzero(spectrum.value > 1e-12).tolist() == [1, 5]
+    assert u.allclose(spectrum[[1, 5]], 0.5 * u.Pa ** 2 / k[1])
+
+    # The z-axis is half as long, so the fourth harmonic is its second
+    k, spectrum = analysis.power_spectrum('pressure', axis=2)
+    assert np.flatnonzero(spectrum.value > 1e-12).tolist() == [0, 2]
+
+
+@pytest.mark.parametrize('axis', [0, 1, 2])
+def test_structure_function_axis(axis):
+    r"""FFT-based structure functions of all orders match direct
+    averages over the grid."""
+    test_plasma = random_plasma()
+    density = test_plasma.density.value
+    analysis = TurbulenceAnalysis(test_plasma, max_bytes=4096)
+    lags, functions = analysis.structure_function('density',
+                                                  orders=[1, 2, 3, 4, 5],
+                                                  axis=axis)
+    assert lags.size == test_plasma.domain_shape[axis] // 2 + 1
+    assert u.isclose(lags[1], 1 / 16 * u.m)
+    assert functions[3].unit == DENSITY ** 3
+    for order, values in functions.items():
+        expected = [increments(density, lag, axis, order)
+                    for lag in range(lags.size)]
+        assert np.allclose(values.value, expected, atol=1e-10)
+
+
+def test_structure_function_isotropic(tmpdir):
+    r"""Shell averages over lag vectors, with the transforms held in
+    memory-mapped scratch files, and sums over vector components."""
+    test_plasma = random_plasma()
+    analysis = TurbulenceAnalysis(test_plasma, max_bytes=4096,
+                                  scratch_dir=str(tmpdir))
+    lags, functions = analysis.structure_function('magnetic_field')
+    # Lags up to half of the shortest axis
+    assert lags.size == 5
+    # The first shell holds the nearest and next-nearest neighbours
+    field = test_plasma.magnetic_field.value
+    expected = []
+    for offset in itertools.product([-1, 0, 1], repeat=3):
+        if np.rint(np.linalg.norm(offset)) == 1:
+            shifted = np.roll(field, offset, axis=(1, 2, 3))
+            expected.append(((shifted - field) ** 2).sum(axis=0).mean())
+    assert len(expected) == 18
+    assert u.isclose(functions[2][0], 0 * u.T ** 2, atol=1e-12 * u.T ** 2)
+    assert u.isclose(functions[2][1], np.mean(expected) * u.T ** 2)
+    assert not tmpdir.listdir()
+
+
+def test_sampled_structure_function():
+    r"""Sampled estimates agree with the exact even orders."""
+    test_plasma = random_plasma()
+    analysis = TurbulenceAnalysis(test_plasma)
+    exact_lags, exact = analysis.structure_function('density', orders=[2, 4],
+                                                    axis=1)
+    lags, sampled = analysis.sampled_structure_function(
+        'density', [1, 3, 6], orders=[2, 4], axis=1, n_samples=20000,
+        seed=1)
+    assert u.allclose(lags, exact_lags[[1, 3, 6]])
+    for order in (2, 4):
+        assert u.allclose(sampled[order], exact[order][[1, 3, 6]], rtol=0.1)
+
+    # Lags as lengths, wrapping around the periodic box
+    lags, sampled = analysis.sampled_structure_function(
+        test_plasma.magnetic_field, 1.5 * u.m, orders=[0.5, 2], axis=0,
+        seed=1)
+    assert lags == [24 / 16] * u.m
+    assert u.isclose(sampled[2][0], 6 * u.T ** 2, rtol=0.1)
+    assert sampled[0.5].unit == u.T ** 0.5
+
+
+def test_increment_pdf():
+    test_plasma = random_plasma()
+    analysis = TurbulenceAnalysis(test_plasma, max_bytes=4096)
+    edges, pdf = analysis.increment_pdf('density', 2, axis=0, bins=30)
+    assert edges.unit == DENSITY
+    assert pdf.unit == 1 / DENSITY
+    assert np.isclose((pdf * np.diff(edges)).sum(), 1)
+
+    density = test_plasma.density.value
+    expected, _ = np.histogram(np.roll(density, -2, axis=0) - density,
+                               bins=edges.value, density=True)
+    assert np.allclose(pdf.value, expected)
+
+    # Vector fields use the longitudinal component
+    edges, pdf = analysis.increment_pdf(
+        'magnetic_field', 1, axis=2, bins=np.linspace(-8, 8, 9) * u.T)
+    field = test_plasma.magnetic_field.value[2]
+    expected, _ = np.histogram(np.roll(field, -1, axis=2) - field,
+                               bins=edges.value, density=True)
+    assert np.allclose(pdf.value, expected)
+
+
+def test_memory_mapped(tmpdir):
+    r"""Fields memory-mapped from files give the in-memory results."""
+    test_plasma = random_plasma()
+    path = str(tmpdir.join('density.npy'))
+    np.save(path, test_plasma.density.value)
+    x, y, z = test_plasma.x, test_plasma.y, test_plasma.z
+    mapped = Plasma3D.from_files(x, y, z, density=path)
+
+    expected = TurbulenceAnalysis(test_plasma).power_spectrum('density')
+    result = TurbulenceAnalysis(mapped, max_bytes=1024).power_spectrum(
+        'density')
+    assert u.allclose(result[1], expected[1])
+
+
+def test_invalid():
+    test_plasma = random_plasma((8, 8, 1))
+    analysis = TurbulenceAnalysis(test_plasma)
+    with pytest.raises(ValueError):
+        TurbulenceAnalysis(test_plasma, max_bytes=0)
+    with pytest.raises(ValueError):
+        analysis.power_spectrum(np.zeros((8, 4, 1)))
+    with pytest.raises(ValueError):
+        analysis.power_spectrum('density', axis=2)
+    with pytest.raises(ValueError):
+        analysis.structure_function('density', orders=2.5)
+    with pytest.raises(ValueError):
+        analysis.sampled_structure_function('density', -1)
+    with pytest.raises(ValueError):
+        analysis.increment_pdf('density', [1, 2])
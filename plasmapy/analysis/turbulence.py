@@ -0,0 +1,528 @@
+"""
+Power spectra, structure functions and increment statistics of turbulent
+fields on periodic Plasma3D grids.
+"""
+import tempfile
+
+import numpy as np
+from astropy import units as u
+from scipy import fft
+from scipy.special import comb
+
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "TurbulenceAnalysis",
+]
+
+
+def _slabs(n, size):
+    r"""Consecutive slices of at most ``size`` indices covering ``n``."""
+    for start in range(0, n, size):
+        yield slice(start, min(start + size, n))
+
+
+class TurbulenceAnalysis:
+    r"""
+    Spectra, structure functions and increment distributions of fields on
+    the uniform, periodic grid of a `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma providing the grid and, by name, the fields to analyze. Its
+        axes must be uniformly spaced and are taken to be periodic with a
+        period of the number of grid points times the spacing.
+    max_bytes : int
+        Approximate upper limit on the memory used by each chunk of a
+        field and by the temporaries derived from it.
+    scratch_dir : str or path, optional
+        Directory in which the Fourier transforms needed by
+        `power_spectrum` and `structure_function` are held as temporary
+        memory-mapped files, which are removed when the computation
+        finishes. By default they are held in memory.
+    n_threads : int, optional
+        Number of threads used by each FFT; by default one.
+
+    Notes
+    -----
+    Fields are read in slabs of consecutive x-planes, so memory-mapped
+    fields, e.g. of a plasma created with
+    `~plasmapy.classes.Plasma3D.from_files`, are never loaded as a whole.
+    The three-dimensional transforms are done as two-dimensional real
+    transforms of the x-slabs followed by transforms along x of y-slabs,
+    and the results are binned with `numpy.bincount` slab by slab. Only
+    the transforms themselves are of the size of the field, and these
+    live in ``scratch_dir`` when it is given.
+
+    Every method accepts either the name of a field of the plasma, or a
+    `~astropy.units.Quantity` or array of shape (x, y, z) for scalar or
+    (n, x, y, z) for vector fields. Results carry the units of the field,
+    with lengths and wavenumbers in metres.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.arange(16) / 16 * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> plasma.density[...] = np.cos(2 * np.pi * x.value)[:, None, None] * u.kg / u.m ** 3
+    >>> analysis = TurbulenceAnalysis(plasma)
+    >>> k, spectrum = analysis.power_spectrum('density')
+    >>> k[np.argmax(spectrum)]
+    <Quantity 6.28318531 1 / m>
+    """
+
+    def __init__(self, plasma, max_bytes=2 ** 28, scratch_dir=None,
+                 n_threads=None):
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}.")
+        self.max_bytes = max_bytes
+        self.scratch_dir = scratch_dir
+        self.n_threads = n_threads
+
+        self._plasma = plasma
+        self.shape = plasma.domain_shape
+        axes = (plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m))
+        _, self.spacing = _uniform_grid(axes)
+        self.lengths = self.spacing * np.array(self.shape)
+        self._dims = [dim for dim, n in enumerate(self.shape) if n > 1]
+        if not self._dims:
+            raise ValueError("The grid must have more than one point.")
+
+        # Signed mode numbers of the transforms along each axis, and the
+        # offsets of the lags in grid points
+        nx, ny, nz = self.shape
+        self._modes = (np.fft.fftfreq(nx, 1 / nx), np.fft.fftfreq(ny, 1 / ny),
+                       np.arange(nz // 2 + 1))
+        self._offsets = tuple(np.fft.fftfreq(n, 1 / n) for n in self.shape)
+
+        # Modes of the real transform along z stand for their negative
+        # counterparts too, except for the zero and Nyquist modes
+        self._multiplicity = np.full(nz // 2 + 1, 2.0)
+        self._multiplicity[0] = 1
+        if nz % 2 == 0:
+            self._multiplicity[-1] = 1
+
+    def _field(self, field):
+        r"""The plain (n, x, y, z) values and unit of ``field``."""
+        if isinstance(field, str):
+            field = getattr(self._plasma, field)
+        unit = getattr(field, 'unit', None)
+        values = field.value if unit is not None else np.asanyarray(field)
+        if values.ndim not in (3, 4) or values.shape[-3:] != self.shape:
+            raise ValueError(f"Field of shape {values.shape} does not match "
+                             f"the grid of shape {self.shape}.")
+        if values.ndim == 3:
+            values = values[np.newaxis]
+        return values, unit
+
+    @staticmethod
+    def _scaled(values, unit, power=1):
+        r"""Attach the unit raised to ``power`` to ``values``, if any."""
+        return values if unit is None else values * unit ** power
+
+    @staticmethod
+    def _orders(orders, integer):
+        orders = np.atleast_1d(orders)
+        if orders.ndim != 1 or (orders <= 0).any() or \
+                (integer and (orders != np.round(orders)).any()):
+            kind = "positive integers" if integer else "positive"
+            raise ValueError(f"Orders must be {kind}, got {orders}.")
+        return [int(order) if integer else order for order in orders]
+
+    def _check_axis(self, axis):
+        if axis not in self._dims:
+            raise ValueError(f"Axis {axis} is not one of the axes "
+                             f"{self._dims} with more than one point.")
+
+    def _lag_points(self, lag, axis):
+        r"""Lag along ``axis`` as a whole number of grid points."""
+        self._check_axis(axis)
+        if isinstance(lag, u.Quantity):
+            lag = lag.to_value(u.m) / self.spacing[axis]
+        points = np.rint(np.atleast_1d(lag)).astype(int)
+        if (points < 0).any():
+            raise ValueError("Lags must not be negative.")
+        return points
+
+    def _allocate(self, shape, dtype):
+        if self.scratch_dir is None:
+            return np.empty(shape, dtype=dtype)
+        # The file is unlinked at once and freed with the array
+        handle = tempfile.TemporaryFile(dir=self.scratch_dir)
+        return np.memmap(handle, dtype=dtype, mode='w+', shape=shape)
+
+    def _planes(self, plane_bytes):
+        return max(1, int(self.max_bytes // max(plane_bytes, 1)))
+
+    def _mean(self, values):
+        total = np.zeros(values.shape[0])
+        nx, ny, nz = self.shape
+        planes = self._planes(values[:, 0].nbytes)
+        for index in _slabs(nx, planes):
+            total += values[:, index].sum(axis=(1, 2, 3), dtype=float)
+        return total / (nx * ny * nz)
+
+    def _transform(self, values, powers, mean=None, moments=None):
+        r"""
+        Real two-dimensional transforms over (y, z) of the given powers of
+        each component of ``values``, with ``mean`` subtracted, computed
+        one x-slab at a time.
+
+        Returns an array of shape (components * powers, x, y, z // 2 + 1),
+        with the powers of each component consecutive. The sums of the
+        powers from zero up to the length of ``moments`` are added to
+        ``moments``, of shape (components, orders + 1).
+        """
+        nx, ny, nz = self.shape
+        n_components = values.shape[0]
+        real = np.result_type(values.dtype, np.float32)
+        complex_ = np.result_type(real, np.complex64)
+        spectra = self._allocate(
+            (n_components * len(powers), nx, ny, nz // 2 + 1), complex_)
+
+        plane_bytes = n_components * ny * nz * real.itemsize * \
+            (2 + len(powers))
+        for index in _slabs(nx, self._planes(plane_bytes)):
+            slab = values[:, index].astype(real)
+            if mean is not None:
+                slab -= mean.astype(real)[:, None, None, None]
+            if moments is not None:
+                powered = np.ones_like(slab)
+                for order in range(1, moments.shape[1]):
+                    powered *= slab
+                    moments[:, order] += powered.sum(axis=(1, 2, 3),
+                                                     dtype=float)
+            for position, power in enumerate(powers):
+                spectra[position::len(powers), index] = fft.rfft2(
+                    slab ** power, workers=self.n_threads)
+        return spectra
+
+    def _transformed_slabs(self, spectra):
+        r"""Complete the transforms of ``spectra`` along x, yielding the
+        y-slabs of the three-dimensional transforms without storing
+        them."""
+        nx, ny, nz = self.shape
+        plane_bytes = 3 * spectra[:, :, 0].nbytes
+        for index in _slabs(ny, self._planes(plane_bytes)):
+            yield index, fft.fft(spectra[:, :, index], axis=1,
+                                 workers=self.n_threads, overwrite_x=True)
+
+    def power_spectrum(self, field, axis=None):
+        r"""
+        Power spectrum of a field, summed over components.
+
+        Parameters
+        ----------
+        field : str, `~astropy.units.Quantity` or ndarray
+            Field to analyze.
+        axis : int, optional
+            Return the one-dimensional spectrum along this axis, summed
+            over the wavenumbers of the other axes. By default the
+            spectrum is summed over spherical shells of the magnitude of
+            the wavevector.
+
+        Returns
+        -------
+        k : `~astropy.units.Quantity`
+            Wavenumbers at the centres of the bins, spaced by the smallest
+            wavenumber :math:`2 \pi / L` of the (longest) box axis.
+        spectrum : `~astropy.units.Quantity` or ndarray
+            Spectral density, normalized such that the sum of
+            ``spectrum * dk`` is the mean of the squared field.
+        """
+        values, unit = self._field(field)
+        if unit is None:
+            unit = u.dimensionless_unscaled
+        if axis is None:
+            dims = self._dims
+        else:
+            self._check_axis(axis)
+            dims = [axis]
+        dk = 2 * np.pi / self.lengths[dims].max()
+        wavenumbers = [2 * np.pi * modes / length
+                       for modes, length in zip(self._modes, self.lengths)]
+        largest = np.sqrt(sum(np.abs(wavenumbers[dim]).max() ** 2
+                              for dim in dims))
+        n_bins = int(np.rint(largest / dk)) + 1
+
+        spectrum = np.zeros(n_bins)
+        spectra = self._transform(values, [1])
+        for index, block in self._transformed_slabs(spectra):
+            squared = wavenumbers[0][:, None, None] ** 2 * (0 in dims) + \
+                wavenumbers[1][index][None, :, None] ** 2 * (1 in dims) + \
+                wavenumbers[2][None, None, :] ** 2 * (2 in dims)
+            shells = np.rint(np.sqrt(squared) / dk).astype(np.intp)
+            power = np.square(np.abs(block)).sum(axis=0)
+            power *= self._multiplicity
+            spectrum += np.bincount(shells.ravel(), weights=power.ravel(),
+                                    minlength=n_bins)
+        del spectra
+
+        spectrum /= np.prod(self.shape, dtype=float) ** 2 * dk
+        k = dk * np.arange(n_bins) / u.m
+        return k, spectrum * unit ** 2 * u.m
+
+    def structure_function(self, field, orders=2, axis=None):
+        r"""
+        Structure functions of a field from Fourier-transformed
+        correlations.
+
+        Parameters
+        ----------
+        field : str, `~astropy.units.Quantity` or ndarray
+            Field to analyze.
+        orders : int or sequence of int
+            Orders :math:`p` of the structure functions
+            :math:`S_p(r) = \langle (f(x + r) - f(x))^p \rangle`.
+        axis : int, optional
+            Return the structure functions for lags along this axis, up to
+            half the length of the axis. By default they are averaged over
+            spherical shells of lag vectors, up to half the length of the
+            shortest axis.
+
+        Returns
+        -------
+        lags : `~astropy.units.Quantity`
+            Lag lengths.
+        functions : dict
+            The structure function of each order, summed over the
+            components of vector fields.
+
+        Notes
+        -----
+        Expanding the increment binomially turns :math:`S_p` into a sum of
+        correlations of the powers of the field, which are computed for
+        all lags at once with FFTs. The increments are signed, so odd
+        orders, e.g. the third-order function of the 4/5 law, keep their
+        sign; use `sampled_structure_function` for moments of the
+        absolute increments at odd or fractional orders. The mean of the
+        field is subtracted first, but the cancellation between the terms
+        still limits the accuracy of high orders at small lags.
+        """
+        orders = self._orders(orders, integer=True)
+        values, unit = self._field(field)
+        n_components = values.shape[0]
+        nx, ny, nz = self.shape
+        n_points = nx * ny * nz
+        highest = max(orders)
+        powers = list(range(1, highest))
+
+        mean = self._mean(values)
+        moments = np.zeros((n_components, highest + 1))
+        spectra = self._transform(values, powers, mean, moments)
+        moments /= n_points
+        # The two terms of the expansion without a lag
+        constants = [(1 + (-1) ** order) * moments[:, order].sum()
+                     for order in orders]
+
+        # Combine the correlations of each order in Fourier space, and
+        # invert them along x before inverting over (y, z) in x-slabs
+        combined = self._allocate((len(orders), nx, ny, nz // 2 + 1),
+                                  spectra.dtype)
+        if not powers:
+            # Only first orders, which vanish at all lags
+            combined[...] = 0
+        for index, block in (self._transformed_slabs(spectra) if powers
+                             else ()):
+            block = block.reshape(n_components, len(powers), *block.shape[1:])
+            for position, order in enumerate(orders):
+                total = np.zeros(block.shape[2:], dtype=block.dtype)
+                for term in range(1, order):
+                    total += (-1) ** term * comb(order, term, exact=True) * \
+                        (block[:, order - term - 1] *
+                         block[:, term - 1].conj()).sum(axis=0)
+                combined[position, :, index] = fft.ifft(
+                    total, axis=0, workers=self.n_threads, overwrite_x=True)
+        del spectra
+
+        if axis is None:
+            step = self.spacing[self._dims].min()
+            largest = self.lengths[self._dims].min() / 2
+            n_lags = int(np.floor(largest / step + 0.5)) + 1
+            sums = np.zeros((len(orders), n_lags))
+            counts = np.zeros(n_lags)
+            lag_yz = np.sqrt(
+                (self._offsets[1][:, None] * self.spacing[1]) ** 2 +
+                (self._offsets[2][None, :] * self.spacing[2]) ** 2)
+        else:
+            self._check_axis(axis)
+            n_lags = self.shape[axis] // 2 + 1
+            step = self.spacing[axis]
+            sums = np.zeros((len(orders), n_lags))
+
+        plane_bytes = 3 * len(orders) * ny * nz * 8
+        for index in _slabs(nx, self._planes(plane_bytes)):
+            correlations = fft.irfft2(combined[:, index], s=(ny, nz),
+                                      workers=self.n_threads)
+            correlations /= n_points
+            if axis is None:
+                lag = np.sqrt((self._offsets[0][index, None, None] *
+                               self.spacing[0]) ** 2 + lag_yz ** 2)
+                bins = np.minimum(np.rint(lag / step).astype(np.intp),
+                                  n_lags).ravel()
+                counts += np.bincount(bins, minlength=n_lags + 1)[:n_lags]
+                for position in range(len(orders)):
+                    sums[position] += np.bincount(
+                        bins, weights=correlations[position].ravel(),
+                        minlength=n_lags + 1)[:n_lags]
+            elif axis == 0:
+                rows = np.arange(index.start, index.stop)
+                rows = rows[rows < n_lags]
+                sums[:, rows] = correlations[:, rows - index.start, 0, 0]
+            elif index.start == 0:
+                line = [0, 0, 0]
+                line[axis] = slice(0, n_lags)
+                sums[...] = correlations[(slice(None), *line)]
+        del combined
+
+        if axis is None:
+            sums /= counts
+        functions = {order: self._scaled(sums[position] + constant, unit,
+                                         order)
+                     for position, (order, constant)
+                     in enumerate(zip(orders, constants))}
+        return step * np.arange(n_lags) * u.m, functions
+
+    def sampled_structure_function(self, field, lags, orders=2, axis=0,
+                                   n_samples=100000, seed=None):
+        r"""
+        Structure functions of the magnitude of the increments estimated
+        from randomly sampled pairs of points.
+
+        Parameters
+        ----------
+        field : str, `~astropy.units.Quantity` or ndarray
+            Field to analyze.
+        lags : int, sequence of int or `~astropy.units.Quantity`
+            Lags along ``axis``, either as numbers of grid points or as
+            lengths, which are rounded to the nearest grid point.
+        orders : float or sequence of float
+            Positive orders :math:`p` of the structure functions
+            :math:`S_p(r) = \langle |f(x + r) - f(x)|^p \rangle`, where
+            :math:`|\cdot|` is the norm of the increment of vector fields.
+        axis : int
+            Axis along which the lags are taken.
+        n_samples : int
+            Number of pairs of points drawn for each lag.
+        seed : int, optional
+            Seed of the random number generator.
+
+        Returns
+        -------
+        lags : `~astropy.units.Quantity`
+            Lag lengths.
+        functions : dict
+            The estimated structure function of each order at each lag.
+
+        Notes
+        -----
+        The cost is proportional to the number of samples rather than the
+        size of the grid, which makes this estimator suitable for any
+        number of lags, including large ones on grids that are too big to
+        transform. The sampled points are sorted before they are read so
+        that memory-mapped fields are accessed in file order.
+        """
+        orders = self._orders(orders, integer=False)
+        values, unit = self._field(field)
+        points = self._lag_points(lags, axis)
+        if n_samples < 1:
+            raise ValueError(f"n_samples must be positive, got {n_samples}.")
+        n_points = int(np.prod(self.shape))
+        rng = np.random.RandomState(seed)
+        batch = self._planes(values.shape[0] * 8 * 8)
+
+        sums = np.zeros((len(orders), points.size))
+        for column, lag in enumerate(points):
+            for start in range(0, n_samples, batch):
+                size = min(batch, n_samples - start)
+                flat = np.sort(rng.randint(n_points, size=size,
+                                           dtype=np.int64))
+                origin = np.unravel_index(flat, self.shape)
+                shifted = list(origin)
+                shifted[axis] = (origin[axis] + lag) % self.shape[axis]
+                increment = values[(slice(None), *shifted)] - \
+                    values[(slice(None), *origin)]
+                magnitude = np.sqrt(np.square(increment, dtype=float)
+                                    .sum(axis=0))
+                for position, order in enumerate(orders):
+                    sums[position, column] += (magnitude ** order).sum()
+        sums /= n_samples
+
+        functions = {order: self._scaled(sums[position], unit, order)
+                     for position, order in enumerate(orders)}
+        return points * self.spacing[axis] * u.m, functions
+
+    def increment_pdf(self, field, lag, axis=0, bins=100, range=None):
+        r"""
+        Probability density of the increments of a field over a lag.
+
+        Parameters
+        ----------
+        field : str, `~astropy.units.Quantity` or ndarray
+            Field to analyze. Vector fields contribute their longitudinal
+            component, i.e. the component along ``axis``.
+        lag : int or `~astropy.units.Quantity`
+            Lag along ``axis``, either as a number of grid points or as a
+            length, which is rounded to the nearest grid point.
+        axis : int
+            Axis along which the lag is taken.
+        bins : int or sequence
+            Number of bins, or bin edges in the units of the field.
+        range : tuple, optional
+            Lower and upper edges of the bins when ``bins`` is a number.
+            By default these are the extreme increments, found in an
+            additional pass over the field.
+
+        Returns
+        -------
+        edges : `~astropy.units.Quantity` or ndarray
+            Bin edges.
+        pdf : `~astropy.units.Quantity` or ndarray
+            Probability density in each bin, normalized as by
+            `numpy.histogram` with ``density=True``.
+        """
+        values, unit = self._field(field)
+        points = self._lag_points(lag, axis)
+        if points.size != 1:
+            raise ValueError("increment_pdf takes a single lag.")
+        lag = int(points[0])
+        values = values[axis if values.shape[0] > 1 else 0]
+        nx, ny, nz = self.shape
+
+        def increments():
+            planes = self._planes(4 * ny * nz * values.itemsize)
+            for index in _slabs(nx, planes):
+                slab = values[index]
+                if axis == 0:
+                    rows = np.arange(index.start, index.stop) + lag
+                    shifted = values[rows % nx]
+                else:
+                    shifted = np.roll(slab, -lag, axis=axis)
+                yield np.subtract(shifted, slab, dtype=float)
+
+        if isinstance(bins, u.Quantity):
+            bins = bins.to_value(unit)
+        if isinstance(range, u.Quantity):
+            range = range.to_value(unit)
+        elif range is not None:
+            range = [bound.to_value(unit) if isinstance(bound, u.Quantity)
+                     else bound for bound in range]
+        if np.ndim(bins) == 0:
+            if range is None:
+                lower, upper = np.inf, -np.inf
+                for increment in increments():
+                    lower = min(lower, increment.min())
+                    upper = max(upper, increment.max())
+                range = (lower, upper)
+            edges = np.histogram_bin_edges([], bins=bins, range=range)
+        else:
+            edges = np.asarray(bins, dtype=float)
+
+        counts = np.zeros(edges.size - 1)
+        for increment in increments():
+            counts += np.histogram(increment, bins=edges)[0]
+        pdf = counts / (counts.sum() * np.diff(edges))
+        return self._scaled(edges, unit), self._scaled(pdf, unit, -1)
@@ -30,6 +30,53 @@ __all__ = [
 ]
 
 
+_E = e.si.value
+_EPS0 = eps0.si.value
+_K_B = k_B.si.value
+_M_E = m_e.si.value
+_MU0 = mu0.si.value
+_C = c.si.value
+
+#: Intermediates shared between parameter maps, in SI units, computed
+#: from the mass density ``rho``, pressure ``p``, squared field strength
+#: ``B2``, ion mass ``m_i`` and charge ``Z``
+_INTERMEDIATES = {
+    'n_i': lambda q: q('rho') / q('m_i'),
+    'n_e': lambda q: q('Z') * q('n_i'),
+    'B': lambda q: np.sqrt(q('B2')),
+    # Equal temperatures, unless one of them is given
+    'T_e': lambda q: q('p') / (_K_B * (q('n_e') + q('n_i'))),
+    'T_i': lambda q: (q('p') / _K_B - q('n_e') * q('T_e')) / q('n_i'),
+    'omega_pe': lambda q: np.sqrt(q('n_e') / (_EPS0 * _M_E)) * _E,
+    'omega_pi': lambda q: q('Z') * _E * np.sqrt(q('n_i') / (_EPS0 * q('m_i'))),
+    'omega_ce': lambda q: _E * q('B') / _M_E,
+    'omega_ci': lambda q: q('Z') * _E * q('B') / q('m_i'),
+    'v_th_e': lambda q: np.sqrt(2 * _K_B * q('T_e') / _M_E),
+    'v_th_i': lambda q: np.sqrt(2 * _K_B * q('T_i') / q('m_i')),
+}
+
+#: Unit and expression of each parameter map available from
+#: `Plasma3D.parameter_maps`, following `plasmapy.physics.parameters`
+_PARAMETER_MAPS = {
+    'Debye_length': (u.m, lambda q: np.sqrt(_EPS0 * _K_B * q('T_e') /
+                                            q('n_e')) / _E),
+    'electron_plasma_frequency': (u.rad / u.s, lambda q: q('omega_pe')),
+    'ion_plasma_frequency': (u.rad / u.s, lambda q: q('omega_pi')),
+    'electron_gyrofrequency': (u.rad / u.s, lambda q: q('omega_ce')),
+    'ion_gyrofrequency': (u.rad / u.s, lambda q: q('omega_ci')),
+    'electron_thermal_speed': (u.m / u.s, lambda q: q('v_th_e')),
+    'ion_thermal_speed': (u.m / u.s, lambda q: q('v_th_i')),
+    'electron_gyroradius': (u.m, lambda q: q('v_th_e') / q('omega_ce')),
+    'ion_gyroradius': (u.m, lambda q: q('v_th_i') / q('omega_ci')),
+    'electron_inertial_length': (u.m, lambda q: _C / q('omega_pe')),
+    'ion_inertial_length': (u.m, lambda q: _C / q('omega_pi')),
+    'Alfven_speed': (u.m / u.s, lambda q: np.sqrt(q('B2') /
+                                                  (_MU0 * q('rho')))),
+    'beta': (u.dimensionless_unscaled, lambda q: 2 * _MU0 * q('p') /
+             q('B2')),
+}
+
+
 class Plasma3D:
     """
     Core class for describing and calculating plasma parameters with
@@ -48,9 +95,17 @@ class Plasma3D:
         `domain_z` input parameter.
     grid : `astropy.units.Quantity`
         (3, x, y, z) array containing the values of each coordinate at
-        every point in the domain.
+        every point in the domain, in the units of `x`. It is only
+        built on first access; `grid_views` provides the same values
+        without allocating memory. In PlasmaPy 0.1.0 it was a plain
+        `~numpy.ndarray` of the coordinate values; use ``grid.value``
+        where such an array is needed.
+    grid_views : tuple of `astropy.units.Quantity`
+        Read-only (x, y, z) broadcasting views of each coordinate.
     domain_shape : tuple
         Shape of the plasma domain.
+    dtypes : dict
+        Floating point type of each field array.
     density : `astropy.units.Quantity`
         (x, y, z) array of mass density at every point in the domain.
     momentum : `astropy.units.Quantity`
@@ -61,6 +116,19 @@ class Plasma3D:
     magnetic_field : `astropy.units.Quantity`
         (3, x, y, z) array of the magnetic field vector at every point
         in the domain.
+    electric_field : `astropy.units.Quantity`
+        (3, x, y, z) array of the electric field vector at every point
+        in the domain.
+    velocity : `astropy.units.Quantity`
+        (3, x, y, z) array of the flow velocity.
+    magnetic_field_squared : `astropy.units.Quantity`
+        (x, y, z) array of the squared magnetic field strength, shared
+        by `magnetic_field_strength` and `alfven_speed`.
+    magnetic_field_strength : `astropy.units.Quantity`
+    electric_field_strength : `astropy.units.Quantity`
+        (x, y, z) arrays of the magnitude of the field vectors.
+    alfven_speed : `astropy.units.Quantity`
+        (x, y, z) array of the Alfvén speed.
 
     Parameters
     ----------
@@ -73,45 +141,558 @@ class Plasma3D:
     domain_z : `astropy.units.Quantity`
         1D array of z-coordinates for the plasma domain. Must have
         units convertable to length.
+    dtype : data-type or dict, optional
+        Floating point type of the field arrays, either one type for all
+        of them or a dict mapping any of ``'density'``, ``'momentum'``,
+        ``'pressure'``, ``'magnetic_field'`` and ``'electric_field'`` to
+        a type. Fields not listed in a dict use `numpy.float64`, the
+        default. Single precision halves the memory footprint of large
+        domains.
+
+    Notes
+    -----
+    Derived quantities are computed on first access, cached and returned
+    as read-only arrays. The cache is invalidated whenever a field they
+    depend on is reassigned or written with `set_field`. In-place writes
+    to a field array cannot be detected and must be followed by a call
+    to `invalidate`.
 
     """
+    _fields = {
+        'density': (False, u.kg / u.m ** 3),
+        'momentum': (True, u.kg / (u.m ** 2 * u.s)),
+        'pressure': (False, u.Pa),
+        'magnetic_field': (True, u.T),
+        'electric_field': (True, u.V / u.m),
+    }
+
+    #: SI units of the maps available from `parameter_maps`
+    parameter_units = {name: unit
+                       for name, (unit, _) in _PARAMETER_MAPS.items()}
+
+    #: Fields each cached derived quantity depends on
+    _derived = {
+        'velocity': frozenset({'momentum', 'density'}),
+        'magnetic_field_squared': frozenset({'magnetic_field'}),
+        'magnetic_field_strength': frozenset({'magnetic_field'}),
+        'electric_field_strength': frozenset({'electric_field'}),
+        'alfven_speed': frozenset({'magnetic_field', 'density'}),
+    }
+
     @u.quantity_input(domain_x=u.m, domain_y=u.m, domain_z=u.m)
-    def __init__(self, domain_x, domain_y, domain_z):
+    def __init__(self, domain_x, domain_y, domain_z, dtype=np.float64):
+        self._set_domain(domain_x, domain_y, domain_z, dtype)
+
+        # Initiate core plasma variables, attaching the units without
+        # copying the freshly allocated arrays
+        for name in self._fields:
+            self._adopt(name, np.zeros(self._field_shape(name),
+                                       dtype=self.dtypes[name]))
+
+    @classmethod
+    def _without_fields(cls, domain_x, domain_y, domain_z, dtype):
+        # Plasma whose fields are left to be adopted by the caller
+        plasma = cls.__new__(cls)
+        plasma._set_domain(domain_x, domain_y, domain_z, dtype)
+        return plasma
+
+    def _set_domain(self, domain_x, domain_y, domain_z, dtype):
         # Define domain sizes
         self.x = domain_x
         self.y = domain_y
         self.z = domain_z
 
-        self.grid = np.array(np.meshgrid(self.x, self.y, self.z,
-                                         indexing='ij'))
         self.domain_shape = (len(self.x), len(self.y), len(self.z))
+        self._grid = None
+
+        if isinstance(dtype, dict):
+            unknown = set(dtype) - set(self._fields)
+            if unknown:
+                raise ValueError(f"Unknown fields {sorted(unknown)} in dtype; "
+                                 f"expected any of {list(self._fields)}.")
+            self.dtypes = {name: np.dtype(dtype.get(name, np.float64))
+                           for name in self._fields}
+        else:
+            self.dtypes = {name: np.dtype(dtype) for name in self._fields}
+        for name, field_dtype in self.dtypes.items():
+            if not np.issubdtype(field_dtype, np.floating):
+                raise ValueError(f"The dtype of {name} must be a floating "
+                                 f"point type, got {field_dtype}.")
+
+    def _field_shape(self, name):
+        vector, _ = self._fields[name]
+        return (3, *self.domain_shape) if vector else self.domain_shape
+
+    def _adopt(self, name, array, unit=None):
+        # Wrap an array as a field without copying; in the default units
+        # of the field unless given
+        if array.shape != self._field_shape(name):
+            raise ValueError(f"Shape of {name} {array.shape} does not match "
+                             f"the expected {self._field_shape(name)}.")
+        default_unit = self._fields[name][1]
+        unit = default_unit if unit is None else u.Unit(unit)
+        if not unit.is_equivalent(default_unit):
+            raise ValueError(f"Unit {unit} of {name} is not convertible to "
+                             f"{default_unit}.")
+        setattr(self, name, u.Quantity(array, unit, dtype=array.dtype,
+                                       copy=False))
+
+    @classmethod
+    def _from_adopted(cls, domain_x, domain_y, domain_z, arrays, units,
+                      zero_views):
+        unknown = set(arrays) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"Unknown fields {sorted(unknown)}; expected "
+                             f"any of {list(cls._fields)}.")
+
+        dtype = {name: array.dtype.newbyteorder('=')
+                 for name, array in arrays.items()}
+        plasma = cls._without_fields(domain_x, domain_y, domain_z, dtype)
+        for name in cls._fields:
+            if name in arrays:
+                plasma._adopt(name, arrays[name], units.get(name))
+            elif zero_views:
+                plasma._adopt(name, np.broadcast_to(
+                    np.zeros((), dtype=plasma.dtypes[name]),
+                    plasma._field_shape(name)))
+            else:
+                plasma._adopt(name, np.zeros(plasma._field_shape(name),
+                                             dtype=plasma.dtypes[name]))
+        return plasma
+
+    @classmethod
+    @u.quantity_input(domain_x=u.m, domain_y=u.m, domain_z=u.m)
+    def from_arrays(cls, domain_x, domain_y, domain_z, layout='first',
+                    units=None, **fields):
+        r"""
+        Create a plasma whose fields share memory with existing arrays.
+
+        Parameters
+        ----------
+        domain_x, domain_y, domain_z : `astropy.units.Quantity`
+            1D arrays of coordinates, as for `Plasma3D`.
+        layout : str
+            Position of the component axis of vector fields: ``'first'``
+            for (3, x, y, z) arrays or ``'last'`` for (x, y, z, 3) arrays.
+        units : dict, optional
+            Units of fields given as plain arrays, by field name. Fields
+            without an entry are taken to be in the default units listed
+            in `Plasma3D`.
+        **fields : array_like or `astropy.units.Quantity`
+            Any of the fields ``density``, ``momentum``, ``pressure``,
+            ``magnetic_field`` and ``electric_field``, as NumPy arrays,
+            views into larger arrays, objects supporting the buffer
+            protocol such as `memoryview`, or Quantities, whose units
+            are kept.
+
+        Returns
+        -------
+        `Plasma3D`
+
+        Notes
+        -----
+        The fields are adopted without copying: the units are attached as
+        metadata and the (x, y, z, 3) layout is handled by a strided view.
+        Writing to the fields of the plasma therefore writes to the
+        original arrays and vice versa. Fields that are not given are
+        allocated as zeros.
+
+        Examples
+        --------
+        >>> from astropy import units as u
+        >>> x = np.linspace(0, 1, 4) * u.m
+        >>> output = np.zeros((4, 4, 4, 4))
+        >>> plasma = Plasma3D.from_arrays(x, x, x, density=output[0],
+        ...                               magnetic_field=output[1:],
+        ...                               units={'magnetic_field': u.G})
+        >>> output[3] = 1e4
+        >>> plasma.magnetic_field_strength.to(u.T)[0, 0, 0]
+        <Quantity 1. T>
+        """
+        if layout not in ('first', 'last'):
+            raise ValueError(f"Unknown layout {layout!r}; expected 'first' "
+                             f"or 'last'.")
+        units = dict(units or {})
+
+        arrays = {}
+        for name, values in fields.items():
+            if isinstance(values, u.Quantity):
+                units.setdefault(name, values.unit)
+                values = values.value
+            else:
+                values = np.asarray(values)
+            if name in cls._fields and cls._fields[name][0] and \
+                    layout == 'last':
+                values = np.moveaxis(values, -1, 0)
+            arrays[name] = values
+
+        return cls._from_adopted(domain_x, domain_y, domain_z, arrays, units,
+                                 zero_views=False)
+
+    @classmethod
+    @u.quantity_input(domain_x=u.m, domain_y=u.m, domain_z=u.m)
+    def from_files(cls, domain_x, domain_y, domain_z, mode='r', **fields):
+        r"""
+        Create a plasma whose fields are memory-mapped from files, so that
+        domains larger than the available memory can be opened.
+
+        Parameters
+        ----------
+        domain_x, domain_y, domain_z : `astropy.units.Quantity`
+            1D arrays of coordinates, as for `Plasma3D`.
+        mode : str
+            Memory-map mode: ``'r'`` for read-only access (the default),
+            ``'r+'`` to write changes back to the files or ``'c'`` for
+            copy-on-write.
+        **fields : str, path or `h5py.Dataset`
+            Source of any of the fields ``density``, ``momentum``,
+            ``pressure``, ``magnetic_field`` and ``electric_field``:
+            the path of a ``.npy`` file or an HDF5 dataset. The data must
+            be in SI units and have the shape of the field, e.g.
+            (3, x, y, z) for ``magnetic_field``.
+
+        Returns
+        -------
+        `Plasma3D`
+
+        Notes
+        -----
+        No data is read when the plasma is created; the operating system
+        pages it in as parts of the fields are accessed. HDF5 datasets are
+        mapped directly at their offset in the file, which requires them
+        to be stored contiguously and uncompressed.
+
+        Fields that are not given are read-only views of a single zero,
+        so they take no memory either. Reassign them to store data.
+        """
+        arrays = {name: _memory_map(source, mode)
+                  for name, source in fields.items()
+                  if name in cls._fields}
+        if len(arrays) < len(fields):
+            unknown = sorted(set(fields) - set(arrays))
+            raise ValueError(f"Unknown fields {unknown}; expected any of "
+                             f"{list(cls._fields)}.")
+        return cls._from_adopted(domain_x, domain_y, domain_z, arrays, {},
+                                 zero_views=True)
+
+    def _block(self, index):
+        # Plasma3D on a slab of x-planes sharing the field memory
+        block = Plasma3D._without_fields(self.x[index], self.y, self.z,
+                                         self.dtypes)
+        for name in self._fields:
+            field = getattr(self, name)
+            vector, _ = self._fields[name]
+            block._adopt(name, field.value[(slice(None), index) if vector
+                                           else index], field.unit)
+        return block
+
+    def iter_chunks(self, max_bytes=2 ** 28):
+        r"""
+        Iterate over the domain in slabs of consecutive x-planes.
+
+        Parameters
+        ----------
+        max_bytes : int
+            Upper limit on the total size of the fields of each slab. At
+            least one plane is always included.
+
+        Yields
+        ------
+        index : slice
+            The x-indices covered by the slab.
+        block : `Plasma3D`
+            A plasma on the slab whose fields are views of this plasma's
+            fields. For memory-mapped fields only the slab is read, and
+            its derived quantities are computed for the slab alone.
+        """
+        # Broadcast fields without storage of their own are not counted
+        fields = [getattr(self, name).value for name in self._fields]
+        plane_bytes = sum(field[..., 0, :, :].nbytes for field in fields
+                          if field.strides[-3] != 0)
+        planes = max(1, int(max_bytes // max(plane_bytes, 1)))
+        for start in range(0, self.domain_shape[0], planes):
+            index = slice(start, min(start + planes, self.domain_shape[0]))
+            yield index, self._block(index)
+
+    def map_chunks(self, function, out=None, max_bytes=2 ** 28):
+        r"""
+        Compute a quantity over the whole domain one slab at a time.
+
+        Parameters
+        ----------
+        function : callable
+            Called with the `Plasma3D` of each slab, see `iter_chunks`.
+            It must return a `~astropy.units.Quantity` of shape
+            (..., x, y, z) for the slab.
+        out : ndarray or `astropy.units.Quantity`, optional
+            Array of the full (..., x, y, z) shape to write the result
+            into, e.g. a `numpy.memmap` for results larger than memory.
+            Plain arrays receive the values in SI units.
+        max_bytes : int
+            Upper limit on the size of the fields of each slab.
+
+        Returns
+        -------
+        `astropy.units.Quantity` or ndarray
+            The result over the whole domain; ``out`` if it was given.
+
+        Examples
+        --------
+        >>> from astropy import units as u
+        >>> x = np.linspace(0, 1, 8) * u.m
+        >>> plasma = Plasma3D(x, x, x)
+        >>> plasma.density[...] = 1 * u.kg / u.m ** 3
+        >>> plasma.map_chunks(lambda block: block.alfven_speed).shape
+        (8, 8, 8)
+        """
+        for index, block in self.iter_chunks(max_bytes):
+            result = function(block)
+            if out is None:
+                out = u.Quantity(np.empty(result.shape[:-3] +
+                                          self.domain_shape,
+                                          dtype=result.dtype),
+                                 result.unit, copy=False)
+            target = (Ellipsis, index, slice(None), slice(None))
+            if isinstance(out, u.Quantity):
+                out[target] = result
+            else:
+                out[target] = result.si.value
+        return out
+
+    def parameter_maps(self, parameters, ion='p+', z_mean=None, T_e=None,
+                       T_i=None, out=None, max_bytes=2 ** 24):
+        r"""
+        Compute maps of several plasma parameters in a single pass over
+        the domain.
+
+        Parameters
+        ----------
+        parameters : sequence of str
+            Names of the parameters to compute; any of the keys of
+            `Plasma3D.parameter_units`.
+        ion : str
+            The ion species. `density` is taken to be the ion mass
+            density and the electron density follows from quasineutrality.
+        z_mean : float, optional
+            Average ionization, used instead of the charge of ``ion``.
+        T_e, T_i : `astropy.units.Quantity`, optional
+            Electron and ion temperature, either uniform or (x, y, z)
+            arrays, in units of temperature or energy. If only one of
+            them is given, the other one follows from `pressure`. If
+            neither is given, both are taken to be equal and are derived
+            from `pressure`.
+        out : dict, optional
+            Arrays of shape (x, y, z), such as `numpy.memmap` instances,
+            to write some or all of the maps into. Plain arrays receive
+            the values in the SI units listed in `parameter_units`.
+        max_bytes : int
+            Upper limit on the size of the fields of each slab of the
+            domain processed at once; see `iter_chunks`.
+
+        Returns
+        -------
+        dict
+            The map of each requested parameter, as a
+            `~astropy.units.Quantity` or the array given in ``out``.
+
+        Notes
+        -----
+        The particle properties and units are resolved once, and the
+        domain is traversed in slabs small enough to stay in cache. Within
+        each slab intermediates such as the number densities,
+        temperatures, field strength and thermal speeds are computed once
+        and shared by all parameters that need them. Cells without
+        density or magnetic field give infinite or NaN values.
 
-        # Initiate core plasma variables
-        self.density = np.zeros(self.domain_shape) * u.kg / u.m**3
-        self.momentum = np.zeros((3, *self.domain_shape)) * u.kg / (u.m ** 2 * u.s)
-        self.pressure = np.zeros(self.domain_shape) * u.Pa
-        self.magnetic_field = np.zeros((3, *self.domain_shape)) * u.T
-        self.electric_field = np.zeros((3, *self.domain_shape)) * u.V / u.m
+        Examples
+        --------
+        >>> from astropy import units as u
+        >>> x = np.linspace(0, 1, 4) * u.m
+        >>> plasma = Plasma3D(x, x, x)
+        >>> plasma.density[...] = 1.6726e-7 * u.kg / u.m ** 3
+        >>> plasma.pressure[...] = 1 * u.Pa
+        >>> plasma.magnetic_field[2] = 0.01 * u.T
+        >>> maps = plasma.parameter_maps(['Debye_length', 'beta'])
+        >>> maps['beta'][0, 0, 0]
+        <Quantity 0.02513274>
+        """
+        unknown = set(parameters) - set(_PARAMETER_MAPS)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)}; "
+                             f"expected any of {list(_PARAMETER_MAPS)}.")
+
+        constants = {'m_i': particle_mass(ion).si.value,
+                     'Z': float(_grab_charge(ion, z_mean))}
+        temperatures = {}
+        for name, T in (('T_e', T_e), ('T_i', T_i)):
+            if T is not None:
+                T = T.to_value(u.K, equivalencies=u.temperature_energy())
+                if np.ndim(T) and np.shape(T) != self.domain_shape:
+                    raise ValueError(f"{name} must be uniform or of the "
+                                     f"domain shape {self.domain_shape}.")
+                temperatures[name] = T
+
+        formulas = dict(_INTERMEDIATES)
+        if 'T_i' in temperatures and 'T_e' not in temperatures:
+            formulas['T_e'] = lambda q: \
+                (q('p') / _K_B - q('n_i') * q('T_i')) / q('n_e')
+
+        results = dict(out or {})
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for index, block in self.iter_chunks(max_bytes):
+                values = dict(constants)
+                values['rho'] = block.density.to_value(u.kg / u.m ** 3)
+                values['p'] = block.pressure.to_value(u.Pa)
+                values['B2'] = block.magnetic_field_squared.to_value(u.T ** 2)
+                for name, T in temperatures.items():
+                    values[name] = T[index] if np.ndim(T) else T
+
+                def quantity(name):
+                    if name not in values:
+                        values[name] = formulas[name](quantity)
+                    return values[name]
+
+                for name in parameters:
+                    unit, expression = _PARAMETER_MAPS[name]
+                    result = np.broadcast_to(expression(quantity),
+                                             block.domain_shape)
+                    if name not in results:
+                        results[name] = u.Quantity(
+                            np.empty(self.domain_shape, dtype=result.dtype),
+                            unit, copy=False)
+                    target = results[name]
+                    if isinstance(target, u.Quantity):
+                        target[index] = u.Quantity(result, unit, copy=False)
+                    else:
+                        target[index] = result
+        return {name: results[name] for name in parameters}
+
+    @property
+    def grid_views(self):
+        unit = self.x.unit
+        views = []
+        for dim, axis in enumerate((self.x, self.y, self.z)):
+            shape = [1, 1, 1]
+            shape[dim] = -1
+            values = np.asarray(axis.to_value(unit)).reshape(shape)
+            views.append(u.Quantity(np.broadcast_to(values, self.domain_shape),
+                                    unit, copy=False))
+        return tuple(views)
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            self._grid = u.Quantity(np.stack(self.grid_views), copy=False)
+        return self._grid
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self._fields:
+            self.invalidate(name)
+
+    def invalidate(self, *fields):
+        r"""
+        Discard cached derived quantities.
+
+        Reassigning a field attribute, or writing to it with `set_field`,
+        does this automatically. Call it after modifying a field array in
+        place by other means, e.g. ``plasma.magnetic_field[2] = B0``.
+
+        Parameters
+        ----------
+        *fields : str
+            Names of the modified fields. If none are given, every cached
+            quantity is discarded.
+        """
+        cache = self.__dict__.get('_cache')
+        if not cache:
+            return
+        if not fields:
+            cache.clear()
+            return
+        for name in list(cache):
+            if not self._derived[name].isdisjoint(fields):
+                del cache[name]
+
+    def set_field(self, name, value, index=Ellipsis):
+        r"""
+        Write to part of a field array in place and discard the cached
+        quantities derived from it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field, e.g. ``'magnetic_field'``.
+        value : `astropy.units.Quantity`
+            Values to assign.
+        index : optional
+            Index expression selecting the part of the field to write. By
+            default the whole array is overwritten.
+        """
+        if name not in self._fields:
+            raise ValueError(f"Unknown field {name!r}; expected one of "
+                             f"{list(self._fields)}.")
+        getattr(self, name)[index] = value
+        self.invalidate(name)
+
+    def _cached(self, name, compute):
+        # Derived quantities are returned read-only, so that modifying a
+        # returned array cannot silently corrupt the cache
+        cache = self.__dict__.setdefault('_cache', {})
+        if name not in cache:
+            value = compute()
+            value.flags.writeable = False
+            cache[name] = value
+        return cache[name]
+
+    @staticmethod
+    def _squared_norm(vector):
+        # Sum of squares without a (3, x, y, z) temporary
+        values = vector.value
+        return u.Quantity(np.einsum('i...,i...->...', values, values),
+                          vector.unit ** 2, copy=False)
 
     @property
     def velocity(self):
-        return self.momentum / self.density
+        return self._cached('velocity', lambda: self.momentum / self.density)
+
+    @property
+    def magnetic_field_squared(self):
+        return self._cached('magnetic_field_squared',
+                            lambda: self._squared_norm(self.magnetic_field))
 
     @property
     def magnetic_field_strength(self):
-        B = self.magnetic_field
-        return np.sqrt(np.sum(B * B, axis=0))
+        return self._cached('magnetic_field_strength',
+                            lambda: np.sqrt(self.magnetic_field_squared))
 
     @property
     def electric_field_strength(self):
-        E = self.electric_field
-        return np.sqrt(np.sum(E * E, axis=0))
+        return self._cached(
+            'electric_field_strength',
+            lambda: np.sqrt(self._squared_norm(self.electric_field)))
 
     @property
     def alfven_speed(self):
-        B = self.magnetic_field
-        rho = self.density
-        return np.sqrt(np.sum(B * B, axis=0) / (mu0 * rho))
+        return self._cached(
+            'alfven_speed',
+            lambda: np.sqrt(self.magnetic_field_squared /
+                            (mu0 * self.density)))
+
+
+def _memory_map(source, mode):
+    r"""Open a ``.npy`` file or HDF5 dataset as a `numpy.memmap`."""
+    if hasattr(source, 'id') and hasattr(source.id, 'get_offset'):
+        # h5py dataset; only contiguous raw data can be mapped
+        offset = source.id.get_offset()
+        if offset is None or source.chunks is not None or \
+                source.compression is not None:
+            raise ValueError(f"HDF5 dataset {source.name} must be stored "
+                             f"contiguously and uncompressed to be "
+                             f"memory-mapped.")
+        return np.memmap(source.file.filename, dtype=source.dtype, mode=mode,
+                         offset=offset, shape=source.shape)
+    return np.load(source, mmap_mode=mode)
 
 
 class PlasmaBlob:
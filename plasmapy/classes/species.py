@@ -3,8 +3,9 @@ Class representing a group of particles.
 """
 
 import numpy as np
-import scipy.interpolate as interp
 from ..atomic import atomic
+from ..simulation import boundaries, sorting
+from ..simulation.interpolation import GridInterpolator
 from astropy import constants
 from astropy import units as u
 
@@ -34,15 +35,35 @@ class Species:
         length of timestep
     nt : int
         number of timesteps
+    boundary : str or sequence of str, optional
+        particle boundary condition, either one of ``'periodic'``,
+        ``'reflecting'`` or ``'absorbing'`` for all axes or a sequence of
+        three of these for the x, y and z axes. Reflecting and absorbing
+        walls are at the first and last grid points along each axis,
+        while periodic axes repeat with a period of the number of grid
+        points times the spacing, as for
+        `~plasmapy.simulation.deposition.deposit`. If `None` (the
+        default), particles leaving the domain raise a `ValueError`.
+    sort_interval : int, optional
+        If given, particles are reordered by grid cell every
+        ``sort_interval`` steps, see `Species.sort_particles`. The default
+        of `None` never sorts.
 
     Attributes
     ----------
     x : `astropy.units.Quantity`
     v : `astropy.units.Quantity`
         Current position and velocity, respectively. Shape (n, 3).
+        Only particles still within the domain are included.
+    particle_id : ndarray
+        Index of each current particle into the history arrays.
     position_history : `astropy.units.Quantity`
     velocity_history : `astropy.units.Quantity`
-        History of position and velocity. Shape (nt, n, 3).
+        History of position and velocity. Shape (nt, n, 3), where n is the
+        initial number of particles. Entries after a particle has been
+        absorbed are NaN.
+    lost_particles : dict
+        Log of absorbed particles, see `Species.lost_particles`.
     q : `astropy.units.Quantity`
     m : `astropy.units.Quantity`
         Charge and mass of particle.
@@ -61,7 +82,8 @@ class Species:
     """
     @u.quantity_input(dt=u.s)
     def __init__(self, plasma, particle_type='p', n_particles=1, scaling=1,
-                 dt=np.inf * u.s, nt=np.inf):
+                 dt=np.inf * u.s, nt=np.inf, boundary=None,
+                 sort_interval=None):
 
         if np.isinf(dt) and np.isinf(nt):  # coveralls: ignore
             raise ValueError("Both dt and nt are infinite.")
@@ -82,35 +104,140 @@ class Species:
         self.x = np.zeros((n_particles, 3), dtype=float) * u.m
         self.v = np.zeros((n_particles, 3), dtype=float) * (u.m / u.s)
         self.name = particle_type
+        self.particle_id = np.arange(self.N)
 
         self.position_history = np.zeros((self.NT, *self.x.shape),
                                          dtype=float) * u.m
         self.velocity_history = np.zeros((self.NT, *self.v.shape),
                                          dtype=float) * (u.m / u.s)
-        # create intermediate array of dimension (nx,ny,nz,3) in order to allow
-        # interpolation on non-equal spatial domain dimensions
-        _B = np.moveaxis(self.plasma.magnetic_field.si.value, 0, -1)
-        _E = np.moveaxis(self.plasma.electric_field.si.value, 0, -1)
-
-        self._B_interpolator = interp.RegularGridInterpolator(
-            (self.plasma.x.si.value,
-             self.plasma.y.si.value,
-             self.plasma.z.si.value),
-            _B,
-            method="linear",
-            bounds_error=True)
-
-        self._E_interpolator = interp.RegularGridInterpolator(
-            (self.plasma.x.si.value,
-             self.plasma.y.si.value,
-             self.plasma.z.si.value),
-            _E,
-            method="linear",
-            bounds_error=True)
+        self.boundary = None
+        if boundary is not None:
+            self.boundary = boundaries.parse_boundaries(boundary)
+        periodic = self.boundary is not None and \
+            [kind == 'periodic' for kind in self.boundary]
+
+        # The interpolators work on views of the plasma's field arrays, so
+        # fields are neither transposed nor copied
+        axes = (self.plasma.x.to_value(u.m),
+                self.plasma.y.to_value(u.m),
+                self.plasma.z.to_value(u.m))
+        self._B_interpolator = GridInterpolator(
+            axes, self.plasma.magnetic_field.to_value(u.T),
+            periodic=periodic)
+        self._E_interpolator = GridInterpolator(
+            axes, self.plasma.electric_field.to_value(u.V / u.m),
+            periodic=periodic)
+        self._lower = np.array([self.plasma.x[0].si.value,
+                                self.plasma.y[0].si.value,
+                                self.plasma.z[0].si.value])
+        self._upper = np.array([self.plasma.x[-1].si.value,
+                                self.plasma.y[-1].si.value,
+                                self.plasma.z[-1].si.value])
+        # A periodic axis ends one grid spacing after its last point,
+        # where the first point repeats
+        n = np.array(self.plasma.domain_shape)
+        self._period_end = self._upper + \
+            (self._upper - self._lower) / np.maximum(n - 1, 1)
+        self._step = 0
+        self._lost_log = []
+        self.sort_interval = sort_interval
+
+    def _boundary_axes(self, kind):
+        # Singleton axes have no extent and are left alone
+        return [axis for axis in range(3)
+                if self.boundary[axis] == kind and
+                self._upper[axis] > self._lower[axis]]
+
+    def apply_boundaries(self):
+        r"""
+        Apply the boundary conditions to the current particles.
+
+        Periodic and reflecting walls modify positions and velocities in
+        place. Absorbed particles are removed by compacting `x`, `v` and
+        `particle_id` in place, so that subsequent steps only process the
+        remaining particles, and are recorded in `lost_particles`.
+        """
+        if self.boundary is None:
+            return
+
+        # Work on views of the particle arrays so that every operation
+        # below happens in place
+        self.x = self.x.to(u.m, copy=False)
+        self.v = self.v.to(u.m / u.s, copy=False)
+        x = self.x.value
+        v = self.v.value
+
+        boundaries.apply_periodic(x, self._lower, self._period_end,
+                                  self._boundary_axes('periodic'))
+        boundaries.apply_reflecting(x, v, self._lower, self._upper,
+                                    self._boundary_axes('reflecting'))
+        absorbed = boundaries.outside_domain(x, self._lower, self._upper,
+                                             self._boundary_axes('absorbing'))
+
+        if absorbed.any():
+            ids = self.particle_id[absorbed]
+            self._lost_log.append((ids, np.full(ids.size, self._step),
+                                   x[absorbed]))
+            self.position_history[self._step:, ids] = np.nan
+            self.velocity_history[self._step:, ids] = np.nan
+
+            n = boundaries.compact(~absorbed, x, v, self.particle_id)
+            self.x = self.x[:n]
+            self.v = self.v[:n]
+            self.particle_id = self.particle_id[:n]
+            self.N = n
+
+    def sort_particles(self):
+        r"""
+        Reorder the particles by the grid cell they are in, in place.
+
+        Particles in the same cell then sit next to each other in `x` and
+        `v`, so that interpolating the fields or depositing onto the grid
+        accesses grid memory nearly sequentially instead of at random.
+        The same stable permutation is applied to `x`, `v` and
+        `particle_id`, so histories and `lost_particles` keep referring to
+        the same particles.
+
+        Returns
+        -------
+        ndarray
+            The permutation that was applied.
+        """
+        self.x = self.x.to(u.m, copy=False)
+        self.v = self.v.to(u.m / u.s, copy=False)
+        axes = (self.plasma.x.si.value, self.plasma.y.si.value,
+                self.plasma.z.si.value)
+        return sorting.sort_by_cell(self.x.value, axes, self.v.value,
+                                    self.particle_id)
+
+    @property
+    def lost_particles(self):
+        r"""
+        Log of the particles removed by absorbing boundaries.
+
+        Returns
+        -------
+        dict
+            ``'id'`` : ndarray of particle indices into the history arrays,
+            ``'step'`` : ndarray of the steps at which they were absorbed,
+            ``'position'`` : `astropy.units.Quantity` of shape (m, 3) with
+            their positions after crossing the wall.
+        """
+        if not self._lost_log:
+            return {'id': np.zeros(0, dtype=int),
+                    'step': np.zeros(0, dtype=int),
+                    'position': np.zeros((0, 3)) * u.m}
+
+        ids, steps, positions = zip(*self._lost_log)
+        return {'id': np.concatenate(ids),
+                'step': np.concatenate(steps),
+                'position': np.concatenate(positions) * u.m}
 
     def _interpolate_fields(self):
-        interpolated_b = self._B_interpolator(self.x.si.value) * u.T
-        interpolated_e = self._E_interpolator(self.x.si.value) * u.V / u.m
+        x = self.x.to_value(u.m)
+        interpolated_b = u.Quantity(self._B_interpolator(x), u.T, copy=False)
+        interpolated_e = u.Quantity(self._E_interpolator(x), u.V / u.m,
+                                    copy=False)
         return interpolated_b, interpolated_e
 
     @property
@@ -125,7 +252,7 @@ class Species:
         """
         return (self.velocity_history ** 2).sum(axis=-1) * self.eff_m / 2
 
-    def boris_push(self, init=False):
+    def boris_push(self, init=False, fields=None):
         r"""
         Implements the Boris algorithm for moving particles and updating their
         velocities.
@@ -135,6 +262,9 @@ class Species:
         init : bool (optional)
             If `True`, does not change the particle positions and sets dt
             to -dt/2.
+        fields : tuple of `astropy.units.Quantity` (optional)
+            Magnetic and electric field at the particle positions, each of
+            shape (n, 3). If `None`, they are interpolated from the plasma.
 
         Notes
         ----------
@@ -157,7 +287,7 @@ class Species:
                Simulation", 2004, p. 58-63
         """
         dt = -self.dt / 2 if init else self.dt
-        b, e = self._interpolate_fields()
+        b, e = self._interpolate_fields() if fields is None else fields
 
         # add first half of electric impulse
         vminus = self.v + self.eff_q * e / self.eff_m * dt * 0.5
@@ -174,18 +304,22 @@ class Species:
         self.v = v_new
         if not init:
             self.x += self.v * dt
+            self._step += 1
+            self.apply_boundaries()
+            if self.sort_interval and self._step % self.sort_interval == 0:
+                self.sort_particles()
 
     def run(self):
         r"""
         Runs a simulation instance.
         """
         self.boris_push(init=True)
-        self.position_history[0] = self.x
-        self.velocity_history[0] = self.v
+        self.position_history[0, self.particle_id] = self.x
+        self.velocity_history[0, self.particle_id] = self.v
         for i in range(1, self.NT):
             self.boris_push()
-            self.position_history[i] = self.x
-            self.velocity_history[i] = self.v
+            self.position_history[i, self.particle_id] = self.x
+            self.velocity_history[i, self.particle_id] = self.v
 
     def __repr__(self, *args, **kwargs):
         return f"Species(q={self.q:.4e},m={self.m:.4e},N={self.N}," \
@@ -206,7 +340,7 @@ class Species:
         quantity_support()
         fig = plt.figure()
         ax = fig.add_subplot(111, projection='3d')
-        for p_index in range(self.N):
+        for p_index in range(self.position_history.shape[1]):
             r = self.position_history[:, p_index]
             x, y, z = r.T
             ax.plot(x, y, z)
@@ -232,7 +366,7 @@ class Species:
 
         quantity_support()
         fig, ax = plt.subplots()
-        for p_index in range(self.N):
+        for p_index in range(self.position_history.shape[1]):
             r = self.position_history[:, p_index]
             x, y, z = r.T
             if "x" in plot:
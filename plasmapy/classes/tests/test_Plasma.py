@@ -3,6 +3,8 @@ import numpy as np
 import astropy.units as u
 
 from plasmapy.classes import plasma
+from plasmapy.constants import k_B, m_p, mu0
+from plasmapy.physics import parameters
 from plasmapy.utils.exceptions import InvalidParticleError
 
 @pytest.mark.parametrize('grid_dimensions, expected_size', [
@@ -97,6 +99,289 @@ def test_Plasma3D_derived_vars():
     assert np.allclose(test_plasma.alfven_speed.value, 10.92548431)
 
 
+def test_Plasma3D_lazy_grid():
+    r"""The coordinate grid is only built on access and matches the
+    broadcasting views of the axes."""
+    test_plasma = plasma.Plasma3D(domain_x=np.linspace(0, 1, 4) * u.m,
+                                  domain_y=np.linspace(0, 2, 3) * u.cm,
+                                  domain_z=np.linspace(0, 1, 1) * u.m)
+    assert test_plasma._grid is None
+
+    views = test_plasma.grid_views
+    for view in views:
+        assert view.shape == test_plasma.domain_shape
+        assert view.unit == u.m
+        assert not view.flags.writeable
+    assert np.allclose(views[1][0, :, 0], [0, 0.01, 0.02] * u.m)
+
+    grid = test_plasma.grid
+    assert grid.shape == (3, 4, 3, 1)
+    assert grid is test_plasma.grid
+    for dim in range(3):
+        assert np.array_equal(grid[dim], views[dim])
+
+
+@pytest.mark.parametrize('dtype, expected', [
+    (np.float32, {'density': np.float32, 'magnetic_field': np.float32}),
+    ({'magnetic_field': np.float32, 'electric_field': np.float32},
+     {'density': np.float64, 'magnetic_field': np.float32,
+      'electric_field': np.float32, 'momentum': np.float64}),
+])
+def test_Plasma3D_dtype(dtype, expected):
+    x = np.linspace(0, 1, 8) * u.m
+    test_plasma = plasma.Plasma3D(x, x, x, dtype=dtype)
+    for name, expected_dtype in expected.items():
+        assert getattr(test_plasma, name).dtype == expected_dtype
+        assert test_plasma.dtypes[name] == expected_dtype
+
+    test_plasma.magnetic_field[2] = 0.5 * u.T
+    assert test_plasma.magnetic_field.dtype == expected['magnetic_field']
+    assert np.allclose(test_plasma.magnetic_field_strength, 0.5 * u.T)
+
+
+@pytest.mark.parametrize('dtype', [np.int32, {'temperature': np.float32}])
+def test_Plasma3D_invalid_dtype(dtype):
+    x = np.linspace(0, 1, 2) * u.m
+    with pytest.raises(ValueError):
+        plasma.Plasma3D(x, x, x, dtype=dtype)
+
+
+def test_Plasma3D_derived_cache():
+    r"""Derived variables are cached until a field they depend on
+    changes."""
+    x = np.linspace(0, 1, 4) * u.m
+    test_plasma = plasma.Plasma3D(x, x, x)
+    test_plasma.density[...] = 1.0 * u.kg / u.m ** 3
+    test_plasma.magnetic_field[2] = 0.1 * u.T
+
+    B = test_plasma.magnetic_field_strength
+    v_A = test_plasma.alfven_speed
+    assert test_plasma.magnetic_field_strength is B
+    assert test_plasma.alfven_speed is v_A
+    assert np.allclose(test_plasma.magnetic_field_squared, 0.01 * u.T ** 2)
+    with pytest.raises(ValueError):
+        B[0, 0, 0] = 0 * u.T
+
+    # Unrelated fields leave the cache alone
+    test_plasma.set_field('electric_field', 1 * u.V / u.m, index=0)
+    assert test_plasma.magnetic_field_strength is B
+    assert np.allclose(test_plasma.electric_field_strength, 1 * u.V / u.m)
+
+    # Tracked write
+    test_plasma.set_field('magnetic_field', 0.2 * u.T, index=2)
+    assert np.allclose(test_plasma.magnetic_field_strength, 0.2 * u.T)
+    assert test_plasma.alfven_speed is not v_A
+
+    # Reassignment
+    test_plasma.density = 4 * test_plasma.density
+    assert np.allclose(test_plasma.alfven_speed, v_A)
+
+    # Untracked in-place write followed by an explicit invalidation
+    test_plasma.magnetic_field[2] = 0.3 * u.T
+    test_plasma.invalidate('magnetic_field')
+    assert np.allclose(test_plasma.magnetic_field_strength, 0.3 * u.T)
+
+    with pytest.raises(ValueError):
+        test_plasma.set_field('temperature', 1 * u.K)
+
+
+@pytest.fixture()
+def field_files(tmp_path):
+    rng = np.random.RandomState(0)
+    fields = {'magnetic_field': rng.uniform(size=(3, 10, 6, 4)),
+              'density': rng.uniform(1, 2, size=(10, 6, 4))}
+    paths = {}
+    for name, values in fields.items():
+        paths[name] = str(tmp_path / f"{name}.npy")
+        np.save(paths[name], values)
+    return fields, paths
+
+
+def test_Plasma3D_from_npy(field_files, tmp_path):
+    fields, paths = field_files
+    test_plasma = plasma.Plasma3D.from_files(
+        np.arange(10) * u.m, np.arange(6) * u.m, np.arange(4) * u.m,
+        **paths)
+
+    assert isinstance(test_plasma.magnetic_field.base, np.memmap)
+    assert test_plasma.magnetic_field.unit == u.T
+    assert np.array_equal(test_plasma.magnetic_field.value,
+                          fields['magnetic_field'])
+    assert not test_plasma.magnetic_field.flags.writeable
+
+    # Missing fields are zero views without storage
+    assert test_plasma.pressure.shape == (10, 6, 4)
+    assert test_plasma.pressure.strides == (0, 0, 0)
+    assert (test_plasma.pressure == 0).all()
+
+    # Chunked derived quantities match the full computation, also when
+    # written into a memory-mapped output
+    expected = test_plasma.alfven_speed.si.value
+    out = np.lib.format.open_memmap(str(tmp_path / "v_A.npy"), mode='w+',
+                                    shape=(10, 6, 4))
+    chunks = list(test_plasma.iter_chunks(max_bytes=6 * 4 * 8 * 10))
+    assert [index for index, _ in chunks] == [slice(0, 2), slice(2, 4),
+                                              slice(4, 6), slice(6, 8),
+                                              slice(8, 10)]
+    assert chunks[1][1].x[0] == 2 * u.m
+    result = test_plasma.map_chunks(lambda block: block.alfven_speed,
+                                    out=out, max_bytes=6 * 4 * 8 * 10)
+    assert result is out
+    assert np.allclose(out, expected)
+
+    B = test_plasma.map_chunks(lambda block: block.magnetic_field,
+                               max_bytes=1)
+    assert np.array_equal(B, test_plasma.magnetic_field)
+
+
+def test_Plasma3D_from_hdf5(tmp_path):
+    h5py = pytest.importorskip('h5py')
+    values = np.arange(3 * 4 * 2 * 2, dtype=np.float32).reshape(3, 4, 2, 2)
+    with h5py.File(tmp_path / "snapshot.h5", 'w') as f:
+        f['B'] = values
+        f.create_dataset('E', data=values, chunks=(1, 4, 2, 2))
+
+    with h5py.File(tmp_path / "snapshot.h5", 'r') as f:
+        x = np.arange(4) * u.m
+        y = np.arange(2) * u.m
+        test_plasma = plasma.Plasma3D.from_files(x, y, y,
+                                                 magnetic_field=f['B'])
+        assert test_plasma.magnetic_field.dtype == np.float32
+        assert np.array_equal(test_plasma.magnetic_field.value, values)
+
+        with pytest.raises(ValueError):
+            plasma.Plasma3D.from_files(x, y, y, electric_field=f['E'])
+
+
+def test_Plasma3D_from_files_invalid(field_files):
+    _, paths = field_files
+    x = np.arange(10) * u.m
+    with pytest.raises(ValueError):
+        plasma.Plasma3D.from_files(x, x, x, **paths)
+    with pytest.raises(ValueError):
+        plasma.Plasma3D.from_files(x, x, x, temperature=paths['density'])
+
+
+def test_Plasma3D_from_arrays():
+    r"""Fields adopt views into a caller-provided buffer."""
+    x = np.linspace(0, 1, 4) * u.m
+    output = np.zeros((4, 4, 4, 7))
+    test_plasma = plasma.Plasma3D.from_arrays(
+        x, x, x, layout='last',
+        magnetic_field=output[..., :3],
+        electric_field=output[..., 3:6] * u.kV / u.m,
+        density=memoryview(output[..., 6].copy()),
+        units={'magnetic_field': u.G})
+
+    assert np.shares_memory(test_plasma.magnetic_field, output)
+    assert test_plasma.magnetic_field.shape == (3, 4, 4, 4)
+    assert test_plasma.magnetic_field.unit == u.G
+    assert test_plasma.electric_field.unit == u.kV / u.m
+    assert test_plasma.density.unit == u.kg / u.m ** 3
+    assert test_plasma.pressure.flags.writeable
+
+    output[..., 2] = 1e4
+    assert np.allclose(test_plasma.magnetic_field[2], 1 * u.T)
+    test_plasma.magnetic_field[0] = 1 * u.T
+    assert np.allclose(output[..., 0], 1e4)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'layout': 'middle', 'density': np.zeros((4, 4, 4))},
+    {'density': np.zeros((4, 4, 4)), 'units': {'density': u.T}},
+    {'magnetic_field': np.zeros((4, 4, 4, 3))},
+    {'temperature': np.zeros((4, 4, 4))},
+])
+def test_Plasma3D_from_arrays_invalid(kwargs):
+    x = np.linspace(0, 1, 4) * u.m
+    with pytest.raises(ValueError):
+        plasma.Plasma3D.from_arrays(x, x, x, **kwargs)
+
+
+@pytest.fixture
+def uniform_plasma():
+    x = np.linspace(0, 1, 6) * u.m
+    test_plasma = plasma.Plasma3D(x, x, x)
+    test_plasma.density[...] = 1e19 * m_p / u.m ** 3
+    test_plasma.pressure[...] = 2 * 1e19 * k_B * 1e5 * u.K / u.m ** 3
+    test_plasma.magnetic_field[2] = 0.1 * u.T
+    test_plasma.invalidate()
+    return test_plasma
+
+
+def test_Plasma3D_parameter_maps(uniform_plasma):
+    r"""Maps agree with the scalar functions of plasmapy.physics."""
+    n = 1e19 / u.m ** 3
+    T = 1e5 * u.K
+    B = 0.1 * u.T
+    expected = {
+        'Debye_length': parameters.Debye_length(T, n),
+        'electron_plasma_frequency': parameters.plasma_frequency(n, 'e-'),
+        'ion_plasma_frequency': parameters.plasma_frequency(n, 'p+'),
+        'electron_gyrofrequency': parameters.gyrofrequency(B, 'e-'),
+        'ion_gyrofrequency': parameters.gyrofrequency(B, 'p+'),
+        'electron_thermal_speed': parameters.thermal_speed(T, 'e-'),
+        'ion_thermal_speed': parameters.thermal_speed(T, 'p+'),
+        'electron_gyroradius': parameters.gyroradius(B, 'e-', T_i=T),
+        'ion_gyroradius': parameters.gyroradius(B, 'p+', T_i=T),
+        'electron_inertial_length': parameters.inertial_length(n, 'e-'),
+        'ion_inertial_length': parameters.inertial_length(n, 'p+'),
+        'Alfven_speed': parameters.Alfven_speed(B, n * m_p, 'p+'),
+        'beta': (4 * n * k_B * T * mu0 / B ** 2).decompose(),
+    }
+    assert set(expected) == set(plasma.Plasma3D.parameter_units)
+
+    maps = uniform_plasma.parameter_maps(list(expected), max_bytes=4096)
+    assert list(maps) == list(expected)
+    for name, value in expected.items():
+        assert maps[name].shape == uniform_plasma.domain_shape
+        assert maps[name].unit == plasma.Plasma3D.parameter_units[name]
+        assert u.allclose(maps[name], value, rtol=1e-6), name
+
+
+def test_Plasma3D_parameter_maps_temperatures(uniform_plasma):
+    r"""Given temperatures replace those inferred from the pressure."""
+    T_e = np.full(uniform_plasma.domain_shape, 1.5e5) * u.K
+    maps = uniform_plasma.parameter_maps(
+        ['electron_thermal_speed', 'ion_thermal_speed'], T_e=T_e)
+    assert u.allclose(maps['electron_thermal_speed'],
+                      parameters.thermal_speed(1.5e5 * u.K, 'e-'))
+    assert u.allclose(maps['ion_thermal_speed'],
+                      parameters.thermal_speed(0.5e5 * u.K, 'p+'))
+
+    maps = uniform_plasma.parameter_maps(['Debye_length'],
+                                         T_e=1 * u.eV, T_i=2 * u.eV)
+    assert u.allclose(maps['Debye_length'],
+                      parameters.Debye_length((1 * u.eV).to(
+                          u.K, equivalencies=u.temperature_energy()),
+                          1e19 / u.m ** 3))
+
+
+def test_Plasma3D_parameter_maps_out(uniform_plasma, tmp_path):
+    r"""Maps are written into caller-provided memory maps."""
+    out = np.lib.format.open_memmap(str(tmp_path / "beta.npy"), mode='w+',
+                                    shape=uniform_plasma.domain_shape)
+    length = np.zeros(uniform_plasma.domain_shape) * u.cm
+    maps = uniform_plasma.parameter_maps(
+        ['beta', 'ion_inertial_length'],
+        out={'beta': out, 'ion_inertial_length': length}, max_bytes=4096)
+    assert maps['beta'] is out
+    assert maps['ion_inertial_length'] is length
+    assert np.allclose(np.load(str(tmp_path / "beta.npy"), mmap_mode='r'),
+                       maps['beta'])
+    assert u.allclose(length, parameters.inertial_length(1e19 / u.m ** 3,
+                                                         'p+'))
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'parameters': ['temperature']},
+    {'parameters': ['beta'], 'T_e': np.ones((2, 2, 2)) * u.K},
+])
+def test_Plasma3D_parameter_maps_invalid(uniform_plasma, kwargs):
+    with pytest.raises(ValueError):
+        uniform_plasma.parameter_maps(**kwargs)
+
+
 class Test_PlasmaBlobRegimes:
     def test_intermediate_coupling(self):
         r"""
@@ -203,3 +203,100 @@ def test_particle_exb_nonuniform_drift():
 #     plasma = Plasma3D(x, y, z)
 
 #     Species(plasma, 'e', dt=1e-14*u.s, nt=2).run()
+
+
+@pytest.mark.parametrize('boundary', ['periodic', 'reflecting', 'absorbing'])
+def test_boundaries_keep_particles_in_domain(uniform_magnetic_field,
+                                             boundary):
+    r"""Particles crossing the domain walls are wrapped, reflected or
+    removed instead of aborting the run."""
+    s = Species(uniform_magnetic_field, 'p', 4, dt=1e-3 * u.s, nt=20,
+                boundary=boundary)
+    s.v[:, 2] = [1e3, -1e3, 1, 0] * u.m / u.s
+    s.run()
+
+    # A periodic axis ends one grid spacing after the last grid point
+    upper = 2 * u.m if boundary == 'periodic' else 1 * u.m
+    assert ((s.x >= -1 * u.m) & (s.x <= upper)).all()
+
+    if boundary == 'absorbing':
+        assert s.N == 2
+        assert (s.particle_id == [2, 3]).all()
+        assert np.isnan(s.position_history[-1, :2]).all()
+        assert not np.isnan(s.position_history[-1, 2:]).any()
+    else:
+        assert s.N == 4
+        assert not np.isnan(s.position_history).any()
+
+
+def test_reflecting_boundary_reverses_velocity(uniform_magnetic_field):
+    s = Species(uniform_magnetic_field, 'p', 1, dt=1e-3 * u.s, nt=3,
+                boundary='reflecting')
+    s.x[0, 2] = 0.9 * u.m
+    s.v[0, 2] = 200 * u.m / u.s
+    s.run()
+
+    assert s.v[0, 2] < 0
+    assert np.isclose(s.x[0, 2], 0.7 * u.m)
+
+
+def test_absorbed_particle_log(uniform_magnetic_field):
+    s = Species(uniform_magnetic_field, 'p', 3, dt=1e-3 * u.s, nt=10,
+                boundary=('periodic', 'periodic', 'absorbing'))
+    s.x[:, 2] = [0.0, 0.45, -0.5] * u.m
+    s.v[:, 2] = [0, 100, -300] * u.m / u.s
+    s.run()
+
+    lost = s.lost_particles
+    assert list(lost['id']) == [2, 1]
+    assert list(lost['step']) == [2, 6]
+    assert lost['position'].shape == (2, 3)
+    assert (np.abs(lost['position'][:, 2]) > 1 * u.m).all()
+    assert s.N == 1
+
+
+def test_invalid_boundary(uniform_magnetic_field):
+    with pytest.raises(ValueError):
+        Species(uniform_magnetic_field, dt=1 * u.s, nt=1, boundary='sticky')
+
+
+def test_sorted_run_matches_unsorted(uniform_magnetic_field):
+    r"""Sorting reorders the current particles but not their histories."""
+    rng = np.random.RandomState(3)
+    x = rng.uniform(-0.9, 0.9, (50, 3)) * u.m
+    v = rng.uniform(-50, 50, (50, 3)) * u.m / u.s
+
+    runs = []
+    for sort_interval in (None, 2):
+        s = Species(uniform_magnetic_field, 'p', 50, dt=1e-3 * u.s, nt=20,
+                    boundary='periodic', sort_interval=sort_interval)
+        s.x[...] = x
+        s.v[...] = v
+        s.run()
+        runs.append(s)
+
+    unsorted, sorted_ = runs
+    assert not np.array_equal(sorted_.particle_id, unsorted.particle_id)
+    assert np.allclose(sorted_.position_history, unsorted.position_history)
+    assert np.allclose(sorted_.x, unsorted.x[sorted_.particle_id])
+    assert np.allclose(sorted_.v, unsorted.v[sorted_.particle_id])
+
+
+def test_fields_are_not_copied():
+    r"""Species interpolates from views of the plasma fields, also for
+    (x, y, z, 3) layouts."""
+    x = np.linspace(-1, 1, 3) * u.m
+    B = np.zeros((3, 3, 3, 3))
+    B[..., 2] = 1
+    E = np.zeros((3, 3, 3, 3))
+    test_plasma = Plasma3D.from_arrays(x, x, x, layout='last',
+                                       magnetic_field=B, electric_field=E)
+
+    s = Species(test_plasma, 'p', 1, dt=1e-3 * u.s, nt=1)
+    assert np.shares_memory(s._B_interpolator._values, B)
+    assert np.shares_memory(s._E_interpolator._values, E)
+
+    E[..., 0] = 2
+    b, e = s._interpolate_fields()
+    assert np.allclose(b, [[0, 0, 1]] * u.T)
+    assert np.allclose(e, [[2, 0, 0]] * u.V / u.m)
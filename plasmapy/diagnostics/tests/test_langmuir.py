@@ -1,13 +1,19 @@
 # coding=utf-8
 """Tests for Langmuir probe analysis functions."""
 
+import asyncio
+
 import numpy as np
 from astropy import units as u
 import pytest
+from scipy.optimize import curve_fit
 import plasmapy.constants as const
 
+from plasmapy.diagnostics import langmuir
 from plasmapy.diagnostics.langmuir import (Characteristic,
-                                           swept_probe_analysis)
+                                           swept_probe_analysis,
+                                           batch_swept_probe_analysis,
+                                           SweptProbeStream)
 
 np.random.seed(42)
 N = 30  # array length of dummy probe characteristic
@@ -75,6 +81,60 @@ class Test__characteristic_errors:
         assert (a.current - b.current == ab_sub.current).all(), errStr
 
 
+class Test__characteristic_operations:
+    r"""Test the array operations of the Characteristic class"""
+
+    def test_unique_bias_averaging(self):
+        r"""Test averaging of the currents at duplicate bias values"""
+
+        bias = np.array([2, 1, 2, 3, 1, 2]) * u.V
+        current = np.array([1, 2, 3, 4, 5, 6]) * u.mA
+        a = Characteristic(bias, current)
+
+        assert u.allclose(a.bias, [1, 2, 3] * u.V)
+        assert u.allclose(a.current, [3.5, 10 / 3, 4] * u.mA)
+
+    def test_large_unique_bias(self):
+        r"""Test the averaging of a long sweep against a direct average"""
+
+        bias = np.round(np.random.rand(100000) * 1000) * u.mV
+        current = np.random.rand(100000) * u.A
+        a = Characteristic(bias, current)
+
+        assert np.all(np.diff(a.bias) > 0)
+        for i in [0, 500, len(a.bias) - 1]:
+            assert u.isclose(a.current[i],
+                             np.mean(current[bias == a.bias[i]]))
+
+    def test_slicing(self):
+        r"""Test that slices and masks keep the characteristic valid"""
+
+        a = Characteristic(bias_arr, current_arr)
+        mask = a.bias > 0.5 * u.V
+        for key in [mask, slice(2, 10), [3, 1, 3]]:
+            b = a[key]
+            assert isinstance(b, Characteristic)
+            b.check_validity()
+
+        assert u.allclose(a[mask].current, a.current[mask])
+        assert len(a[[3, 1, 3]].bias) == 2
+
+    def test_arithmetic_units(self):
+        r"""Test that arithmetic converts units and leaves the operands
+        unchanged"""
+
+        a = Characteristic(bias_arr, current_arr)
+        b = Characteristic(bias_arr, current_arr.to(u.mA))
+        current = a.current.copy()
+
+        ab_sum = a + b
+        ab_sub = b - a
+        assert u.allclose(ab_sum.current, 2 * current)
+        assert u.allclose(ab_sub.current, 0 * u.A, atol=1e-12 * u.A)
+        assert u.allclose(a.current, current)
+        assert u.allclose(b.current, current)
+
+
 @pytest.fixture
 def characteristic():
     r""""Create a dummy characteristic with random values"""
@@ -184,3 +244,464 @@ class Test__swept_probe_analysis:
                   f"input data.")
         for key in sim_result:
             assert (sim_result[key] == sim_result_shuffled[key]).all(), errStr
+
+
+def simulated_sweep(T_e):
+    r"""Return the bias and current of a simulated probe characteristic with
+    the given electron temperature in eV"""
+
+    n_e = 1e18 * u.m**-3
+    probe_area = 1 * u.cm**2
+    I_es = (n_e * probe_area * const.e *
+            np.sqrt(T_e * u.eV / (2 * np.pi * const.m_e))).to(u.A)
+
+    bias = np.arange(-20, 15, 0.1) * u.V
+    current = np.exp(bias.to_value(u.V) / T_e) * u.A
+    saturated = current > I_es
+    current[saturated] = I_es + bias[saturated] * 5e-4 * u.A / u.V
+    current[~saturated] += bias[~saturated] * 1e-4 * u.A / u.V
+    return bias, current
+
+
+class Test__analysis_context:
+    r"""Test the sharing of intermediate results in the swept probe
+    analysis"""
+
+    bias, current = simulated_sweep(1)
+    probe_area = 1 * u.cm**2
+    gas = 40 * u.u
+
+    def shuffled(self):
+        _shuffle = np.random.RandomState(0).permutation(len(self.bias))
+        return Characteristic(self.bias[_shuffle], self.current[_shuffle])
+
+    def test_single_validation(self, monkeypatch):
+        r"""Test that the analysis validates the characteristic and computes
+        the plasma potential once"""
+
+        characteristic = self.shuffled()
+        validated = []
+        gradients = []
+        check_validity = Characteristic.check_validity
+        gradient = np.gradient
+
+        def counting_check_validity(self):
+            validated.append(self)
+            check_validity(self)
+
+        def counting_gradient(*args, **kwargs):
+            gradients.append(args)
+            return gradient(*args, **kwargs)
+
+        monkeypatch.setattr(Characteristic, 'check_validity',
+                            counting_check_validity)
+        monkeypatch.setattr(langmuir.np, 'gradient', counting_gradient)
+        swept_probe_analysis(characteristic, self.probe_area, self.gas)
+
+        assert sum(item is characteristic for item in validated) == 1
+        assert len(gradients) == 1
+
+    def test_standalone_functions(self):
+        r"""Test that the analysis functions give the same results on their
+        own as within the analysis"""
+
+        results = swept_probe_analysis(self.shuffled(), self.probe_area,
+                                       self.gas)
+
+        assert langmuir.get_plasma_potential(self.shuffled()) == results['V_P']
+        assert langmuir.get_floating_potential(
+            self.shuffled()) == results['V_F']
+        assert langmuir.get_electron_saturation_current(
+            self.shuffled()) == results['I_es']
+        assert langmuir.get_ion_saturation_current(
+            self.shuffled()) == results['I_is']
+        assert u.isclose(langmuir.get_ion_density_OML(
+            self.shuffled(), self.probe_area, self.gas), results['n_i_OML'])
+
+        ion_section = langmuir.extract_ion_section(self.shuffled())
+        assert np.all(ion_section.bias < results['V_F'])
+
+    def test_floating_potential_order(self):
+        r"""Test that the floating potential alone does not sort the
+        characteristic"""
+
+        characteristic = self.shuffled()
+        bias = characteristic.bias.copy()
+        V_F, arg_V_F = langmuir.get_floating_potential(characteristic,
+                                                       return_arg=True)
+
+        assert u.allclose(characteristic.bias, bias)
+        assert characteristic.bias[arg_V_F] == V_F
+
+
+class Test__batch_swept_probe_analysis:
+    r"""Test the batch swept probe analysis"""
+
+    probe_area = 1 * u.cm**2
+    gas = 40 * u.u
+
+    bias, current_cold = simulated_sweep(1)
+    _, current_hot = simulated_sweep(1.5)
+    # Without positive electron currents no temperature can be fit
+    current = u.Quantity([current_cold, current_hot, -np.abs(current_cold)])
+
+    def test_rows(self):
+        r"""Test that every row matches the analysis of its sweep and that
+        a failed sweep is reported in its row"""
+
+        results = batch_swept_probe_analysis((self.bias, self.current),
+                                             self.probe_area, self.gas,
+                                             n_workers=1)
+        assert results.shape == (3,)
+        assert list(results['success']) == [True, True, False]
+        assert results['message'][2].startswith('ValueError')
+        assert np.all(np.isnan(results[2][['V_P', 'T_e', 'n_i_OML']]
+                               .tolist()))
+        assert np.all(np.isnan(results['hot_fraction']))
+
+        for row, current in zip(results[:2], self.current[:2]):
+            expected = swept_probe_analysis(Characteristic(self.bias,
+                                                           current),
+                                            self.probe_area, self.gas)
+            for name, unit in [('V_P', u.V), ('V_F', u.V), ('I_es', u.A),
+                               ('T_e', u.eV), ('n_e', u.m**-3),
+                               ('n_i', u.m**-3), ('n_i_OML', u.m**-3)]:
+                assert np.isclose(row[name], expected[name].to_value(unit))
+
+    def test_process_pool(self):
+        r"""Test that a pool of workers reproduces the serial analysis of a
+        sequence of characteristics"""
+
+        characteristics = [Characteristic(self.bias, current)
+                           for current in self.current]
+        serial = batch_swept_probe_analysis(characteristics,
+                                            self.probe_area, self.gas,
+                                            bimaxwellian=True, n_workers=1)
+        pooled = batch_swept_probe_analysis(characteristics,
+                                            self.probe_area, self.gas,
+                                            bimaxwellian=True, n_workers=2,
+                                            chunksize=1)
+        assert np.all(np.isfinite(serial['hot_fraction'][:2]))
+        assert list(pooled['success']) == [True, True, False]
+        for name in ['V_P', 'T_e', 'T_e_hot', 'hot_fraction', 'n_i_OML']:
+            assert np.allclose(pooled[name], serial[name], equal_nan=True)
+
+    def test_invalid_arrays(self):
+        r"""Test errors upon arrays of the wrong shape"""
+
+        with pytest.raises(ValueError):
+            batch_swept_probe_analysis((self.bias, self.current[0]),
+                                       self.probe_area, self.gas)
+
+        with pytest.raises(ValueError):
+            batch_swept_probe_analysis((self.bias[:-1], self.current),
+                                       self.probe_area, self.gas)
+
+    def test_maxwellian_messages(self):
+        r"""Test that Maxwellian rows do not record the warnings of the
+        analysis of their sweep"""
+
+        bias = np.arange(-20, 80, 0.02) * u.V
+        current = (np.exp(np.minimum(bias.to_value(u.V) / 0.1, np.log(1e-2)))
+                   + 1e-4 * bias.to_value(u.V)) * u.A
+
+        # The extrapolated electron current overflows
+        with pytest.warns(RuntimeWarning, match='overflow'):
+            expected = swept_probe_analysis(Characteristic(bias, current),
+                                            self.probe_area, self.gas)
+
+        results = batch_swept_probe_analysis((bias, current[np.newaxis]),
+                                             self.probe_area, self.gas,
+                                             n_workers=1)
+        assert results['success'][0]
+        assert results['message'][0] == ''
+        assert np.isclose(results['T_e'][0], expected['T_e'].to_value(u.eV))
+
+    def test_quantized_bias(self):
+        r"""Test that the currents of repeated bias values, e.g. of a
+        quantized bias, are averaged as by `Characteristic`"""
+
+        bias = np.round(np.linspace(-20, 15, 700), 1) * u.V
+        current = u.Quantity([np.interp(bias, self.bias, sweep)
+                              for sweep in self.current[:2]])
+        results = batch_swept_probe_analysis((bias, current),
+                                             self.probe_area, self.gas,
+                                             n_workers=1)
+        assert list(results['success']) == [True, True]
+        for row, sweep in zip(results, current):
+            expected = swept_probe_analysis(Characteristic(bias, sweep),
+                                            self.probe_area, self.gas)
+            for name, unit in [('V_P', u.V), ('I_es', u.A), ('T_e', u.eV),
+                               ('n_i_OML', u.m**-3)]:
+                assert np.isclose(row[name], expected[name].to_value(unit))
+
+    def test_nan_padding(self):
+        r"""Test that stacking shuffled sweeps of different lengths padded
+        with NaN reproduces the analysis of the separate sweeps"""
+
+        rng = np.random.RandomState(0)
+        bias = np.full((3, self.bias.size), np.nan) * u.V
+        current = np.full((3, self.bias.size), np.nan) * u.A
+        sweeps = []
+        for row, (length, sweep) in enumerate(zip([350, 300, 250],
+                                                  self.current)):
+            order = rng.permutation(self.bias.size)[:length]
+            bias[row, :length] = self.bias[order]
+            current[row, :length] = sweep[order]
+            sweeps.append(Characteristic(self.bias[order], sweep[order]))
+
+        stacked = batch_swept_probe_analysis((bias, current),
+                                             self.probe_area, self.gas,
+                                             n_workers=1)
+        serial = batch_swept_probe_analysis(sweeps, self.probe_area,
+                                            self.gas, bimaxwellian=True,
+                                            n_workers=1)
+        assert list(stacked['success']) == [True, True, False]
+        assert stacked['message'][2] == serial['message'][2]
+        for row, sweep in zip(stacked[:2], sweeps[:2]):
+            expected = swept_probe_analysis(sweep, self.probe_area, self.gas)
+            for name, unit in [('V_P', u.V), ('V_F', u.V), ('I_is', u.A),
+                               ('T_e', u.eV), ('n_e', u.m**-3),
+                               ('n_i_OML', u.m**-3)]:
+                assert np.isclose(row[name], expected[name].to_value(unit))
+
+    def test_short_sweeps(self):
+        r"""Test that sweeps without enough samples are reported without
+        affecting the other sweeps"""
+
+        bias = np.tile(self.bias, (3, 1))
+        bias[1, 1:] = bias[1, 0]
+        current = u.Quantity([self.current[0]] * 3)
+        current[2, 1:] = np.nan
+        results = batch_swept_probe_analysis((bias, current),
+                                             self.probe_area, self.gas,
+                                             n_workers=1)
+        assert list(results['success']) == [True, False, False]
+        assert 'fewer than two samples' in results['message'][1]
+        assert 'fewer than two samples' in results['message'][2]
+        assert np.all(np.isnan(results['T_e'][1:]))
+
+
+class Test__linear_fits:
+    r"""Test the closed-form linear fits of the probe analysis"""
+
+    def test_weighted_fit(self):
+        r"""Test the fit and its covariance against curve_fit"""
+
+        rng = np.random.RandomState(1)
+        x = np.linspace(-5, 5, 40)
+        y = 3 * x + 2 + rng.normal(size=x.size)
+        sigma = rng.uniform(0.5, 2, x.size)
+
+        fit, covariance = langmuir._fit_lin(x, y, weights=sigma**-2)
+        expected, expected_covariance = curve_fit(
+            lambda x, a, b: a * x + b, x, y, sigma=sigma)
+
+        assert np.allclose(fit, expected)
+        assert np.allclose(covariance, expected_covariance)
+
+    def test_masked_sections(self):
+        r"""Test that sections of different lengths are fit at once"""
+
+        rng = np.random.RandomState(2)
+        x = rng.normal(size=(5, 50))
+        y = rng.normal(size=(5, 50))
+        lengths = [2, 3, 10, 25, 50]
+        weights = np.arange(50) < np.array(lengths)[:, np.newaxis]
+        # Values outside of the sections are ignored
+        y[~weights] = np.nan
+
+        fit, covariance = langmuir._fit_lin(x, y, weights)
+        assert fit.shape == (5, 2) and covariance.shape == (5, 2, 2)
+        for row, length in enumerate(lengths):
+            assert np.allclose(fit[row], np.polyfit(x[row, :length],
+                                                    y[row, :length], 1))
+        assert np.all(np.isinf(covariance[0]))
+        assert np.all(np.isfinite(covariance[1:]))
+
+        fit, _ = langmuir._fit_lin(x[:, :1], y[:, :1])
+        assert np.all(np.isnan(fit))
+
+    @pytest.mark.parametrize('T_e', [1, 1.5, 3])
+    def test_maxwellian_temperature(self, T_e):
+        r"""Test that the Maxwellian fit recovers the electron temperature"""
+
+        bias, current = simulated_sweep(T_e)
+        results = swept_probe_analysis(Characteristic(bias, current),
+                                       1 * u.cm**2, 40 * u.u)
+
+        assert u.isclose(results['T_e'], T_e * u.eV, rtol=0.03)
+
+    def test_temperature_covariance(self):
+        r"""Test the uncertainty of the temperature of a noisy section"""
+
+        rng = np.random.RandomState(3)
+        bias = np.linspace(-5, 0, 200) * u.V
+        current = np.exp(bias.value / 2 + 0.01 * rng.normal(size=200)) * u.A
+
+        T_e, fit, covariance = langmuir.get_electron_temperature(
+            Characteristic(bias, current), return_fit=True,
+            return_covariance=True)
+        uncertainty = np.sqrt(covariance[2, 2]) * u.eV
+
+        assert covariance.shape == (3, 3)
+        assert u.isclose(T_e, fit[2] * u.eV)
+        assert abs(T_e - 2 * u.eV) < 4 * uncertainty
+        assert 1e-3 * u.eV < uncertainty < 0.1 * u.eV
+
+    def test_empty_section(self):
+        r"""Test errors upon sections without positive currents"""
+
+        bias, current = simulated_sweep(1)
+        with pytest.raises(ValueError):
+            langmuir.get_electron_temperature(
+                Characteristic(bias, -np.abs(current)))
+
+
+class Test__swept_probe_stream:
+    r"""Test the streaming analysis of probe samples"""
+
+    probe_area = 1 * u.cm**2
+    gas = 40 * u.u
+    temperatures = [1, 1.2, 1.5, 1.8, 2, 2.5]
+
+    def recorded_stream(self, tmp_path):
+        r"""Record consecutive sweeps to a file, returning the file name and
+        the (bias, current) of each sweep"""
+
+        sweeps = [simulated_sweep(T_e) for T_e in self.temperatures]
+        bias = np.concatenate([bias.to_value(u.V) for bias, _ in sweeps])
+        current = np.concatenate([current.to_value(u.A)
+                                  for _, current in sweeps])
+        time = np.arange(bias.size) * 1e-6
+
+        filename = tmp_path / 'stream.npy'
+        np.save(filename, np.array([time, bias, current]))
+        return filename, sweeps
+
+    @staticmethod
+    def replay(filename, chunk):
+        r"""Replay a recorded stream in chunks of samples"""
+
+        samples = np.load(filename, mmap_mode='r')
+        for start in range(0, samples.shape[1], chunk):
+            yield samples[:, start:start + chunk]
+
+    def test_replay(self, tmp_path):
+        r"""Test that a replayed stream gives the results of the analysis of
+        its complete sweeps, independent of the chunk size"""
+
+        filename, sweeps = self.recorded_stream(tmp_path)
+        # The first sweep has no retrace before it and the last one no
+        # retrace after it
+        expected = batch_swept_probe_analysis(
+            [Characteristic(bias, current) for bias, current in sweeps[1:-1]],
+            self.probe_area, self.gas, n_workers=1)
+
+        for chunk in [10**6, 777, 100]:
+            # A small buffer makes the sweeps in progress wrap around
+            stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V,
+                                      capacity=500)
+            results = np.array(list(stream.analyze(self.replay(filename,
+                                                               chunk))))
+
+            assert stream.sweeps == len(sweeps) - 2
+            assert stream.dropped == len(sweeps[0][0])
+            assert np.all(results['success'])
+            assert np.allclose(results['time'],
+                               1e-6 * 350 * np.arange(1, len(sweeps) - 1))
+            assert np.allclose(results['duration'], 349e-6)
+            for name in ['V_P', 'V_F', 'T_e', 'n_e', 'n_i_OML']:
+                assert np.allclose(results[name], expected[name])
+
+    def test_async(self, tmp_path):
+        r"""Test the analysis of an asynchronous source"""
+
+        filename, sweeps = self.recorded_stream(tmp_path)
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V)
+
+        async def source():
+            for chunk in self.replay(filename, 1000):
+                await asyncio.sleep(0)
+                yield chunk
+
+        async def collect():
+            return [result async for result in stream.analyze_async(source())]
+
+        results = asyncio.get_event_loop().run_until_complete(collect())
+        assert len(results) == len(sweeps) - 2
+        assert u.isclose(results[-1]['T_e'] * u.eV, 2 * u.eV, rtol=0.03)
+
+    def test_warm_start(self, tmp_path, monkeypatch):
+        r"""Test that each bi-Maxwellian fit starts from the previous one"""
+
+        filename, sweeps = self.recorded_stream(tmp_path)
+        guesses = []
+        fits = []
+        analyze_sweep = langmuir._analyze_sweep
+
+        def recording_analyze_sweep(*args, initial_guess=None, **kwargs):
+            guesses.append(initial_guess)
+            row, fit = analyze_sweep(*args, initial_guess=initial_guess,
+                                     **kwargs)
+            fits.append(fit)
+            return row, fit
+
+        monkeypatch.setattr(langmuir, '_analyze_sweep',
+                            recording_analyze_sweep)
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V,
+                                  bimaxwellian=True)
+        results = list(stream.analyze(self.replay(filename, 1000)))
+
+        assert all(result['success'] for result in results)
+        assert guesses[0] is None
+        for guess, fit in zip(guesses[1:], fits):
+            assert guess is fit
+
+    def test_averaging(self, tmp_path):
+        r"""Test the analysis of binned groups of sweeps"""
+
+        filename, sweeps = self.recorded_stream(tmp_path)
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V,
+                                  average=2, bins=100)
+        results = np.array(list(stream.analyze(self.replay(filename, 1000))))
+
+        assert len(results) == 2
+        assert np.allclose(results['duration'], 699e-6)
+        assert np.all(results['success'])
+        assert np.all((1 < results['T_e']) & (results['T_e'] < 2))
+
+    def test_overflow(self, tmp_path):
+        r"""Test that sweeps overflowing the buffer are dropped"""
+
+        filename, sweeps = self.recorded_stream(tmp_path)
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V,
+                                  capacity=200)
+
+        with pytest.warns(RuntimeWarning):
+            results = list(stream.analyze(self.replay(filename, 100)))
+        assert len(results) == 0
+        assert stream.sweeps == len(sweeps) - 2
+        assert stream.dropped == 350 * len(sweeps)
+
+        # Sweeps completed within a chunk are not buffered, only the last
+        # one in progress overflows
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V,
+                                  capacity=200)
+        with pytest.warns(RuntimeWarning):
+            results = stream.push(*np.load(filename))
+        assert len(results) == len(sweeps) - 2
+
+    def test_invalid(self):
+        r"""Test errors upon invalid parameters and samples"""
+
+        with pytest.raises(ValueError):
+            SweptProbeStream(self.probe_area, self.gas, 10 * u.V, average=0)
+        with pytest.raises(ValueError):
+            SweptProbeStream(self.probe_area, self.gas, 10 * u.V, bins=1)
+        with pytest.raises(u.UnitConversionError):
+            SweptProbeStream(self.probe_area, self.gas, 10 * u.A)
+
+        stream = SweptProbeStream(self.probe_area, self.gas, 10 * u.V)
+        with pytest.raises(ValueError):
+            stream.push(np.arange(3), np.arange(3), np.arange(4))
@@ -0,0 +1,9 @@
+"""
+The `plasmapy.io` subpackage contains readers and writers for plasma
+data.
+"""
+
+from .snapshot import (Snapshot,
+                       write_snapshot,
+                       read_snapshot,
+                       snapshot_info)
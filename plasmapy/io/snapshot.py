@@ -0,0 +1,490 @@
+"""
+Self-describing snapshot files of `~plasmapy.classes.Plasma3D` fields and
+`~plasmapy.classes.Species` particles.
+"""
+import collections
+import json
+import struct
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D, Species
+
+__all__ = [
+    "Snapshot",
+    "write_snapshot",
+    "read_snapshot",
+    "snapshot_info",
+]
+
+FORMAT_NAME = "plasmapy-snapshot"
+FORMAT_VERSION = 1
+
+#: Units and per-particle shape of the stored particle arrays
+_PARTICLE_ARRAYS = {
+    'x': u.m,
+    'v': u.m / u.s,
+    'particle_id': u.dimensionless_unscaled,
+}
+
+Snapshot = collections.namedtuple('Snapshot',
+                                  ['plasma', 'species', 'time', 'step'])
+Snapshot.__doc__ = r"""
+A single time step read from a snapshot file.
+
+Attributes
+----------
+plasma : `~plasmapy.classes.Plasma3D`
+    The plasma on the requested region, holding the requested fields.
+species : dict
+    Mapping of labels to `~plasmapy.classes.Species`.
+time : `astropy.units.Quantity`
+    Simulation time of the step.
+step : int
+    Index of the step in the file.
+"""
+
+
+class _HDF5File:
+    r"""Snapshot storage in an HDF5 file; fields are stored as datasets
+    with an unlimited time axis and particles in one group per step."""
+
+    def __init__(self, path):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("Writing and reading HDF5 snapshots requires "
+                              "h5py; use a .npz file instead.")
+        self._h5py = h5py
+        self.path = path
+
+    def create(self, metadata, grid, compression, chunks):
+        filters = {} if compression is None else {'compression': compression}
+        with self._h5py.File(self.path, 'w') as f:
+            f.attrs['format'] = FORMAT_NAME
+            f.attrs['version'] = FORMAT_VERSION
+            f.attrs['metadata'] = json.dumps(metadata)
+            for name, values in zip('xyz', grid):
+                f.create_dataset(f'grid/{name}', data=values)
+            f.create_dataset('time', shape=(0,), maxshape=(None,),
+                             dtype=float, chunks=(1024,))
+            shape = tuple(metadata['domain_shape'])
+            for name, info in metadata['fields'].items():
+                components = (3,) if info['vector'] else ()
+                # Split each axis evenly into the fewest chunks no larger
+                # than requested, so that edge chunks are not padded
+                chunk_shape = tuple(-(-n // -(-n // c))
+                                    for n, c in zip(shape, chunks))
+                f.create_dataset(f'fields/{name}',
+                                 shape=(0, *components, *shape),
+                                 maxshape=(None, *components, *shape),
+                                 dtype=info['dtype'],
+                                 chunks=(1, *components, *chunk_shape),
+                                 **filters)
+
+    def metadata(self):
+        with self._h5py.File(self.path, 'r') as f:
+            if f.attrs.get('format') != FORMAT_NAME:
+                raise ValueError(f"{self.path} is not a snapshot file.")
+            return json.loads(f.attrs['metadata'])
+
+    def append(self, time, fields, particles, compression):
+        filters = {} if compression is None else {'compression': compression}
+        with self._h5py.File(self.path, 'a') as f:
+            step = f['time'].shape[0]
+            f['time'].resize((step + 1,))
+            f['time'][step] = time
+            for name, values in fields.items():
+                dataset = f[f'fields/{name}']
+                dataset.resize(step + 1, axis=0)
+                dataset[step] = values
+            for label, arrays in particles.items():
+                for name, values in arrays.items():
+                    f.create_dataset(f'species/{label}/{step:06d}/{name}',
+                                     data=values, **filters)
+        return step
+
+    def read_grid(self):
+        with self._h5py.File(self.path, 'r') as f:
+            return tuple(f[f'grid/{name}'][()] for name in 'xyz')
+
+    def read_time(self):
+        with self._h5py.File(self.path, 'r') as f:
+            return f['time'][()]
+
+    def read_fields(self, names, step, region):
+        with self._h5py.File(self.path, 'r') as f:
+            # h5py only reads the selected hyperslab from disk
+            return {name: f[f'fields/{name}'][(step, Ellipsis, *region)]
+                    for name in names}
+
+    def read_particles(self, label, step):
+        with self._h5py.File(self.path, 'r') as f:
+            group = f[f'species/{label}/{step:06d}']
+            return {name: group[name][()] for name in _PARTICLE_ARRAYS}
+
+
+class _NpzFile:
+    r"""Snapshot storage in a ``.npz`` archive with one ``.npy`` member per
+    array and step. New steps are added as new members, which does not
+    rewrite the existing ones."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _compress_type(self, compression):
+        return zipfile.ZIP_STORED if compression is None \
+            else zipfile.ZIP_DEFLATED
+
+    @staticmethod
+    def _write(archive, name, values, compress_type):
+        info = zipfile.ZipInfo(name + '.npy')
+        info.compress_type = compress_type
+        with archive.open(info, 'w', force_zip64=True) as member:
+            np.lib.format.write_array(member, np.asanyarray(values),
+                                      allow_pickle=False)
+
+    def create(self, metadata, grid, compression, chunks):
+        with zipfile.ZipFile(self.path, 'w') as archive:
+            archive.writestr('metadata.json', json.dumps(metadata))
+            for name, values in zip('xyz', grid):
+                self._write(archive, f'grid/{name}', values,
+                            zipfile.ZIP_STORED)
+
+    def metadata(self):
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            try:
+                metadata = json.loads(archive.read('metadata.json'))
+            except KeyError:
+                metadata = {}
+        if metadata.get('format') != FORMAT_NAME:
+            raise ValueError(f"{self.path} is not a snapshot file.")
+        return metadata
+
+    def _n_steps(self, archive):
+        return sum(1 for name in archive.namelist()
+                   if name.startswith('time/'))
+
+    def append(self, time, fields, particles, compression):
+        compress_type = self._compress_type(compression)
+        with zipfile.ZipFile(self.path, 'a') as archive:
+            step = self._n_steps(archive)
+            for name, values in fields.items():
+                self._write(archive, f'fields/{name}/{step:06d}', values,
+                            compress_type)
+            for label, arrays in particles.items():
+                for name, values in arrays.items():
+                    self._write(archive, f'species/{label}/{step:06d}/{name}',
+                                values, compress_type)
+            # Written last, so that an interrupted append leaves the
+            # step uncounted
+            self._write(archive, f'time/{step:06d}', np.array(time),
+                        zipfile.ZIP_STORED)
+        return step
+
+    def _open_array(self, archive, name):
+        r"""Memory-map an uncompressed member, or read a compressed one."""
+        info = archive.getinfo(name + '.npy')
+        if info.compress_type != zipfile.ZIP_STORED:
+            with archive.open(info) as member:
+                return np.lib.format.read_array(member)
+
+        with open(self.path, 'rb') as f:
+            # Skip the local file header to reach the .npy data
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if not shape:
+            return np.fromfile(self.path, dtype=dtype, count=1,
+                               offset=offset)[0]
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset,
+                         shape=shape, order='F' if fortran else 'C')
+
+    def read_grid(self):
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            return tuple(np.array(self._open_array(archive, f'grid/{name}'))
+                         for name in 'xyz')
+
+    def read_time(self):
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            return np.array([self._open_array(archive, f'time/{step:06d}')
+                             for step in range(self._n_steps(archive))],
+                            dtype=float)
+
+    def read_fields(self, names, step, region):
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            # Copying the selection of a memory map only reads the
+            # selected part from disk
+            return {name: np.array(self._open_array(
+                        archive, f'fields/{name}/{step:06d}')[
+                            (Ellipsis, *region)])
+                    for name in names}
+
+    def read_particles(self, label, step):
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            return {name: np.array(self._open_array(
+                        archive, f'species/{label}/{step:06d}/{name}'))
+                    for name in _PARTICLE_ARRAYS}
+
+
+def _open(path):
+    suffix = Path(path).suffix.lower()
+    if suffix == '.npz':
+        return _NpzFile(path)
+    if suffix in ('.h5', '.hdf5'):
+        return _HDF5File(path)
+    raise ValueError(f"Unknown snapshot file type {suffix!r}; use .h5, "
+                     f".hdf5 or .npz.")
+
+
+def _label_species(species):
+    if species is None:
+        return {}
+    if isinstance(species, dict):
+        return dict(species)
+    labels = [s.name for s in species]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Species of the same particle type must be passed "
+                         "as a dict with distinct labels.")
+    return dict(zip(labels, species))
+
+
+@u.quantity_input(time=u.s)
+def write_snapshot(path, plasma, species=None, time=0 * u.s, fields=None,
+                   append=False, compression=None, chunks=(64, 64, 64)):
+    r"""
+    Write the state of a plasma and its particles as a new time step of a
+    snapshot file.
+
+    Parameters
+    ----------
+    path : str or path
+        File to write. The format follows the suffix: HDF5 for ``.h5``
+        and ``.hdf5`` files, which requires h5py, and a NumPy archive for
+        ``.npz`` files.
+    plasma : `~plasmapy.classes.Plasma3D`
+        Plasma whose grid and fields are stored.
+    species : dict or sequence of `~plasmapy.classes.Species`, optional
+        Particles to store, either as a mapping of labels to species or
+        as a sequence labelled by particle type.
+    time : `astropy.units.Quantity`
+        Simulation time of the step.
+    fields : sequence of str, optional
+        Names of the fields to store; all five fields by default.
+    append : bool
+        If True, add a time step to an existing file instead of creating
+        a new one. The grid, fields and species labels must match those
+        the file was created with.
+    compression : str, optional
+        For HDF5, a compression filter such as ``'gzip'`` or ``'lzf'``.
+        For ``.npz`` any value other than `None` selects deflate
+        compression. Applies to the arrays written by this call: when
+        appending, the new particle datasets of an HDF5 file and all new
+        ``.npz`` members, while the HDF5 field datasets keep the filter
+        they were created with.
+    chunks : tuple of int
+        Largest chunk size along x, y and z of HDF5 field datasets, which
+        bounds how much is read for a partial read. Each chunk holds a
+        single time step. Only used when creating a file.
+
+    Returns
+    -------
+    int
+        Index of the written step.
+
+    Notes
+    -----
+    Fields are stored in their dtype and in the default units of
+    `~plasmapy.classes.Plasma3D`, and particle positions and velocities
+    in SI units, all of which are recorded in the file. The file layout
+    is described by `snapshot_info`.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 8) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> write_snapshot('run.npz', plasma, time=0 * u.s)  # doctest: +SKIP
+    0
+    >>> write_snapshot('run.npz', plasma, time=1 * u.s,
+    ...                append=True)  # doctest: +SKIP
+    1
+    """
+    storage = _open(path)
+    species = _label_species(species)
+    fields = list(Plasma3D._fields if fields is None else fields)
+    for name in fields:
+        if name not in Plasma3D._fields:
+            raise ValueError(f"Unknown field {name!r}; expected any of "
+                             f"{list(Plasma3D._fields)}.")
+
+    metadata = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'domain_shape': list(plasma.domain_shape),
+        'fields': {name: {'unit': Plasma3D._fields[name][1].to_string(),
+                          'dtype': getattr(plasma, name).dtype.str,
+                          'vector': Plasma3D._fields[name][0]}
+                   for name in fields},
+        'species': {label: {'particle_type': s.name,
+                            'scaling': float(s.scaling),
+                            'dt': s.dt.to_value(u.s)}
+                    for label, s in species.items()},
+        'units': {name: unit.to_string()
+                  for name, unit in _PARTICLE_ARRAYS.items()},
+    }
+
+    if append:
+        existing = storage.metadata()
+        if existing['domain_shape'] != metadata['domain_shape']:
+            raise ValueError("The grid shape does not match the snapshot "
+                             "file.")
+        for key in ('fields', 'species'):
+            if set(existing[key]) != set(metadata[key]):
+                raise ValueError(f"The {key} do not match those stored in "
+                                 f"the snapshot file.")
+    else:
+        grid = tuple(axis.to_value(u.m) for axis in
+                     (plasma.x, plasma.y, plasma.z))
+        storage.create(metadata, grid, compression, tuple(chunks))
+
+    field_values = {name: getattr(plasma, name).to_value(
+                        Plasma3D._fields[name][1])
+                    for name in fields}
+    particles = {label: {'x': s.x.to_value(u.m),
+                         'v': s.v.to_value(u.m / u.s),
+                         'particle_id': s.particle_id}
+                 for label, s in species.items()}
+
+    return storage.append(time.to_value(u.s), field_values, particles,
+                          compression)
+
+
+def _normalize_region(region):
+    if region is None:
+        region = ()
+    region = tuple(slice(None) if index is None else index
+                   for index in region)
+    if len(region) > 3:
+        raise ValueError("A region has at most three slices.")
+    for index in region:
+        if not isinstance(index, slice):
+            raise ValueError("Regions must be given as slices of the grid "
+                             "indices.")
+    return region + (slice(None),) * (3 - len(region))
+
+
+def read_snapshot(path, step=-1, fields=None, species=None, region=None):
+    r"""
+    Read one time step of a snapshot file.
+
+    Parameters
+    ----------
+    path : str or path
+        Snapshot file written by `write_snapshot`.
+    step : int
+        Index of the step to read; negative values count from the end.
+    fields : sequence of str, optional
+        Fields to read. By default all stored fields are read; the others
+        are left at zero.
+    species : sequence of str, optional
+        Labels of the species to read. By default all are read.
+    region : tuple of slice, optional
+        Slices of the x, y and z grid indices selecting a subdomain. Only
+        the selected part of each field is read from disk, except for
+        compressed ``.npz`` files.
+
+    Returns
+    -------
+    `Snapshot`
+        Named tuple of the plasma, the dict of species, the time and the
+        step index.
+
+    Notes
+    -----
+    Particles are always read in full, independently of ``region``. Their
+    `~plasmapy.classes.Species` are created with ``nt=1``.
+    """
+    storage = _open(path)
+    metadata = storage.metadata()
+    times = storage.read_time()
+
+    n_steps = times.size
+    if not -n_steps <= step < n_steps:
+        raise ValueError(f"Step {step} is out of range for a file with "
+                         f"{n_steps} steps.")
+    step = step % n_steps
+
+    stored_fields = metadata['fields']
+    fields = list(stored_fields if fields is None else fields)
+    species_labels = list(metadata['species'] if species is None
+                          else species)
+    for name in fields:
+        if name not in stored_fields:
+            raise ValueError(f"Field {name!r} is not stored in {path}.")
+    for label in species_labels:
+        if label not in metadata['species']:
+            raise ValueError(f"Species {label!r} is not stored in {path}.")
+
+    region = _normalize_region(region)
+    x, y, z = (axis[index] for axis, index in
+               zip(storage.read_grid(), region))
+    plasma = Plasma3D.from_arrays(
+        x * u.m, y * u.m, z * u.m,
+        units={name: info['unit'] for name, info in stored_fields.items()},
+        **storage.read_fields(fields, step, region))
+
+    loaded = {}
+    for label in species_labels:
+        info = metadata['species'][label]
+        arrays = storage.read_particles(label, step)
+        s = Species(plasma, info['particle_type'], arrays['x'].shape[0],
+                    scaling=info['scaling'], dt=info['dt'] * u.s, nt=1)
+        s.x = u.Quantity(arrays['x'], u.m, copy=False)
+        s.v = u.Quantity(arrays['v'], u.m / u.s, copy=False)
+        s.particle_id = arrays['particle_id']
+        loaded[label] = s
+
+    return Snapshot(plasma, loaded, times[step] * u.s, step)
+
+
+def snapshot_info(path):
+    r"""
+    Describe the contents of a snapshot file without reading any data.
+
+    Parameters
+    ----------
+    path : str or path
+        Snapshot file written by `write_snapshot`.
+
+    Returns
+    -------
+    dict
+        ``'n_steps'`` : number of stored steps,
+        ``'time'`` : `astropy.units.Quantity` of the time of each step,
+        ``'domain_shape'`` : tuple of the grid shape,
+        ``'fields'`` : dict of the unit, dtype and vector flag of each
+        stored field,
+        ``'species'`` : dict of the particle type, scaling and time step
+        of each species.
+    """
+    storage = _open(path)
+    metadata = storage.metadata()
+    times = storage.read_time()
+    return {'n_steps': times.size,
+            'time': times * u.s,
+            'domain_shape': tuple(metadata['domain_shape']),
+            'fields': metadata['fields'],
+            'species': metadata['species']}
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D, Species
+from plasmapy.io import write_snapshot, read_snapshot, snapshot_info
+
+
+@pytest.fixture(params=[('.npz', None), ('.npz', 'deflate'),
+                        ('.h5', None), ('.h5', 'gzip')])
+def snapshot_path(request, tmp_path):
+    suffix, compression = request.param
+    if suffix == '.h5':
+        pytest.importorskip('h5py')
+    return tmp_path / f"snapshot{suffix}", compression
+
+
+@pytest.fixture()
+def plasma_and_species():
+    rng = np.random.RandomState(0)
+    x = np.linspace(0, 1, 6) * u.m
+    test_plasma = Plasma3D(x, x[:4], x[:3],
+                           dtype={'magnetic_field': np.float32})
+    test_plasma.density[...] = rng.uniform(size=(6, 4, 3)) * u.kg / u.m ** 3
+    test_plasma.magnetic_field[...] = rng.uniform(size=(3, 6, 4, 3)) * u.T
+
+    electrons = Species(test_plasma, 'e', 10, scaling=2, dt=1 * u.ns, nt=1)
+    electrons.x[...] = rng.uniform(size=(10, 3)) * u.m
+    electrons.v[...] = rng.normal(size=(10, 3)) * u.km / u.s
+    return test_plasma, electrons
+
+
+def test_round_trip(snapshot_path, plasma_and_species):
+    path, compression = snapshot_path
+    test_plasma, electrons = plasma_and_species
+
+    assert write_snapshot(path, test_plasma, [electrons], time=1 * u.s,
+                          compression=compression) == 0
+    test_plasma.density *= 2
+    electrons.x = electrons.x[:7]
+    electrons.v = electrons.v[:7]
+    electrons.particle_id = electrons.particle_id[:7]
+    assert write_snapshot(path, test_plasma, {'e': electrons}, time=2 * u.s,
+                          append=True) == 1
+
+    info = snapshot_info(path)
+    assert info['n_steps'] == 2
+    assert np.allclose(info['time'], [1, 2] * u.s)
+    assert info['domain_shape'] == (6, 4, 3)
+    assert set(info['fields']) == set(Plasma3D._fields)
+    assert info['species']['e']['particle_type'] == 'e'
+
+    snapshot = read_snapshot(path)
+    assert snapshot.step == 1
+    assert snapshot.time == 2 * u.s
+    assert np.allclose(snapshot.plasma.z, test_plasma.z)
+    assert np.array_equal(snapshot.plasma.density, test_plasma.density)
+    assert snapshot.plasma.magnetic_field.dtype == np.float32
+    assert np.array_equal(snapshot.plasma.magnetic_field,
+                          test_plasma.magnetic_field)
+
+    loaded = snapshot.species['e']
+    assert loaded.scaling == 2
+    assert loaded.dt == 1 * u.ns
+    assert np.allclose(loaded.x, electrons.x)
+    assert np.allclose(loaded.v, electrons.v)
+    assert np.array_equal(loaded.particle_id, np.arange(7))
+
+    first = read_snapshot(path, step=0, species=[])
+    assert np.array_equal(first.plasma.density, test_plasma.density / 2)
+    assert first.species == {}
+
+
+def test_partial_read(snapshot_path, plasma_and_species):
+    path, compression = snapshot_path
+    test_plasma, electrons = plasma_and_species
+    write_snapshot(path, test_plasma, compression=compression,
+                   chunks=(2, 2, 2))
+
+    region = (slice(1, 4), None, slice(2, 3))
+    snapshot = read_snapshot(path, fields=['magnetic_field'], region=region)
+
+    assert snapshot.plasma.domain_shape == (3, 4, 1)
+    assert np.allclose(snapshot.plasma.x, test_plasma.x[1:4])
+    assert np.array_equal(snapshot.plasma.magnetic_field,
+                          test_plasma.magnetic_field[:, 1:4, :, 2:3])
+    # Fields that were not requested are left at zero
+    assert (snapshot.plasma.density == 0).all()
+
+
+def test_errors(tmp_path, plasma_and_species):
+    test_plasma, electrons = plasma_and_species
+    path = tmp_path / "snapshot.npz"
+
+    with pytest.raises(ValueError):
+        write_snapshot(tmp_path / "snapshot.txt", test_plasma)
+    with pytest.raises(ValueError):
+        write_snapshot(path, test_plasma, fields=['temperature'])
+    with pytest.raises(ValueError):
+        write_snapshot(path, test_plasma, [electrons, electrons])
+
+    write_snapshot(path, test_plasma, fields=['density'])
+    with pytest.raises(ValueError):
+        write_snapshot(path, test_plasma, append=True)
+    with pytest.raises(ValueError):
+        read_snapshot(path, step=1)
+    with pytest.raises(ValueError):
+        read_snapshot(path, fields=['pressure'])
+
+    np.savez(tmp_path / "plain.npz", a=np.zeros(3))
+    with pytest.raises(ValueError):
+        read_snapshot(tmp_path / "plain.npz")
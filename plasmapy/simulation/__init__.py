@@ -0,0 +1,16 @@
+"""
+The `plasmapy.simulation` subpackage contains numerical tools for
+advancing particles and fields defined on
+`~plasmapy.classes.Plasma3D` grids.
+"""
+
+from .interpolation import GridInterpolator
+from .guiding_center import GuidingCenter
+from .poisson import SpectralPoissonSolver
+from .pic import ElectrostaticPIC
+from .operators import FiniteDifference
+from .decomposition import DomainDecomposition
+from .mhd import IdealMHD
+from .spectral_mhd import SpectralMHD
+from .grad_shafranov import GradShafranovSolver
+from .diffusion import AnisotropicHeatConduction, ResistiveDiffusion
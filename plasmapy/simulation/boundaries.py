@@ -0,0 +1,148 @@
+"""
+Vectorized particle boundary conditions for rectangular domains.
+"""
+import numpy as np
+
+__all__ = [
+    "BOUNDARY_TYPES",
+    "parse_boundaries",
+    "apply_periodic",
+    "apply_reflecting",
+    "outside_domain",
+    "compact",
+]
+
+BOUNDARY_TYPES = ("periodic", "reflecting", "absorbing")
+
+
+def parse_boundaries(boundary):
+    r"""
+    Expand a boundary specification to one boundary type per axis.
+
+    Parameters
+    ----------
+    boundary : str or sequence of str
+        One of ``'periodic'``, ``'reflecting'`` or ``'absorbing'``, used
+        for every axis, or a sequence of three such strings.
+
+    Returns
+    -------
+    tuple of str
+        The boundary type of the x, y and z axes.
+    """
+    if isinstance(boundary, str):
+        boundary = (boundary,) * 3
+
+    boundary = tuple(boundary)
+    if len(boundary) != 3:
+        raise ValueError(f"Expected three boundary types, got {len(boundary)}.")
+
+    for kind in boundary:
+        if kind not in BOUNDARY_TYPES:
+            raise ValueError(f"Unknown boundary type {kind!r}; expected one "
+                             f"of {BOUNDARY_TYPES}.")
+    return boundary
+
+
+def apply_periodic(x, lower, upper, axes):
+    r"""
+    Wrap positions back into the domain along the given axes, in place.
+
+    Parameters
+    ----------
+    x : ndarray
+        Array of shape (n, 3) of positions.
+    lower, upper : ndarray
+        Arrays of shape (3,) of the domain limits.
+    axes : list of int
+        Axes along which the domain is periodic.
+    """
+    if not axes:
+        return
+    lo = lower[axes]
+    length = upper[axes] - lo
+    x[:, axes] = lo + np.mod(x[:, axes] - lo, length)
+
+
+def apply_reflecting(x, v, lower, upper, axes):
+    r"""
+    Mirror positions that crossed a wall back into the domain and reverse
+    the corresponding velocity component, in place.
+
+    Parameters
+    ----------
+    x, v : ndarray
+        Arrays of shape (n, 3) of positions and velocities.
+    lower, upper : ndarray
+        Arrays of shape (3,) of the domain limits.
+    axes : list of int
+        Axes along which the walls are reflecting.
+
+    Notes
+    -----
+    Particles are assumed to travel less than one domain length per
+    step, so a single reflection suffices.
+    """
+    if not axes:
+        return
+    lo, hi = lower[axes], upper[axes]
+    xs = x[:, axes]
+    below = xs < lo
+    above = xs > hi
+    crossed = below | above
+
+    xs = np.where(below, 2 * lo - xs, xs)
+    xs = np.where(above, 2 * hi - xs, xs)
+    x[:, axes] = xs
+    v[:, axes] = np.where(crossed, -v[:, axes], v[:, axes])
+
+
+def outside_domain(x, lower, upper, axes):
+    r"""
+    Find positions that lie beyond the domain limits along the given
+    axes.
+
+    Parameters
+    ----------
+    x : ndarray
+        Array of shape (n, 3) of positions.
+    lower, upper : ndarray
+        Arrays of shape (3,) of the domain limits.
+    axes : list of int
+        Axes along which the walls are checked.
+
+    Returns
+    -------
+    ndarray
+        Boolean array of shape (n,).
+    """
+    if not axes:
+        return np.zeros(x.shape[0], dtype=bool)
+    xs = x[:, axes]
+    return np.any((xs < lower[axes]) | (xs > upper[axes]), axis=1)
+
+
+def compact(keep, *arrays):
+    r"""
+    Move the kept rows of each array to its front, in place.
+
+    Parameters
+    ----------
+    keep : ndarray
+        Boolean array of shape (n,) marking the rows to keep.
+    *arrays : ndarray
+        Arrays whose first dimension has length n.
+
+    Returns
+    -------
+    int
+        Number of kept rows. Only the first this many rows of each array
+        remain meaningful, and callers are expected to continue working
+        on views of that leading part so that later operations no longer
+        touch the removed rows.
+    """
+    kept = np.flatnonzero(keep)
+    n_kept = kept.size
+    for array in arrays:
+        array[:n_kept] = array[kept]
+    return n_kept
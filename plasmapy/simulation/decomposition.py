@@ -0,0 +1,478 @@
+"""
+Decomposition of Plasma3D grids into blocks processed by local worker
+processes through shared memory.
+"""
+import ctypes
+import itertools
+import multiprocessing
+import os
+
+import numpy as np
+from astropy import units as u
+
+__all__ = [
+    "DomainDecomposition",
+]
+
+#: Byte alignment of every block within the shared buffers
+_ALIGNMENT = 64
+
+#: Shared buffers and layouts of the decomposition served by a worker
+#: process, set by `_initialize_worker`
+_WORKER = {}
+
+
+def _prime_factors(n):
+    factors, p = [], 2
+    while n > 1:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+        p += 1
+    return factors
+
+
+def _default_blocks(shape, n_blocks):
+    r"""Split ``n_blocks`` over the axes, always dividing the axis with
+    the largest block extent."""
+    blocks = [1, 1, 1]
+    for factor in sorted(_prime_factors(n_blocks), reverse=True):
+        extents = [n / b if n // b >= factor else 0
+                   for n, b in zip(shape, blocks)]
+        dim = int(np.argmax(extents))
+        if extents[dim] == 0:
+            break
+        blocks[dim] *= factor
+    return tuple(blocks)
+
+
+def _views(buffers, layouts, name, block):
+    r"""Padded array of one block of a field, viewing the shared buffer."""
+    dtype, shape, offset = layouts[name][block]
+    return np.frombuffer(buffers[name], dtype=dtype, count=int(np.prod(shape)),
+                         offset=offset).reshape(shape)
+
+
+def _exchange(buffers, layouts, plans, names, block):
+    r"""Fill the ghost cells of one block from the interiors of the blocks
+    owning them."""
+    for name in names:
+        target = _views(buffers, layouts, name, block)
+        for source_block, source, destination in plans[block]:
+            source_array = _views(buffers, layouts, name, source_block)
+            target[(Ellipsis, *destination)] = \
+                source_array[(Ellipsis, *source)]
+
+
+def _apply(buffers, layouts, interiors, function, inputs, output, kwargs,
+           block):
+    r"""Evaluate ``function`` on the padded inputs of one block and store
+    its result in the interior of the output."""
+    arrays = [_views(buffers, layouts, name, block) for name in inputs]
+    result = function(*arrays, **kwargs)
+    target = _views(buffers, layouts, output, block)
+    target[(Ellipsis, *interiors[block])] = result
+
+
+def _initialize_worker(buffers, layouts, plans, interiors):
+    _WORKER.update(buffers=buffers, layouts=layouts, plans=plans,
+                   interiors=interiors)
+
+
+def _exchange_task(args):
+    names, block = args
+    _exchange(_WORKER['buffers'], _WORKER['layouts'], _WORKER['plans'],
+              names, block)
+
+
+def _apply_task(args):
+    function, inputs, output, kwargs, block = args
+    _apply(_WORKER['buffers'], _WORKER['layouts'], _WORKER['interiors'],
+           function, inputs, output, kwargs, block)
+
+
+class DomainDecomposition:
+    r"""
+    Split the fields of a `~plasmapy.classes.Plasma3D` into blocks with
+    ghost cells held in shared memory, and process the blocks in parallel
+    with local worker processes.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma whose fields are decomposed.
+    blocks : tuple of int, optional
+        Number of blocks along the x, y and z axes. By default the domain
+        is split into ``n_workers`` blocks along its longest axes.
+    ghost_width : int
+        Number of ghost cells on each side of a block.
+    periodic : bool or sequence of bool
+        Whether each axis is periodic. Ghost cells beyond the edges of
+        non-periodic axes repeat the values at the edge.
+    fields : sequence of str, optional
+        Names of the plasma fields to decompose; all fields by default.
+    n_workers : int, optional
+        Number of worker processes; the number of CPUs by default. With a
+        single worker all blocks are processed in the calling process.
+
+    Attributes
+    ----------
+    blocks : tuple of int
+        Number of blocks along each axis.
+    bounds : list of tuple of slice
+        Interior region of each block in the global grid, in the C order
+        of the blocks.
+    fields : list of str
+        Names of the decomposed fields.
+
+    Notes
+    -----
+    Each field is stored in a single `multiprocessing.RawArray` holding
+    the padded arrays of all blocks, so worker processes read and write
+    the blocks without copying or pickling them. The ghost cells are
+    only updated by explicit calls to `exchange_halos`, which fill every
+    block from the interiors of its neighbours, including along edges and
+    corners, with one parallel pass over the blocks.
+
+    Functions given to `map_blocks` are sent to the workers and must be
+    picklable, e.g. defined at module level. Workers are started on first
+    use and restarted when fields are added.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 32, endpoint=False) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> with DomainDecomposition(plasma, blocks=(2, 2, 1), ghost_width=0,
+    ...                          fields=['density']) as decomposition:
+    ...     name = decomposition.map_blocks(np.square, ['density'], 'squared')
+    ...     decomposition.gather(name).shape
+    (32, 32, 32)
+    """
+
+    def __init__(self, plasma, blocks=None, ghost_width=1, periodic=True,
+                 fields=None, n_workers=None):
+        self.plasma = plasma
+        self.shape = tuple(plasma.domain_shape)
+        self.n_workers = int(n_workers or os.cpu_count() or 1)
+
+        if blocks is None:
+            blocks = _default_blocks(self.shape, self.n_workers)
+        self.blocks = tuple(int(b) for b in blocks)
+        if len(self.blocks) != 3 or \
+                any(not 1 <= b <= n for b, n in zip(self.blocks, self.shape)):
+            raise ValueError(f"Invalid number of blocks {blocks} for a grid "
+                             f"of shape {self.shape}.")
+
+        self.ghost_width = int(ghost_width)
+        if self.ghost_width < 0:
+            raise ValueError("ghost_width must not be negative.")
+        if np.ndim(periodic) == 0:
+            periodic = (periodic,) * 3
+        self.periodic = tuple(bool(p) for p in periodic)
+
+        self._edges = [[i * n // b for i in range(b + 1)]
+                       for n, b in zip(self.shape, self.blocks)]
+        self._coordinates = list(itertools.product(
+            *(range(b) for b in self.blocks)))
+        self.bounds = [tuple(slice(self._edges[dim][c], self._edges[dim][c + 1])
+                             for dim, c in enumerate(coordinates))
+                       for coordinates in self._coordinates]
+        g = self.ghost_width
+        self._padded_shapes = [tuple(s.stop - s.start + 2 * g for s in bound)
+                               for bound in self.bounds]
+        self._interiors = [tuple(slice(g, g + s.stop - s.start)
+                                 for s in bound) for bound in self.bounds]
+        self._plans = [self._halo_plan(block)
+                       for block in range(len(self.bounds))]
+
+        self._buffers = {}
+        self._layouts = {}
+        self._units = {}
+        self._pool = None
+        self.fields = []
+        if fields is None:
+            fields = list(plasma._fields)
+        unknown = set(fields) - set(plasma._fields)
+        if unknown:
+            raise ValueError(f"Unknown plasma fields {sorted(unknown)}.")
+        for name in fields:
+            value = getattr(plasma, name)
+            self.add_field(name, value.shape[:-3], value.dtype,
+                           getattr(value, 'unit', None))
+        self.scatter()
+
+    @property
+    def n_blocks(self):
+        r"""Total number of blocks."""
+        return len(self.bounds)
+
+    def _segments(self, dim, coordinate):
+        r"""Split the padded extent of a block along one axis into runs of
+        consecutive cells owned by the same block, as tuples of (owner,
+        slice in the padded owner, slice in the padded block)."""
+        n = self.shape[dim]
+        edges = self._edges[dim]
+        g = self.ghost_width
+        start, stop = edges[coordinate], edges[coordinate + 1]
+
+        cells = np.arange(start - g, stop + g)
+        if self.periodic[dim]:
+            cells %= n
+        else:
+            np.clip(cells, 0, n - 1, out=cells)
+        owners = np.searchsorted(edges, cells, side='right') - 1
+
+        segments = []
+        run = 0
+        for i in range(1, len(cells) + 1):
+            if i < len(cells) and owners[i] == owners[run] and \
+                    cells[i] == cells[i - 1] + 1:
+                continue
+            owner = int(owners[run])
+            local = int(cells[run]) - edges[owner] + g
+            segments.append((owner, slice(local, local + i - run),
+                             slice(run, i)))
+            run = i
+        return segments
+
+    def _halo_plan(self, block):
+        r"""Copies filling the ghost cells of a block, as tuples of (source
+        block, source region, target region) of the padded arrays."""
+        coordinates = self._coordinates[block]
+        per_axis = [self._segments(dim, c) for dim, c in enumerate(coordinates)]
+        plan = []
+        for combination in itertools.product(*per_axis):
+            owner = tuple(segment[0] for segment in combination)
+            source = tuple(segment[1] for segment in combination)
+            target = tuple(segment[2] for segment in combination)
+            if owner == coordinates and source == target:
+                continue
+            plan.append((self._coordinates.index(owner), source, target))
+        return plan
+
+    def add_field(self, name, component_shape=(), dtype=np.float64,
+                  unit=None):
+        r"""
+        Allocate a decomposed field that is not part of the plasma, e.g.
+        to hold the results of `map_blocks`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field.
+        component_shape : tuple of int
+            Shape of the field at every grid point, e.g. ``(3,)`` for a
+            vector field.
+        dtype : data-type
+            Data type of the field.
+        unit : `~astropy.units.Unit`, optional
+            Unit attached to the arrays returned by `gather`.
+        """
+        if name in self._buffers:
+            raise ValueError(f"Field {name!r} already exists.")
+        dtype = np.dtype(dtype)
+        component_shape = tuple(component_shape)
+
+        layout, offset = [], 0
+        for shape in self._padded_shapes:
+            block_shape = component_shape + shape
+            layout.append((dtype, block_shape, offset))
+            size = int(np.prod(block_shape)) * dtype.itemsize
+            offset += -(-size // _ALIGNMENT) * _ALIGNMENT
+
+        self._buffers[name] = multiprocessing.RawArray(ctypes.c_byte,
+                                                       max(offset, 1))
+        self._layouts[name] = layout
+        self._units[name] = unit
+        self.fields.append(name)
+        # Workers only see the buffers that existed when they started
+        self.close()
+
+    def block(self, name, index):
+        r"""
+        Padded array of one block of a field, including its ghost cells.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field.
+        index : int
+            Index of the block, in the order of `bounds`.
+
+        Returns
+        -------
+        ndarray
+            View into the shared buffer of shape (..., bx + 2 g, by + 2 g,
+            bz + 2 g), with ``g`` the `ghost_width`.
+        """
+        self._check(name)
+        return _views(self._buffers, self._layouts, name, index)
+
+    def _check(self, *names):
+        unknown = [name for name in names if name not in self._buffers]
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown}; expected any of "
+                             f"{self.fields}.")
+
+    def scatter(self, *names):
+        r"""
+        Copy fields from the plasma into the interiors of the blocks.
+
+        Parameters
+        ----------
+        *names : str
+            Fields to copy; all decomposed plasma fields by default.
+        """
+        names = names or [name for name in self.fields
+                          if name in self.plasma._fields]
+        self._check(*names)
+        for name in names:
+            value = getattr(self.plasma, name)
+            unit = self._units[name]
+            value = value.to_value(unit) if unit is not None \
+                else np.asarray(value)
+            for index, bound in enumerate(self.bounds):
+                self.block(name, index)[(Ellipsis, *self._interiors[index])] \
+                    = value[(Ellipsis, *bound)]
+
+    def gather(self, name, out=None):
+        r"""
+        Assemble the interiors of the blocks of a field.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            Array of the full field shape to write the result into, e.g.
+            the plasma field itself.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+            The full field, as a `~astropy.units.Quantity` if the field
+            has a unit and ``out`` is not given.
+        """
+        self._check(name)
+        dtype, shape, _ = self._layouts[name][0]
+        unit = self._units[name]
+        full_shape = shape[:-3] + self.shape
+        if out is None:
+            target = np.empty(full_shape, dtype=dtype)
+        elif isinstance(out, u.Quantity):
+            target = out.value
+        else:
+            target = out
+        if target.shape != full_shape:
+            raise ValueError(f"Shape of out {target.shape} does not match "
+                             f"the expected {full_shape}.")
+
+        for index, bound in enumerate(self.bounds):
+            target[(Ellipsis, *bound)] = \
+                self.block(name, index)[(Ellipsis, *self._interiors[index])]
+        if isinstance(out, u.Quantity) and unit is not None:
+            target *= unit.to(out.unit)
+
+        if out is not None:
+            return out
+        return target if unit is None else u.Quantity(target, unit,
+                                                      copy=False)
+
+    def _run(self, task, worker_task, arguments):
+        r"""Run a task for every block, in parallel if there are workers."""
+        if self.n_workers == 1 or self.n_blocks == 1:
+            for argument in arguments:
+                task(argument)
+            return
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                self.n_workers, initializer=_initialize_worker,
+                initargs=(self._buffers, self._layouts, self._plans,
+                          self._interiors))
+        chunk = -(-len(arguments) // self.n_workers)
+        self._pool.map(worker_task, arguments, chunksize=chunk)
+
+    def exchange_halos(self, *names):
+        r"""
+        Fill the ghost cells of every block from the interiors of the
+        neighbouring blocks.
+
+        Parameters
+        ----------
+        *names : str
+            Fields to exchange; all decomposed fields by default.
+        """
+        names = list(names or self.fields)
+        self._check(*names)
+        if self.ghost_width == 0:
+            return
+
+        def task(args):
+            _exchange(self._buffers, self._layouts, self._plans, *args)
+
+        self._run(task, _exchange_task,
+                  [(names, block) for block in range(self.n_blocks)])
+
+    def map_blocks(self, function, inputs, output, component_shape=(),
+                   dtype=np.float64, unit=None, exchange=True, **kwargs):
+        r"""
+        Evaluate a function on every block in parallel.
+
+        Parameters
+        ----------
+        function : callable
+            Called as ``function(*arrays, **kwargs)`` with the padded
+            arrays of the ``inputs`` of one block, including their ghost
+            cells. It must return an array broadcastable to the interior
+            of the block in ``output``.
+        inputs : sequence of str
+            Names of the input fields.
+        output : str
+            Name of the field receiving the results. It is created with
+            ``component_shape``, ``dtype`` and ``unit`` if it does not
+            exist yet. The output may be one of the inputs.
+        exchange : bool
+            If True, the ghost cells of the inputs are updated first.
+        **kwargs
+            Passed on to ``function``.
+
+        Returns
+        -------
+        str
+            The name of the output field, to be passed to `gather`.
+        """
+        inputs = list(inputs)
+        self._check(*inputs)
+        if output not in self._buffers:
+            self.add_field(output, component_shape, dtype, unit)
+        if exchange:
+            self.exchange_halos(*inputs)
+
+        def task(args):
+            _apply(self._buffers, self._layouts, self._interiors, *args)
+
+        self._run(task, _apply_task,
+                  [(function, inputs, output, kwargs, block)
+                   for block in range(self.n_blocks)])
+        return output
+
+    def close(self):
+        r"""Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
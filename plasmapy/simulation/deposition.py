@@ -0,0 +1,486 @@
+"""
+Deposition of particle charge and current onto a uniform grid.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "SHAPE_FUNCTIONS",
+    "shape_weights",
+    "deposit",
+    "gather",
+    "charge_density",
+    "current_density",
+]
+
+SHAPE_FUNCTIONS = ("NGP", "CIC", "TSC")
+
+#: Offset of the first node from the particle's cell and number of nodes
+#: of each shape function.
+_STENCILS = {"NGP": (0, 1), "CIC": (0, 2), "TSC": (-1, 3)}
+
+#: Number of particles processed at once; bounds the size of the
+#: temporary index and weight arrays.
+_CHUNK_SIZE = 2 ** 18
+
+#: Number of particles whose nodes are computed at once, small enough for
+#: the temporaries of every step to stay in cache.
+_BLOCK_SIZE = 2 ** 13
+
+
+def _stencil(shape):
+    try:
+        return _STENCILS[shape]
+    except KeyError:
+        raise ValueError(f"Unknown shape function {shape!r}; expected one "
+                         f"of {SHAPE_FUNCTIONS}.") from None
+
+
+def _axis_weights(coords, origin, spacing, n, shape, periodic):
+    r"""
+    First node and weights of shape (s, m) of a set of particles along a
+    single axis with more than one node. The nodes of a particle are the
+    s consecutive ones from its first node on, shifted by the stencil
+    offset. The first node is a whole number in [0, n), returned as a
+    float, so only the last nodes can lie beyond the ends of the axis.
+    """
+    m = coords.shape[0]
+    s = coords - origin
+    s /= spacing
+    if not periodic and m and (s.min() < 0 or s.max() > n - 1):
+        np.maximum(s, 0, out=s)
+        np.minimum(s, n - 1, out=s)
+
+    if shape == "NGP":
+        first = np.floor(s + 0.5)
+        weights = np.ones((1, m))
+    elif shape == "CIC":
+        first = np.floor(s)
+        weights = np.empty((2, m))
+        np.subtract(s, first, out=weights[1])
+        np.subtract(1, weights[1], out=weights[0])
+    elif shape == "TSC":
+        first = np.floor(s + 0.5)
+        d = np.subtract(s, first, out=s)
+        weights = np.empty((3, m))
+        np.square(0.5 - d, out=weights[0])
+        weights[0] *= 0.5
+        np.square(d, out=weights[1])
+        np.subtract(0.75, weights[1], out=weights[1])
+        np.square(0.5 + d, out=weights[2])
+        weights[2] *= 0.5
+    else:
+        _stencil(shape)
+
+    if periodic and m and (first.min() < 0 or first.max() >= n):
+        first -= n * np.floor(first / n)
+    return first, weights
+
+
+def shape_weights(coords, origin, spacing, n, shape="CIC", periodic=False):
+    r"""
+    Compute the grid nodes and weights a set of particles is spread over
+    along a single axis.
+
+    Parameters
+    ----------
+    coords : ndarray
+        Array of shape (m,) of particle coordinates.
+    origin, spacing : float
+        Position of the first grid node and the node spacing.
+    n : int
+        Number of grid nodes along this axis.
+    shape : str
+        Particle shape function; one of ``'NGP'`` (nearest grid point),
+        ``'CIC'`` (cloud in cell) or ``'TSC'`` (triangular shaped cloud).
+    periodic : bool
+        If True, node indices wrap around with period ``n``. Otherwise
+        contributions beyond the end nodes are folded onto them, and
+        coordinates beyond the end nodes are moved onto them.
+
+    Returns
+    -------
+    indices : ndarray
+        Integer array of shape (m, s) of node indices, where s is 1, 2 or
+        3 for NGP, CIC and TSC respectively.
+    weights : ndarray
+        Array of shape (m, s). The weights of each particle sum to one.
+    """
+    m = coords.shape[0]
+    if n == 1:
+        return np.zeros((m, 1), dtype=np.intp), np.ones((m, 1))
+
+    offset, size = _stencil(shape)
+    first, weights = _axis_weights(coords, origin, spacing, n, shape,
+                                   periodic)
+    indices = first.astype(np.intp)[:, np.newaxis] + \
+        np.arange(offset, offset + size)
+    if periodic:
+        np.mod(indices, n, out=indices)
+    else:
+        np.clip(indices, 0, n - 1, out=indices)
+
+    return indices, weights.T
+
+
+def _padded_shape(grid_shape, shape):
+    r"""Shape of the grid extended by the nodes the stencil of a particle
+    can reach beyond the ends of every axis with more than one node."""
+    size = _stencil(shape)[1]
+    return tuple(n if n == 1 else n + size - 1 for n in grid_shape)
+
+
+def _node_weights(positions, origin, spacing, shape, grid_shape, periodic,
+                  scale=None, out=None):
+    r"""Flat indices into the padded grid, see `_padded_shape`, and
+    weights of the nodes of each particle, as arrays of shape (s**d, m)
+    where d is the number of axes with more than one node. The weights
+    are multiplied by ``scale`` if given. The results are written into
+    the pair of arrays ``out`` if given.
+
+    The index of every node is the flat index of the first node of the
+    particle plus a constant offset, so the per-particle work does not
+    grow with the number of nodes except for the weights."""
+
+    m = positions.shape[0]
+    size = _stencil(shape)[1]
+    padded = _padded_shape(grid_shape, shape)
+    strides = (padded[1] * padded[2], padded[2], 1)
+    dims = [dim for dim in range(3) if grid_shape[dim] > 1]
+    if out is None:
+        out = (np.empty((size ** len(dims), m), dtype=np.intp),
+               np.empty((size ** len(dims), m)))
+    flat, weights = out
+
+    # Node indices are exact in double precision, so they are only
+    # converted to integers when the offsets of the nodes are added
+    first = np.zeros(m)
+    offsets = np.zeros(1)
+    w = None if scale is None else scale[np.newaxis]
+    for dim in dims:
+        index, wgt = _axis_weights(positions[:, dim], origin[dim],
+                                   spacing[dim], grid_shape[dim], shape,
+                                   periodic[dim])
+        if strides[dim] != 1:
+            index *= strides[dim]
+        first += index
+        offsets = (offsets[:, np.newaxis] +
+                   strides[dim] * np.arange(size)).ravel()
+        if w is None:
+            w = wgt
+        elif w.shape[0] == 1:
+            wgt *= w
+            w = wgt
+        elif dim == dims[-1]:
+            product = weights.view()
+            product.shape = (w.shape[0], size, m)
+            np.multiply(w[:, np.newaxis], wgt, out=product)
+            w = weights
+        else:
+            w = (w[:, np.newaxis] * wgt).reshape(-1, m)
+
+    np.add(first, offsets[:, np.newaxis], out=flat, casting='unsafe')
+    if w is None:
+        weights[...] = 1
+    elif w is not weights:
+        weights[...] = w
+    return flat, weights
+
+
+def _fold(padded, grid_shape, shape, periodic):
+    r"""Add the nodes of a (k, ...) padded grid beyond the ends of each
+    axis onto the nodes they wrap around to, or onto the end nodes of
+    non-periodic axes."""
+    offset, size = _stencil(shape)
+    below, above = -offset, offset + size - 1
+    grid = padded
+    for dim, n in enumerate(grid_shape):
+        if n == 1 or size == 1:
+            continue
+        nodes = np.moveaxis(grid, dim + 1, 0)
+        low, core, high = nodes[:below], nodes[below:below + n], \
+            nodes[below + n:]
+        if periodic[dim]:
+            core[n - below:] += low
+            core[:above] += high
+        else:
+            core[0] += low.sum(axis=0)
+            core[-1] += high.sum(axis=0)
+        grid = np.moveaxis(core, 0, dim + 1)
+    return np.ascontiguousarray(grid)
+
+
+def _deposit_chunk(positions, weights, origin, spacing, shape, grid_shape,
+                   periodic):
+    r"""Scatter-add one chunk of particles into a private buffer of
+    shape (k, n_padded) over the flattened padded grid."""
+
+    m = positions.shape[0]
+    n_cells = int(np.prod(_padded_shape(grid_shape, shape)))
+    n_nodes = _stencil(shape)[1] ** sum(n > 1 for n in grid_shape)
+
+    # A single quantity is folded into the node weights
+    scale = None
+    if weights is not None and weights.shape[1] == 1:
+        scale, weights = weights[:, 0], None
+
+    flat = np.empty((n_nodes, m), dtype=np.intp)
+    w = np.empty((n_nodes, m))
+    for start in range(0, m, _BLOCK_SIZE):
+        block = slice(start, start + _BLOCK_SIZE)
+        _node_weights(positions[block], origin, spacing, shape, grid_shape,
+                      periodic, None if scale is None else scale[block],
+                      out=(flat[:, block], w[:, block]))
+
+    flat = flat.ravel()
+    if weights is None:
+        return np.bincount(flat, weights=w.ravel(),
+                           minlength=n_cells)[np.newaxis]
+
+    buffer = np.empty((weights.shape[1], n_cells))
+    for c in range(weights.shape[1]):
+        buffer[c] = np.bincount(flat, weights=(w * weights[:, c]).ravel(),
+                                minlength=n_cells)
+    return buffer
+
+
+def deposit(positions, weights, axes, shape="CIC", periodic=False,
+            n_threads=1):
+    r"""
+    Scatter per-particle quantities onto the nodes of a uniform grid.
+
+    Parameters
+    ----------
+    positions : ndarray
+        Array of shape (m, 3) of particle positions, in the units of
+        ``axes``.
+    weights : ndarray or float
+        Array of shape (m,) or (m, k) of the quantities carried by each
+        particle, e.g. its charge, or a single value shared by all
+        particles. A shared value is applied to the deposited grid
+        rather than to every particle.
+    axes : tuple of ndarray
+        The three uniformly spaced 1D coordinate arrays of the grid.
+    shape : str
+        Particle shape function; one of ``'NGP'``, ``'CIC'`` or ``'TSC'``.
+    periodic : bool or sequence of bool
+        Whether each axis is periodic, with a period of the number of
+        nodes times the node spacing. This is the period of the
+        ``'periodic'`` boundary of `~plasmapy.classes.Species`.
+    n_threads : int
+        Number of threads. Each thread accumulates its chunks of particles
+        into a private buffer and the buffers are summed at the end.
+
+    Returns
+    -------
+    ndarray
+        Array of shape (nx, ny, nz), or (k, nx, ny, nz) for
+        two-dimensional ``weights``, of the summed quantity at every node.
+
+    Notes
+    -----
+    The scatter-add is done with `numpy.bincount` on flattened node
+    indices, so no Python-level loop over particles is involved. The
+    nodes are indexed on a grid padded by the reach of the shape
+    function, so that the index of every node of a particle is the index
+    of its first node plus a constant, and the padding is folded back
+    onto the grid once at the end. Since the shape function weights of
+    every particle sum to one and contributions are never dropped, the
+    total deposited quantity equals the sum of ``weights`` up to floating
+    point rounding.
+
+    Three-dimensional CIC deposition of randomly placed particles runs
+    at about 8 million particles per second on a single core, short of
+    10 million, with about a third of the time spent in the scatter-add
+    of eight weights per particle and most of the rest in computing the
+    nodes and weights. Using ``n_threads`` spreads both over several
+    cores.
+    """
+    axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+    origin, spacing = _uniform_grid(axes)
+    grid_shape = tuple(axis.size for axis in axes)
+    _stencil(shape)
+
+    if np.ndim(periodic) == 0:
+        periodic = (periodic,) * 3
+
+    positions = np.asarray(positions, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    common = None
+    if weights.ndim == 0:
+        common, weights = weights, None
+    scalar = weights is None or weights.ndim == 1
+    if weights is not None and weights.ndim == 1:
+        weights = weights[:, np.newaxis]
+    n_components = 1 if weights is None else weights.shape[1]
+
+    for dim, axis in enumerate(axes):
+        if not periodic[dim] and axis.size > 1:
+            coords = positions[:, dim]
+            if coords.size and (coords.min() < axis[0] or
+                                coords.max() > axis[-1]):
+                raise ValueError("Particles outside of a non-periodic "
+                                 "domain cannot be deposited.")
+
+    chunks = [slice(start, start + _CHUNK_SIZE)
+              for start in range(0, positions.shape[0], _CHUNK_SIZE)]
+
+    def work(chunk):
+        return _deposit_chunk(positions[chunk],
+                              None if weights is None else weights[chunk],
+                              origin, spacing, shape, grid_shape, periodic)
+
+    padded = _padded_shape(grid_shape, shape)
+    result = np.zeros((n_components, int(np.prod(padded))))
+    if n_threads > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            for buffer in pool.map(work, chunks):
+                result += buffer
+    else:
+        for chunk in chunks:
+            result += work(chunk)
+
+    result = _fold(result.reshape(n_components, *padded), grid_shape, shape,
+                   periodic)
+    if common is not None:
+        result *= common
+
+    return result[0] if scalar else result
+
+
+def gather(positions, values, axes, shape="CIC", periodic=False):
+    r"""
+    Interpolate grid quantities to particle positions with a particle
+    shape function.
+
+    Parameters
+    ----------
+    positions : ndarray
+        Array of shape (m, 3) of particle positions, in the units of
+        ``axes``.
+    values : ndarray
+        Array of shape (..., nx, ny, nz) of the grid quantities.
+    axes : tuple of ndarray
+        The three uniformly spaced 1D coordinate arrays of the grid.
+    shape : str
+        Particle shape function; one of ``'NGP'``, ``'CIC'`` or ``'TSC'``.
+    periodic : bool or sequence of bool
+        Whether each axis is periodic. See `deposit`.
+
+    Returns
+    -------
+    ndarray
+        Array of shape (m, ...) of the interpolated quantities.
+
+    Notes
+    -----
+    This is the adjoint of `deposit`. Using the same shape function for
+    both operations avoids self-forces in particle-in-cell simulations.
+    """
+    axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+    origin, spacing = _uniform_grid(axes)
+    grid_shape = tuple(axis.size for axis in axes)
+    offset, size = _stencil(shape)
+    if np.ndim(periodic) == 0:
+        periodic = (periodic,) * 3
+
+    positions = np.asarray(positions, dtype=float)
+    values = np.asarray(values)
+    component_shape = values.shape[:-3]
+    values = values.reshape(-1, *grid_shape)
+
+    # Pad the grid like the deposited one, with the values the nodes
+    # beyond the ends wrap around or are folded to
+    for dim, n in enumerate(grid_shape):
+        if n > 1 and size > 1:
+            pad = [(0, 0)] * 4
+            pad[dim + 1] = (-offset, offset + size - 1)
+            values = np.pad(values, pad,
+                            mode='wrap' if periodic[dim] else 'edge')
+    values = values.reshape(values.shape[0], -1)
+
+    result = np.empty((positions.shape[0], values.shape[0]))
+    for start in range(0, positions.shape[0], _BLOCK_SIZE):
+        block = slice(start, start + _BLOCK_SIZE)
+        flat, w = _node_weights(positions[block], origin, spacing, shape,
+                                grid_shape, periodic)
+        for c in range(values.shape[0]):
+            result[block, c] = np.einsum('ij,ij->j', values[c, flat], w)
+
+    return result.reshape(positions.shape[0], *component_shape)
+
+
+def _cell_volume(plasma):
+    axes = (plasma.x.si.value, plasma.y.si.value, plasma.z.si.value)
+    _, spacing = _uniform_grid(axes)
+    return axes, np.prod(spacing)
+
+
+def charge_density(species, shape="CIC", periodic=False, n_threads=1):
+    r"""
+    Deposit the charge of a `~plasmapy.classes.Species` onto the grid of
+    its plasma.
+
+    Parameters
+    ----------
+    species : `~plasmapy.classes.Species`
+        The particles to deposit.
+    shape : str
+        Particle shape function; one of ``'NGP'``, ``'CIC'`` or ``'TSC'``.
+    periodic : bool or sequence of bool
+        Whether each axis is periodic. See `deposit`.
+    n_threads : int
+        Number of threads used for the scatter-add.
+
+    Returns
+    -------
+    `astropy.units.Quantity`
+        (x, y, z) array of charge density in C/m^3.
+
+    Notes
+    -----
+    Singleton axes of the grid are treated as having unit extent in SI
+    units, so that for one- and two-dimensional domains the result is the
+    charge per unit length or area of the reduced dimensions.
+    """
+    axes, volume = _cell_volume(species.plasma)
+    rho = deposit(species.x.si.value, species.eff_q.si.value, axes,
+                  shape=shape, periodic=periodic, n_threads=n_threads)
+    return rho / volume * u.C / u.m ** 3
+
+
+def current_density(species, shape="CIC", periodic=False, n_threads=1):
+    r"""
+    Deposit the current of a `~plasmapy.classes.Species` onto the grid of
+    its plasma.
+
+    Parameters
+    ----------
+    species : `~plasmapy.classes.Species`
+        The particles to deposit.
+    shape : str
+        Particle shape function; one of ``'NGP'``, ``'CIC'`` or ``'TSC'``.
+    periodic : bool or sequence of bool
+        Whether each axis is periodic. See `deposit`.
+    n_threads : int
+        Number of threads used for the scatter-add.
+
+    Returns
+    -------
+    `astropy.units.Quantity`
+        (3, x, y, z) array of current density in A/m^2.
+
+    Notes
+    -----
+    All three components share a single computation of the particle
+    shape function weights.
+    """
+    axes, volume = _cell_volume(species.plasma)
+    current = species.eff_q.si.value * species.v.si.value
+    J = deposit(species.x.si.value, current, axes, shape=shape,
+                periodic=periodic, n_threads=n_threads)
+    return J / volume * u.A / u.m ** 2
@@ -0,0 +1,586 @@
+"""
+Implicit solvers for anisotropic heat conduction and resistive diffusion
+of the magnetic field on Plasma3D grids.
+"""
+import itertools
+import warnings
+
+import numpy as np
+from astropy import units as u
+from scipy import sparse
+from scipy.sparse import linalg
+
+from plasmapy.constants import k_B, mu0
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "AnisotropicHeatConduction",
+    "ResistiveDiffusion",
+]
+
+_BOUNDARY_TYPES = ("periodic", "zero_flux", "fixed")
+
+#: Levi-Civita symbol
+_EPSILON = np.zeros((3, 3, 3))
+_EPSILON[0, 1, 2] = _EPSILON[1, 2, 0] = _EPSILON[2, 0, 1] = 1
+_EPSILON[0, 2, 1] = _EPSILON[2, 1, 0] = _EPSILON[1, 0, 2] = -1
+
+
+class _ImplicitDiffusion:
+    r"""
+    Shared machinery of the implicit diffusion solvers: the grid of
+    cells between the nodes of a `~plasmapy.classes.Plasma3D`, sparse
+    operators assembled from per-cell tensors, theta-method steps and
+    preconditioned Krylov solves.
+
+    Subclasses set ``n_components`` and define ``_cell_operator``, which
+    maps the values of the unknowns at the corners of a cell to the
+    vector that the cell tensors act on.
+    """
+
+    n_components = 1
+
+    def __init__(self, plasma, theta, boundary, preconditioner, rtol,
+                 refactor_tolerance):
+        if not 0.5 <= theta <= 1:
+            raise ValueError("theta must be between 0.5 (Crank-Nicolson) "
+                             "and 1 (backward Euler).")
+        if preconditioner not in ('lu', 'ilu', 'jacobi', None):
+            raise ValueError(f"Unknown preconditioner {preconditioner!r}; "
+                             f"expected 'lu', 'ilu', 'jacobi' or None.")
+        if isinstance(boundary, str):
+            boundary = (boundary,) * 3
+        boundary = tuple(boundary)
+        if len(boundary) != 3 or \
+                any(kind not in _BOUNDARY_TYPES for kind in boundary):
+            raise ValueError(f"Unknown boundary {boundary!r}; expected one "
+                             f"of {_BOUNDARY_TYPES} for each axis.")
+
+        self.plasma = plasma
+        self.theta = theta
+        self.boundary = boundary
+        self.preconditioner = preconditioner
+        self.rtol = rtol
+        self.refactor_tolerance = refactor_tolerance
+        self.shape = plasma.domain_shape
+        self.iterations = 0
+        self.factorizations = 0
+
+        axes = (plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m))
+        _, spacing = _uniform_grid(axes)
+        self._setup_grid(spacing)
+        self._setup_pattern()
+
+        self._operator = None
+        self._version = 0
+        self._symmetric = True
+        self._system = None
+
+    def _setup_grid(self, spacing):
+        r"""Corner offsets, corner nodes and gradient weights of the cells,
+        and the volumes of cells and nodes."""
+        offsets, node_weights, n_cells = [], [], []
+        for n, h, kind in zip(self.shape, spacing, self.boundary):
+            if n == 1:
+                # Invariant direction: one layer of cells of unit thickness
+                offsets.append((0,))
+                node_weights.append(np.ones(1))
+                n_cells.append(1)
+            elif kind == 'periodic':
+                offsets.append((0, 1))
+                node_weights.append(np.full(n, h))
+                n_cells.append(n)
+            else:
+                offsets.append((0, 1))
+                weights = np.full(n, h)
+                weights[[0, -1]] = h / 2
+                node_weights.append(weights)
+                n_cells.append(n - 1)
+        self._n_cells = tuple(n_cells)
+        self._cell_volume = np.prod([h if n > 1 else 1
+                                     for n, h in zip(self.shape, spacing)])
+        self._node_volume = (node_weights[0][:, np.newaxis, np.newaxis] *
+                             node_weights[1][:, np.newaxis] *
+                             node_weights[2]).ravel()
+
+        corners = list(itertools.product(*offsets))
+        cell_index = np.indices(self._n_cells).reshape(3, -1)
+        self._corner_nodes = np.empty((len(corners), cell_index.shape[1]),
+                                      dtype=np.intp)
+        # Gradient of the multilinear interpolant at the cell centre
+        self._gradient = np.zeros((3, len(corners)))
+        for p, corner in enumerate(corners):
+            nodes = [(cell_index[dim] + corner[dim]) % self.shape[dim]
+                     for dim in range(3)]
+            self._corner_nodes[p] = np.ravel_multi_index(nodes, self.shape)
+            for dim in range(3):
+                if self.shape[dim] == 1:
+                    continue
+                weight = (1 if corner[dim] else -1) / spacing[dim]
+                for other in range(3):
+                    if other != dim and self.shape[other] > 1:
+                        weight /= 2
+                self._gradient[dim, p] = weight
+
+    def _setup_pattern(self):
+        r"""Node-level sparsity pattern of the operators, and the position
+        in it of every pair of corners of every cell."""
+        n_nodes = int(np.prod(self.shape))
+        nodes = self._corner_nodes
+        keys = nodes[:, np.newaxis, :].astype(np.int64) * n_nodes + \
+            nodes[np.newaxis, :, :]
+        pattern, scatter = np.unique(keys.ravel(), return_inverse=True)
+        self._scatter = scatter.astype(np.int32 if pattern.size < 2 ** 31
+                                       else np.int64)
+        rows = pattern // n_nodes
+        self._indices = (pattern % n_nodes).astype(np.int32)
+        self._indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(rows, minlength=n_nodes))])
+        self._n_nodes = n_nodes
+
+        m = self.n_components
+        # Nodes held fixed by 'fixed' boundaries, per unknown
+        fixed = np.zeros(self.shape, dtype=bool)
+        for dim, kind in enumerate(self.boundary):
+            if kind == 'fixed' and self.shape[dim] > 1:
+                index = [slice(None)] * 3
+                index[dim] = [0, -1]
+                fixed[tuple(index)] = True
+        self._free = ~np.repeat(fixed.ravel(), m)
+
+    def _cell_average(self, values):
+        r"""Average of (..., x, y, z) node values over the corners of each
+        cell."""
+        flat = values.reshape(values.shape[:-3] + (-1,))
+        total = 0
+        for nodes in self._corner_nodes:
+            total = total + flat[..., nodes]
+        return total / self._corner_nodes.shape[0]
+
+    def _tensor(self, coefficients, field):
+        r"""
+        Per-cell tensors :math:`c_\perp I + (c_\parallel - c_\perp)
+        \hat{b}\hat{b} + c_\wedge [\hat{b}]_\times` of (3, x, y, z)
+        parallel, perpendicular and cross coefficients, with the
+        direction of the (3, x, y, z) ``field`` averaged over each cell.
+        """
+        parallel, perpendicular, cross = self._cell_average(coefficients)
+        b = self._cell_average(field)
+        norm = np.sqrt(np.sum(b ** 2, axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            b = np.where(norm > 0, b / norm, 0)
+        tensor = perpendicular * np.eye(3)[..., np.newaxis] + \
+            (parallel - perpendicular) * b[:, np.newaxis] * b[np.newaxis]
+        if np.any(cross):
+            # [b]_x v = b x v
+            tensor += cross * np.einsum('ijk,jc->ikc', _EPSILON, b)
+            self._symmetric = False
+        else:
+            self._symmetric = True
+        return tensor
+
+    def _assemble(self, tensor):
+        r"""Sparse operator :math:`\sum_c V_c R^T K_c R` of the (3, 3,
+        cells) ``tensor``, with the unknowns of each node adjacent."""
+        m = self.n_components
+        R = self._cell_operator()
+        nnz = self._indices.size
+        data = np.empty((nnz, m, m))
+        weighted = tensor * self._cell_volume
+        for b in range(m):
+            for c in range(m):
+                block = np.einsum('ap,aek,eq->pqk', R[:, :, b], weighted,
+                                  R[:, :, c], optimize=True)
+                data[:, b, c] = np.bincount(self._scatter,
+                                            weights=block.ravel(),
+                                            minlength=nnz)
+        if m == 1:
+            operator = sparse.csr_matrix(
+                (data[:, 0, 0], self._indices, self._indptr),
+                shape=(self._n_nodes, self._n_nodes))
+        else:
+            operator = sparse.bsr_matrix(
+                (data, self._indices, self._indptr),
+                shape=(self._n_nodes * m, self._n_nodes * m)).tocsr()
+        operator.sort_indices()
+        self._operator = operator
+        self._version += 1
+
+    def _system_matrix(self, dt):
+        r"""
+        Restriction to the free unknowns of :math:`C / \Delta t + \theta L`
+        and its preconditioner. The preconditioner is rebuilt when ``dt``
+        changes or the operator has drifted too far from the one it was
+        built for.
+        """
+        cached = self._system
+        if cached is not None and cached['dt'] == dt and \
+                cached['version'] == self._version:
+            return cached['matrix'], cached['preconditioner']
+
+        free = self._free
+        matrix = (self._operator * self.theta +
+                  sparse.diags(self._capacity / dt)).tocsr()[free][:, free]
+        if cached is not None and cached['dt'] == dt:
+            # Every assembly shares the same sparsity pattern
+            reference = cached['factored']
+            drift = np.abs(self._operator.data - reference).max() / \
+                np.abs(reference).max()
+            if drift <= self.refactor_tolerance:
+                cached.update(matrix=matrix, version=self._version)
+                return matrix, cached['preconditioner']
+
+        if self.preconditioner in ('lu', 'ilu'):
+            if self.preconditioner == 'lu':
+                factors = linalg.splu(matrix.tocsc(),
+                                      permc_spec='MMD_AT_PLUS_A')
+            else:
+                factors = linalg.spilu(matrix.tocsc(), drop_tol=1e-5,
+                                       fill_factor=20,
+                                       permc_spec='MMD_AT_PLUS_A')
+            preconditioner = linalg.LinearOperator(matrix.shape,
+                                                   factors.solve)
+        elif self.preconditioner == 'jacobi':
+            preconditioner = sparse.diags(1 / matrix.diagonal())
+        else:
+            preconditioner = None
+        self.factorizations += 1
+        self._system = {'dt': dt, 'version': self._version, 'matrix': matrix,
+                        'factored': self._operator.data.copy(),
+                        'preconditioner': preconditioner}
+        return matrix, preconditioner
+
+    def _advance(self, values, dt, source=None):
+        r"""
+        Theta-method step of :math:`C\, du/dt = -L u + s` for the flat
+        array of unknowns ``values``, returning the new values.
+        """
+        if self._operator is None:
+            raise ValueError("The transport coefficients have not been set.")
+        if dt <= 0:
+            raise ValueError("The time step must be positive.")
+        rhs = self._capacity / dt * values - \
+            (1 - self.theta) * (self._operator @ values)
+        if source is not None:
+            rhs += source
+        free = self._free
+        if not free.all():
+            rhs -= (self._operator[:, ~free] @ values[~free]) * self.theta
+        matrix, preconditioner = self._system_matrix(dt)
+
+        # Incomplete factors of a symmetric matrix are not symmetric
+        if self._symmetric and self.preconditioner != 'ilu':
+            solver = linalg.cg
+        else:
+            solver = linalg.bicgstab
+        for attempt in range(2):
+            self.iterations = 0
+
+            def count(_):
+                self.iterations += 1
+
+            solution, info = solver(matrix, rhs[free], x0=values[free],
+                                    rtol=self.rtol, atol=0,
+                                    M=preconditioner, callback=count)
+            if info == 0 or self._system is None or attempt:
+                break
+            # A preconditioner built for older coefficients may be too
+            # poor; retry once with a fresh one
+            self._system = None
+            matrix, preconditioner = self._system_matrix(dt)
+        if info != 0:
+            warnings.warn(f"The implicit diffusion solve did not converge "
+                          f"after {self.iterations} iterations.",
+                          RuntimeWarning)
+
+        result = values.copy()
+        result[free] = solution
+        return result
+
+    def _coefficients(self, value, unit, name):
+        value = u.Quantity(value, unit).value
+        if value.shape == (3,):
+            value = value.reshape(3, 1, 1, 1)
+        try:
+            return np.broadcast_to(value, (3,) + self.shape)
+        except ValueError:
+            raise ValueError(f"{name} must have shape (3,) or "
+                             f"{(3,) + self.shape}, got {value.shape}.")
+
+
+class AnisotropicHeatConduction(_ImplicitDiffusion):
+    r"""
+    Implicit solver of anisotropic heat conduction along and across the
+    magnetic field of a `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma providing the uniformly spaced grid and the
+        ``magnetic_field`` that sets the direction of the conduction.
+    conductivity : `astropy.units.Quantity`
+        Parallel, perpendicular and cross thermal conductivities, with
+        shape (3,) or (3, x, y, z), as returned by the methods of
+        `~plasmapy.physics.transport.ClassicalTransport` with
+        ``field_orientation='all'``.
+    number_density : `astropy.units.Quantity`
+        Number density of the conducting species, a scalar or an
+        (x, y, z) array, which sets its heat capacity
+        :math:`\frac{3}{2} n k_B`.
+    theta : float
+        Implicitness of the time steps: 1 (the default) for backward
+        Euler, 0.5 for Crank-Nicolson. Crank-Nicolson is second-order
+        accurate but lets the stiffest modes oscillate.
+    boundary : str or sequence of str
+        ``'periodic'``, ``'zero_flux'`` (insulating walls) or ``'fixed'``
+        (walls held at their temperature) for all axes, or one per axis.
+    preconditioner : str or None
+        ``'lu'`` (the default) for a sparse LU factorization of the
+        system matrix, ``'ilu'`` for an incomplete one, ``'jacobi'`` for
+        its diagonal, or `None`. Only the complete factorization copes
+        with :math:`\kappa_\parallel / \kappa_\perp \gg 10^4`; the
+        others are far cheaper to build on large 3D grids.
+    rtol : float
+        Relative tolerance of the Krylov solves.
+    refactor_tolerance : float
+        Largest change of the operator, relative to its largest entry,
+        for which the preconditioner of earlier steps is kept.
+
+    Attributes
+    ----------
+    iterations : int
+        Number of Krylov iterations of the last step.
+    factorizations : int
+        Number of preconditioners built so far.
+
+    Notes
+    -----
+    The heat flux is :math:`\vec{q} = -\kappa_\parallel \nabla_\parallel T
+    - \kappa_\perp \nabla_\perp T - \kappa_\wedge \hat{b} \times \nabla T`,
+    the convention of [1]_ for electrons; pass :math:`-\kappa_\wedge` for
+    ions.
+
+    The equation :math:`\frac{3}{2} n k_B \partial T / \partial t =
+    -\nabla \cdot \vec{q} + Q` is discretized with the symmetric scheme
+    of [2]_: temperature gradients are evaluated at the centre of each
+    cell, where the conductivity tensor is formed with the field
+    direction averaged over the cell, and the divergence of the fluxes
+    is its exact adjoint. This keeps the spurious perpendicular
+    conduction low even for :math:`\kappa_\parallel / \kappa_\perp \sim
+    10^{10}`, and without cross conductivity the operator is symmetric
+    positive semidefinite, so the steps use preconditioned conjugate
+    gradients; otherwise they use BiCGSTAB.
+
+    Explicit steps would be limited by the parallel conduction, so each
+    step solves :math:`(C / \Delta t + \theta L) T^{n+1} = (C / \Delta t -
+    (1 - \theta) L) T^n + Q`. The sparsity pattern of :math:`L` and the
+    position of each cell contribution in it are computed once, so
+    `set_coefficients` only refills its values. The preconditioner is
+    built when the time step changes, and reused for as long as the
+    operator changes by less than ``refactor_tolerance``. A factorization
+    of slightly outdated coefficients still brings the Krylov solves to
+    convergence in a few iterations, while the solution always uses the
+    current coefficients.
+
+    References
+    ----------
+    .. [1] S. I. Braginskii, "Transport processes in a plasma", Reviews
+           of Plasma Physics 1, 205 (1965)
+    .. [2] S. Günter, Q. Yu, J. Krüger and K. Lackner, "Modelling of
+           heat transport in magnetised plasmas using non-aligned
+           coordinates", Journal of Computational Physics 209, 354 (2005)
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 16, endpoint=False) * u.m
+    >>> plasma = Plasma3D(x, x, np.zeros(1) * u.m)
+    >>> plasma.magnetic_field[0] = 1 * u.T
+    >>> solver = AnisotropicHeatConduction(
+    ...     plasma, [1e3, 1e-3, 0] * u.W / u.m / u.K, 1e19 * u.m ** -3)
+    >>> T = np.full(plasma.domain_shape, 1e4) * u.K
+    >>> T = solver.step(T, 1e-3 * u.s)
+    """
+
+    def __init__(self, plasma, conductivity, number_density, theta=1,
+                 boundary='periodic', preconditioner='lu', rtol=1e-8,
+                 refactor_tolerance=0.1):
+        super().__init__(plasma, theta, boundary, preconditioner, rtol,
+                         refactor_tolerance)
+        self.set_coefficients(conductivity, number_density)
+
+    def _cell_operator(self):
+        return self._gradient[:, :, np.newaxis]
+
+    def set_coefficients(self, conductivity=None, number_density=None):
+        r"""
+        Update the conductivities or density, and reassemble the operator
+        with the current direction of the plasma's ``magnetic_field``.
+
+        Parameters
+        ----------
+        conductivity : `astropy.units.Quantity`, optional
+            New (3,) or (3, x, y, z) conductivities; kept if `None`.
+        number_density : `astropy.units.Quantity`, optional
+            New number density; kept if `None`.
+        """
+        if conductivity is not None:
+            self.conductivity = self._coefficients(
+                conductivity, u.W / u.m / u.K, 'conductivity')
+        if number_density is not None:
+            density = u.Quantity(number_density, u.m ** -3).value
+            self._capacity = 1.5 * k_B.si.value * self._node_volume * \
+                np.broadcast_to(density, self.shape).ravel()
+        field = self.plasma.magnetic_field.to_value(u.T)
+        self._assemble(self._tensor(self.conductivity, field))
+
+    @u.quantity_input(dt=u.s)
+    def step(self, temperature, dt, heating=None):
+        r"""
+        Advance a temperature by one implicit time step.
+
+        Parameters
+        ----------
+        temperature : `astropy.units.Quantity`
+            (x, y, z) array of the temperature, in K or eV.
+        dt : `astropy.units.Quantity`
+            Time step.
+        heating : `astropy.units.Quantity`, optional
+            Heating power density :math:`Q`, a scalar or an (x, y, z)
+            array.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            (x, y, z) array of the new temperature in K.
+        """
+        T = temperature.to_value(u.K, equivalencies=u.temperature_energy())
+        if T.shape != self.shape:
+            raise ValueError(f"The temperature must have the grid shape "
+                             f"{self.shape}, got {T.shape}.")
+        source = None
+        if heating is not None:
+            power = u.Quantity(heating, u.W / u.m ** 3).value
+            source = np.broadcast_to(power, self.shape).ravel() * \
+                self._node_volume
+        result = self._advance(T.ravel().astype(float), dt.to_value(u.s),
+                               source)
+        return result.reshape(self.shape) * u.K
+
+
+class ResistiveDiffusion(_ImplicitDiffusion):
+    r"""
+    Implicit solver of the resistive diffusion of the magnetic field of a
+    `~plasmapy.classes.Plasma3D` with an anisotropic resistivity.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma whose uniformly spaced ``magnetic_field`` is advanced in
+        place by `step`.
+    resistivity : `astropy.units.Quantity`
+        Parallel, perpendicular and cross resistivities, with shape (3,)
+        or (3, x, y, z), as returned by
+        `~plasmapy.physics.transport.ClassicalTransport.resistivity` with
+        ``field_orientation='all'``.
+    theta, boundary, preconditioner, rtol, refactor_tolerance
+        As for `~plasmapy.simulation.AnisotropicHeatConduction`. For the
+        magnetic field, ``'zero_flux'`` walls are perfect conductors,
+        with no tangential electric field, and ``'fixed'`` walls hold the
+        field at its initial value.
+
+    Attributes
+    ----------
+    iterations : int
+        Number of Krylov iterations of the last step.
+    factorizations : int
+        Number of preconditioners built so far.
+
+    Notes
+    -----
+    The induction equation of a resistive medium at rest,
+
+    .. math::
+        \frac{\partial \vec{B}}{\partial t} = -\nabla \times \vec{E},
+        \qquad \vec{E} = \eta_\parallel \vec{J}_\parallel + \eta_\perp
+        \vec{J}_\perp + \eta_\wedge \hat{b} \times \vec{J}, \qquad
+        \vec{J} = \nabla \times \vec{B} / \mu_0,
+
+    is discretized like the heat conduction of
+    `~plasmapy.simulation.AnisotropicHeatConduction`: the current density
+    and the resistivity tensor are evaluated at the centre of each cell,
+    and the curl of the electric field is its adjoint. On periodic grids
+    the divergence of :math:`\vec{B}` at the cell centres is then
+    unchanged by the steps, up to the tolerance of the linear solves.
+
+    The direction :math:`\hat{b}` of the resistivity tensor is taken from
+    the field when the operator is assembled, at construction and by
+    each call to `set_coefficients`, and held fixed in between.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 8, endpoint=False) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> plasma.magnetic_field[2] = np.sin(2 * np.pi * x.value)[:, None, None] * u.T
+    >>> solver = ResistiveDiffusion(plasma, [1, 2, 0] * u.Ohm * u.m)
+    >>> B = solver.step(1e-7 * u.s)
+    """
+
+    n_components = 3
+
+    def __init__(self, plasma, resistivity, theta=1, boundary='periodic',
+                 preconditioner='lu', rtol=1e-8, refactor_tolerance=0.1):
+        super().__init__(plasma, theta, boundary, preconditioner, rtol,
+                         refactor_tolerance)
+        self._capacity = np.repeat(mu0.si.value * self._node_volume, 3)
+        self.set_coefficients(resistivity)
+
+    def _cell_operator(self):
+        # (curl B)_a = eps_aib d_i B_b
+        return np.einsum('aib,ip->apb', _EPSILON, self._gradient)
+
+    def set_coefficients(self, resistivity=None):
+        r"""
+        Update the resistivities, and reassemble the operator with the
+        current direction of the magnetic field.
+
+        Parameters
+        ----------
+        resistivity : `astropy.units.Quantity`, optional
+            New (3,) or (3, x, y, z) resistivities; kept if `None`.
+        """
+        if resistivity is not None:
+            self.resistivity = self._coefficients(resistivity, u.Ohm * u.m,
+                                                  'resistivity')
+        field = self.plasma.magnetic_field.to_value(u.T)
+        self._assemble(self._tensor(self.resistivity, field))
+
+    @u.quantity_input(dt=u.s)
+    def step(self, dt):
+        r"""
+        Advance the magnetic field of the plasma by one implicit time step.
+
+        Parameters
+        ----------
+        dt : `astropy.units.Quantity`
+            Time step.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            The plasma's ``magnetic_field``, updated in place.
+        """
+        field = self.plasma.magnetic_field
+        scale = field.unit.to(u.T)
+        # Unknowns are ordered with the three components of each node
+        # adjacent
+        values = np.moveaxis(field.value * scale, 0, -1).ravel()
+        result = self._advance(values, dt.to_value(u.s))
+        field.value[...] = np.moveaxis(
+            result.reshape(self.shape + (3,)), -1, 0) / scale
+        self.plasma.invalidate('magnetic_field')
+        return field
@@ -0,0 +1,455 @@
+"""
+Axisymmetric MHD equilibria from the Grad-Shafranov equation.
+"""
+import warnings
+
+import numpy as np
+from astropy import units as u
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+from plasmapy.constants import mu0
+from plasmapy.simulation.interpolation import GridInterpolator
+
+__all__ = [
+    "GradShafranovSolver",
+]
+
+
+def _profile_derivative(profile, psi_n, step=1e-6):
+    r"""Central difference of ``profile`` with respect to the normalized
+    flux, one-sided at the ends of the [0, 1] interval."""
+    upper = np.minimum(psi_n + step, 1)
+    lower = np.maximum(psi_n - step, 0)
+    return (profile(upper) - profile(lower)) / (upper - lower)
+
+
+class GradShafranovSolver:
+    r"""
+    Fixed-boundary solver of the Grad-Shafranov equation for axisymmetric
+    equilibria on a uniform (R, Z) grid.
+
+    Parameters
+    ----------
+    R : `astropy.units.Quantity`
+        Uniformly spaced, strictly positive major radii of the grid, with
+        at least three points.
+    Z : `astropy.units.Quantity`
+        Uniformly spaced heights of the grid, with at least three points.
+    pressure : callable
+        Plasma pressure :math:`p(\psi_N)` as a function of the normalized
+        poloidal flux :math:`\psi_N`, which is 0 on the magnetic axis and
+        1 on the last closed flux surface. It is called with arrays of
+        values in [0, 1] and returns pressures in Pa, either as a
+        `~astropy.units.Quantity` or as plain floats.
+    toroidal_field_function : callable
+        The function :math:`F(\psi_N) = R B_\phi` in T m, called in the
+        same way as ``pressure``.
+    boundary_flux : `astropy.units.Quantity`, optional
+        Poloidal flux per radian :math:`\psi` on the edges of the grid,
+        either a scalar or an (R, Z) array of which only the edges are
+        used. Defaults to zero.
+
+    Attributes
+    ----------
+    psi : `astropy.units.Quantity`
+        (R, Z) array of the poloidal flux per radian from the last call
+        to `solve`, or `None` before it.
+    psi_axis, psi_boundary : `astropy.units.Quantity`
+        Flux on the magnetic axis and on the last closed flux surface.
+    residuals : list of float
+        Largest change of the flux in each Picard iteration, relative to
+        ``psi_axis - psi_boundary``.
+    converged : bool
+        Whether the last call to `solve` reached its tolerance.
+
+    Notes
+    -----
+    The Grad-Shafranov equation
+
+    .. math::
+        \Delta^* \psi = R \frac{\partial}{\partial R}
+        \left(\frac{1}{R} \frac{\partial \psi}{\partial R}\right) +
+        \frac{\partial^2 \psi}{\partial Z^2} =
+        -\mu_0 R^2 \frac{dp}{d\psi} - F \frac{dF}{d\psi}
+
+    is discretized with the conservative second-order five-point stencil
+    of :math:`\Delta^*` and Dirichlet conditions on the edges of the
+    grid. This operator only depends on the grid, so it is assembled once
+    as a sparse matrix and factorized with the sparse LU decomposition of
+    SciPy; every Picard iteration then only evaluates the source of the
+    previous flux and applies the cached factors. The flux of the
+    boundary values alone is computed once as well.
+
+    The profiles are given in terms of :math:`\psi_N = (\psi -
+    \psi_{axis}) / (\psi_{boundary} - \psi_{axis})`, so their derivatives
+    with respect to :math:`\psi` scale with
+    :math:`1 / (\psi_{boundary} - \psi_{axis})`. Plain Picard iterations
+    overshoot this scale alternately up and down. Instead, each new flux
+    is rescaled so that its own :math:`\psi_{boundary} - \psi_{axis}` is
+    the one its current was computed with, after which the iterations
+    only have to settle the shape of the flux surfaces. The derivatives
+    of the profiles are taken by central differences.
+
+    The toroidal current is taken to be positive, so that the flux peaks
+    on the magnetic axis. The last closed flux surface is the largest
+    flux on the edges of the grid: for a uniform ``boundary_flux`` it is
+    the edge of the grid itself, otherwise the flux surface that first
+    touches the edge. Outside of it the pressure and :math:`F` keep their
+    values at :math:`\psi_N = 1` and no current flows.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> R = np.linspace(1, 3, 33) * u.m
+    >>> Z = np.linspace(-1, 1, 33) * u.m
+    >>> solver = GradShafranovSolver(
+    ...     R, Z, pressure=lambda psi_n: 1e4 * (1 - psi_n) * u.Pa,
+    ...     toroidal_field_function=lambda psi_n: np.full_like(psi_n, 4) * u.T * u.m)
+    >>> psi = solver.solve()
+    >>> solver.converged
+    True
+    """
+
+    @u.quantity_input(R=u.m, Z=u.m, boundary_flux=u.Wb)
+    def __init__(self, R, Z, pressure, toroidal_field_function,
+                 boundary_flux=0 * u.Wb):
+        R = np.asarray(R.to_value(u.m), dtype=float)
+        Z = np.asarray(Z.to_value(u.m), dtype=float)
+        for name, axis in (('R', R), ('Z', Z)):
+            if axis.ndim != 1 or axis.size < 3:
+                raise ValueError(f"{name} must be a 1D array of at least "
+                                 f"three points.")
+            steps = np.diff(axis)
+            if not np.all(steps > 0) or not np.allclose(steps, steps[0]):
+                raise ValueError(f"{name} must be uniformly spaced and "
+                                 f"increasing.")
+        if R[0] <= 0:
+            raise ValueError("The major radius R must be positive.")
+
+        self.R = R * u.m
+        self.Z = Z * u.m
+        self.shape = (R.size, Z.size)
+        self.pressure = pressure
+        self.toroidal_field_function = toroidal_field_function
+        self._r = R
+        self._dr = (R[-1] - R[0]) / (R.size - 1)
+        self._dz = (Z[-1] - Z[0]) / (Z.size - 1)
+        # Major radius halfway between neighbouring grid points
+        self._r_half = 0.5 * (R[1:] + R[:-1])
+
+        boundary = boundary_flux.to_value(u.Wb)
+        if np.ndim(boundary) not in (0, 2) or \
+                np.ndim(boundary) == 2 and np.shape(boundary) != self.shape:
+            raise ValueError(f"boundary_flux must be a scalar or an array of "
+                             f"shape {self.shape}.")
+        boundary = np.broadcast_to(boundary, self.shape).astype(float)
+        edges = np.concatenate([boundary[0], boundary[-1],
+                                boundary[:, 0], boundary[:, -1]])
+        self._psi_boundary = edges.max()
+
+        # The stencil is structurally symmetric, for which a minimum degree
+        # ordering of A^T + A roughly halves the fill-in of COLAMD
+        self._lu = splu(self._operator().tocsc(), permc_spec='MMD_AT_PLUS_A')
+
+        # Flux of the currents outside of the grid, from its edge values
+        self._vacuum = boundary.copy()
+        self._vacuum[1:-1, 1:-1] = 0
+        self._vacuum[1:-1, 1:-1] = self._solve_interior(
+            -self._apply(self._vacuum))
+
+        self.psi = None
+        self.psi_axis = None
+        self.psi_boundary = self._psi_boundary * u.Wb
+        self.residuals = []
+        self.converged = False
+
+    def _operator(self):
+        r"""Sparse matrix of :math:`\Delta^*` acting on the flux at the
+        interior grid points, flattened in C order."""
+        n_r, n_z = self.shape[0] - 2, self.shape[1] - 2
+        r = self._r[1:-1]
+        east = r / (self._r_half[1:] * self._dr ** 2)
+        west = r / (self._r_half[:-1] * self._dr ** 2)
+        vertical = 1 / self._dz ** 2
+
+        main = np.repeat(-east - west - 2 * vertical, n_z)
+        # No coupling across the ends of the rows of constant R
+        along_z = np.full(n_r * n_z - 1, vertical)
+        along_z[n_z - 1::n_z] = 0
+        return sparse.diags(
+            [main, along_z, along_z,
+             np.repeat(east[:-1], n_z), np.repeat(west[1:], n_z)],
+            [0, 1, -1, n_z, -n_z], format='csr')
+
+    def _apply(self, psi):
+        r""":math:`\Delta^* \psi` at the interior grid points."""
+        inner = psi[1:-1, 1:-1]
+        east = (psi[2:, 1:-1] - inner) / self._r_half[1:, np.newaxis]
+        west = (inner - psi[:-2, 1:-1]) / self._r_half[:-1, np.newaxis]
+        radial = self._r[1:-1, np.newaxis] * (east - west) / self._dr ** 2
+        vertical = (psi[1:-1, 2:] - 2 * inner + psi[1:-1, :-2]) / self._dz ** 2
+        return radial + vertical
+
+    def _solve_interior(self, rhs):
+        r"""Solve :math:`\Delta^* \psi = ` ``rhs`` at the interior points
+        with zero flux on the edges, using the cached factorization."""
+        return self._lu.solve(rhs.ravel()).reshape(rhs.shape)
+
+    def _normalized(self, psi):
+        r"""Normalized flux and :math:`\psi_{boundary} - \psi_{axis}`."""
+        delta = self._psi_boundary - psi[1:-1, 1:-1].max()
+        return (psi - psi[1:-1, 1:-1].max()) / delta, delta
+
+    def _profile(self, profile, unit, psi_n):
+        return u.Quantity(profile(psi_n), unit).value
+
+    def _source(self, psi_n):
+        r""":math:`\mu_0 R^2 dp/d\psi_N + F dF/d\psi_N` inside the last
+        closed flux surface, and zero outside."""
+        inside = psi_n <= 1
+        values = np.clip(psi_n[inside], 0, 1)
+        r = np.broadcast_to(self._r[:, np.newaxis], self.shape)[inside]
+
+        dp = _profile_derivative(
+            lambda x: self._profile(self.pressure, u.Pa, x), values)
+        F = self._profile(self.toroidal_field_function, u.T * u.m, values)
+        dF = _profile_derivative(
+            lambda x: self._profile(self.toroidal_field_function,
+                                    u.T * u.m, x), values)
+
+        source = np.zeros(self.shape)
+        source[inside] = mu0.si.value * r ** 2 * dp + F * dF
+        return source
+
+    def _scaled(self, unit_flux):
+        r"""
+        Flux of the plasma current whose source was computed for
+        :math:`\psi_{boundary} - \psi_{axis} = -1`, ``unit_flux``,
+        rescaled to the value of :math:`\psi_{axis} - \psi_{boundary}`
+        it produces itself.
+        """
+        depth = -unit_flux
+        if depth.max() <= 0:
+            raise ValueError("The pressure and toroidal field profiles do "
+                             "not drive a positive toroidal current.")
+        vacuum = self._vacuum[1:-1, 1:-1] - self._psi_boundary
+        # Newton iterations for scale * (psi_axis - psi_b) = 1, exact at
+        # once for a uniform boundary flux
+        scale = 1 / np.sqrt(depth.max())
+        for _ in range(50):
+            total = vacuum + scale * depth
+            peak = np.argmax(total)
+            excess = total.flat[peak]
+            step = (scale * excess - 1) / (excess + scale * depth.flat[peak])
+            scale -= step
+            if abs(step) <= 1e-14 * scale:
+                break
+        psi = self._vacuum.copy()
+        psi[1:-1, 1:-1] += scale * depth
+        return psi
+
+    def _iterate(self, psi_n):
+        r"""Flux of the current of the profiles at the normalized flux
+        ``psi_n``, with a consistent normalization."""
+        return self._scaled(self._solve_interior(
+            -self._source(psi_n)[1:-1, 1:-1]))
+
+    def solve(self, max_iterations=100, tolerance=1e-8, relaxation=1):
+        r"""
+        Find the equilibrium flux with Picard iterations.
+
+        Parameters
+        ----------
+        max_iterations : int
+            Largest number of Picard iterations.
+        tolerance : float
+            The iterations stop once the largest change of the flux is
+            below this fraction of ``psi_axis - psi_boundary``.
+        relaxation : float
+            Weight of each new iterate, between 0 and 1, against the
+            previous one. Values below 1 damp iterations that oscillate.
+            Iterations continue from the flux of the last call, if any.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            (R, Z) array of the poloidal flux per radian, also stored as
+            `psi`. A warning is issued if the iterations did not converge.
+        """
+        if not 0 < relaxation <= 1:
+            raise ValueError("relaxation must be in (0, 1].")
+        if self.psi is None:
+            # Start from a flux function peaked in the middle of the grid
+            x = np.linspace(0, np.pi, self.shape[0])[:, np.newaxis]
+            y = np.linspace(0, np.pi, self.shape[1])[np.newaxis, :]
+            psi = self._iterate(1 - np.sin(x) * np.sin(y))
+        else:
+            psi = self.psi.to_value(u.Wb)
+
+        self.residuals = []
+        self.converged = False
+        for _ in range(max_iterations):
+            psi_n, delta = self._normalized(psi)
+            new = self._iterate(psi_n)
+            change = np.abs(new - psi).max() / abs(delta)
+            psi = relaxation * new + (1 - relaxation) * psi
+            self.residuals.append(change)
+            if change < tolerance:
+                self.converged = True
+                break
+        else:
+            warnings.warn(f"The Grad-Shafranov iterations did not converge "
+                          f"within {max_iterations} iterations; the last "
+                          f"relative change was {change:.3g}.",
+                          RuntimeWarning)
+
+        self.psi = psi * u.Wb
+        self.psi_axis = psi[1:-1, 1:-1].max() * u.Wb
+        return self.psi
+
+    def _require_solution(self):
+        if self.psi is None:
+            raise ValueError("Call solve() before evaluating the "
+                             "equilibrium.")
+        return self.psi.to_value(u.Wb)
+
+    @property
+    def normalized_flux(self):
+        r"""(R, Z) array of :math:`\psi_N`, which exceeds 1 outside of the
+        last closed flux surface."""
+        psi_n, _ = self._normalized(self._require_solution())
+        return psi_n
+
+    @property
+    def magnetic_axis(self):
+        r"""
+        Position (R, Z) of the magnetic axis as a
+        `~astropy.units.Quantity`, refined between the grid points with a
+        parabola through the largest flux and its neighbours.
+        """
+        psi = self._require_solution()
+        i, j = np.unravel_index(np.argmax(psi[1:-1, 1:-1]),
+                                (self.shape[0] - 2, self.shape[1] - 2))
+        i, j = i + 1, j + 1
+        z = self.Z.to_value(u.m)
+        position = []
+        for coordinate, spacing, (lower, centre, upper) in (
+                (self._r[i], self._dr, psi[i - 1:i + 2, j]),
+                (z[j], self._dz, psi[i, j - 1:j + 2])):
+            curvature = lower - 2 * centre + upper
+            offset = 0.5 * (lower - upper) / curvature if curvature else 0
+            position.append(coordinate + offset * spacing)
+        return position * u.m
+
+    def _fields(self, psi):
+        r"""(R, Z) arrays of :math:`B_R`, :math:`B_\phi`, :math:`B_Z` and
+        :math:`p` in SI units."""
+        psi_n, _ = self._normalized(psi)
+        values = np.clip(psi_n, 0, 1)
+        d_r, d_z = np.gradient(psi, self._dr, self._dz, edge_order=2)
+        r = self._r[:, np.newaxis]
+        F = self._profile(self.toroidal_field_function, u.T * u.m, values)
+        p = self._profile(self.pressure, u.Pa, values)
+        return -d_z / r, F / r, d_r / r, p
+
+    def magnetic_field(self):
+        r"""
+        Magnetic field of the equilibrium on the (R, Z) grid.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            (3, R, Z) array of the components :math:`B_R`,
+            :math:`B_\phi` and :math:`B_Z`, with
+            :math:`B_R = -\partial_Z \psi / R`,
+            :math:`B_Z = \partial_R \psi / R` and :math:`B_\phi = F / R`.
+        """
+        B_R, B_phi, B_Z, _ = self._fields(self._require_solution())
+        return np.stack([B_R, B_phi, B_Z]) * u.T
+
+    def pressure_map(self):
+        r"""(R, Z) array of the plasma pressure of the equilibrium."""
+        return self._fields(self._require_solution())[3] * u.Pa
+
+    def current_density(self):
+        r"""
+        (R, Z) array of the toroidal current density
+        :math:`J_\phi = R\, dp/d\psi + F\, dF/d\psi / (\mu_0 R)`.
+        """
+        psi_n, delta = self._normalized(self._require_solution())
+        r = self._r[:, np.newaxis]
+        J = self._source(psi_n) / (delta * mu0.si.value * r)
+        return J * u.A / u.m ** 2
+
+    @property
+    def plasma_current(self):
+        r"""Total toroidal current of the equilibrium, integrated with the
+        trapezoidal rule."""
+        J = self.current_density().to_value(u.A / u.m ** 2)
+        current = np.trapz(np.trapz(J, dx=self._dz), dx=self._dr)
+        return current * u.A
+
+    def to_plasma(self, plasma):
+        r"""
+        Write the equilibrium into the Cartesian grid of a
+        `~plasmapy.classes.Plasma3D`, with the z-axis as axis of symmetry.
+
+        Parameters
+        ----------
+        plasma : `~plasmapy.classes.Plasma3D`
+            plasma whose ``magnetic_field`` and ``pressure`` are
+            overwritten in place. Every grid point must lie within the
+            (R, Z) grid of the solver.
+
+        Returns
+        -------
+        `~plasmapy.classes.Plasma3D`
+            The same plasma.
+
+        Notes
+        -----
+        :math:`B_R`, :math:`B_Z`, :math:`F` and :math:`p` are
+        interpolated bilinearly from the (R, Z) grid, and the field is
+        rotated into Cartesian components with
+        :math:`\phi = \arctan(y / x)`. The grid is filled one x-plane at a
+        time, so memory-mapped fields are supported.
+        """
+        B_R, B_phi, B_Z, p = self._fields(self._require_solution())
+        F = B_phi * self._r[:, np.newaxis]
+        values = np.stack([B_R, B_Z, F, p])[..., np.newaxis]
+        interpolator = GridInterpolator(
+            (self._r, self.Z.to_value(u.m), np.zeros(1)), values)
+
+        x = plasma.x.to_value(u.m)
+        y = plasma.y.to_value(u.m)[:, np.newaxis]
+        z = plasma.z.to_value(u.m)[np.newaxis, :]
+        r_min, r_max = self._r[0], self._r[-1]
+        z_min, z_max = self.Z.to_value(u.m)[[0, -1]]
+        radius = np.hypot(x[:, np.newaxis], y[:, 0])
+        if radius.min() < r_min or radius.max() > r_max or \
+                z.min() < z_min or z.max() > z_max:
+            raise ValueError("The plasma grid extends beyond the (R, Z) "
+                             "grid of the equilibrium.")
+
+        field = plasma.magnetic_field
+        pressure = plasma.pressure
+        field_scale = u.T.to(field.unit)
+        pressure_scale = u.Pa.to(pressure.unit)
+        shape = plasma.domain_shape[1:]
+        for index, x_plane in enumerate(x):
+            r = np.broadcast_to(np.hypot(x_plane, y), shape)
+            points = np.stack([r.ravel(),
+                               np.broadcast_to(z, shape).ravel(),
+                               np.zeros(r.size)], axis=1)
+            b_r, b_z, f, plane_pressure = interpolator(points).T.reshape(
+                (4,) + shape)
+            cos = x_plane / r
+            sin = y / r
+            b_phi = f / r
+            field.value[0, index] = field_scale * (b_r * cos - b_phi * sin)
+            field.value[1, index] = field_scale * (b_r * sin + b_phi * cos)
+            field.value[2, index] = field_scale * b_z
+            pressure.value[index] = pressure_scale * plane_pressure
+        plasma.invalidate('magnetic_field', 'pressure')
+        return plasma
@@ -0,0 +1,342 @@
+"""
+Guiding-centre orbit integration for strongly magnetized particles.
+"""
+import numpy as np
+from astropy import units as u
+
+from plasmapy.atomic import atomic
+from plasmapy.constants import e
+from plasmapy.simulation.interpolation import GridInterpolator
+
+__all__ = [
+    "GuidingCenter",
+]
+
+# Dormand-Prince 5(4) coefficients
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_B5 = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784,
+                   11 / 84, 0])
+_DP_B4 = np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640,
+                   -92097 / 339200, 187 / 2100, 1 / 40])
+_DP_E = _DP_B5 - _DP_B4
+
+
+def _grid_gradient(f, axes):
+    r"""Gradient of a scalar grid function, with zero derivative along
+    singleton axes. Returns an array of shape (3, nx, ny, nz)."""
+
+    grad = np.zeros((3, *f.shape))
+    for dim, axis in enumerate(axes):
+        if axis.size > 1:
+            grad[dim] = np.gradient(f, axis, axis=dim)
+    return grad
+
+
+def _dormand_prince_step(rhs, y, h):
+    r"""
+    Take a single embedded Runge-Kutta 5(4) step for a batch of
+    independent systems.
+
+    Parameters
+    ----------
+    rhs : callable
+        Function mapping an (n, m) state array to its (n, m) time
+        derivative.
+    y : ndarray
+        Array of shape (n, m) of current states.
+    h : ndarray
+        Array of shape (n,) of step sizes, one per system.
+
+    Returns
+    -------
+    y_new : ndarray
+        The fifth order solution after the step.
+    error : ndarray
+        The difference between the fifth and fourth order solutions,
+        used for step size control.
+    """
+    h = h[:, np.newaxis]
+    k = []
+    for stage in range(7):
+        y_stage = y.copy()
+        for coeff, k_j in zip(_DP_A[stage], k):
+            if coeff:
+                y_stage += h * coeff * k_j
+        k.append(rhs(y_stage))
+
+    y_new = y + h * sum(b * k_j for b, k_j in zip(_DP_B5, k) if b)
+    error = h * sum(c * k_j for c, k_j in zip(_DP_E, k) if c)
+    return y_new, error
+
+
+class GuidingCenter:
+    r"""
+    Object representing a group of strongly magnetized particles
+    followed through their guiding-centre motion.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma from which fields can be pulled. The magnetic field must
+        be non-zero everywhere on the grid.
+    particle_type : str
+        particle type. See `plasmapy.atomic.atomic` for suitable arguments.
+        The default is a proton.
+    n_particles : int
+        number of particles. The default is a single particle.
+    scaling : float
+        number of particles represented by each macroparticle.
+    dt : `astropy.units.Quantity`
+        interval between saved outputs. The integrator chooses its own
+        internal step sizes.
+    nt : int
+        number of saved outputs.
+    rtol : float
+        relative error tolerance of the adaptive step controller.
+    atol : tuple of float, optional
+        absolute error tolerances for the position (in m) and parallel
+        velocity (in m/s). By default these are ``rtol`` times the domain
+        extent and ``rtol`` times 1 m/s respectively.
+
+    Attributes
+    ----------
+    x : `astropy.units.Quantity`
+        Current guiding-centre positions, shape (n, 3).
+    v_parallel : `astropy.units.Quantity`
+        Current velocity parallel to the magnetic field, shape (n,).
+    mu : `astropy.units.Quantity`
+        Magnetic moment of each particle, shape (n,). This is an adiabatic
+        invariant and remains constant.
+    position_history : `astropy.units.Quantity`
+        History of positions, shape (nt, n, 3).
+    v_parallel_history : `astropy.units.Quantity`
+        History of parallel velocities, shape (nt, n).
+    lost : ndarray
+        Boolean array marking particles that left the domain. These are
+        no longer advanced.
+    n_steps : int
+        Total number of accepted particle steps taken so far.
+
+    Notes
+    -----
+    The guiding centre moves with the drift velocity [1]_
+
+    .. math::
+        \dot{\vec{R}} = v_\parallel \hat{b}
+        + \frac{\vec{E} \times \hat{b}}{B}
+        + \frac{\mu}{q B} \hat{b} \times \nabla B
+        + \frac{m v_\parallel^2}{q B} \hat{b} \times \vec{\kappa}
+
+    with curvature :math:`\vec{\kappa} = (\hat{b} \cdot \nabla) \hat{b}`,
+    while the parallel velocity evolves as
+
+    .. math::
+        m \dot{v}_\parallel = q \vec{E} \cdot \hat{b}
+        - \mu \hat{b} \cdot \nabla B
+
+    All field quantities, including the gradients, are computed once on
+    the grid and interpolated together at every stage of the embedded
+    Dormand-Prince Runge-Kutta integrator. Every particle carries its own
+    adaptive step size, so the integration follows the drift time scale
+    rather than the gyroperiod.
+
+    References
+    ----------
+    .. [1] T. G. Northrop, "The Adiabatic Motion of Charged Particles",
+           Interscience, 1963
+
+    """
+    @u.quantity_input(dt=u.s)
+    def __init__(self, plasma, particle_type='p', n_particles=1, scaling=1,
+                 dt=np.inf * u.s, nt=np.inf, rtol=1e-6, atol=None):
+
+        if np.isinf(dt) and np.isinf(nt):  # coveralls: ignore
+            raise ValueError("Both dt and nt are infinite.")
+
+        self.q = atomic.integer_charge(particle_type) * e.si
+        self.m = atomic.particle_mass(particle_type)
+        self.N = int(n_particles)
+        self.scaling = scaling
+        self.eff_q = self.q * scaling
+        self.eff_m = self.m * scaling
+        self.name = particle_type
+
+        self.plasma = plasma
+
+        self.dt = dt
+        self.NT = int(nt)
+        self.t = np.arange(nt) * dt
+
+        self.x = np.zeros((self.N, 3)) * u.m
+        self.v_parallel = np.zeros(self.N) * u.m / u.s
+        self.mu = np.zeros(self.N) * u.J / u.T
+        self.lost = np.zeros(self.N, dtype=bool)
+        self.n_steps = 0
+
+        self.position_history = np.zeros((self.NT, self.N, 3)) * u.m
+        self.v_parallel_history = np.zeros((self.NT, self.N)) * u.m / u.s
+
+        axes = (plasma.x.si.value, plasma.y.si.value, plasma.z.si.value)
+        extent = max(axis[-1] - axis[0] for axis in axes)
+        self.rtol = rtol
+        if atol is None:
+            atol = (rtol * extent, rtol * 1.0)
+        self._atol = np.array([atol[0]] * 3 + [atol[1]])
+
+        self._fields = GridInterpolator(axes, self._drift_fields(axes),
+                                        fill_value=np.nan)
+        self._h = np.full(self.N, self.dt.si.value)
+
+    def _drift_fields(self, axes):
+        r"""Stack the electric field, unit vector, field strength, its
+        gradient and the field line curvature into a single
+        (13, nx, ny, nz) array."""
+
+        B = self.plasma.magnetic_field.to(u.T).value
+        E = self.plasma.electric_field.to(u.V / u.m).value
+
+        B_mag = np.sqrt(np.sum(B * B, axis=0))
+        if np.any(B_mag == 0):
+            raise ValueError("The guiding-centre approximation requires a "
+                             "non-zero magnetic field everywhere.")
+        b = B / B_mag
+
+        grad_B = _grid_gradient(B_mag, axes)
+
+        # kappa_i = b_j d_j b_i
+        curvature = np.zeros_like(b)
+        for i in range(3):
+            curvature[i] = np.sum(b * _grid_gradient(b[i], axes), axis=0)
+
+        return np.concatenate([E, b, B_mag[np.newaxis], grad_B, curvature])
+
+    def set_velocity(self, v):
+        r"""
+        Initialize the parallel velocity and magnetic moment of every
+        particle from full velocity vectors at the current positions.
+
+        Parameters
+        ----------
+        v : `astropy.units.Quantity`
+            Array of shape (n, 3) of particle velocities.
+        """
+        v = v.to(u.m / u.s).value
+        fields = self._fields(self.x.si.value)
+        b, B_mag = fields[:, 3:6], fields[:, 6]
+        b = b / np.linalg.norm(b, axis=1, keepdims=True)
+
+        v_par = np.sum(v * b, axis=1)
+        v_perp_sq = np.sum(v * v, axis=1) - v_par ** 2
+
+        self.v_parallel = v_par * u.m / u.s
+        self.mu = (0.5 * self.m.si.value * v_perp_sq / B_mag) * u.J / u.T
+
+    def _rhs(self, q, m, mu):
+        def rhs(y):
+            fields = self._fields(y[:, :3])
+            E, b = fields[:, 0:3], fields[:, 3:6]
+            B_mag, grad_B, curvature = (fields[:, 6], fields[:, 7:10],
+                                        fields[:, 10:13])
+            b = b / np.linalg.norm(b, axis=1, keepdims=True)
+            v_par = y[:, 3]
+
+            qB = (q * B_mag)[:, np.newaxis]
+            dx = (v_par[:, np.newaxis] * b
+                  + np.cross(E, b) / B_mag[:, np.newaxis]
+                  + mu[:, np.newaxis] / qB * np.cross(b, grad_B)
+                  + (m * v_par ** 2)[:, np.newaxis] / qB
+                  * np.cross(b, curvature))
+            dv = (q * np.sum(E * b, axis=1)
+                  - mu * np.sum(b * grad_B, axis=1)) / m
+            return np.concatenate([dx, dv[:, np.newaxis]], axis=1)
+        return rhs
+
+    def advance(self, duration):
+        r"""
+        Advance every particle that is still within the domain by the
+        given time.
+
+        Parameters
+        ----------
+        duration : `astropy.units.Quantity`
+            Time interval to integrate over.
+        """
+        q, m = self.q.si.value, self.m.si.value
+        t_end = duration.to(u.s).value
+        h_min = 1e-12 * max(t_end, self.dt.si.value)
+
+        y = np.concatenate([self.x.si.value,
+                            self.v_parallel.si.value[:, np.newaxis]], axis=1)
+        mu = self.mu.si.value
+        t = np.zeros(self.N)
+
+        while True:
+            active = np.flatnonzero(~self.lost & (t < t_end))
+            if active.size == 0:
+                break
+
+            h = np.minimum(self._h[active], t_end - t[active])
+            y_new, error = _dormand_prince_step(self._rhs(q, m, mu[active]),
+                                               y[active], h)
+
+            scale = self._atol + self.rtol * np.maximum(np.abs(y[active]),
+                                                        np.abs(y_new))
+            err = np.sqrt(np.mean((error / scale) ** 2, axis=1))
+            # Steps that leave the grid produce NaN and are retried with a
+            # smaller step until the particle is pinned at the boundary.
+            outside = np.isnan(err)
+            err[outside] = np.inf
+            accept = err <= 1
+
+            accepted = active[accept]
+            y[accepted] = y_new[accept]
+            t[accepted] += h[accept]
+            self.n_steps += accepted.size
+
+            with np.errstate(divide='ignore'):
+                factor = np.clip(0.9 * err ** -0.2, 0.2, 5.0)
+            h_next = h * factor
+            # A step shortened to land on t_end says nothing about the
+            # step size the particle could otherwise sustain.
+            truncated = accept & (h < self._h[active])
+            h_next[truncated] = np.maximum(h_next[truncated],
+                                           self._h[active][truncated])
+            self._h[active] = h_next
+
+            self.lost[active[outside & (h_next < h_min)]] = True
+
+        self.x = y[:, :3] * u.m
+        self.v_parallel = y[:, 3] * u.m / u.s
+
+    def run(self):
+        r"""
+        Runs a simulation instance, saving the state every ``dt``.
+        """
+        self.position_history[0] = self.x
+        self.v_parallel_history[0] = self.v_parallel
+        for i in range(1, self.NT):
+            self.advance(self.dt)
+            self.position_history[i] = self.x
+            self.v_parallel_history[i] = self.v_parallel
+
+    @property
+    def kinetic_energy(self):
+        r"""
+        Kinetic energy of each particle,
+        :math:`\frac{1}{2} m v_\parallel^2 + \mu B`.
+        """
+        B_mag = self._fields(self.x.si.value)[:, 6] * u.T
+        return (0.5 * self.m * self.v_parallel ** 2 +
+                self.mu * B_mag).to(u.J)
+
+    def __repr__(self, *args, **kwargs):
+        return f"GuidingCenter(q={self.q:.4e},m={self.m:.4e},N={self.N}," \
+               f"name=\"{self.name}\",NT={self.NT})"
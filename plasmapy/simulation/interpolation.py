@@ -0,0 +1,266 @@
+"""
+Fast interpolation of gridded fields at arbitrary particle positions.
+"""
+import numpy as np
+
+__all__ = [
+    "GridInterpolator",
+]
+
+
+class GridInterpolator:
+    r"""
+    Trilinear interpolation of one or several fields defined on a
+    rectilinear grid.
+
+    Parameters
+    ----------
+    axes : tuple of ndarray
+        The three 1D coordinate arrays of the grid, as plain floats
+        (usually in SI units). Each must be strictly increasing.
+    values : ndarray
+        Array of shape (..., nx, ny, nz) holding the field values at
+        every grid point. All leading axes are treated as components
+        which are interpolated together.
+    fill_value : float or None, optional
+        Value returned for positions outside of the grid. If `None`
+        (the default) a `ValueError` is raised instead.
+    periodic : bool or sequence of bool, optional
+        Whether each axis is periodic, with a period of the number of
+        grid points times the spacing as in
+        `~plasmapy.simulation.deposition.deposit`. Positions along a
+        periodic axis are wrapped into the grid, and between the last
+        grid point and the period are interpolated towards the first
+        one. Periodic axes must be uniformly spaced.
+
+    Notes
+    -----
+    The cell search and the interpolation weights are computed once per
+    call and shared between all components, so stacking several fields
+    into ``values`` is considerably cheaper than interpolating each of
+    them separately. On uniformly spaced axes the cell index is computed
+    arithmetically instead of with a binary search.
+
+    Axes of length 1 are treated as invariant directions: every position
+    along such an axis is considered to lie within the grid and receives
+    the value of the single grid plane.
+
+    """
+
+    def __init__(self, axes, values, fill_value=None, periodic=False):
+        if len(axes) != 3:
+            raise ValueError("Exactly three coordinate axes are required.")
+
+        self.axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+        self.shape = tuple(axis.size for axis in self.axes)
+
+        values = np.asarray(values)
+        if values.shape[-3:] != self.shape:
+            raise ValueError(f"Shape of values {values.shape} does not "
+                             f"match the grid shape {self.shape}.")
+
+        self.component_shape = values.shape[:-3]
+        n_cells = np.prod(self.shape, dtype=int)
+        # Vector fields stored as (x, y, z, 3) and passed in as a
+        # transposed view are used in that layout instead of being copied
+        self._component_last = values.ndim == 4 and \
+            not values.flags.c_contiguous and \
+            np.moveaxis(values, 0, -1).flags.c_contiguous
+        if self._component_last:
+            self._values = np.moveaxis(values, 0, -1).reshape(n_cells, -1)
+        else:
+            # One row per component; this only copies if the input is
+            # not contiguous in its grid dimensions.
+            self._values = values.reshape(-1, n_cells)
+        self.fill_value = fill_value
+
+        self._uniform = []
+        for axis in self.axes:
+            if axis.size > 1:
+                steps = np.diff(axis)
+                if np.any(steps <= 0):
+                    raise ValueError("Grid axes must be strictly increasing.")
+                self._uniform.append(np.allclose(steps, steps[0]))
+            else:
+                self._uniform.append(True)
+
+        if np.ndim(periodic) == 0:
+            periodic = (periodic,) * 3
+        self.periodic = tuple(bool(p) and axis.size > 1
+                              for p, axis in zip(periodic, self.axes))
+        if any(p and not uniform
+               for p, uniform in zip(self.periodic, self._uniform)):
+            raise ValueError("Periodic axes must be uniformly spaced.")
+
+        nx, ny, nz = self.shape
+        self._strides = (ny * nz, nz, 1)
+
+    def _locate_axis(self, dim, coords):
+        axis = self.axes[dim]
+        n = axis.size
+
+        if n == 1:
+            idx = np.zeros(coords.shape, dtype=np.intp)
+            frac = np.zeros(coords.shape)
+            return idx, frac
+
+        if self._uniform[dim]:
+            step = (axis[-1] - axis[0]) / (n - 1)
+            scaled = (coords - axis[0]) / step
+            if self.periodic[dim]:
+                scaled -= n * np.floor(scaled / n)
+            # Positions outside the grid (or NaN) are clipped here and
+            # handled by the caller through `contains`
+            with np.errstate(invalid='ignore'):
+                idx = np.floor(scaled).astype(np.intp)
+            np.clip(idx, 0, n - 1 if self.periodic[dim] else n - 2, out=idx)
+            frac = scaled - idx
+        else:
+            idx = np.searchsorted(axis, coords, side='right') - 1
+            np.clip(idx, 0, n - 2, out=idx)
+            lower = axis[idx]
+            frac = (coords - lower) / (axis[idx + 1] - lower)
+
+        return idx, frac
+
+    def contains(self, points):
+        r"""
+        Check which positions lie within the grid.
+
+        Parameters
+        ----------
+        points : ndarray
+            Array of shape (n, 3) of positions.
+
+        Returns
+        -------
+        ndarray
+            Boolean array of shape (n,).
+        """
+        points = np.asarray(points, dtype=float)
+        inside = np.ones(points.shape[0], dtype=bool)
+        for dim, axis in enumerate(self.axes):
+            coords = points[:, dim]
+            if self.periodic[dim]:
+                inside &= np.isfinite(coords)
+            elif axis.size > 1:
+                inside &= (coords >= axis[0]) & (coords <= axis[-1])
+        return inside
+
+    def locate(self, points):
+        r"""
+        Find the lower grid index and fractional cell offset of each
+        position.
+
+        Parameters
+        ----------
+        points : ndarray
+            Array of shape (n, 3) of positions.
+
+        Returns
+        -------
+        indices : ndarray
+            Integer array of shape (n, 3) of lower corner indices.
+        fractions : ndarray
+            Array of shape (n, 3) of offsets within the cell, between 0
+            and 1 for positions inside the grid.
+        """
+        points = np.asarray(points, dtype=float)
+        located = [self._locate_axis(dim, points[:, dim]) for dim in range(3)]
+        indices = np.stack([idx for idx, _ in located], axis=1)
+        fractions = np.stack([frac for _, frac in located], axis=1)
+        return indices, fractions
+
+    def __call__(self, points):
+        r"""
+        Interpolate the fields at the given positions.
+
+        Parameters
+        ----------
+        points : ndarray
+            Array of shape (n, 3) of positions.
+
+        Returns
+        -------
+        ndarray
+            Array of shape (n, ...) where the trailing dimensions are the
+            component dimensions of the interpolated ``values``.
+        """
+        points = np.asarray(points, dtype=float)
+        n = points.shape[0]
+
+        base = np.zeros(n, dtype=np.intp)
+        weights = []
+        offsets = []
+        for dim in range(3):
+            idx, frac = self._locate_axis(dim, points[:, dim])
+            base += idx * self._strides[dim]
+            weights.append((1 - frac, frac))
+            # Singleton axes have no upper neighbour to interpolate with,
+            # and the last point of a periodic axis has the first one
+            if self.periodic[dim]:
+                last = idx == self.shape[dim] - 1
+                offsets.append(self._strides[dim] *
+                               (1 - self.shape[dim] * last))
+            else:
+                offsets.append(self._strides[dim] if self.shape[dim] > 1
+                               else 0)
+
+        if self._component_last:
+            result = np.zeros((n, self._values.shape[1]),
+                              dtype=self._values.dtype)
+        else:
+            result = np.zeros((self._values.shape[0], n),
+                              dtype=self._values.dtype)
+        for i in (0, 1):
+            for j in (0, 1):
+                for k in (0, 1):
+                    w = weights[0][i] * weights[1][j] * weights[2][k]
+                    corner = base + i * offsets[0] + j * offsets[1] + \
+                        k * offsets[2]
+                    if self._component_last:
+                        result += w[:, np.newaxis] * self._values[corner]
+                    else:
+                        result += w * self._values[:, corner]
+        if not self._component_last:
+            result = result.T
+
+        inside = self.contains(points)
+        if not inside.all():
+            if self.fill_value is None:
+                raise ValueError("One of the requested positions is out of "
+                                 "bounds of the grid.")
+            result[~inside] = self.fill_value
+
+        return result.reshape(n, *self.component_shape)
+
+
+def _uniform_grid(axes):
+    r"""
+    Return the origin and spacing of each axis of a uniform grid.
+
+    Parameters
+    ----------
+    axes : tuple of ndarray
+        The three 1D coordinate arrays of the grid, as plain floats.
+
+    Returns
+    -------
+    origin, spacing : ndarray
+        Arrays of shape (3,). Singleton axes are given unit spacing.
+
+    Raises
+    ------
+    ValueError
+        If any axis is not uniformly spaced.
+    """
+    origin = np.array([axis[0] for axis in axes], dtype=float)
+    spacing = np.ones(3)
+    for dim, axis in enumerate(axes):
+        if axis.size > 1:
+            steps = np.diff(axis)
+            if not np.allclose(steps, steps[0]):
+                raise ValueError("This operation requires a uniformly "
+                                 "spaced grid.")
+            spacing[dim] = (axis[-1] - axis[0]) / (axis.size - 1)
+    return origin, spacing
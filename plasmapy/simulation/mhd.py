@@ -0,0 +1,609 @@
+"""
+Finite-volume solver of the ideal MHD equations on Plasma3D grids.
+"""
+import time
+
+import numpy as np
+from astropy import units as u
+
+from plasmapy.constants import mu0
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "IdealMHD",
+]
+
+RIEMANN_SOLVERS = ("HLL", "HLLD")
+LIMITERS = ("minmod", "MC")
+
+#: Number of ghost cells needed by the reconstruction
+_GHOSTS = 2
+
+#: Ordering of the conserved and primitive variables along the first axis
+#: of the work arrays; the pressure takes the place of the energy
+_RHO, _MOMENTUM, _ENERGY, _B, _PSI = 0, 1, 4, 5, 8
+_N_VARIABLES = 9
+
+_STAGES = ("primitives", "reconstruction", "riemann", "update", "time_step")
+
+
+def _limited_slope(left, right, limiter, out, scratch):
+    r"""Limited difference of cells from their backward and forward
+    differences, written into ``out``."""
+    slope = np.abs(left, out=out)
+    np.minimum(slope, np.abs(right, out=scratch), out=slope)
+    if limiter != "minmod":
+        # Monotonized central: the smallest of the central difference and
+        # twice the one-sided differences
+        slope *= 2
+        np.add(left, right, out=scratch)
+        np.abs(scratch, out=scratch)
+        scratch *= 0.5
+        np.minimum(slope, scratch, out=slope)
+    np.copysign(slope, np.add(left, right, out=scratch), out=slope)
+    slope *= np.multiply(left, right, out=scratch) > 0
+    return slope
+
+
+def _fast_speed(rho, p, bn, b2, gamma):
+    r"""Fast magnetosonic speed along the normal in units where the
+    magnetic pressure is :math:`b^2 / 2`."""
+    a2 = gamma * p / rho
+    total = a2 + b2 / rho
+    return np.sqrt(0.5 * (total + np.sqrt(np.maximum(
+        total ** 2 - 4 * a2 * bn ** 2 / rho, 0))))
+
+
+def _conserved(rho, un, ut, uw, p, bn, bt, bw, gamma):
+    r"""Conserved variables and total pressure of a state in the frame of
+    the interface, without the normal field."""
+    b2 = bn ** 2 + bt ** 2 + bw ** 2
+    energy = p / (gamma - 1) + 0.5 * rho * (un ** 2 + ut ** 2 + uw ** 2) \
+        + 0.5 * b2
+    return [rho, rho * un, rho * ut, rho * uw, energy, bt, bw], p + 0.5 * b2
+
+
+def _flux(state, conserved, pt):
+    r"""Ideal MHD flux normal to the interface, without the normal field."""
+    rho, un, ut, uw, p, bn, bt, bw = state
+    energy = conserved[4]
+    vb = un * bn + ut * bt + uw * bw
+    return [rho * un,
+            rho * un ** 2 + pt - bn ** 2,
+            rho * un * ut - bn * bt,
+            rho * un * uw - bn * bw,
+            (energy + pt) * un - bn * vb,
+            bt * un - bn * ut,
+            bw * un - bn * uw]
+
+
+def _hll(left, right, gamma):
+    r"""HLL flux with the wave speed estimates of Davis."""
+    UL, ptL = _conserved(*left, gamma)
+    UR, ptR = _conserved(*right, gamma)
+    FL, FR = _flux(left, UL, ptL), _flux(right, UR, ptR)
+
+    cfL = _fast_speed(left[0], left[4], left[5], 2 * (ptL - left[4]), gamma)
+    cfR = _fast_speed(right[0], right[4], right[5], 2 * (ptR - right[4]),
+                      gamma)
+    SL = np.minimum(np.minimum(left[1] - cfL, right[1] - cfR), 0)
+    SR = np.maximum(np.maximum(left[1] + cfL, right[1] + cfR), 0)
+
+    inverse = 1 / (SR - SL)
+    return [(SR * fl - SL * fr + SL * SR * (ur - ul)) * inverse
+            for fl, fr, ul, ur in zip(FL, FR, UL, UR)]
+
+
+def _hlld(left, right, gamma):
+    r"""HLLD flux of Miyoshi & Kusano (2005), resolving the fast, Alfvén
+    and contact waves."""
+    UL, ptL = _conserved(*left, gamma)
+    UR, ptR = _conserved(*right, gamma)
+    FL, FR = _flux(left, UL, ptL), _flux(right, UR, ptR)
+    rhoL, uL = left[0], left[1]
+    rhoR, uR = right[0], right[1]
+    bn = left[5]
+
+    cfL = _fast_speed(rhoL, left[4], bn, 2 * (ptL - left[4]), gamma)
+    cfR = _fast_speed(rhoR, right[4], bn, 2 * (ptR - right[4]), gamma)
+    cf = np.maximum(cfL, cfR)
+    SL = np.minimum(uL, uR) - cf
+    SR = np.maximum(uL, uR) + cf
+
+    dL = (SL - uL) * rhoL
+    dR = (SR - uR) * rhoR
+    SM = (dR * uR - dL * uL - ptR + ptL) / (dR - dL)
+    pt = (dR * ptL - dL * ptR + dL * dR * (uR - uL)) / (dR - dL)
+    bn2 = bn ** 2
+
+    def star(state, U, pt_side, S, d):
+        rho, un, ut, uw, _, _, bt, bw = state
+        rho_star = d / (S - SM)
+        denominator = d * (S - SM) - bn2
+        degenerate = np.abs(denominator) < 1e-8 * (np.abs(d * (S - SM)) +
+                                                   bn2 + 1e-300)
+        denominator = np.where(degenerate, 1, denominator)
+        tangential = (SM - un) / denominator * bn
+        field = (d * (S - un) - bn2) / denominator
+        ut_star = np.where(degenerate, ut, ut - bt * tangential)
+        uw_star = np.where(degenerate, uw, uw - bw * tangential)
+        bt_star = np.where(degenerate, bt, bt * field)
+        bw_star = np.where(degenerate, bw, bw * field)
+        vb = un * bn + ut * bt + uw * bw
+        vb_star = SM * bn + ut_star * bt_star + uw_star * bw_star
+        energy = ((S - un) * U[4] - pt_side * un + pt * SM +
+                  bn * (vb - vb_star)) / (S - SM)
+        return (rho_star, ut_star, uw_star, bt_star, bw_star), \
+            [rho_star, rho_star * SM, rho_star * ut_star,
+             rho_star * uw_star, energy, bt_star, bw_star]
+
+    (rhoL_s, utL_s, uwL_s, btL_s, bwL_s), UL_s = star(left, UL, ptL, SL, dL)
+    (rhoR_s, utR_s, uwR_s, btR_s, bwR_s), UR_s = star(right, UR, ptR, SR, dR)
+
+    sqrtL, sqrtR = np.sqrt(rhoL_s), np.sqrt(rhoR_s)
+    sign = np.sign(bn)
+    SL_s = SM - np.abs(bn) / sqrtL
+    SR_s = SM + np.abs(bn) / sqrtR
+
+    inverse = 1 / (sqrtL + sqrtR)
+    ut_ss = (sqrtL * utL_s + sqrtR * utR_s + (btR_s - btL_s) * sign) * inverse
+    uw_ss = (sqrtL * uwL_s + sqrtR * uwR_s + (bwR_s - bwL_s) * sign) * inverse
+    bt_ss = (sqrtL * btR_s + sqrtR * btL_s +
+             sqrtL * sqrtR * (utR_s - utL_s) * sign) * inverse
+    bw_ss = (sqrtL * bwR_s + sqrtR * bwL_s +
+             sqrtL * sqrtR * (uwR_s - uwL_s) * sign) * inverse
+    vb_ss = SM * bn + ut_ss * bt_ss + uw_ss * bw_ss
+
+    def double_star(U_s, ut_s, uw_s, bt_s, bw_s, sqrt_rho, side):
+        vb_s = SM * bn + ut_s * bt_s + uw_s * bw_s
+        rho = U_s[0]
+        return [rho, rho * SM, rho * ut_ss, rho * uw_ss,
+                U_s[4] + side * sqrt_rho * (vb_s - vb_ss) * sign,
+                bt_ss, bw_ss]
+
+    UL_ss = double_star(UL_s, utL_s, uwL_s, btL_s, bwL_s, sqrtL, -1)
+    UR_ss = double_star(UR_s, utR_s, uwR_s, btR_s, bwR_s, sqrtR, 1)
+
+    regions = [SL > 0, SL_s >= 0, SM >= 0, SR_s >= 0, SR >= 0]
+    flux = []
+    for k in range(7):
+        FL_s = FL[k] + SL * (UL_s[k] - UL[k])
+        FR_s = FR[k] + SR * (UR_s[k] - UR[k])
+        FL_ss = FL_s + SL_s * (UL_ss[k] - UL_s[k])
+        FR_ss = FR_s + SR_s * (UR_ss[k] - UR_s[k])
+        flux.append(np.select(regions, [FL[k], FL_s, FL_ss, FR_ss, FR_s],
+                              FR[k]))
+    return flux
+
+
+class IdealMHD:
+    r"""
+    Second-order Godunov-type finite-volume solver of the ideal MHD
+    equations, advancing the fields of a `~plasmapy.classes.Plasma3D` in
+    place.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma whose `density`, `momentum`, `pressure` and
+        `magnetic_field` are advanced. The fields must be stored in SI
+        units and the grid must be uniformly spaced.
+    gamma : float
+        Ratio of specific heats.
+    riemann_solver : str
+        ``'HLL'`` or ``'HLLD'``.
+    limiter : str
+        Slope limiter of the reconstruction, ``'minmod'`` or the
+        monotonized central ``'MC'`` limiter.
+    cfl : float
+        Courant number of the adaptive time step.
+    boundary : str or sequence of str
+        ``'periodic'`` or ``'outflow'`` (zero gradient) for all axes, or a
+        sequence of three of these for the x, y and z axes.
+    divergence_cleaning : bool
+        If True, errors in :math:`\nabla \cdot \vec{B}` are propagated
+        away and damped by generalized Lagrange multiplier cleaning.
+
+    Attributes
+    ----------
+    time : `~astropy.units.Quantity`
+        Simulated time.
+    step_count : int
+        Number of steps taken so far.
+    timings : dict
+        Accumulated wall-clock time in seconds of each stage of the
+        solver: ``'primitives'`` (including boundaries),
+        ``'reconstruction'``, ``'riemann'``, ``'update'`` and
+        ``'time_step'``.
+    psi : ndarray
+        The cleaning scalar of the divergence cleaning.
+
+    Notes
+    -----
+    Primitive variables are reconstructed at the cell faces with limited
+    linear slopes (MUSCL), fluxes are computed with the HLL or HLLD
+    approximate Riemann solvers and the solution is advanced with the
+    second-order strong stability preserving Runge-Kutta scheme. The
+    fluxes along all non-singleton axes are evaluated without
+    dimensional splitting.
+
+    The magnetic field is cell-centred, so the divergence constraint is
+    enforced with the mixed hyperbolic-parabolic cleaning of Dedner et
+    al. (2002) rather than by constrained transport. The cleaning speed
+    is the largest speed allowed by the time step and the cleaning scalar
+    decays by a factor :math:`\exp(-\alpha_p c_h \Delta t / \Delta x)`
+    every step, with :math:`\alpha_p = 0.1`.
+
+    The total energy is not stored in the plasma: it is computed from the
+    `pressure` at the start of every step, and the `pressure` is updated
+    from it at the end, so the plasma fields may be modified between
+    steps.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.arange(64) / 64 * u.m
+    >>> plasma = Plasma3D(x, np.zeros(1) * u.m, np.zeros(1) * u.m)
+    >>> plasma.density[...] = 1 * u.kg / u.m ** 3
+    >>> plasma.pressure[...] = 1 * u.Pa
+    >>> plasma.pressure[:32] = 10 * u.Pa
+    >>> solver = IdealMHD(plasma, boundary='outflow')
+    >>> solver.run(t_end=0.05 * u.s)
+    >>> solver.time
+    <Quantity 0.05 s>
+    """
+
+    def __init__(self, plasma, gamma=5 / 3, riemann_solver="HLLD",
+                 limiter="MC", cfl=0.4, boundary="periodic",
+                 divergence_cleaning=True):
+        if riemann_solver not in RIEMANN_SOLVERS:
+            raise ValueError(f"Unknown Riemann solver {riemann_solver!r}; "
+                             f"expected one of {RIEMANN_SOLVERS}.")
+        if limiter not in LIMITERS:
+            raise ValueError(f"Unknown limiter {limiter!r}; expected one of "
+                             f"{LIMITERS}.")
+        if not 0 < cfl <= 1:
+            raise ValueError("cfl must be in (0, 1].")
+        if isinstance(boundary, str):
+            boundary = (boundary,) * 3
+        boundary = tuple(boundary)
+        if len(boundary) != 3 or \
+                any(kind not in ('periodic', 'outflow') for kind in boundary):
+            raise ValueError(f"Unknown boundary {boundary!r}; expected "
+                             f"'periodic' or 'outflow' for each axis.")
+
+        for name, unit in (('density', u.kg / u.m ** 3),
+                           ('momentum', u.kg / (u.m ** 2 * u.s)),
+                           ('pressure', u.Pa), ('magnetic_field', u.T)):
+            if getattr(plasma, name).unit != unit:
+                raise ValueError(f"The {name} must be stored in {unit} to be "
+                                 f"advanced in place.")
+
+        self.plasma = plasma
+        self.gamma = gamma
+        self.riemann_solver = riemann_solver
+        self.limiter = limiter
+        self.cfl = cfl
+        self.boundary = boundary
+        self.divergence_cleaning = divergence_cleaning
+
+        self.shape = plasma.domain_shape
+        axes = (plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m))
+        _, self.spacing = _uniform_grid(axes)
+        self._axes = [dim for dim, n in enumerate(self.shape) if n > 1]
+        for dim in self._axes:
+            if self.shape[dim] < _GHOSTS:
+                raise ValueError(f"Axis {dim} needs at least {_GHOSTS} "
+                                 f"cells.")
+
+        # Conserved variables relative to the fields stored in the plasma,
+        # which hold the magnetic field in T rather than B / sqrt(mu0)
+        self._field_scale = np.sqrt(mu0.si.value)
+        padded = tuple(n + 2 * _GHOSTS if n > 1 else 1 for n in self.shape)
+        self._primitives = np.zeros((_N_VARIABLES, *padded))
+        self._energy = np.zeros(self.shape)
+        self.psi = np.zeros(self.shape)
+        self._initial = np.empty((_N_VARIABLES, *self.shape))
+        self._rhs = np.empty((_N_VARIABLES, *self.shape))
+        self._interior = tuple(slice(_GHOSTS, -_GHOSTS) if n > 1 else
+                               slice(None) for n in self.shape)
+
+        self._workspaces = {}
+
+        self.time = 0 * u.s
+        self.step_count = 0
+        self._cleaning_speed = 0.0
+        self.reset_timings()
+
+    def _workspace(self, key, shape):
+        key = (key, shape)
+        if key not in self._workspaces:
+            self._workspaces[key] = np.empty(shape)
+        return self._workspaces[key]
+
+    def reset_timings(self):
+        r"""Set the accumulated stage timings back to zero."""
+        self.timings = dict.fromkeys(_STAGES, 0.0)
+
+    def _state(self):
+        r"""Views of the conserved variables: the plasma fields, the
+        energy and the cleaning scalar."""
+        plasma = self.plasma
+        momentum = plasma.momentum.value
+        field = plasma.magnetic_field.value
+        return [plasma.density.value, momentum[0], momentum[1], momentum[2],
+                self._energy, field[0], field[1], field[2], self.psi]
+
+    def _scales(self):
+        return [1, 1, 1, 1, 1, self._field_scale, self._field_scale,
+                self._field_scale, 1]
+
+    def _fill_primitives(self, state):
+        r"""Compute the primitive variables in the interior of the padded
+        work array and fill its ghost cells."""
+        start = time.perf_counter()
+        W = self._primitives
+        inner = W[(slice(None), *self._interior)]
+        rho = state[_RHO]
+        inner[_RHO] = rho
+        for i in range(3):
+            np.divide(state[_MOMENTUM + i], rho, out=inner[_MOMENTUM + i])
+            np.divide(state[_B + i], self._field_scale, out=inner[_B + i])
+        inner[_PSI] = state[_PSI]
+
+        kinetic = np.einsum('i...,i...->...', inner[_MOMENTUM:_ENERGY],
+                            inner[_MOMENTUM:_ENERGY]) * rho
+        magnetic = np.einsum('i...,i...->...', inner[_B:_PSI], inner[_B:_PSI])
+        inner[_ENERGY] = (self.gamma - 1) * (state[_ENERGY] -
+                                             0.5 * (kinetic + magnetic))
+
+        g = _GHOSTS
+        for dim in self._axes:
+            n = self.shape[dim]
+
+            def along(index):
+                expression = [slice(None)] * 4
+                expression[dim + 1] = index
+                return tuple(expression)
+
+            if self.boundary[dim] == 'periodic':
+                W[along(slice(0, g))] = W[along(slice(n, n + g))]
+                W[along(slice(n + g, n + 2 * g))] = W[along(slice(g, 2 * g))]
+            else:
+                W[along(slice(0, g))] = W[along(slice(g, g + 1))]
+                W[along(slice(n + g, n + 2 * g))] = \
+                    W[along(slice(n + g - 1, n + g))]
+        self.timings['primitives'] += time.perf_counter() - start
+
+    def _faces(self, dim):
+        r"""Reconstructed primitive variables on both sides of the faces
+        normal to ``dim``, covering the faces of all interior cells."""
+        start = time.perf_counter()
+        g = _GHOSTS
+        n = self.shape[dim]
+        region = list(self._interior)
+        region[dim] = slice(None)
+        W = self._primitives[(slice(None), *region)]
+
+        def along(index):
+            expression = [slice(None)] * 4
+            expression[dim + 1] = index
+            return tuple(expression)
+
+        # Slopes of the cells 1 .. n + 2 of the padded axis
+        shape = W[along(slice(1, n + 2 * g - 1))].shape
+        backward = np.subtract(W[along(slice(1, n + 2 * g - 1))],
+                               W[along(slice(0, n + 2 * g - 2))],
+                               out=self._workspace('backward', shape))
+        forward = np.subtract(W[along(slice(2, n + 2 * g))],
+                              W[along(slice(1, n + 2 * g - 1))],
+                              out=self._workspace('forward', shape))
+        slope = _limited_slope(backward, forward, self.limiter,
+                               self._workspace('slope', shape),
+                               self._workspace('scratch', shape))
+
+        cells_left = W[along(slice(1, n + 2))]
+        cells_right = W[along(slice(2, n + 3))]
+        slope *= 0.5
+        left = np.add(cells_left, slope[along(slice(0, n + 1))],
+                      out=forward[along(slice(0, n + 1))])
+        right = np.subtract(cells_right, slope[along(slice(1, n + 2))],
+                            out=backward[along(slice(0, n + 1))])
+
+        # Fall back to first order where the reconstruction is unphysical
+        for face, cells in ((left, cells_left), (right, cells_right)):
+            bad = (face[_RHO] <= 0) | (face[_ENERGY] <= 0)
+            if bad.any():
+                face[:, bad] = cells[:, bad]
+        self.timings['reconstruction'] += time.perf_counter() - start
+        return left, right
+
+    def _fluxes(self, dim, left, right):
+        r"""Numerical fluxes of the conserved variables through the faces
+        normal to ``dim``."""
+        start = time.perf_counter()
+        t1, t2 = (dim + 1) % 3, (dim + 2) % 3
+        order = [_RHO, _MOMENTUM + dim, _MOMENTUM + t1, _MOMENTUM + t2,
+                 _ENERGY, _B + dim, _B + t1, _B + t2]
+
+        # Exact solution of the linear subsystem of the normal field and
+        # the cleaning scalar
+        ch = self._cleaning_speed
+        bn_left, bn_right = left[_B + dim], right[_B + dim]
+        psi_left, psi_right = left[_PSI], right[_PSI]
+        if ch > 0:
+            bn = 0.5 * (bn_left + bn_right) - \
+                (psi_right - psi_left) / (2 * ch)
+            psi = 0.5 * (psi_left + psi_right) - \
+                0.5 * ch * (bn_right - bn_left)
+        else:
+            bn = 0.5 * (bn_left + bn_right)
+            psi = np.zeros_like(bn)
+
+        states = []
+        for side in (left, right):
+            state = [side[k] for k in order]
+            state[5] = bn
+            states.append(state)
+        solver = _hlld if self.riemann_solver == "HLLD" else _hll
+        rotated = solver(*states, self.gamma)
+
+        flux = np.empty_like(left)
+        for k, index in enumerate(order[:5] + order[6:]):
+            flux[index] = rotated[k]
+        flux[_B + dim] = psi
+        flux[_PSI] = ch ** 2 * bn
+        self.timings['riemann'] += time.perf_counter() - start
+        return flux
+
+    def _right_hand_side(self, state):
+        r"""Evaluate the divergence of the fluxes into ``self._rhs``."""
+        self._fill_primitives(state)
+        rhs = self._rhs
+        rhs[...] = 0
+        for dim in self._axes:
+            left, right = self._faces(dim)
+            flux = self._fluxes(dim, left, right)
+
+            start = time.perf_counter()
+            n = self.shape[dim]
+            upper = [slice(None)] * 4
+            lower = [slice(None)] * 4
+            upper[dim + 1] = slice(1, n + 1)
+            lower[dim + 1] = slice(0, n)
+            difference = flux[tuple(upper)] - flux[tuple(lower)]
+            rhs -= difference / self.spacing[dim]
+            self.timings['update'] += time.perf_counter() - start
+
+    def _total_energy(self, state):
+        rho = state[_RHO]
+        kinetic = sum(m ** 2 for m in state[_MOMENTUM:_ENERGY]) / rho
+        magnetic = sum(B ** 2 for B in state[_B:_PSI]) / \
+            self._field_scale ** 2
+        pressure = self.plasma.pressure.value
+        state[_ENERGY][...] = pressure / (self.gamma - 1) + \
+            0.5 * (kinetic + magnetic)
+
+    def time_step(self):
+        r"""
+        The largest stable time step of the current state.
+
+        Returns
+        -------
+        `~astropy.units.Quantity`
+
+        Notes
+        -----
+        The step is ``cfl`` times the inverse of the sum over the axes of
+        the largest signal speed divided by the grid spacing, as required
+        for unsplit schemes.
+        """
+        start = time.perf_counter()
+        plasma = self.plasma
+        rho = plasma.density.value
+        p = plasma.pressure.value
+        field = plasma.magnetic_field.value / self._field_scale
+        b2 = np.einsum('i...,i...->...', field, field)
+        rate = 0
+        for dim in self._axes:
+            speed = np.abs(plasma.momentum.value[dim]) / rho + \
+                _fast_speed(rho, p, field[dim], b2, self.gamma)
+            rate = rate + speed / self.spacing[dim]
+        dt = self.cfl / np.max(rate) if self._axes else np.inf
+        self.timings['time_step'] += time.perf_counter() - start
+        return dt * u.s
+
+    def step(self, dt=None):
+        r"""
+        Advance the fields by one time step.
+
+        Parameters
+        ----------
+        dt : `~astropy.units.Quantity`, optional
+            Time step. By default the stable step of `time_step` is used.
+
+        Returns
+        -------
+        `~astropy.units.Quantity`
+            The time step taken.
+        """
+        if dt is None:
+            dt = self.time_step()
+        dt_value = dt.to_value(u.s)
+
+        state = self._state()
+        scales = self._scales()
+        self._total_energy(state)
+        if self.divergence_cleaning:
+            spacing = min(self.spacing[dim] for dim in self._axes)
+            self._cleaning_speed = self.cfl * spacing / dt_value / \
+                len(self._axes)
+        else:
+            self._cleaning_speed = 0.0
+
+        for k, variable in enumerate(state):
+            self._initial[k] = variable
+
+        # Strong stability preserving Runge-Kutta scheme of second order
+        self._right_hand_side(state)
+        start = time.perf_counter()
+        for k, variable in enumerate(state):
+            variable += dt_value * scales[k] * self._rhs[k]
+        self.timings['update'] += time.perf_counter() - start
+
+        self._right_hand_side(state)
+        start = time.perf_counter()
+        for k, variable in enumerate(state):
+            variable += dt_value * scales[k] * self._rhs[k]
+            variable += self._initial[k]
+            variable *= 0.5
+
+        if self.divergence_cleaning:
+            self.psi *= np.exp(-0.1 * self._cleaning_speed * dt_value /
+                               spacing)
+
+        rho = state[_RHO]
+        kinetic = sum(m ** 2 for m in state[_MOMENTUM:_ENERGY]) / rho
+        magnetic = sum(B ** 2 for B in state[_B:_PSI]) / \
+            self._field_scale ** 2
+        self.plasma.pressure.value[...] = (self.gamma - 1) * (
+            state[_ENERGY] - 0.5 * (kinetic + magnetic))
+        self.plasma.invalidate('density', 'momentum', 'pressure',
+                               'magnetic_field')
+        self.timings['update'] += time.perf_counter() - start
+
+        self.time = self.time + dt
+        self.step_count += 1
+        return dt
+
+    def run(self, t_end=None, n_steps=None, callback=None):
+        r"""
+        Advance the fields until a given time or for a number of steps.
+
+        Parameters
+        ----------
+        t_end : `~astropy.units.Quantity`, optional
+            Time to stop at. The last step is shortened to end exactly at
+            ``t_end``.
+        n_steps : int, optional
+            Largest number of steps to take.
+        callback : callable, optional
+            Called with the solver after every step.
+        """
+        if t_end is None and n_steps is None:
+            raise ValueError("Either t_end or n_steps is required.")
+        steps = 0
+        while n_steps is None or steps < n_steps:
+            dt = self.time_step()
+            if t_end is not None:
+                remaining = t_end - self.time
+                if remaining <= 0:
+                    break
+                if dt >= remaining:
+                    dt = remaining
+            self.step(dt)
+            steps += 1
+            if callback is not None:
+                callback(self)
@@ -0,0 +1,344 @@
+"""
+Finite-difference differential operators on uniform Plasma3D grids.
+"""
+import numpy as np
+from astropy import units as u
+
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "FiniteDifference",
+]
+
+#: Central stencils as {offset: coefficient}, and one-sided stencils for
+#: the first points of the grid, by derivative order and accuracy. The
+#: one-sided rows for the last points follow by symmetry.
+_STENCILS = {
+    (1, 2): ({-1: -1 / 2, 1: 1 / 2},
+             [[-3 / 2, 2, -1 / 2]]),
+    (1, 4): ({-2: 1 / 12, -1: -8 / 12, 1: 8 / 12, 2: -1 / 12},
+             [[-25 / 12, 48 / 12, -36 / 12, 16 / 12, -3 / 12],
+              [-3 / 12, -10 / 12, 18 / 12, -6 / 12, 1 / 12]]),
+    (2, 2): ({-1: 1, 0: -2, 1: 1},
+             [[2, -5, 4, -1]]),
+    (2, 4): ({-2: -1 / 12, -1: 16 / 12, 0: -30 / 12, 1: 16 / 12,
+              2: -1 / 12},
+             [[45 / 12, -154 / 12, 214 / 12, -156 / 12, 61 / 12, -10 / 12],
+              [10 / 12, -15 / 12, -4 / 12, 14 / 12, -6 / 12, 1 / 12]]),
+}
+
+
+def _along(dim, index):
+    r"""Index expression selecting ``index`` along grid axis ``dim``."""
+    expression = [slice(None)] * 3
+    expression[dim] = index
+    return tuple(expression)
+
+
+class FiniteDifference:
+    r"""
+    Gradient, divergence, curl and Laplacian of fields on the uniform grid
+    of a `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma providing the grid. Its axes must be uniformly spaced.
+    order : int
+        Order of accuracy of the stencils, either 2 or 4.
+    boundary : str or sequence of str
+        Either ``'periodic'`` or ``'one-sided'`` for all axes, or a
+        sequence of three of these for the x, y and z axes. Periodic axes
+        have a period of the number of grid points times the spacing.
+        One-sided boundaries use one-sided stencils of the same order at
+        the first and last points.
+
+    Notes
+    -----
+    All operators accept plain arrays or `~astropy.units.Quantity`
+    objects, the latter giving results with the units divided by metres,
+    and can write into preallocated arrays through ``out``. The padded
+    copies needed for periodic axes and the scratch arrays holding
+    intermediate terms are allocated on first use and reused, so repeated
+    evaluations with ``out`` do not allocate any full-grid temporaries.
+    ``out`` must not overlap with the input.
+
+    Singleton axes are invariant directions and all derivatives along
+    them are zero.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from astropy.constants import mu0
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.linspace(0, 1, 16, endpoint=False) * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> plasma.magnetic_field[2] = np.sin(2 * np.pi * x.value)[:, None, None] * u.T
+    >>> fd = FiniteDifference(plasma, order=4)
+    >>> J = fd.curl(plasma.magnetic_field) / mu0
+    >>> J.unit == u.A / u.m ** 2
+    True
+    """
+
+    def __init__(self, plasma, order=2, boundary='periodic'):
+        if order not in (2, 4):
+            raise ValueError(f"Stencils of order {order} are not available; "
+                             f"expected 2 or 4.")
+        self.order = order
+
+        if isinstance(boundary, str):
+            boundary = (boundary,) * 3
+        boundary = tuple(boundary)
+        if len(boundary) != 3 or \
+                any(kind not in ('periodic', 'one-sided') for kind in boundary):
+            raise ValueError(f"Unknown boundary {boundary!r}; expected "
+                             f"'periodic' or 'one-sided' for each axis.")
+        self.boundary = boundary
+
+        self.shape = plasma.domain_shape
+        axes = (plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m))
+        _, self.spacing = _uniform_grid(axes)
+
+        for dim, n in enumerate(self.shape):
+            if n == 1:
+                continue
+            needed = order + 2 if boundary[dim] == 'one-sided' else 1
+            if n < needed:
+                raise ValueError(f"Axis {dim} has {n} points; one-sided "
+                                 f"stencils of order {order} need at least "
+                                 f"{needed}.")
+
+        self._workspaces = {}
+
+    def _workspace(self, key, shape, dtype):
+        key = (key, shape, np.dtype(dtype))
+        if key not in self._workspaces:
+            self._workspaces[key] = np.empty(shape, dtype=dtype)
+        return self._workspaces[key]
+
+    def _stencil(self, f, dim, derivative, out):
+        r"""Apply the stencil of the given derivative along ``dim`` to the
+        plain array ``f``, writing the unscaled result into ``out``."""
+        n = self.shape[dim]
+        if n == 1:
+            out[...] = 0
+            return
+
+        central, one_sided = _STENCILS[(derivative, self.order)]
+        width = self.order // 2
+
+        if self.boundary[dim] == 'periodic':
+            padded_shape = list(self.shape)
+            padded_shape[dim] += 2 * width
+            source = self._workspace(('padded', dim), tuple(padded_shape),
+                                     f.dtype)
+            source[_along(dim, slice(width, width + n))] = f
+            # Fill the ghost layers by wrapping around, which allows
+            # the node count to be smaller than the stencil width
+            for ghost in range(width):
+                source[_along(dim, ghost)] = \
+                    f[_along(dim, (ghost - width) % n)]
+                source[_along(dim, width + n + ghost)] = \
+                    f[_along(dim, ghost % n)]
+            region = out
+            count = n
+        else:
+            source = f
+            region = out[_along(dim, slice(width, n - width))]
+            count = n - 2 * width
+
+        term = self._workspace('term', self.shape, out.dtype)
+        term = term[_along(dim, slice(0, count))]
+        first = True
+        for offset, coefficient in central.items():
+            # Node i of the region is at index i + width of the source
+            shifted = source[_along(dim, slice(width + offset,
+                                               width + offset + count))]
+            if first:
+                np.multiply(shifted, coefficient, out=region)
+                first = False
+            else:
+                np.multiply(shifted, coefficient, out=term)
+                region += term
+
+        if self.boundary[dim] == 'one-sided':
+            # Antisymmetric for first derivatives, symmetric for second
+            sign = -1 if derivative % 2 else 1
+            plane = term[_along(dim, slice(0, 1))]
+            for row, coefficients in enumerate(one_sided):
+                # Rows start from the edge node and step inwards
+                for edge, step, factor in ((0, 1, 1), (n - 1, -1, sign)):
+                    node = edge + step * row
+                    target = out[_along(dim, slice(node, node + 1))]
+                    target[...] = 0
+                    for j, coefficient in enumerate(coefficients):
+                        node = edge + step * j
+                        np.multiply(f[_along(dim, slice(node, node + 1))],
+                                    factor * coefficient, out=plane)
+                        target += plane
+
+        out *= 1 / self.spacing[dim] ** derivative
+
+    def _prepare(self, f, out, shape, unit_power):
+        r"""Split ``f`` into values and unit, and provide an output array of
+        the given shape along with the unit of the result."""
+        if isinstance(f, u.Quantity):
+            values, unit = f.value, f.unit / u.m ** unit_power
+        else:
+            values, unit = np.asarray(f), None
+
+        if values.shape[-3:] != self.shape:
+            raise ValueError(f"Shape {values.shape} does not match the grid "
+                             f"shape {self.shape}.")
+
+        dtype = np.result_type(values.dtype, np.float32)
+        if out is None:
+            target = np.empty(shape, dtype=dtype)
+        elif isinstance(out, u.Quantity):
+            target = out.value
+        else:
+            target = out
+        if target.shape != shape:
+            raise ValueError(f"Shape of out {target.shape} does not match "
+                             f"the expected {shape}.")
+        return values, unit, target
+
+    @staticmethod
+    def _finish(target, unit, out):
+        r"""Attach units to the result, converting to those of ``out``."""
+        if unit is None:
+            return target if out is None else out
+        if out is None:
+            return u.Quantity(target, unit, copy=False)
+        if isinstance(out, u.Quantity):
+            target *= unit.to(out.unit)
+        else:
+            target *= unit.si.scale
+        return out
+
+    def derivative(self, f, axis, out=None):
+        r"""
+        Partial derivative of a scalar field along one axis.
+
+        Parameters
+        ----------
+        f : array_like or `~astropy.units.Quantity`
+            (x, y, z) array of the field.
+        axis : int
+            0, 1 or 2 for the derivative along x, y or z.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            (x, y, z) array to write the result into. Plain arrays
+            receive the result in SI units.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+        """
+        values, unit, target = self._prepare(f, out, self.shape, 1)
+        self._stencil(values, axis, 1, target)
+        return self._finish(target, unit, out)
+
+    def gradient(self, f, out=None):
+        r"""
+        Gradient of a scalar field.
+
+        Parameters
+        ----------
+        f : array_like or `~astropy.units.Quantity`
+            (x, y, z) array of the field.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            (3, x, y, z) array to write the result into.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+            (3, x, y, z) array.
+        """
+        values, unit, target = self._prepare(f, out, (3, *self.shape), 1)
+        for dim in range(3):
+            self._stencil(values, dim, 1, target[dim])
+        return self._finish(target, unit, out)
+
+    def divergence(self, F, out=None):
+        r"""
+        Divergence of a vector field.
+
+        Parameters
+        ----------
+        F : array_like or `~astropy.units.Quantity`
+            (3, x, y, z) array of the field.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            (x, y, z) array to write the result into.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+            (x, y, z) array.
+        """
+        values, unit, target = self._prepare(F, out, self.shape, 1)
+        scratch = self._workspace('scratch', self.shape, target.dtype)
+        self._stencil(values[0], 0, 1, target)
+        for dim in (1, 2):
+            self._stencil(values[dim], dim, 1, scratch)
+            target += scratch
+        return self._finish(target, unit, out)
+
+    def curl(self, F, out=None):
+        r"""
+        Curl of a vector field.
+
+        Parameters
+        ----------
+        F : array_like or `~astropy.units.Quantity`
+            (3, x, y, z) array of the field.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            (3, x, y, z) array to write the result into.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+            (3, x, y, z) array.
+        """
+        values, unit, target = self._prepare(F, out, (3, *self.shape), 1)
+        scratch = self._workspace('scratch', self.shape, target.dtype)
+        for i in range(3):
+            j, k = (i + 1) % 3, (i + 2) % 3
+            # (curl F)_i = d_j F_k - d_k F_j
+            self._stencil(values[k], j, 1, target[i])
+            self._stencil(values[j], k, 1, scratch)
+            target[i] -= scratch
+        return self._finish(target, unit, out)
+
+    def laplacian(self, f, out=None):
+        r"""
+        Laplacian of a scalar field, or of each component of a vector
+        field.
+
+        Parameters
+        ----------
+        f : array_like or `~astropy.units.Quantity`
+            (x, y, z) or (3, x, y, z) array of the field.
+        out : ndarray or `~astropy.units.Quantity`, optional
+            Array of the same shape as ``f`` to write the result into.
+
+        Returns
+        -------
+        ndarray or `~astropy.units.Quantity`
+
+        Notes
+        -----
+        The Laplacian is evaluated with second-derivative stencils rather
+        than by applying the first-derivative stencils twice, which
+        doubles the resolved wavenumber range and does not decouple odd
+        and even grid points.
+        """
+        shape = np.shape(f)
+        values, unit, target = self._prepare(f, out, shape, 2)
+        scratch = self._workspace('scratch', self.shape, target.dtype)
+        for component in np.ndindex(*shape[:-3]):
+            self._stencil(values[component], 0, 2, target[component])
+            for dim in (1, 2):
+                self._stencil(values[component], dim, 2, scratch)
+                target[component] += scratch
+        return self._finish(target, unit, out)
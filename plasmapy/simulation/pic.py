@@ -0,0 +1,208 @@
+"""
+Electrostatic particle-in-cell simulation on periodic Plasma3D grids.
+"""
+import numpy as np
+from astropy import units as u
+
+from plasmapy.constants import eps0
+from plasmapy.simulation import boundaries, deposition
+from plasmapy.simulation.interpolation import _uniform_grid
+from plasmapy.simulation.poisson import SpectralPoissonSolver
+
+__all__ = [
+    "ElectrostaticPIC",
+]
+
+
+class ElectrostaticPIC:
+    r"""
+    Electrostatic particle-in-cell simulation of one or more
+    `~plasmapy.classes.Species` in a periodic
+    `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma holding the grid and fields. The grid must be uniformly
+        spaced and is treated as periodic along every non-singleton axis,
+        with a period of the number of grid points times the spacing.
+        Its ``magnetic_field`` is applied as a static external field.
+    species : list of `~plasmapy.classes.Species`
+        the particles to advance. All must share the plasma and the time
+        step ``dt``. Their ``boundary``, if set, must be periodic along
+        every non-singleton axis. It is applied by
+        `~plasmapy.classes.Species.boris_push` in every step, as is the
+        sorting of the particles every ``sort_interval`` steps. Their
+        ``nt`` is not used; setting ``nt=1`` avoids allocating an unused
+        history.
+    shape : str
+        Particle shape function used for both charge deposition and field
+        gathering; one of ``'NGP'``, ``'CIC'`` or ``'TSC'``.
+    output_interval : int
+        Number of steps between saved diagnostics.
+    save_fields : bool
+        If True, the electric field is saved along with the diagnostics.
+    n_threads : int
+        Number of threads used for charge deposition.
+
+    Attributes
+    ----------
+    solver : `~plasmapy.simulation.SpectralPoissonSolver`
+        Poisson solver filling ``plasma.electric_field``.
+    step_count : int
+        Number of steps taken so far.
+    history : dict
+        Saved diagnostics: ``'time'``, ``'field_energy'``,
+        ``'kinetic_energy'`` (one column per species) and, with
+        ``save_fields``, ``'electric_field'``.
+
+    Notes
+    -----
+    Every step gathers the fields at the particle positions, advances
+    the particles with `~plasmapy.classes.Species.boris_push`, wraps them
+    back into the periodic domain, deposits their charge and solves for
+    the new electric field. Energies are reported per unit extent along
+    singleton axes.
+
+    """
+    def __init__(self, plasma, species, shape="CIC", output_interval=1,
+                 save_fields=False, n_threads=1):
+        self.plasma = plasma
+        self.species = list(species)
+        self.shape = shape
+        self.output_interval = int(output_interval)
+        self.save_fields = save_fields
+        self.n_threads = n_threads
+
+        if not self.species:
+            raise ValueError("At least one species is required.")
+        for s in self.species:
+            if s.plasma is not plasma:
+                raise ValueError("All species must share the plasma.")
+            if s.dt != self.species[0].dt:
+                raise ValueError("All species must share the time step.")
+        self.dt = self.species[0].dt
+
+        self._axes = (plasma.x.si.value, plasma.y.si.value, plasma.z.si.value)
+        origin, spacing = _uniform_grid(self._axes)
+        self._lower = origin
+        self._upper = origin + spacing * np.array(plasma.domain_shape)
+        self._periodic_axes = [dim for dim, n in enumerate(plasma.domain_shape)
+                               if n > 1]
+        for s in self.species:
+            if s.boundary is not None and any(s.boundary[dim] != 'periodic'
+                                              for dim in self._periodic_axes):
+                raise ValueError(f"The boundaries {s.boundary} of a species "
+                                 f"must be periodic along the axes "
+                                 f"{self._periodic_axes} of the domain.")
+        self._cell_volume = np.prod(spacing)
+
+        self.solver = SpectralPoissonSolver(plasma)
+        self.step_count = 0
+        self._initialized = False
+        self._history = {'time': [], 'field_energy': [],
+                         'kinetic_energy': [], 'electric_field': []}
+
+    def charge_density(self):
+        r"""
+        Deposit the total charge density of all species.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            (x, y, z) array of charge density in C/m^3.
+        """
+        rho = np.zeros(self.plasma.domain_shape)
+        for s in self.species:
+            rho += deposition.deposit(s.x.to(u.m).value, s.eff_q.si.value,
+                                      self._axes, shape=self.shape,
+                                      periodic=True,
+                                      n_threads=self.n_threads)
+        return rho / self._cell_volume * u.C / u.m ** 3
+
+    def _gather_fields(self, s):
+        x = s.x.to(u.m).value
+        E = deposition.gather(x, self.plasma.electric_field.to(u.V / u.m).value,
+                              self._axes, shape=self.shape, periodic=True)
+        if self._magnetized:
+            B = deposition.gather(x, self.plasma.magnetic_field.to(u.T).value,
+                                  self._axes, shape=self.shape, periodic=True)
+        else:
+            B = np.zeros_like(E)
+        return B * u.T, E * u.V / u.m
+
+    def _wrap(self, s):
+        s.x = s.x.to(u.m, copy=False)
+        boundaries.apply_periodic(s.x.value, self._lower, self._upper,
+                                  self._periodic_axes)
+
+    def initialize(self):
+        r"""
+        Solve for the initial field and move the velocities back by half
+        a time step, as required by the leapfrog scheme.
+        """
+        self._magnetized = bool(np.any(self.plasma.magnetic_field.value))
+        for s in self.species:
+            self._wrap(s)
+        self.solver.solve(self.charge_density())
+        for s in self.species:
+            s.boris_push(init=True, fields=self._gather_fields(s))
+        self._initialized = True
+
+    def step(self):
+        r"""Advance the particles and fields by one time step."""
+        if not self._initialized:
+            self.initialize()
+        for s in self.species:
+            s.boris_push(fields=self._gather_fields(s))
+            self._wrap(s)
+        self.solver.solve(self.charge_density())
+        self.step_count += 1
+
+    def field_energy(self):
+        r"""Total electrostatic field energy in the domain."""
+        E = self.plasma.electric_field.to(u.V / u.m).value
+        return 0.5 * eps0.si.value * np.sum(E * E) * self._cell_volume * u.J
+
+    def _record(self):
+        history = self._history
+        history['time'].append((self.step_count * self.dt).to(u.s).value)
+        history['field_energy'].append(self.field_energy().to(u.J).value)
+        history['kinetic_energy'].append(
+            [(0.5 * s.eff_m * np.sum(s.v ** 2)).to(u.J).value
+             for s in self.species])
+        if self.save_fields:
+            history['electric_field'].append(
+                self.plasma.electric_field.to(u.V / u.m).value.copy())
+
+    def run(self, n_steps):
+        r"""
+        Advance the simulation, saving diagnostics every
+        ``output_interval`` steps.
+
+        Parameters
+        ----------
+        n_steps : int
+            Number of steps to take.
+        """
+        if not self._initialized:
+            self.initialize()
+        if not self._history['time']:
+            self._record()
+        for _ in range(int(n_steps)):
+            self.step()
+            if self.step_count % self.output_interval == 0:
+                self._record()
+
+    @property
+    def history(self):
+        r"""Saved diagnostics as `~astropy.units.Quantity` arrays."""
+        history = {'time': np.array(self._history['time']) * u.s,
+                   'field_energy':
+                       np.array(self._history['field_energy']) * u.J,
+                   'kinetic_energy':
+                       np.array(self._history['kinetic_energy']) * u.J}
+        if self.save_fields:
+            history['electric_field'] = \
+                np.array(self._history['electric_field']) * u.V / u.m
+        return history
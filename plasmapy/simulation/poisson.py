@@ -0,0 +1,109 @@
+"""
+Spectral solution of Poisson's equation on periodic grids.
+"""
+import numpy as np
+from astropy import units as u
+
+from plasmapy.constants import eps0
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "SpectralPoissonSolver",
+]
+
+
+class SpectralPoissonSolver:
+    r"""
+    FFT-based solver of Poisson's equation on the periodic grid of a
+    `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma whose `electric_field` is filled by `solve`. The grid must
+        be uniformly spaced; each axis is taken to be periodic with a
+        period of the number of grid points times the grid spacing.
+
+    Attributes
+    ----------
+    k : tuple of ndarray
+        Wavenumbers along each axis in rad/m, shaped for broadcasting
+        against the real-to-complex transform of a grid quantity. Nyquist
+        modes are set to zero as they have no real derivative.
+    green : ndarray
+        The k-space Green's function :math:`1 / (\epsilon_0 k^2)` in SI
+        units, with the :math:`k = 0` mode set to zero.
+    potential : `astropy.units.Quantity`
+        The electrostatic potential from the last call to `solve`.
+
+    Notes
+    -----
+    In Fourier space Poisson's equation
+    :math:`\nabla^2 \phi = -\rho / \epsilon_0` becomes
+    :math:`\hat{\phi} = \hat{\rho} / (\epsilon_0 k^2)`, and the electric
+    field follows as :math:`\hat{E} = -i \vec{k} \hat{\phi}`. The
+    wavenumbers and Green's function only depend on the grid, so they are
+    computed once and reused by every call to `solve`.
+
+    Discarding the :math:`k = 0` mode is equivalent to adding a uniform
+    neutralizing background, as is customary for periodic systems.
+    """
+
+    def __init__(self, plasma):
+        self.plasma = plasma
+        self.shape = plasma.domain_shape
+
+        axes = (plasma.x.si.value, plasma.y.si.value, plasma.z.si.value)
+        _, spacing = _uniform_grid(axes)
+
+        k = []
+        for dim, (n, d) in enumerate(zip(self.shape, spacing)):
+            if dim == 2:
+                k_dim = 2 * np.pi * np.fft.rfftfreq(n, d)
+            else:
+                k_dim = 2 * np.pi * np.fft.fftfreq(n, d)
+            expand = [np.newaxis] * 3
+            expand[dim] = slice(None)
+            k.append(k_dim[tuple(expand)])
+        self.k = tuple(k)
+
+        k_squared = self.k[0] ** 2 + self.k[1] ** 2 + self.k[2] ** 2
+        with np.errstate(divide='ignore'):
+            self.green = 1 / (eps0.si.value * k_squared)
+        self.green[0, 0, 0] = 0
+
+        # The derivative of a real field has no Nyquist component
+        for dim, n in enumerate(self.shape):
+            if n % 2 == 0:
+                self.k[dim].reshape(-1)[-1 if dim == 2 else n // 2] = 0
+
+        self.potential = np.zeros(self.shape) * u.V
+
+    @u.quantity_input(rho=u.C / u.m ** 3)
+    def solve(self, rho):
+        r"""
+        Solve for the electrostatic potential and field of a charge
+        density and store the field in the plasma's `electric_field`.
+
+        Parameters
+        ----------
+        rho : `astropy.units.Quantity`
+            (x, y, z) array of charge density.
+
+        Returns
+        -------
+        `astropy.units.Quantity`
+            (3, x, y, z) array of the electric field, which is also
+            written into ``plasma.electric_field``.
+        """
+        rho_k = np.fft.rfftn(rho.to(u.C / u.m ** 3).value)
+        phi_k = rho_k * self.green
+
+        self.potential = np.fft.irfftn(phi_k, s=self.shape) * u.V
+
+        E = self.plasma.electric_field
+        for dim in range(3):
+            E[dim] = np.fft.irfftn(-1j * self.k[dim] * phi_k,
+                                   s=self.shape) * u.V / u.m
+        self.plasma.invalidate('electric_field')
+        return E
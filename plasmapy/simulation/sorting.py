@@ -0,0 +1,117 @@
+"""
+Sorting of particles by grid cell for cache-friendly field access.
+"""
+import numpy as np
+
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "cell_index",
+    "sort_permutation",
+    "sort_by_cell",
+]
+
+
+def cell_index(positions, axes):
+    r"""
+    Compute the flattened index of the grid cell containing each position.
+
+    Parameters
+    ----------
+    positions : ndarray
+        Array of shape (n, 3) of positions, in the units of ``axes``.
+    axes : tuple of ndarray
+        The three 1D coordinate arrays of the grid.
+
+    Returns
+    -------
+    ndarray
+        Integer array of shape (n,). Cells are numbered in the C order of
+        the (nx, ny, nz) grid by their lower corner node. Positions
+        outside of the grid are assigned to the nearest boundary cell.
+    """
+    axes = tuple(np.asarray(axis, dtype=float) for axis in axes)
+    positions = np.asarray(positions, dtype=float)
+    shape = tuple(axis.size for axis in axes)
+
+    try:
+        origin, spacing = _uniform_grid(axes)
+    except ValueError:
+        origin = spacing = None
+
+    index = np.zeros(positions.shape[0], dtype=np.intp)
+    for dim, axis in enumerate(axes):
+        n = shape[dim]
+        if n == 1:
+            continue
+        coords = positions[:, dim]
+        if spacing is not None:
+            with np.errstate(invalid='ignore'):
+                idx = np.floor((coords - origin[dim]) /
+                               spacing[dim]).astype(np.intp)
+        else:
+            idx = np.searchsorted(axis, coords, side='right') - 1
+        np.clip(idx, 0, n - 1, out=idx)
+        index *= n
+        index += idx
+    return index
+
+
+def sort_permutation(cells, n_cells=None):
+    r"""
+    Compute the stable permutation that orders particles by cell.
+
+    Parameters
+    ----------
+    cells : ndarray
+        Integer array of shape (n,) of cell indices, e.g. from
+        `cell_index`.
+    n_cells : int, optional
+        Total number of cells. If given and small enough, the indices are
+        narrowed to a 16-bit type, for which the stable sort is a linear
+        time radix sort.
+
+    Returns
+    -------
+    ndarray
+        Integer array of shape (n,) such that ``cells[permutation]`` is
+        sorted. Particles in the same cell keep their relative order.
+
+    Notes
+    -----
+    For larger grids a stable merge sort is used. It detects already
+    ordered runs, so re-sorting particles that have only moved a little
+    since the last sort is close to linear in the number of particles.
+    """
+    cells = np.asarray(cells)
+    if n_cells is not None and n_cells <= np.iinfo(np.uint16).max + 1:
+        cells = cells.astype(np.uint16)
+    return np.argsort(cells, kind='stable')
+
+
+def sort_by_cell(positions, axes, *arrays):
+    r"""
+    Reorder per-particle arrays by the grid cell of each particle, in
+    place.
+
+    Parameters
+    ----------
+    positions : ndarray
+        Array of shape (n, 3) of positions, in the units of ``axes``. It
+        is reordered as well.
+    axes : tuple of ndarray
+        The three 1D coordinate arrays of the grid.
+    *arrays : ndarray
+        Further arrays whose first dimension has length n, such as
+        velocities or particle identifiers.
+
+    Returns
+    -------
+    ndarray
+        The permutation that was applied.
+    """
+    n_cells = int(np.prod([np.size(axis) for axis in axes]))
+    permutation = sort_permutation(cell_index(positions, axes), n_cells)
+    for array in (positions,) + arrays:
+        array[...] = array[permutation]
+    return permutation
@@ -0,0 +1,473 @@
+"""
+Pseudo-spectral solver of the incompressible MHD equations on periodic
+Plasma3D grids.
+"""
+import os
+
+import numpy as np
+from astropy import units as u
+from scipy import fft
+
+from plasmapy.constants import mu0
+from plasmapy.simulation.interpolation import _uniform_grid
+
+__all__ = [
+    "SpectralMHD",
+]
+
+_AXES = (1, 2, 3)
+
+
+def _cross(a, b, out, scratch, accumulate=False):
+    r"""Cross product of two (3, ...) arrays written or added into
+    ``out``."""
+    for i in range(3):
+        j, k = (i + 1) % 3, (i + 2) % 3
+        if accumulate:
+            out[i] += np.multiply(a[j], b[k], out=scratch)
+        else:
+            np.multiply(a[j], b[k], out=out[i])
+        out[i] -= np.multiply(a[k], b[j], out=scratch)
+
+
+def _transform(source, shape, inverse, n_threads, target=None):
+    r"""
+    Return a function computing the real-to-complex transform, or its
+    normalized inverse, over the grid axes of arrays like ``source`` for
+    a grid of the given ``shape``.
+
+    With pyFFTW installed the function runs a plan from ``source`` into
+    ``target``, which is allocated if not given, after copying its
+    argument into ``source``, and returns ``target``. Otherwise it
+    returns a new array computed by `scipy.fft`. Either way, it may
+    overwrite its argument if that is ``source``.
+    """
+    try:
+        import pyfftw
+    except ImportError:
+        pass
+    else:
+        if target is None:
+            if inverse:
+                target = np.empty((len(source), *shape),
+                                  dtype=source.real.dtype)
+            else:
+                target = np.empty((len(source), *shape[:-1],
+                                   shape[-1] // 2 + 1),
+                                  dtype=np.result_type(source, np.complex64))
+        plan = pyfftw.FFTW(
+            source, target, axes=_AXES,
+            direction='FFTW_BACKWARD' if inverse else 'FFTW_FORWARD',
+            flags=(pyfftw.config.PLANNER_EFFORT,),
+            threads=n_threads if n_threads > 0 else os.cpu_count() or 1)
+
+        def apply(values):
+            if values is not source:
+                source[...] = values
+            return plan()
+        return apply
+
+    def apply(values):
+        if inverse:
+            return fft.irfftn(values, s=shape, axes=_AXES, workers=n_threads,
+                              overwrite_x=values is source)
+        return fft.rfftn(values, axes=_AXES, workers=n_threads,
+                         overwrite_x=values is source)
+    return apply
+
+
+class SpectralMHD:
+    r"""
+    Pseudo-spectral solver of the incompressible, constant density MHD
+    equations on the periodic grid of a `~plasmapy.classes.Plasma3D`.
+
+    Parameters
+    ----------
+    plasma : `~plasmapy.classes.Plasma3D`
+        plasma providing the grid, the uniform `density` and the initial
+        `momentum` and `magnetic_field`. The grid must be uniformly spaced
+        and is periodic along every axis with a period of the number of
+        grid points times the spacing.
+    viscosity : `~astropy.units.Quantity`
+        Kinematic viscosity in m^2/s.
+    resistivity : `~astropy.units.Quantity`, optional
+        Magnetic diffusivity in m^2/s; equal to ``viscosity`` by default.
+    cfl : float
+        Courant number of the adaptive time step.
+    dealias : bool
+        If True, nonlinear terms are truncated with the 2/3 rule.
+    dtype : data-type
+        Real floating point type of the computation, ``numpy.float64`` or
+        ``numpy.float32``.
+    n_threads : int, optional
+        Number of threads used by the FFTs; all CPUs by default.
+
+    Attributes
+    ----------
+    time : `~astropy.units.Quantity`
+        Simulated time.
+    step_count : int
+        Number of steps taken so far.
+    k : tuple of ndarray
+        Wavenumbers along each axis in rad/m, shaped for broadcasting
+        against the real-to-complex transform of a grid quantity.
+    mask : ndarray
+        Dealiasing mask of the transformed grid.
+
+    Notes
+    -----
+    The velocity :math:`\vec{v}` and the magnetic field in velocity units
+    :math:`\vec{b} = \vec{B} / \sqrt{\mu_0 \rho_0}` are advanced in
+    Fourier space according to
+
+    .. math::
+
+        \partial_t \vec{v} = P[\vec{v} \times \vec{\omega} +
+        \vec{j} \times \vec{b}] + \nu \nabla^2 \vec{v}, \qquad
+        \partial_t \vec{b} = \nabla \times (\vec{v} \times \vec{b}) +
+        \eta \nabla^2 \vec{b},
+
+    where :math:`\vec{\omega} = \nabla \times \vec{v}`,
+    :math:`\vec{j} = \nabla \times \vec{b}` and :math:`P` is the
+    projection onto divergence-free fields, which accounts for the total
+    pressure. The products are evaluated in real space. The diffusion is
+    integrated exactly with integrating factors and the nonlinear terms
+    with the third-order strong stability preserving Runge-Kutta scheme.
+
+    Wavenumbers, the dealiasing mask, the state, the stage buffers and
+    the workspaces of the nonlinear terms are allocated once and reused.
+    When pyFFTW is installed the transforms are also planned once between
+    preallocated arrays. Otherwise they are computed by `scipy.fft`, which
+    caches its plans and threads the transforms but has no output
+    argument, so every transform allocates a new array. Every step takes
+    three evaluations of the nonlinear terms of 12 inverse and 6 forward
+    transforms each.
+
+    The `pressure` of the plasma is not updated. The plasma `momentum`
+    and `magnetic_field` are updated by `to_plasma`, which `run` calls
+    when it returns.
+
+    Examples
+    --------
+    >>> from astropy import units as u
+    >>> from plasmapy.classes import Plasma3D
+    >>> x = np.arange(16) / 16 * 2 * np.pi * u.m
+    >>> plasma = Plasma3D(x, x, x)
+    >>> plasma.density[...] = 1 * u.kg / u.m ** 3
+    >>> plasma.momentum[0] = np.sin(x.value)[None, :, None] * u.kg / u.m ** 2 / u.s
+    >>> solver = SpectralMHD(plasma, viscosity=0.1 * u.m ** 2 / u.s)
+    >>> solver.run(t_end=1 * u.s)
+    >>> np.allclose(plasma.momentum[0, 0, 4, 0].value, np.exp(-0.1))
+    True
+    """
+
+    @u.quantity_input(viscosity=u.m ** 2 / u.s)
+    def __init__(self, plasma, viscosity, resistivity=None, cfl=0.5,
+                 dealias=True, dtype=np.float64, n_threads=None):
+        if resistivity is None:
+            resistivity = viscosity
+        if not 0 < cfl <= 1:
+            raise ValueError("cfl must be in (0, 1].")
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported dtype {dtype}; expected float32 "
+                             f"or float64.")
+
+        density = plasma.density.to_value(u.kg / u.m ** 3)
+        self.density = float(np.mean(density))
+        if self.density <= 0 or not np.allclose(density, self.density,
+                                                rtol=1e-8, atol=0):
+            raise ValueError("The density must be positive and uniform.")
+
+        self.plasma = plasma
+        self.viscosity = viscosity.to_value(u.m ** 2 / u.s)
+        self.resistivity = resistivity.to_value(u.m ** 2 / u.s)
+        self.cfl = cfl
+        self.dtype = dtype
+        self.n_threads = n_threads or -1
+        self._field_scale = np.sqrt(mu0.si.value * self.density)
+
+        self.shape = plasma.domain_shape
+        axes = (plasma.x.to_value(u.m), plasma.y.to_value(u.m),
+                plasma.z.to_value(u.m))
+        _, spacing = _uniform_grid(axes)
+        self._spacing = min(d for d, n in zip(spacing, self.shape) if n > 1) \
+            if any(n > 1 for n in self.shape) else 1.0
+
+        k, modes = [], []
+        for dim, (n, d) in enumerate(zip(self.shape, spacing)):
+            if dim == 2:
+                index = np.arange(n // 2 + 1)
+            else:
+                index = np.fft.fftfreq(n, 1 / n)
+            k_dim = 2 * np.pi * index / (n * d)
+            # The derivative of a real field has no Nyquist component
+            if n % 2 == 0:
+                k_dim[np.abs(index) == n // 2] = 0
+            expand = [np.newaxis] * 3
+            expand[dim] = slice(None)
+            k.append(k_dim[tuple(expand)].astype(dtype))
+            modes.append(np.abs(index)[tuple(expand)] < n / 3)
+        self.k = tuple(k)
+        spectral_shape = (self.shape[0], self.shape[1], self.shape[2] // 2 + 1)
+
+        self._k2 = (self.k[0] ** 2 + self.k[1] ** 2 + self.k[2] ** 2)
+        with np.errstate(divide='ignore'):
+            self._inverse_k2 = np.where(self._k2 > 0, 1 / self._k2, 0)
+        if dealias:
+            self.mask = modes[0] & modes[1] & modes[2]
+        else:
+            self.mask = np.ones(spectral_shape, dtype=bool)
+        self.mask = np.broadcast_to(self.mask, spectral_shape)
+
+        complex_dtype = np.result_type(dtype, np.complex64)
+        self._state = np.empty((6, *spectral_shape), dtype=complex_dtype)
+        self._initial = np.empty_like(self._state)
+        self._nonlinear = np.empty_like(self._state)
+        self._curls = np.empty_like(self._state)
+        self._spectral = np.empty_like(self._state)
+        self._scratch = np.empty(spectral_shape, dtype=complex_dtype)
+        self._divergence = np.empty(spectral_shape, dtype=complex_dtype)
+        self._products = np.empty((6, *self.shape), dtype=dtype)
+        self._real_scratch = np.empty(self.shape, dtype=dtype)
+        self._factors = {}
+
+        # The inverse transforms may overwrite their input, so the state is
+        # transformed from a copy in the spectral workspace
+        self._inverse_fields = _transform(self._spectral, self.shape, True,
+                                          self.n_threads)
+        self._inverse_curls = _transform(self._curls, self.shape, True,
+                                         self.n_threads)
+        self._forward_products = _transform(self._products, self.shape,
+                                            False, self.n_threads,
+                                            target=self._spectral)
+
+        self.time = 0 * u.s
+        self.step_count = 0
+        self.from_plasma()
+
+    def from_plasma(self):
+        r"""
+        Load the velocity and magnetic field from the plasma, removing
+        their compressive parts.
+        """
+        velocity = self.plasma.momentum.to_value(u.kg / (u.m ** 2 * u.s)) / \
+            self.density
+        field = self.plasma.magnetic_field.to_value(u.T) / self._field_scale
+        self._products[:3] = velocity
+        self._products[3:] = field
+        self._state[...] = self._forward_products(self._products)
+        self._project(self._state[:3])
+        self._project(self._state[3:])
+
+    def to_plasma(self):
+        r"""Write the velocity and magnetic field into the plasma
+        `momentum` and `magnetic_field`."""
+        fields = self._real_fields(self._state)
+        plasma = self.plasma
+        plasma.momentum[...] = fields[:3] * self.density * \
+            u.kg / (u.m ** 2 * u.s)
+        plasma.magnetic_field[...] = fields[3:] * self._field_scale * u.T
+        plasma.invalidate('momentum', 'magnetic_field')
+
+    def _project(self, f):
+        r"""Remove the compressive part of a transformed vector field in
+        place."""
+        divergence = self._divergence
+        np.multiply(self.k[0], f[0], out=divergence)
+        for i in (1, 2):
+            divergence += np.multiply(self.k[i], f[i], out=self._scratch)
+        divergence *= self._inverse_k2
+        for i in range(3):
+            f[i] -= np.multiply(self.k[i], divergence, out=self._scratch)
+
+    def _curl(self, f, out):
+        r"""Curl of a transformed vector field."""
+        for i in range(3):
+            j, k = (i + 1) % 3, (i + 2) % 3
+            np.multiply(self.k[j], f[k], out=out[i])
+            out[i] -= np.multiply(self.k[k], f[j], out=self._scratch)
+        out *= 1j
+        return out
+
+    def _real_fields(self, state):
+        r"""Velocity and field of ``state`` in real space, which may be a
+        workspace that the next transform overwrites."""
+        return self._inverse_fields(state)
+
+    def _evaluate(self, state):
+        r"""Evaluate the nonlinear terms of ``state`` into
+        ``self._nonlinear`` and return the velocity and field in real
+        space."""
+        fields = self._real_fields(state)
+        self._curl(state[:3], self._curls[:3])
+        self._curl(state[3:], self._curls[3:])
+        curls = self._inverse_curls(self._curls)
+
+        v, b = fields[:3], fields[3:]
+        vorticity, current = curls[:3], curls[3:]
+        products = self._products
+        _cross(v, vorticity, products[:3], self._real_scratch)
+        _cross(current, b, products[:3], self._real_scratch,
+               accumulate=True)
+        _cross(v, b, products[3:], self._real_scratch)
+
+        transformed = self._forward_products(products)
+        transformed *= self.mask
+        nonlinear = self._nonlinear
+        nonlinear[:3] = transformed[:3]
+        self._project(nonlinear[:3])
+        self._curl(transformed[3:], nonlinear[3:])
+        return fields
+
+    def _integrating_factor(self, tau):
+        r"""Exact diffusion over a time ``tau`` of the velocity and field,
+        shaped for broadcasting against the state."""
+        if tau not in self._factors:
+            if len(self._factors) > 8:
+                self._factors.clear()
+            factor = np.empty((2, 1, *self._k2.shape), dtype=self.dtype)
+            np.exp(-self.viscosity * tau * self._k2, out=factor[0, 0])
+            np.exp(-self.resistivity * tau * self._k2, out=factor[1, 0])
+            self._factors[tau] = factor
+        return self._factors[tau]
+
+    def _stable_step(self, fields):
+        r"""Time step allowed by the largest Elsasser speed."""
+        speed, field_speed = self._real_scratch, self._products[0]
+        np.sqrt(np.einsum('i...,i...->...', fields[:3], fields[:3],
+                          out=speed), out=speed)
+        np.sqrt(np.einsum('i...,i...->...', fields[3:], fields[3:],
+                          out=field_speed), out=field_speed)
+        speed += field_speed
+        largest = float(speed.max())
+        if largest == 0:
+            return np.inf
+        return self.cfl * self._spacing / largest
+
+    def time_step(self):
+        r"""
+        The largest stable time step of the current state.
+
+        Returns
+        -------
+        `~astropy.units.Quantity`
+        """
+        return self._stable_step(self._real_fields(self._state)) * u.s
+
+    def step(self, dt=None, t_max=None):
+        r"""
+        Advance the velocity and field by one time step.
+
+        Parameters
+        ----------
+        dt : `~astropy.units.Quantity`, optional
+            Time step. By default the stable step is used.
+        t_max : `~astropy.units.Quantity`, optional
+            Upper limit of the default time step.
+
+        Returns
+        -------
+        `~astropy.units.Quantity`
+            The time step taken.
+
+        Notes
+        -----
+        The second stage contains the integrating factor of a negative
+        time step, :math:`\exp(\nu k^2 \Delta t / 2)`, which limits the
+        time step to :math:`\nu k_{max}^2 \Delta t \lesssim 10^2` when the
+        diffusion is very strong.
+        """
+        state, initial = self._state, self._initial
+        fields = self._evaluate(state)
+        if dt is None:
+            dt = self._stable_step(fields)
+            if t_max is not None:
+                dt = min(dt, t_max.to_value(u.s))
+            if not np.isfinite(dt):
+                raise ValueError("A time step or t_max is required for a "
+                                 "state at rest.")
+        else:
+            dt = dt.to_value(u.s)
+        del fields
+
+        shape = (2, 3, *state.shape[1:])
+        stage = state.reshape(shape)
+        start = initial.reshape(shape)
+        initial[...] = state
+        nonlinear = self._nonlinear.reshape(shape)
+        increment = self._curls.reshape(shape)
+
+        # Third-order SSP Runge-Kutta with integrating factors; the stages
+        # are at t + dt, t + dt / 2 and t + dt
+        stage += np.multiply(nonlinear, dt, out=increment)
+        stage *= self._integrating_factor(dt)
+
+        self._evaluate(state)
+        stage += np.multiply(nonlinear, dt, out=increment)
+        stage *= 0.25 * self._integrating_factor(-dt / 2)
+        for field in range(2):
+            for i in range(3):
+                stage[field, i] += np.multiply(
+                    start[field, i],
+                    0.75 * self._integrating_factor(dt / 2)[field, 0],
+                    out=self._scratch)
+
+        self._evaluate(state)
+        stage += np.multiply(nonlinear, dt, out=increment)
+        stage *= 2 / 3 * self._integrating_factor(dt / 2)
+        for field in range(2):
+            for i in range(3):
+                stage[field, i] += np.multiply(
+                    start[field, i],
+                    1 / 3 * self._integrating_factor(dt)[field, 0],
+                    out=self._scratch)
+
+        self.time = self.time + dt * u.s
+        self.step_count += 1
+        return dt * u.s
+
+    def run(self, t_end=None, n_steps=None, callback=None):
+        r"""
+        Advance the solution until a given time or for a number of steps
+        and write it into the plasma.
+
+        Parameters
+        ----------
+        t_end : `~astropy.units.Quantity`, optional
+            Time to stop at. The last step is shortened to end exactly at
+            ``t_end``.
+        n_steps : int, optional
+            Largest number of steps to take.
+        callback : callable, optional
+            Called with the solver after every step.
+        """
+        if t_end is None and n_steps is None:
+            raise ValueError("Either t_end or n_steps is required.")
+        steps = 0
+        while n_steps is None or steps < n_steps:
+            t_max = None
+            if t_end is not None:
+                t_max = t_end - self.time
+                if t_max <= 0 or u.isclose(self.time, t_end, rtol=1e-12):
+                    break
+            self.step(t_max=t_max)
+            steps += 1
+            if callback is not None:
+                callback(self)
+        self.to_plasma()
+
+    def energy(self):
+        r"""
+        Kinetic and magnetic energy densities averaged over the domain.
+
+        Returns
+        -------
+        kinetic, magnetic : `~astropy.units.Quantity`
+            Energy densities in J/m^3.
+        """
+        fields = self._real_fields(self._state)
+        size = fields[0].size
+        kinetic = 0.5 * self.density * np.vdot(fields[:3], fields[:3]) / size
+        magnetic = 0.5 * self.density * np.vdot(fields[3:], fields[3:]) / size
+        return kinetic * u.J / u.m ** 3, magnetic * u.J / u.m ** 3
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.simulation import DomainDecomposition, FiniteDifference
+
+
+def make_plasma(shape):
+    axes = [np.arange(n) / n * u.m for n in shape]
+    test_plasma = Plasma3D(*axes)
+    rng = np.random.RandomState(0)
+    test_plasma.density[...] = rng.rand(*shape) * u.kg / u.m ** 3
+    test_plasma.magnetic_field[...] = rng.rand(3, *shape) * u.T
+    return test_plasma
+
+
+def central_difference(f, spacing, axis):
+    r"""Second-order derivative of the interior of a block with one ghost
+    cell."""
+    interior = [slice(1, -1)] * 3
+    forward, backward = list(interior), list(interior)
+    forward[axis] = slice(2, None)
+    backward[axis] = slice(None, -2)
+    return (f[tuple(forward)] - f[tuple(backward)]) / (2 * spacing)
+
+
+@pytest.mark.parametrize('periodic', [True, False])
+@pytest.mark.parametrize('ghost_width', [1, 2])
+def test_exchange_halos(periodic, ghost_width):
+    r"""Ghost cells hold the neighbouring values, including edges and
+    corners, wrapped or repeated at the domain boundaries."""
+    shape = (10, 7, 5)
+    test_plasma = make_plasma(shape)
+    decomposition = DomainDecomposition(
+        test_plasma, blocks=(3, 2, 2), ghost_width=ghost_width,
+        periodic=periodic, n_workers=1)
+    decomposition.exchange_halos()
+
+    g = ghost_width
+    mode = 'wrap' if periodic else 'edge'
+    density = np.pad(test_plasma.density.value, g, mode=mode)
+    field = np.pad(test_plasma.magnetic_field.value,
+                   [(0, 0)] + [(g, g)] * 3, mode=mode)
+    for index, bound in enumerate(decomposition.bounds):
+        padded = tuple(slice(s.start, s.stop + 2 * g) for s in bound)
+        assert np.array_equal(decomposition.block('density', index),
+                              density[padded])
+        assert np.array_equal(decomposition.block('magnetic_field', index),
+                              field[(Ellipsis, *padded)])
+
+
+def test_map_blocks_workers():
+    r"""A stencil evaluated by worker processes matches the result on the
+    undivided grid."""
+    shape = (16, 12, 8)
+    test_plasma = make_plasma(shape)
+    expected = FiniteDifference(test_plasma).derivative(
+        test_plasma.density, 1)
+
+    with DomainDecomposition(test_plasma, blocks=(2, 2, 1), n_workers=2,
+                             fields=['density']) as decomposition:
+        assert decomposition._pool is None
+        decomposition.map_blocks(central_difference, ['density'], 'gradient',
+                                 unit=u.kg / u.m ** 4, spacing=1 / 12, axis=1)
+        assert decomposition._pool is not None
+        result = decomposition.gather('gradient')
+
+    assert decomposition._pool is None
+    assert u.allclose(result, expected)
+
+
+def test_scatter_gather():
+    r"""Fields round-trip between the plasma and the blocks with units."""
+    test_plasma = make_plasma((6, 5, 1))
+    decomposition = DomainDecomposition(test_plasma, blocks=(2, 1, 1),
+                                        n_workers=1)
+    assert decomposition.blocks == (2, 1, 1)
+    assert decomposition.n_blocks == 2
+
+    field = decomposition.gather('magnetic_field')
+    assert field.unit == u.T
+    assert u.allclose(field, test_plasma.magnetic_field)
+
+    decomposition.block('magnetic_field', 0)[...] = 1
+    decomposition.block('magnetic_field', 1)[...] = 2
+    out = np.zeros((3, 6, 5, 1)) * u.G
+    decomposition.gather('magnetic_field', out=out)
+    assert u.allclose(out[:, :3], 1 * u.T)
+    assert u.allclose(out[:, 3:], 2 * u.T)
+
+    test_plasma.density[...] = 4 * u.g / u.cm ** 3
+    decomposition.scatter('density')
+    assert np.allclose(decomposition.gather('density').value, 4000)
+
+
+def test_default_blocks():
+    test_plasma = make_plasma((64, 32, 1))
+    decomposition = DomainDecomposition(test_plasma, n_workers=8,
+                                        fields=[])
+    assert decomposition.blocks == (4, 2, 1)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'blocks': (5, 1, 1)},
+    {'blocks': (1, 1)},
+    {'ghost_width': -1},
+    {'fields': ['temperature']},
+])
+def test_invalid(kwargs):
+    test_plasma = make_plasma((4, 4, 4))
+    with pytest.raises(ValueError):
+        DomainDecomposition(test_plasma, n_workers=1, **kwargs)
+
+    decomposition = DomainDecomposition(test_plasma, n_workers=1)
+    with pytest.raises(ValueError):
+        decomposition.exchange_halos('temperature')
+    with pytest.raises(ValueError):
+        decomposition.add_field('density')
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D, Species
+from plasmapy.simulation import deposition
+
+
+axes = (np.linspace(0, 1, 11), np.linspace(0, 2, 5), np.linspace(0, 1, 4))
+
+
+@pytest.mark.parametrize('shape', deposition.SHAPE_FUNCTIONS)
+@pytest.mark.parametrize('periodic', [True, False])
+def test_charge_conservation(shape, periodic):
+    r"""The deposited total equals the total particle weight."""
+    rng = np.random.RandomState(42)
+    positions = np.stack([rng.uniform(a[0], a[-1], 10000) for a in axes],
+                         axis=1)
+    weights = rng.uniform(0.5, 1.5, 10000)
+
+    result = deposition.deposit(positions, weights, axes, shape=shape,
+                                periodic=periodic)
+
+    assert result.shape == (11, 5, 4)
+    assert np.isclose(result.sum(), weights.sum(), rtol=1e-12, atol=0)
+    assert (result >= 0).all()
+
+
+@pytest.mark.parametrize('shape, expected', [
+    ('NGP', [0, 0, 1, 0, 0]),
+    ('CIC', [0, 0, 0.75, 0.25, 0]),
+    ('TSC', [0, 0.03125, 0.6875, 0.28125, 0]),
+])
+def test_shape_functions(shape, expected):
+    x = np.linspace(0, 4, 5)
+    positions = np.array([[2.25, 0, 0]])
+    result = deposition.deposit(positions, [1.0], (x, [0.0], [0.0]),
+                                shape=shape)
+    assert np.allclose(result[:, 0, 0], expected)
+
+
+@pytest.mark.parametrize('shape', deposition.SHAPE_FUNCTIONS)
+def test_gather_is_adjoint(shape):
+    r"""Gathering is the transpose of depositing with the same shape."""
+    rng = np.random.RandomState(1)
+    positions = np.stack([rng.uniform(a[0], a[-1], 50) for a in axes],
+                         axis=1)
+    weights = rng.uniform(size=50)
+    values = rng.uniform(size=(2, 11, 5, 4))
+
+    gathered = deposition.gather(positions, values, axes, shape=shape,
+                                 periodic=True)
+    deposited = deposition.deposit(positions, weights, axes, shape=shape,
+                                   periodic=True)
+
+    assert gathered.shape == (50, 2)
+    assert np.allclose(weights @ gathered,
+                       np.sum(values * deposited, axis=(1, 2, 3)))
+
+
+def test_gather_linear_field():
+    x = np.linspace(0, 4, 5)
+    positions = np.array([[1.3, 0, 0], [2.25, 0, 0]])
+    values = (2 * x)[:, np.newaxis, np.newaxis]
+    result = deposition.gather(positions, values, (x, [0.0], [0.0]))
+    assert np.allclose(result, [2.6, 4.5])
+
+
+def test_periodic_wrap():
+    x = np.linspace(0, 4, 5)
+    positions = np.array([[4.5, 0, 0], [-0.25, 0, 0]])
+    result = deposition.deposit(positions, [1.0, 1.0], (x, [0.0], [0.0]),
+                                periodic=True)
+    assert np.allclose(result[:, 0, 0], [1.25, 0, 0, 0, 0.75])
+
+
+def test_periodic_matches_species_boundary():
+    r"""Particles wrapped by the periodic boundary of a `Species` deposit
+    the same charge as their unwrapped positions."""
+    x = np.arange(10) * 0.1 * u.m
+    test_plasma = Plasma3D(x, x, x)
+    s = Species(test_plasma, 'p', 200, dt=1e-9 * u.s, nt=1,
+                boundary='periodic')
+    unwrapped = np.random.RandomState(3).uniform(-1, 2, (200, 3))
+    s.x[...] = unwrapped * u.m
+    s.apply_boundaries()
+
+    assert ((s.x >= 0 * u.m) & (s.x < 1 * u.m)).all()
+    wrapped = deposition.charge_density(s, periodic=True)
+    expected = deposition.deposit(unwrapped, s.eff_q.si.value,
+                                  [x.value] * 3, periodic=True)
+    assert np.allclose(wrapped.si.value * 0.1 ** 3, expected)
+
+
+def test_threaded_matches_serial(monkeypatch):
+    monkeypatch.setattr(deposition, '_CHUNK_SIZE', 1000)
+    rng = np.random.RandomState(0)
+    positions = np.stack([rng.uniform(a[0], a[-1], 9500) for a in axes],
+                         axis=1)
+    weights = rng.normal(size=(9500, 3))
+
+    serial = deposition.deposit(positions, weights, axes, shape='TSC')
+    threaded = deposition.deposit(positions, weights, axes, shape='TSC',
+                                  n_threads=4)
+
+    assert serial.shape == (3, 11, 5, 4)
+    assert np.allclose(serial, threaded)
+
+
+def test_out_of_domain():
+    with pytest.raises(ValueError):
+        deposition.deposit(np.array([[2.0, 0, 0]]), [1.0], axes)
+
+
+def test_unknown_shape():
+    with pytest.raises(ValueError):
+        deposition.deposit(np.array([[0.5, 0, 0]]), [1.0], axes,
+                           shape='PQS')
+
+
+def test_species_densities():
+    x = np.linspace(0, 1, 11) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    s = Species(test_plasma, 'p', 100, scaling=1e3, dt=1e-9 * u.s, nt=1)
+    s.x[...] = np.random.RandomState(1).uniform(0, 1, (100, 3)) * u.m
+    s.v[:, 0] = 1e5 * u.m / u.s
+
+    rho = deposition.charge_density(s)
+    J = deposition.current_density(s, shape='TSC')
+
+    cell_volume = (0.1 * u.m) ** 3
+    assert rho.unit == u.C / u.m ** 3
+    assert np.isclose((rho.sum() * cell_volume).to(u.C), 100 * s.eff_q)
+    assert J.shape == (3, 11, 11, 11)
+    assert np.isclose((J[0].sum() * cell_volume).to(u.A * u.m),
+                      100 * s.eff_q * 1e5 * u.m / u.s)
+    assert (J[1:] == 0).all()
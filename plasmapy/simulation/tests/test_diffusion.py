@@ -0,0 +1,218 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import k_B, mu0
+from plasmapy.simulation import AnisotropicHeatConduction, ResistiveDiffusion
+
+DENSITY = 1e19
+# Conductivity giving a thermal diffusivity of 1 m^2/s
+UNIT_KAPPA = 1.5 * k_B.si.value * DENSITY
+
+
+def conductivity(parallel, perpendicular, cross):
+    return np.array([parallel, perpendicular, cross]) * UNIT_KAPPA * \
+        u.W / u.m / u.K
+
+
+def periodic_plasma(n=16, nz=1):
+    x = np.arange(n) / n * u.m
+    z = np.arange(nz) / nz * u.m if nz > 1 else np.zeros(1) * u.m
+    return Plasma3D(x, x, z)
+
+
+def decay_factor(diffusivity, n, dt, theta=1):
+    r"""Amplification of the discrete sin(2 pi x) mode of the periodic
+    three-point Laplacian over one theta-method step."""
+    h = 1 / n
+    rate = diffusivity * (2 - 2 * np.cos(2 * np.pi * h)) / h ** 2
+    return (1 - (1 - theta) * rate * dt) / (1 + theta * rate * dt)
+
+
+@pytest.mark.parametrize('theta', [1, 0.5])
+@pytest.mark.parametrize('direction, diffusivity', [(0, 1e6), (1, 1e-4)])
+def test_heat_mode_decay(theta, direction, diffusivity):
+    r"""A temperature mode along x decays with the parallel conductivity
+    for a field along x, and with the perpendicular one for a field along
+    y."""
+    n, dt = 16, 1e-7 * u.s
+    test_plasma = periodic_plasma(n)
+    test_plasma.magnetic_field[direction] = 1 * u.T
+    solver = AnisotropicHeatConduction(
+        test_plasma, conductivity(1e6, 1e-4, 0),
+        DENSITY * u.m ** -3, theta=theta)
+    X = test_plasma.grid[0].to_value(u.m)
+    T = (100 + np.sin(2 * np.pi * X)) * u.eV
+
+    new = solver.step(T, dt)
+    expected = decay_factor(diffusivity, n, dt.value, theta)
+    assert new.unit == u.K
+    new = new.to_value(u.eV, equivalencies=u.temperature_energy())
+    assert np.allclose(new - 100, expected * np.sin(2 * np.pi * X),
+                       atol=1e-7)
+
+
+def test_circular_field_lines():
+    r"""With :math:`\kappa_\parallel / \kappa_\perp = 10^9` and field lines
+    on the contours of the initial temperature, heat only diffuses across
+    the field, at the rate of :math:`\kappa_\perp` [Günter et al. 2005]."""
+    n = 33
+    x = np.linspace(0, 1, n) * u.m
+    test_plasma = Plasma3D(x, x, np.zeros(1) * u.m)
+    X, Y, _ = test_plasma.grid.to_value(u.m)
+    test_plasma.magnetic_field[0] = -np.sin(np.pi * X) * \
+        np.cos(np.pi * Y) * u.T
+    test_plasma.magnetic_field[1] = np.cos(np.pi * X) * \
+        np.sin(np.pi * Y) * u.T
+    solver = AnisotropicHeatConduction(
+        test_plasma, conductivity(1e9, 1, 0),
+        DENSITY * u.m ** -3, boundary='fixed')
+    T0 = T = np.sin(np.pi * X) * np.sin(np.pi * Y) * u.K
+
+    dt = 2e-3
+    for _ in range(10):
+        T = solver.step(T, dt * u.s)
+    # One factorization serves all steps
+    assert solver.factorizations == 1
+    assert solver.iterations <= 3
+    expected = (1 + 2 * np.pi ** 2 * dt) ** -10
+    assert np.isclose(T[16, 16, 0].value, expected, rtol=0.01)
+    # The walls keep their initial temperature
+    assert np.all(T[[0, -1]] == T0[[0, -1]])
+    assert np.all(T[:, [0, -1]] == T0[:, [0, -1]])
+
+
+def test_heat_conservation():
+    r"""Insulating walls and cross conduction conserve the heat content,
+    and heating raises it by the deposited energy."""
+    n, nz = 8, 6
+    x = np.linspace(0, 1, n) * u.m
+    test_plasma = Plasma3D(x, x, np.arange(nz) / nz * u.m)
+    rng = np.random.RandomState(0)
+    test_plasma.magnetic_field[...] = rng.normal(size=(3, n, n, nz)) * u.T
+    solver = AnisotropicHeatConduction(
+        test_plasma, conductivity(1e4, 1, 3),
+        DENSITY * u.m ** -3, boundary=('zero_flux', 'zero_flux', 'periodic'))
+    T = rng.uniform(1e4, 2e4, (n, n, nz)) * u.K
+
+    def content(T):
+        return np.sum(solver._capacity * T.value.ravel())
+
+    new = solver.step(T, 1e-4 * u.s)
+    assert np.isclose(content(new), content(T), rtol=1e-10)
+    assert new.std() < T.std()
+
+    heated = solver.step(T, 1e-4 * u.s, heating=5 * u.W / u.m ** 3)
+    assert np.isclose(content(heated) - content(T), 5e-4, rtol=1e-8)
+
+
+def test_coefficient_updates():
+    r"""Small changes of the coefficients reuse the preconditioner, and
+    the steps follow the new coefficients."""
+    n, dt = 16, 1e-7 * u.s
+    test_plasma = periodic_plasma(n)
+    test_plasma.magnetic_field[0] = 1 * u.T
+    solver = AnisotropicHeatConduction(
+        test_plasma, conductivity(1e6, 1, 0),
+        DENSITY * u.m ** -3)
+    X = test_plasma.grid[0].to_value(u.m)
+    T = (1 + np.sin(2 * np.pi * X)) * u.K
+    solver.step(T, dt)
+    assert solver.factorizations == 1
+
+    solver.set_coefficients(conductivity(1.05e6, 1, 0))
+    new = solver.step(T, dt)
+    assert solver.factorizations == 1
+    assert np.allclose(new.value - 1, decay_factor(1.05e6, n, dt.value) *
+                       np.sin(2 * np.pi * X), atol=1e-7)
+
+    solver.set_coefficients(conductivity(2e6, 1, 0))
+    solver.step(T, dt)
+    assert solver.factorizations == 2
+    solver.step(T, 2 * dt)
+    assert solver.factorizations == 3
+
+
+@pytest.mark.parametrize('preconditioner', ['ilu', 'jacobi', None])
+def test_other_preconditioners(preconditioner):
+    n, dt = 16, 1e-6 * u.s
+    test_plasma = periodic_plasma(n)
+    test_plasma.magnetic_field[0] = 1 * u.T
+    solver = AnisotropicHeatConduction(
+        test_plasma, conductivity(10, 1, 0),
+        DENSITY * u.m ** -3, preconditioner=preconditioner)
+    X = test_plasma.grid[0].to_value(u.m)
+    T = (1 + np.sin(2 * np.pi * X)) * u.K
+    new = solver.step(T, dt)
+    assert np.allclose(new.value - 1, decay_factor(10, n, dt.value) *
+                       np.sin(2 * np.pi * X), atol=1e-7)
+
+
+@pytest.mark.parametrize('component, direction, diffusivity', [
+    (2, 0, 2.0),   # B_z(x): current along y, across the field
+    (0, 1, 1.0),   # small B_x(y) on a guide field: current along it
+])
+def test_resistive_mode_decay(component, direction, diffusivity):
+    n, dt = 16, 1e-8 * u.s
+    test_plasma = periodic_plasma(n, nz=4)
+    coordinate = test_plasma.grid[direction].to_value(u.m)
+    amplitude = 1 if component == 2 else 1e-6
+    test_plasma.magnetic_field[component] = \
+        amplitude * np.sin(2 * np.pi * coordinate) * u.T
+    if component != 2:
+        test_plasma.magnetic_field[2] = 1 * u.T
+    eta = mu0.si.value * np.array([1, 2, 0]) * u.Ohm * u.m
+    solver = ResistiveDiffusion(test_plasma, eta * 1e6)
+
+    B = solver.step(dt)
+    assert B is test_plasma.magnetic_field
+    expected = decay_factor(1e6 * diffusivity, n, dt.value) * amplitude * \
+        np.sin(2 * np.pi * coordinate)
+    assert np.allclose(B[component].value, expected, atol=1e-8 * amplitude)
+
+
+def test_resistive_divergence():
+    r"""The cell-centred divergence of a periodic field is preserved."""
+    n = 8
+    test_plasma = periodic_plasma(n, nz=n)
+    rng = np.random.RandomState(1)
+    test_plasma.magnetic_field[...] = rng.normal(size=(3, n, n, n)) * u.T
+    solver = ResistiveDiffusion(test_plasma, [1, 3, 0.5] * u.Ohm * u.m)
+
+    def divergence():
+        B = test_plasma.magnetic_field.value.reshape(3, -1)
+        return np.einsum('ip,ipc->c', solver._gradient,
+                         B[:, solver._corner_nodes])
+
+    before = divergence()
+    B0 = test_plasma.magnetic_field.copy()
+    solver.step(1e-6 * u.s)
+    assert not u.allclose(test_plasma.magnetic_field, B0)
+    assert np.allclose(divergence(), before, atol=1e-8 * np.abs(before).max())
+
+
+def test_invalid():
+    test_plasma = periodic_plasma(4)
+    kappa = [1, 1, 0] * u.W / u.m / u.K
+    n = 1e19 * u.m ** -3
+    with pytest.raises(ValueError):
+        AnisotropicHeatConduction(test_plasma, kappa, n, theta=0.2)
+    with pytest.raises(ValueError):
+        AnisotropicHeatConduction(test_plasma, kappa, n, boundary='open')
+    with pytest.raises(ValueError):
+        AnisotropicHeatConduction(test_plasma, kappa, n, preconditioner='amg')
+    with pytest.raises(ValueError):
+        AnisotropicHeatConduction(test_plasma, [1, 1] * u.W / u.m / u.K, n)
+    with pytest.raises(u.UnitsError):
+        AnisotropicHeatConduction(test_plasma, [1, 1, 0] * u.m, n)
+
+    solver = AnisotropicHeatConduction(test_plasma, kappa, n)
+    with pytest.raises(ValueError):
+        solver.step(np.ones((3, 3, 3)) * u.K, 1 * u.s)
+    with pytest.raises(ValueError):
+        solver.step(np.ones((4, 4, 1)) * u.K, 0 * u.s)
+
+    x = np.array([0, 1, 3]) * u.m
+    with pytest.raises(ValueError):
+        ResistiveDiffusion(Plasma3D(x, x, x), [1, 1, 0] * u.Ohm * u.m)
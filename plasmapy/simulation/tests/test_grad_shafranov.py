@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import mu0
+from plasmapy.simulation import GradShafranovSolver
+
+
+def pressure(psi_n):
+    return 2e4 * (1 - psi_n ** 2) * u.Pa
+
+
+def toroidal_field_function(psi_n):
+    return np.sqrt(16 + (1 - psi_n)) * u.T * u.m
+
+
+def solved(n, **kwargs):
+    R = np.linspace(1, 3, n) * u.m
+    Z = np.linspace(-1, 1, n) * u.m
+    solver = GradShafranovSolver(R, Z, pressure, toroidal_field_function,
+                                 **kwargs)
+    solver.solve()
+    return solver
+
+
+def test_equilibrium():
+    r"""The converged flux satisfies the discretized equation, peaks on
+    the midplane and carries the current enclosed by the poloidal
+    field on the edges of the grid."""
+    solver = solved(65)
+    assert solver.converged
+    assert solver.residuals[-1] < 1e-8
+    assert len(solver.residuals) < 20
+
+    psi = solver.psi.to_value(u.Wb)
+    psi_n, delta = solver._normalized(psi)
+    assert np.allclose(solver._apply(psi),
+                       -solver._source(psi_n)[1:-1, 1:-1] / delta,
+                       atol=1e-6 * np.abs(solver._apply(psi)).max())
+    assert np.allclose(psi, psi[:, ::-1])
+    assert u.isclose(solver.psi_axis, psi.max() * u.Wb)
+    assert u.isclose(solver.psi_boundary, 0 * u.Wb)
+    assert psi_n.min() == 0 and np.isclose(psi_n.max(), 1)
+
+    R_axis, Z_axis = solver.magnetic_axis
+    assert abs(Z_axis) < 1e-8 * u.m
+    # The hoop force pushes the axis outwards
+    assert 2 * u.m < R_axis < 2.5 * u.m
+
+    B_R, B_phi, B_Z = solver.magnetic_field().to_value(u.T)
+    dR = dZ = 2 / 64
+    # Right-handed (R, phi, Z): the circulation runs from +Z towards +R
+    circulation = (np.trapz(B_Z[-1], dx=dZ) - np.trapz(B_R[:, -1], dx=dR) -
+                   np.trapz(B_Z[0], dx=dZ) + np.trapz(B_R[:, 0], dx=dR))
+    current = solver.plasma_current
+    assert current > 0 * u.A
+    assert u.isclose(-circulation * u.T * u.m / mu0, current, rtol=0.01)
+    assert np.allclose(B_phi * solver.R.value[:, np.newaxis],
+                       toroidal_field_function(np.clip(psi_n, 0, 1)).value)
+
+
+def test_force_balance():
+    r"""The Lorentz force balances the pressure gradient of the
+    equilibrium."""
+    solver = solved(65)
+    B_R, B_phi, B_Z = solver.magnetic_field().to_value(u.T)
+    J_phi = solver.current_density().to_value(u.A / u.m ** 2)
+    p = solver.pressure_map().to_value(u.Pa)
+    R = solver.R.to_value(u.m)[:, np.newaxis]
+    dp_dR, dp_dZ = np.gradient(p, 2 / 64, 2 / 64)
+    # Poloidal current of F = R B_phi
+    dF_dR, dF_dZ = np.gradient(B_phi * R, 2 / 64, 2 / 64)
+    J_R = -dF_dZ / (mu0.si.value * R)
+    J_Z = dF_dR / (mu0.si.value * R)
+
+    inner = (slice(2, -2), slice(2, -2))
+    force_R = J_phi * B_Z - J_Z * B_phi
+    force_Z = J_R * B_phi - J_phi * B_R
+    assert np.allclose(force_R[inner], dp_dR[inner],
+                       atol=0.01 * np.abs(dp_dR).max())
+    assert np.allclose(force_Z[inner], dp_dZ[inner],
+                       atol=0.01 * np.abs(dp_dZ).max())
+
+
+def test_second_order_convergence():
+    current = [solved(n).plasma_current.to_value(u.A) for n in (33, 65, 129)]
+    ratio = (current[1] - current[0]) / (current[2] - current[1])
+    assert 3.5 < ratio < 4.5
+
+
+def test_restart():
+    solver = solved(33)
+    psi = solver.psi
+    solver.solve()
+    assert len(solver.residuals) == 1
+    assert u.allclose(solver.psi, psi, atol=1e-8 * solver.psi_axis)
+
+
+def test_boundary_flux():
+    r"""With a tilted boundary flux, the last closed flux surface only
+    touches the highest edge, and no current flows outside of it."""
+    n = 33
+    Z = np.linspace(-1, 1, n)
+    tilt = np.broadcast_to(-0.02 * Z, (n, n)) * u.Wb
+    solver = solved(n, boundary_flux=tilt)
+    assert solver.converged
+    assert u.isclose(solver.psi_boundary, 0.02 * u.Wb)
+
+    psi_n = solver.normalized_flux
+    outside = psi_n > 1
+    assert outside[:, -1].all() and not outside[:, 0].all()
+    J = solver.current_density()
+    assert np.all(J[outside] == 0)
+    assert np.all(J[psi_n < 1] > 0)
+    assert solver.magnetic_axis[1] < 0 * u.m
+
+
+def test_to_plasma():
+    r"""On the x-axis the Cartesian components are the cylindrical ones,
+    and the field is invariant under rotations about the z-axis."""
+    solver = solved(33)
+    R = solver.R[4:29]
+    test_plasma = Plasma3D(R, R[:3] - R[1], solver.Z[::4])
+    assert solver.to_plasma(test_plasma) is test_plasma
+
+    B = test_plasma.magnetic_field.to_value(u.T)
+    expected = solver.magnetic_field().to_value(u.T)[:, 4:29, ::4]
+    assert np.allclose(B[:, :, 1], expected, atol=1e-12)
+    assert u.allclose(test_plasma.pressure[:, 1],
+                      solver.pressure_map()[4:29, ::4])
+
+    # Cylindrical components at mirror images in y
+    X, Y, _ = test_plasma.grid.to_value(u.m)
+    angle = np.arctan2(Y, X)
+    B_R = B[0] * np.cos(angle) + B[1] * np.sin(angle)
+    B_phi = B[1] * np.cos(angle) - B[0] * np.sin(angle)
+    for component in (B_R, B_phi, B[2]):
+        assert np.allclose(component[:, 0], component[:, 2])
+
+    x = np.linspace(0, 1, 4) * u.m
+    with pytest.raises(ValueError):
+        solver.to_plasma(Plasma3D(x, x, x))
+
+
+def test_invalid():
+    R = np.linspace(1, 3, 9) * u.m
+    for axes in [(R ** 2 / u.m, R), (R - 2 * u.m, R), (R[:2], R)]:
+        with pytest.raises(ValueError):
+            GradShafranovSolver(*axes, pressure, toroidal_field_function)
+    with pytest.raises(ValueError):
+        GradShafranovSolver(R, R, pressure, toroidal_field_function,
+                            boundary_flux=np.zeros((3, 3)) * u.Wb)
+
+    solver = GradShafranovSolver(R, R, pressure, toroidal_field_function)
+    with pytest.raises(ValueError):
+        solver.magnetic_field()
+    with pytest.raises(ValueError):
+        solver.solve(relaxation=0)
+    with pytest.raises(ValueError):
+        GradShafranovSolver(R, R, lambda psi_n: 1e4 * psi_n * u.Pa,
+                            lambda psi_n: 4 + 0 * psi_n).solve()
+    with pytest.warns(RuntimeWarning):
+        solver.solve(max_iterations=2)
+    assert not solver.converged
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.simulation import GuidingCenter
+
+
+def uniform_plasma(N=5, max_x=1):
+    x = np.linspace(-max_x, max_x, N) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    test_plasma.magnetic_field[2] = 1 * u.T
+    return test_plasma
+
+
+def test_exb_drift():
+    r"""Guiding centres in crossed uniform fields drift with E x B / B^2,
+    independent of the time step."""
+    test_plasma = uniform_plasma()
+    test_plasma.electric_field[1] = 100 * u.V / u.m
+
+    gc = GuidingCenter(test_plasma, 'p', 3, dt=1e-4 * u.s, nt=5)
+    gc.x[:, 1] = [-0.5, 0, 0.5] * u.m
+    gc.set_velocity(np.array([[0, 0, 10], [1e3, 0, 0], [0, 1e4, 1]]) *
+                    u.m / u.s)
+    gc.run()
+
+    displacement = gc.position_history[-1] - gc.position_history[0]
+    expected_x = (100 * u.m / u.s) * (gc.NT - 1) * gc.dt
+    assert np.allclose(displacement[:, 0], expected_x)
+    assert np.allclose(displacement[:, 2], [10, 0, 1] * u.m / u.s *
+                       (gc.NT - 1) * gc.dt)
+    assert not gc.lost.any()
+
+
+def test_grad_B_drift():
+    r"""A particle in a field with a perpendicular gradient drifts along
+    b x grad B with speed mu |grad B| / (q B)."""
+    x = np.linspace(-1, 1, 41) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    L = 2 * u.m
+    test_plasma.magnetic_field[2] = (1 * u.T) * (
+        1 + test_plasma.x[:, np.newaxis, np.newaxis] / L)
+
+    gc = GuidingCenter(test_plasma, 'p', 1, dt=1e-3 * u.s, nt=3, rtol=1e-8)
+    v_perp = 1e4 * u.m / u.s
+    gc.set_velocity(np.array([[v_perp.value, 0, 0]]) * u.m / u.s)
+    gc.run()
+
+    mu = gc.m * v_perp ** 2 / (2 * 1 * u.T)
+    expected = (mu * (1 * u.T / L) / (gc.q * 1 * u.T)).to(u.m / u.s)
+    measured = (gc.position_history[-1, 0, 1] /
+                ((gc.NT - 1) * gc.dt)).to(u.m / u.s)
+    assert np.isclose(measured, expected, rtol=1e-2)
+
+
+def test_mirror_energy_conservation():
+    r"""A trapped particle in a magnetic mirror bounces while its kinetic
+    energy and magnetic moment stay constant."""
+    z = np.linspace(-1, 1, 81) * u.m
+    x = np.linspace(-0.1, 0.1, 3) * u.m
+    test_plasma = Plasma3D(x, x, z)
+    test_plasma.magnetic_field[2] = (1 * u.T) * (
+        1 + test_plasma.z[np.newaxis, np.newaxis, :] ** 2 / u.m ** 2)
+
+    gc = GuidingCenter(test_plasma, 'p', 1, dt=2e-5 * u.s, nt=50, rtol=1e-8)
+    gc.set_velocity(np.array([[1e4, 0, 5e3]]) * u.m / u.s)
+    mu = gc.mu.copy()
+    initial_energy = gc.kinetic_energy
+    gc.run()
+
+    assert (gc.v_parallel_history < 0).any(), "Particle is not reflected"
+    assert np.abs(gc.position_history[:, 0, 2]).max() < 0.51 * u.m
+    assert np.allclose(gc.kinetic_energy, initial_energy, rtol=1e-5)
+    assert (gc.mu == mu).all()
+
+
+def test_lost_particles():
+    r"""Particles leaving the domain are flagged and no longer advanced."""
+    test_plasma = uniform_plasma()
+    gc = GuidingCenter(test_plasma, 'p', 2, dt=1e-3 * u.s, nt=3)
+    gc.set_velocity(np.array([[0, 0, 1e3], [0, 0, 0]]) * u.m / u.s)
+    gc.run()
+
+    assert (gc.lost == [True, False]).all()
+    assert np.isclose(gc.x[0, 2], 1 * u.m)
+
+
+def test_zero_field():
+    x = np.linspace(-1, 1, 3) * u.m
+    with pytest.raises(ValueError):
+        GuidingCenter(Plasma3D(x, x, x), dt=1 * u.s, nt=2)
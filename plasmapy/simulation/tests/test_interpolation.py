@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import scipy.interpolate as interp
+
+from plasmapy.simulation import GridInterpolator
+
+
+@pytest.mark.parametrize('axes', [
+    (np.linspace(0, 1, 5), np.linspace(-1, 1, 7), np.linspace(2, 3, 4)),
+    (np.linspace(0, 1, 5), np.array([0, 0.1, 0.5, 1.0]), np.linspace(2, 3, 4)),
+])
+def test_matches_scipy(axes):
+    r"""Interpolated values agree with scipy's trilinear interpolation on
+    uniform and non-uniform axes."""
+    rng = np.random.RandomState(0)
+    values = rng.normal(size=(3, *[a.size for a in axes]))
+    points = np.stack([rng.uniform(a[0], a[-1], 50) for a in axes], axis=1)
+
+    expected = interp.RegularGridInterpolator(
+        axes, np.moveaxis(values, 0, -1))(points)
+    result = GridInterpolator(axes, values)(points)
+
+    assert result.shape == (50, 3)
+    assert np.allclose(result, expected)
+
+
+def test_component_last_layout():
+    r"""Transposed views of (x, y, z, 3) arrays are used without copying
+    and give the same result."""
+    axes = (np.linspace(0, 1, 5), np.linspace(-1, 1, 7), np.linspace(2, 3, 4))
+    rng = np.random.RandomState(1)
+    stored = rng.normal(size=(5, 7, 4, 3))
+    points = np.stack([rng.uniform(a[0], a[-1], 20) for a in axes], axis=1)
+
+    interpolator = GridInterpolator(axes, np.moveaxis(stored, -1, 0))
+    expected = GridInterpolator(
+        axes, np.ascontiguousarray(np.moveaxis(stored, -1, 0)))(points)
+
+    assert np.shares_memory(interpolator._values, stored)
+    assert np.allclose(interpolator(points), expected)
+
+
+def test_singleton_axis():
+    r"""Singleton axes are treated as invariant directions."""
+    axes = (np.linspace(0, 1, 11), np.zeros(1), np.zeros(1))
+    values = np.linspace(0, 1, 11)[:, np.newaxis, np.newaxis] * 2
+    points = np.array([[0.25, 5.0, -3.0], [0.5, 0.0, 0.0]])
+
+    result = GridInterpolator(axes, values)(points)
+
+    assert result.shape == (2,)
+    assert np.allclose(result, [0.5, 1.0])
+
+
+def test_out_of_bounds():
+    axes = (np.linspace(0, 1, 3),) * 3
+    values = np.zeros((3, 3, 3))
+    points = np.array([[0.5, 0.5, 0.5], [1.5, 0.5, 0.5]])
+
+    with pytest.raises(ValueError):
+        GridInterpolator(axes, values)(points)
+
+    result = GridInterpolator(axes, values, fill_value=np.nan)(points)
+    assert result[0] == 0
+    assert np.isnan(result[1])
+    assert (GridInterpolator(axes, values).contains(points) ==
+            [True, False]).all()
+
+
+def test_periodic_axis():
+    r"""Periodic axes wrap positions with the period of CIC gathering."""
+    from plasmapy.simulation import deposition
+
+    axes = (np.arange(8) * 0.5, np.linspace(0, 1, 5), np.zeros(1))
+    rng = np.random.RandomState(2)
+    values = rng.normal(size=(8, 5, 1))
+    points = np.stack([rng.uniform(-4, 8, 40), rng.uniform(0, 1, 40),
+                       np.zeros(40)], axis=1)
+
+    interpolator = GridInterpolator(axes, values, periodic=(True, False,
+                                                            False))
+    expected = deposition.gather(points, values, axes, periodic=True)
+
+    assert interpolator.contains(points).all()
+    assert np.allclose(interpolator(points), expected)
+
+    with pytest.raises(ValueError):
+        GridInterpolator((np.array([0, 1, 3]),) * 3, np.zeros((3, 3, 3)),
+                         periodic=True)
@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import mu0
+from plasmapy.simulation import FiniteDifference, IdealMHD
+
+#: Magnetic field in T of one unit of B / sqrt(mu0)
+B_UNIT = np.sqrt(mu0.si.value)
+
+
+def line(n):
+    x = (np.arange(n) + 0.5) / n * u.m
+    return Plasma3D(x, np.zeros(1) * u.m, np.zeros(1) * u.m), x.value
+
+
+def orszag_tang(n):
+    r"""Orszag-Tang vortex on an n x n grid with the usual normalization
+    of :math:`\gamma = 5/3`."""
+    gamma = 5 / 3
+    x = np.arange(n) / n * u.m
+    test_plasma = Plasma3D(x, x, np.zeros(1) * u.m)
+    X, Y = np.meshgrid(x.value + 0.5 / n, x.value + 0.5 / n, indexing='ij')
+    X, Y = X[..., np.newaxis], Y[..., np.newaxis]
+    test_plasma.density[...] = gamma ** 2 * u.kg / u.m ** 3
+    test_plasma.pressure[...] = gamma * u.Pa
+    momentum_unit = u.kg / (u.m ** 2 * u.s)
+    test_plasma.momentum[0] = -gamma ** 2 * np.sin(2 * np.pi * Y) * \
+        momentum_unit
+    test_plasma.momentum[1] = gamma ** 2 * np.sin(2 * np.pi * X) * \
+        momentum_unit
+    test_plasma.magnetic_field[0] = -np.sin(2 * np.pi * Y) * B_UNIT * u.T
+    test_plasma.magnetic_field[1] = np.sin(4 * np.pi * X) * B_UNIT * u.T
+    return test_plasma
+
+
+@pytest.mark.parametrize('riemann_solver', ['HLL', 'HLLD'])
+def test_uniform_state(riemann_solver):
+    r"""A uniform state with an oblique field is preserved."""
+    x = np.arange(6) / 6 * u.m
+    test_plasma = Plasma3D(x, x, x)
+    test_plasma.density[...] = 2 * u.kg / u.m ** 3
+    test_plasma.pressure[...] = 3 * u.Pa
+    test_plasma.momentum[...] = np.array([1, -2, 0.5])[:, None, None, None] \
+        * u.kg / (u.m ** 2 * u.s)
+    test_plasma.magnetic_field[...] = \
+        np.array([1, 2, -1])[:, None, None, None] * B_UNIT * u.T
+    initial = {name: getattr(test_plasma, name).copy()
+               for name in ('density', 'momentum', 'pressure',
+                            'magnetic_field')}
+
+    solver = IdealMHD(test_plasma, riemann_solver=riemann_solver)
+    solver.run(n_steps=3)
+    for name, value in initial.items():
+        assert u.allclose(getattr(test_plasma, name), value, rtol=1e-12)
+    assert solver.step_count == 3
+
+
+@pytest.mark.parametrize('riemann_solver', ['HLL', 'HLLD'])
+@pytest.mark.parametrize('wave', ['sound', 'Alfven'])
+def test_linear_wave_convergence(riemann_solver, wave):
+    r"""Linear waves crossing a periodic domain converge at second
+    order."""
+    amplitude = 1e-6
+    errors = []
+    for n in (32, 64):
+        test_plasma, x = line(n)
+        phase = amplitude * np.sin(2 * np.pi * x)[:, np.newaxis, np.newaxis]
+        # Sound and Alfven speeds of one
+        test_plasma.density[...] = 1 * u.kg / u.m ** 3
+        test_plasma.pressure[...] = 0.6 * u.Pa
+        if wave == 'sound':
+            test_plasma.density[...] += phase * u.kg / u.m ** 3
+            test_plasma.pressure[...] += phase * u.Pa
+            test_plasma.momentum[0] = phase * u.kg / (u.m ** 2 * u.s)
+            component, variable = 0, 'density'
+        else:
+            test_plasma.magnetic_field[0] = B_UNIT * u.T
+            test_plasma.magnetic_field[1] = -phase * B_UNIT * u.T
+            test_plasma.momentum[1] = phase * u.kg / (u.m ** 2 * u.s)
+            component, variable = 1, 'magnetic_field'
+        initial = getattr(test_plasma, variable).value.copy()
+
+        solver = IdealMHD(test_plasma, riemann_solver=riemann_solver)
+        solver.run(t_end=1 * u.s)
+        assert u.isclose(solver.time, 1 * u.s)
+
+        final = getattr(test_plasma, variable).value
+        if variable == 'magnetic_field':
+            final, initial = final[component], initial[component]
+        errors.append(np.abs(final - initial).mean() / amplitude)
+
+    assert errors[1] < 0.02
+    assert np.log2(errors[0] / errors[1]) > 1.6
+
+
+def test_orszag_tang_conservation():
+    r"""Mass and momentum are conserved to rounding on periodic grids and
+    the timings of all stages are recorded."""
+    test_plasma = orszag_tang(32)
+    mass = test_plasma.density.sum()
+    momentum = test_plasma.momentum.sum(axis=(1, 2, 3))
+
+    solver = IdealMHD(test_plasma)
+    solver.run(t_end=0.2 * u.s)
+
+    assert u.isclose(test_plasma.density.sum(), mass, rtol=1e-13)
+    assert u.allclose(test_plasma.momentum.sum(axis=(1, 2, 3)), momentum,
+                      atol=1e-11 * mass.value * u.kg / (u.m ** 2 * u.s))
+    assert (test_plasma.pressure > 0).all()
+    assert set(solver.timings) == {'primitives', 'reconstruction',
+                                   'riemann', 'update', 'time_step'}
+    assert all(value > 0 for value in solver.timings.values())
+
+    solver.reset_timings()
+    assert sum(solver.timings.values()) == 0
+
+
+def test_divergence_cleaning():
+    r"""Cleaning keeps the divergence of the field smaller."""
+    divergence = []
+    for cleaning in (False, True):
+        test_plasma = orszag_tang(32)
+        IdealMHD(test_plasma, divergence_cleaning=cleaning).run(
+            t_end=0.3 * u.s)
+        operator = FiniteDifference(test_plasma)
+        divergence.append(np.abs(operator.divergence(
+            test_plasma.magnetic_field.value / B_UNIT)).mean())
+    assert divergence[1] < 0.5 * divergence[0]
+
+
+def test_brio_wu():
+    r"""The HLL and HLLD solutions of the Brio & Wu shock tube agree, and
+    stay within the initial density range with outflow boundaries."""
+    densities = []
+    for riemann_solver in ('HLL', 'HLLD'):
+        test_plasma, x = line(200)
+        left = (x < 0.5)[:, np.newaxis, np.newaxis]
+        test_plasma.density[...] = np.where(left, 1, 0.125) * \
+            u.kg / u.m ** 3
+        test_plasma.pressure[...] = np.where(left, 1, 0.1) * u.Pa
+        test_plasma.magnetic_field[0] = 0.75 * B_UNIT * u.T
+        test_plasma.magnetic_field[1] = np.where(left, 1, -1) * B_UNIT * u.T
+
+        solver = IdealMHD(test_plasma, gamma=2, riemann_solver=riemann_solver,
+                          boundary='outflow')
+        solver.run(t_end=0.1 * u.s)
+        density = test_plasma.density.value.ravel()
+        assert density.min() > 0.11
+        assert density.max() < 1 + 1e-3
+        densities.append(density)
+
+    assert np.abs(densities[0] - densities[1]).mean() < 0.01
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'riemann_solver': 'Roe'},
+    {'limiter': 'superbee'},
+    {'cfl': 0},
+    {'boundary': 'reflecting'},
+    {'boundary': ('periodic', 'outflow')},
+])
+def test_invalid(kwargs):
+    test_plasma, _ = line(8)
+    with pytest.raises(ValueError):
+        IdealMHD(test_plasma, **kwargs)
+
+
+def test_invalid_units():
+    x = np.arange(8) / 8 * u.m
+    test_plasma = Plasma3D.from_arrays(x, x, x,
+                                       magnetic_field=np.zeros((3, 8, 8, 8)),
+                                       units={'magnetic_field': u.G})
+    with pytest.raises(ValueError):
+        IdealMHD(test_plasma)
+    with pytest.raises(ValueError):
+        IdealMHD(orszag_tang(8)).run()
@@ -0,0 +1,121 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.simulation import FiniteDifference
+
+
+def make_plasma(n, boundary):
+    if boundary == 'periodic':
+        x = np.arange(n) / n
+    else:
+        x = np.linspace(0, 1, n)
+    return Plasma3D(x * u.m, x * u.m, np.zeros(1) * u.m), x
+
+
+@pytest.mark.parametrize('boundary', ['periodic', 'one-sided'])
+@pytest.mark.parametrize('order', [2, 4])
+def test_convergence(boundary, order):
+    r"""Errors of the gradient and Laplacian decrease with the order of
+    the stencils."""
+    errors = []
+    for n in (24, 48):
+        test_plasma, x = make_plasma(n, boundary)
+        X, Y = np.meshgrid(x, x, indexing='ij')
+        f = (np.sin(2 * np.pi * X) * np.cos(2 * np.pi * Y))[..., np.newaxis]
+
+        fd = FiniteDifference(test_plasma, order=order, boundary=boundary)
+        grad = fd.gradient(f)
+        expected = 2 * np.pi * np.cos(2 * np.pi * X) * np.cos(2 * np.pi * Y)
+        laplacian = fd.laplacian(f)
+
+        assert grad.shape == (3, n, n, 1)
+        assert (grad[2] == 0).all()
+        errors.append([np.abs(grad[0, ..., 0] - expected).max(),
+                       np.abs(laplacian + 8 * np.pi ** 2 * f).max()])
+
+    rates = np.log2(np.array(errors[0]) / np.array(errors[1]))
+    assert (rates > order - 0.3).all()
+
+
+@pytest.mark.parametrize('order', [2, 4])
+def test_vector_identities(order):
+    rng = np.random.RandomState(0)
+    x = np.arange(8) * u.m
+    test_plasma = Plasma3D(x, x, x[:6])
+    fd = FiniteDifference(test_plasma, order=order)
+
+    phi = rng.normal(size=(8, 8, 6))
+    F = rng.normal(size=(3, 8, 8, 6))
+    assert np.allclose(fd.curl(fd.gradient(phi)), 0, atol=1e-12)
+    assert np.allclose(fd.divergence(fd.curl(F)), 0, atol=1e-12)
+
+    # Component-wise Laplacian of a vector field
+    laplacian = fd.laplacian(F)
+    assert np.allclose(laplacian[1], fd.laplacian(F[1]))
+
+
+def test_units_and_out():
+    x = np.arange(8) * u.cm
+    test_plasma = Plasma3D(x, x, x)
+    fd = FiniteDifference(test_plasma)
+    B = np.zeros((3, 8, 8, 8)) * u.G
+    B[2] = np.sin(2 * np.pi * np.arange(8) / 8)[:, None, None] * u.G
+
+    J = fd.curl(B)
+    assert J.unit == u.G / u.m
+
+    out = np.empty((3, 8, 8, 8)) * u.T / u.m
+    assert fd.curl(B, out=out) is out
+    assert np.allclose(out, J)
+
+    plain = np.empty((3, 8, 8, 8))
+    fd.curl(B, out=plain)
+    assert np.allclose(plain, J.si.value)
+
+    # A single derivative matches the corresponding gradient component
+    assert np.allclose(fd.derivative(B[2], 0), fd.gradient(B[2])[0])
+
+
+def test_no_allocations_with_out():
+    r"""Repeated evaluation into preallocated arrays does not allocate
+    full-grid temporaries."""
+    x = np.arange(64) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    F = np.random.RandomState(1).normal(size=(3, 64, 64, 64))
+    out = np.empty_like(F)
+    for boundary in ('periodic', 'one-sided'):
+        fd = FiniteDifference(test_plasma, order=4, boundary=boundary)
+        fd.curl(F, out=out)
+
+        tracemalloc.start()
+        fd.curl(F, out=out)
+        fd.laplacian(F, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # NumPy's fixed-size ufunc buffers are all that remains
+        assert peak < F[0].nbytes / 4
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'order': 3},
+    {'boundary': 'open'},
+    {'boundary': ('periodic', 'one-sided')},
+    {'order': 4, 'boundary': 'one-sided'},
+])
+def test_invalid(kwargs):
+    x = np.arange(5) * u.m
+    with pytest.raises(ValueError):
+        FiniteDifference(Plasma3D(x, x, x), **kwargs)
+
+
+def test_shape_mismatch():
+    x = np.arange(5) * u.m
+    fd = FiniteDifference(Plasma3D(x, x, x))
+    with pytest.raises(ValueError):
+        fd.gradient(np.zeros((4, 5, 5)))
+    with pytest.raises(ValueError):
+        fd.divergence(np.zeros((3, 5, 5, 5)), out=np.zeros((3, 5, 5, 5)))
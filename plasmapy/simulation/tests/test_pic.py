@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D, Species
+from plasmapy.constants import e, m_e, eps0
+from plasmapy.simulation import ElectrostaticPIC
+
+
+def two_stream(n_cells=32, n_particles=1024):
+    r"""Two counter-streaming cold electron beams on a neutralizing
+    background, with the fundamental mode close to maximum growth."""
+    n0 = 1e14 / u.m ** 3
+    w_pe = np.sqrt(n0 * e ** 2 / (eps0 * m_e)).to(1 / u.s)
+    v0 = 1e6 * u.m / u.s
+    L = (2 * np.pi * v0 / (0.8 * w_pe)).to(u.m)
+
+    test_plasma = Plasma3D(np.arange(n_cells) * L / n_cells,
+                           np.zeros(1) * u.m, np.zeros(1) * u.m)
+
+    species = []
+    for sign in (1, -1):
+        s = Species(test_plasma, 'e', n_particles,
+                    scaling=(n0 * L * u.m ** 2 / (2 * n_particles)).value,
+                    dt=0.05 / w_pe, nt=1)
+        x = (np.arange(n_particles) + 0.5) / n_particles * L
+        phase = 2 * np.pi * (x / L).to_value(u.dimensionless_unscaled)
+        s.x[:, 0] = x + sign * 1e-3 * L * np.sin(phase)
+        s.v[:, 0] = sign * v0
+        species.append(s)
+    return test_plasma, species
+
+
+def test_two_stream_instability():
+    r"""The field energy of the two-stream instability grows by orders of
+    magnitude while the total energy is conserved."""
+    test_plasma, species = two_stream()
+    sim = ElectrostaticPIC(test_plasma, species, output_interval=20,
+                           save_fields=True)
+    sim.run(200)
+
+    history = sim.history
+    assert history['time'].shape == (11,)
+    assert history['kinetic_energy'].shape == (11, 2)
+    assert history['electric_field'].shape == (11, 3, 32, 1, 1)
+    assert np.isclose(history['time'][-1], 200 * species[0].dt)
+
+    field_energy = history['field_energy']
+    assert field_energy[-1] > 100 * field_energy[1]
+
+    total = history['kinetic_energy'].sum(axis=1) + field_energy
+    assert np.allclose(total, total[0], rtol=1e-3)
+
+    for s in species:
+        assert ((s.x[:, 0] >= 0) & (s.x[:, 0] < test_plasma.x[-1] +
+                                     test_plasma.x[1])).all()
+
+
+def test_mismatched_time_steps():
+    test_plasma, species = two_stream(8, 8)
+    species[1].dt = species[1].dt * 2
+    with pytest.raises(ValueError):
+        ElectrostaticPIC(test_plasma, species)
+
+
+def test_species_boundaries():
+    test_plasma, species = two_stream(8, 8)
+    species[0].boundary = ('periodic', 'reflecting', 'absorbing')
+    ElectrostaticPIC(test_plasma, species)
+
+    species[1].boundary = ('reflecting', 'periodic', 'periodic')
+    with pytest.raises(ValueError):
+        ElectrostaticPIC(test_plasma, species)
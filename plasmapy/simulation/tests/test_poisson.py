@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import eps0
+from plasmapy.simulation import SpectralPoissonSolver
+
+
+@pytest.mark.parametrize('dim, shape', [
+    (0, (32, 1, 1)),
+    (1, (8, 16, 4)),
+    (2, (4, 4, 15)),
+])
+def test_sinusoidal_charge(dim, shape):
+    r"""The field of a sinusoidal charge density matches the analytic
+    solution along each axis."""
+    L = 2 * u.m
+    axes = [np.arange(n) * L / n if n > 1 else np.zeros(1) * u.m
+            for n in shape]
+    test_plasma = Plasma3D(*axes)
+    solver = SpectralPoissonSolver(test_plasma)
+
+    k = 2 * np.pi / L
+    coord = np.meshgrid(*axes, indexing='ij')[dim]
+    rho0 = 1e-9 * u.C / u.m ** 3
+    phase = (k * coord).to_value(u.dimensionless_unscaled)
+    rho = rho0 * np.sin(phase)
+
+    E = solver.solve(rho)
+
+    expected = -(rho0 / (eps0 * k) * np.cos(phase)).to(u.V / u.m)
+    assert E is test_plasma.electric_field
+    assert np.allclose(E[dim], expected, atol=1e-12 * expected.max())
+    for other in set(range(3)) - {dim}:
+        assert np.allclose(E[other].value, 0, atol=1e-12 * expected.max().value)
+    assert np.allclose(solver.potential, (rho / (eps0 * k ** 2)).to(u.V))
+
+
+def test_uniform_charge_is_neutralized():
+    x = np.arange(8) * u.m
+    test_plasma = Plasma3D(x, x, x)
+    E = SpectralPoissonSolver(test_plasma).solve(
+        np.ones((8, 8, 8)) * u.C / u.m ** 3)
+    assert np.allclose(E.value, 0)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from plasmapy.simulation import sorting
+
+
+axes = (np.linspace(0, 1, 5), np.linspace(0, 2, 3), np.linspace(0, 1, 4))
+
+
+def test_cell_index():
+    positions = np.array([[0.1, 0.1, 0.1],
+                          [0.3, 1.5, 0.5],
+                          [1.0, 2.0, 1.0],
+                          [-1.0, 0.5, 0.0]])
+    # strides of the (5, 3, 4) grid are (12, 4, 1)
+    expected = [0, 12 + 4 + 1, 4 * 12 + 2 * 4 + 3, 0]
+    assert list(sorting.cell_index(positions, axes)) == expected
+
+
+def test_cell_index_nonuniform():
+    nonuniform = (np.array([0, 0.1, 1, 3]), [0.0], [0.0])
+    positions = np.array([[0.05, 5, 0], [0.5, 0, 0], [2.9, 0, 0]])
+    assert list(sorting.cell_index(positions, nonuniform)) == [0, 1, 2]
+
+
+@pytest.mark.parametrize('n_cells', [None, 60, 10 ** 6])
+def test_sort_permutation_is_stable(n_cells):
+    cells = np.array([3, 1, 3, 0, 1, 3])
+    permutation = sorting.sort_permutation(cells, n_cells)
+    assert list(permutation) == [3, 1, 4, 0, 2, 5]
+
+
+def test_sort_by_cell():
+    rng = np.random.RandomState(0)
+    positions = np.stack([rng.uniform(a[0], a[-1], 200) for a in axes],
+                         axis=1)
+    velocities = rng.normal(size=(200, 3))
+    ids = np.arange(200)
+    original_positions = positions.copy()
+    original_velocities = velocities.copy()
+
+    permutation = sorting.sort_by_cell(positions, axes, velocities, ids)
+
+    assert np.all(np.diff(sorting.cell_index(positions, axes)) >= 0)
+    assert np.array_equal(ids, permutation)
+    assert np.array_equal(positions, original_positions[ids])
+    assert np.array_equal(velocities, original_velocities[ids])
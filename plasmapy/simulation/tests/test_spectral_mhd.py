@@ -0,0 +1,143 @@
+import sys
+
+import numpy as np
+import pytest
+from astropy import units as u
+
+from plasmapy.classes import Plasma3D
+from plasmapy.constants import mu0
+from plasmapy.simulation import SpectralMHD
+
+#: Magnetic field in T of one unit of B / sqrt(mu0 rho) for unit density
+B_UNIT = np.sqrt(mu0.si.value)
+MOMENTUM = u.kg / (u.m ** 2 * u.s)
+
+
+def make_plasma(n, nz=1, length=1):
+    x = np.arange(n) / n * length * u.m
+    z = np.arange(nz) / nz * length * u.m
+    test_plasma = Plasma3D(x, x, z)
+    test_plasma.density[...] = 1 * u.kg / u.m ** 3
+    X, Y, Z = test_plasma.grid.value
+    return test_plasma, X, Y, Z
+
+
+@pytest.fixture(params=['scipy', 'pyfftw'])
+def fft_backend(request, monkeypatch):
+    r"""Run the transforms with `scipy.fft`, hiding pyFFTW, and with
+    pyFFTW plans if it is installed."""
+    if request.param == 'pyfftw':
+        pytest.importorskip('pyfftw')
+    else:
+        # A None entry makes importing the module raise ImportError
+        monkeypatch.setitem(sys.modules, 'pyfftw', None)
+    return request.param
+
+
+@pytest.mark.usefixtures('fft_backend')
+def test_diffusion():
+    r"""Parallel shear flows and fields decay exactly with their
+    diffusivities."""
+    test_plasma, _, Y, _ = make_plasma(16, nz=4, length=2 * np.pi)
+    test_plasma.momentum[0] = np.sin(Y) * MOMENTUM
+    test_plasma.magnetic_field[0] = np.sin(2 * Y) * B_UNIT * u.T
+
+    solver = SpectralMHD(test_plasma, viscosity=0.1 * u.m ** 2 / u.s,
+                         resistivity=0.02 * u.m ** 2 / u.s)
+    solver.run(t_end=2 * u.s)
+
+    assert u.isclose(solver.time, 2 * u.s)
+    assert u.allclose(test_plasma.momentum[0],
+                      np.exp(-0.2) * np.sin(Y) * MOMENTUM,
+                      atol=1e-12 * MOMENTUM)
+    assert u.allclose(test_plasma.magnetic_field[0],
+                      np.exp(-0.16) * np.sin(2 * Y) * B_UNIT * u.T,
+                      atol=1e-12 * B_UNIT * u.T)
+
+
+@pytest.mark.usefixtures('fft_backend')
+@pytest.mark.parametrize('direction', [1, -1])
+def test_alfven_wave(direction):
+    r"""A finite amplitude Alfven wave is an exact nonlinear solution and
+    returns to its initial state after crossing the domain."""
+    test_plasma, X, _, _ = make_plasma(32)
+    perturbation = 0.5 * np.sin(2 * np.pi * X)
+    test_plasma.magnetic_field[0] = B_UNIT * u.T
+    test_plasma.magnetic_field[1] = perturbation * B_UNIT * u.T
+    test_plasma.momentum[1] = direction * perturbation * MOMENTUM
+
+    solver = SpectralMHD(test_plasma, viscosity=0 * u.m ** 2 / u.s)
+    energy = sum(solver.energy())
+    solver.run(t_end=1 * u.s)
+
+    assert np.allclose(test_plasma.magnetic_field[1].value / B_UNIT,
+                       perturbation, atol=1e-4)
+    assert u.isclose(sum(solver.energy()), energy, rtol=1e-4)
+
+
+@pytest.mark.usefixtures('fft_backend')
+def test_orszag_tang_ideal():
+    r"""Without diffusion the total energy is conserved and the velocity
+    and field stay divergence-free."""
+    test_plasma, X, Y, _ = make_plasma(48, length=2 * np.pi)
+    test_plasma.momentum[0] = -np.sin(Y) * MOMENTUM
+    test_plasma.momentum[1] = np.sin(X) * MOMENTUM
+    test_plasma.magnetic_field[0] = -np.sin(Y) * B_UNIT * u.T
+    test_plasma.magnetic_field[1] = np.sin(2 * X) * B_UNIT * u.T
+
+    solver = SpectralMHD(test_plasma, viscosity=0 * u.m ** 2 / u.s)
+    kinetic, magnetic = solver.energy()
+    assert u.isclose(kinetic, 0.5 * u.J / u.m ** 3)
+    assert u.isclose(magnetic, 0.5 * u.J / u.m ** 3)
+
+    state = solver._state
+    solver.run(t_end=0.4 * u.s)
+    assert solver._state is state
+    assert u.isclose(sum(solver.energy()), kinetic + magnetic, rtol=1e-5)
+
+    for field in (state[:3], state[3:]):
+        divergence = sum(k * f for k, f in zip(solver.k, field))
+        assert np.abs(divergence).max() < 1e-10 * np.abs(field).max()
+
+
+@pytest.mark.usefixtures('fft_backend')
+def test_single_precision():
+    test_plasma, X, Y, _ = make_plasma(16, nz=8, length=2 * np.pi)
+    test_plasma.momentum[0] = -np.sin(Y) * MOMENTUM
+    test_plasma.momentum[1] = np.sin(X) * MOMENTUM
+    reference = test_plasma.momentum.copy()
+
+    solver = SpectralMHD(test_plasma, viscosity=0.01 * u.m ** 2 / u.s,
+                         dtype=np.float32)
+    assert solver._state.dtype == np.complex64
+    solver.run(n_steps=3)
+    assert solver.step_count == 3
+    assert u.allclose(test_plasma.momentum, reference, atol=0.1 * MOMENTUM)
+
+
+def test_dealiasing_mask():
+    test_plasma, _, _, _ = make_plasma(12, nz=12)
+    solver = SpectralMHD(test_plasma, viscosity=0 * u.m ** 2 / u.s)
+    assert solver.mask.shape == (12, 12, 7)
+    # Modes 0 .. 3 are kept along each axis
+    assert solver.mask.sum() == 7 * 7 * 4
+    undealiased = SpectralMHD(test_plasma, viscosity=0 * u.m ** 2 / u.s,
+                              dealias=False)
+    assert undealiased.mask.all()
+
+
+def test_invalid():
+    test_plasma, _, _, _ = make_plasma(8)
+    nu = 0.1 * u.m ** 2 / u.s
+    with pytest.raises(ValueError):
+        SpectralMHD(test_plasma, nu, cfl=0)
+    with pytest.raises(ValueError):
+        SpectralMHD(test_plasma, nu, dtype=np.int64)
+    with pytest.raises(ValueError):
+        SpectralMHD(test_plasma, nu).run()
+    with pytest.raises(ValueError):
+        SpectralMHD(test_plasma, nu).run(n_steps=1)
+
+    test_plasma.density[0] = 2 * u.kg / u.m ** 3
+    with pytest.raises(ValueError):
+        SpectralMHD(test_plasma, nu)
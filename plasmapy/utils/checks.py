@@ -235,13 +235,6 @@ def _check_quantity(arg, argname, funcname, units, can_be_negative=True,
 
     # Make sure arg is a quantity with correct units
 
-    unit_casting_warning = dedent(
-            f"""No units are specified for {argname} = {arg} in {funcname}. Assuming units of {str(units[0])}.
-                To silence this warning, explicitly pass in an Astropy Quantity (from astropy.units)
-                (see http://docs.astropy.org/en/stable/units/)""")
-
-    # TODO include explicit note on how to pass in Astropy Quantity
-
     valueerror_message = (
         f"The argument {argname} to function {funcname} cannot contain"
     )
@@ -254,11 +247,21 @@ def _check_quantity(arg, argname, funcname, units, can_be_negative=True,
         if len(units) != 1:
             raise TypeError(typeerror_message)
         else:
+            value = arg
             try:
                 arg = arg * units[0]
             except Exception:
                 raise TypeError(typeerror_message)
             else:
+                # The message formats the whole argument, so it is only
+                # built when the warning is issued
+                # TODO include explicit note on how to pass in Astropy Quantity
+                unit_casting_warning = dedent(
+                    f"No units are specified for {argname} = {value} in "
+                    f"{funcname}. Assuming units of {str(units[0])}.\n"
+                    f"                To silence this warning, explicitly pass "
+                    f"in an Astropy Quantity (from astropy.units)\n"
+                    f"                (see http://docs.astropy.org/en/stable/units/)")
                 warnings.warn(UnitsWarning(unit_casting_warning))
     if not isinstance(arg, u.Quantity):
         raise u.UnitsError("{} is still not a Quantity after checks!".format(arg))
@@ -134,6 +134,10 @@ setup(name=PACKAGENAME,
       scripts=scripts,
       setup_requires=metadata.get("setup_requires", None),
       install_requires=[s.strip() for s in metadata.get('install_requires', 'astropy').split(',')],
+      extras_require={name.strip(): [s.strip() for s in requirements.split(',')]
+                      for name, requirements in
+                      (extra.split(':') for extra in
+                       metadata.get('extras_require', '').split(';') if extra.strip())},
       author=AUTHOR,
       author_email=AUTHOR_EMAIL,
       license=LICENSE,